@@ -5,5 +5,25 @@ MASTER_CONFIG_FILE = "data_dir.cfg"
 MASTER_KEY_FILE = "master.key"
 CONFIG = {}
 global_language = "en"
+# Évaluation des filtres et agrégats par lots NumPy (False : ligne à ligne).
+vectorized_execution = True
+# Budget mémoire d'une jointure par hachage, en lignes du côté construit ; au-delà, partitions sur disque.
+join_memory_rows = 200000
+# Budget mémoire d'un GROUP BY, en groupes ; au-delà, les lignes des nouveaux groupes sont partitionnées sur disque.
+aggregate_memory_groups = 100000
+# Budget mémoire d'un ORDER BY, en lignes par passe triée ; au-delà, passes sur disque fusionnées (tri externe).
+sort_memory_rows = 200000
+# Budget mémoire de UNION / INTERSECT / EXCEPT, en lignes distinctes ; au-delà, les nouvelles lignes sont partitionnées sur disque.
+set_memory_rows = 200000
+# Budget mémoire d'une CTE lue plusieurs fois, en lignes ; au-delà, le reste est écrit dans un fichier temporaire.
+cte_memory_rows = 200000
+# Garde-fous de WITH RECURSIVE : nombre d'itérations et de lignes au-delà duquel la requête échoue.
+recursive_max_iterations = 1000
+recursive_max_rows = 1000000
+# Cache des résultats de SELECT : nombre d'entrées et total de lignes gardées (0 entrée le désactive).
+result_cache_entries = 256
+result_cache_rows = 100000
+# Parcours séquentiels parallèles : nombre de processus de travail (0 : un par cœur ; 1 : parcours toujours en série).
+parallel_workers = 0
 SSL_CERT = os.path.join(os.path.dirname(__file__), "server.pem")
 SSL_KEY = os.path.join(os.path.dirname(__file__), "server.key")
\ No newline at end of file
@@ -21,6 +21,14 @@ LANGUAGES = {
         "unique_constraint": "La valeur {val} pour {col} doit être unique",
         "invalid_columns": "Colonnes invalides",
         "no_row_updated": "Aucune ligne modifiée",
+        "no_row_deleted": "Aucune ligne supprimée",
+        "rows_deleted": "{count} ligne(s) supprimée(s)",
+        "records_inserted": "{count} enregistrements insérés",
+        "prepared_created": "Instruction préparée {name} créée",
+        "prepared_not_found": "Instruction préparée {name} introuvable",
+        "prepared_deallocated": "Instruction préparée {name} supprimée",
+        "prepared_param_count": "L'instruction {name} attend {expected} paramètre(s), {given} fourni(s)",
+        "table_analyzed": "Statistiques collectées pour : {tables}",
         "column_already_exists": "La colonne existe déjà",
         "column_not_exists": "La colonne n'existe pas",
         "data_updated": "Données mises à jour",
@@ -29,6 +37,9 @@ LANGUAGES = {
         "backup_created": "Sauvegarde effectuée : {backup_file}",
         "restore_completed": "Restauration effectuée depuis : {backup_file}",
         "index_created": "Index {index_type} créé sur {table}.{column}",
+        "index_type_not_supported": "Type d'index non supporté : {index_type}",
+        "bitmap_high_cardinality": "La colonne {column} a {distinct} valeurs distinctes : un index bitmap est peu adapté.",
+        "invalid_json": "JSON invalide pour la colonne {col} : {error}",
         "otp_sent": "Un code OTP a été envoyé. Veuillez le saisir : ",
         "otp_invalid": "Code OTP invalide. Authentification échouée.",
     "session_started": "Session démarrée.",
@@ -61,6 +72,14 @@ LANGUAGES = {
         "table_sharded": "Table {table} partitionnée en {num_shards} shards sur la colonne {shard_column}.",
         "materialized_view_created": "Vue matérialisée {view_name} créée.",
         "materialized_view_refreshed": "Vue matérialisée {view_name} actualisée.",
+        "materialized_view_dropped": "Vue matérialisée {view_name} supprimée.",
+        "materialized_view_not_found": "Vue matérialisée {view_name} introuvable.",
+        "materialized_view_read_only": "{view_name} est une vue matérialisée : elle ne change que par REFRESH ou par ses tables de base.",
+        "materialized_view_dependents": "{table} est lue par les vues matérialisées : {views}.",
+        "materialized_view_column_dependents": "La colonne {column} de {table} est lue par les vues matérialisées : {views}.",
+        "materialized_view_failed": "Maintenance de la vue matérialisée {view_name} impossible : {error}",
+        "table_option_set": "Table {table} : {option} = {value}.",
+        "table_option_invalid": "Option de table non supportée : {option}",
         "cte_created": "CTE {cte_name} créé.",
         "savepoint_created": "Savepoint {savepoint_name} créé.",
         "savepoint_rolled_back": "Revenu au savepoint {savepoint_name}.",
@@ -77,7 +96,7 @@ LANGUAGES = {
         "division_completed": "Opération de division terminée entre {table1} et {table2}.",
         "json_table_error": "Erreur lors de l'extraction JSON_TABLE : {error}",
         "generated_column_added": "Colonne générée {column} ajoutée à {table}.",
-        "recursive_cte_completed": "CTE récursif {cte_name} exécuté avec succès.",
+        "generated_column_write": "La colonne {col} est générée : elle ne peut pas être écrite.",
         "sequence_created": "Séquence {sequence} créée.",
         "sequence_exists": "La séquence {sequence} existe déjà.",
         "enum_created": "Type ENUM {enum} créé.",
@@ -134,6 +153,14 @@ LANGUAGES = {
         "unique_constraint": "Value {val} for {col} must be unique",
         "invalid_columns": "Invalid columns",
         "no_row_updated": "No rows updated",
+        "no_row_deleted": "No rows deleted",
+        "rows_deleted": "{count} row(s) deleted",
+        "records_inserted": "{count} records inserted",
+        "prepared_created": "Prepared statement {name} created",
+        "prepared_not_found": "Prepared statement {name} not found",
+        "prepared_deallocated": "Prepared statement {name} deallocated",
+        "prepared_param_count": "Statement {name} expects {expected} parameter(s), {given} given",
+        "table_analyzed": "Statistics collected for: {tables}",
         "column_already_exists": "Column already exists",
         "column_not_exists": "Column does not exist",
         "data_updated": "Data updated",
@@ -142,6 +169,9 @@ LANGUAGES = {
         "backup_created": "Backup created: {backup_file}",
         "restore_completed": "Restored from backup: {backup_file}",
         "index_created": "{index_type} index created on {table}.{column}",
+        "index_type_not_supported": "Unsupported index type: {index_type}",
+        "bitmap_high_cardinality": "Column {column} has {distinct} distinct values: a bitmap index is a poor fit.",
+        "invalid_json": "Invalid JSON for column {col}: {error}",
         "otp_sent": "An OTP code has been sent. Please enter it: ",
         "otp_invalid": "Invalid OTP code. Authentication failed.",
     "session_started": "Session started.",
@@ -174,6 +204,14 @@ LANGUAGES = {
         "table_sharded": "Table {table} sharded into {num_shards} shards on column {shard_column}.",
         "materialized_view_created": "Materialized view {view_name} created.",
         "materialized_view_refreshed": "Materialized view {view_name} refreshed.",
+        "materialized_view_dropped": "Materialized view {view_name} dropped.",
+        "materialized_view_not_found": "Materialized view {view_name} not found.",
+        "materialized_view_read_only": "{view_name} is a materialized view: it only changes through REFRESH or its base tables.",
+        "materialized_view_dependents": "{table} is read by materialized views: {views}.",
+        "materialized_view_column_dependents": "Column {column} of {table} is read by materialized views: {views}.",
+        "materialized_view_failed": "Cannot maintain materialized view {view_name}: {error}",
+        "table_option_set": "Table {table}: {option} = {value}.",
+        "table_option_invalid": "Unsupported table option: {option}",
         "cte_created": "CTE {cte_name} created.",
         "savepoint_created": "Savepoint {savepoint_name} created.",
         "savepoint_rolled_back": "Rolled back to savepoint {savepoint_name}.",
@@ -190,7 +228,7 @@ LANGUAGES = {
         "division_completed": "Division operation completed between {table1} and {table2}.",
         "json_table_error": "Error during JSON_TABLE extraction: {error}",
         "generated_column_added": "Generated column {column} added to {table}.",
-        "recursive_cte_completed": "Recursive CTE {cte_name} executed successfully.",
+        "generated_column_write": "Column {col} is generated and cannot be written.",
         "sequence_created": "Sequence {sequence} created.",
         "sequence_exists": "Sequence {sequence} already exists.",
         "enum_created": "ENUM type {enum} created.",
@@ -0,0 +1,350 @@
+from array import array
+from bisect import bisect_left
+
+from utils.json_utils import evaluate_json_expression, parse_json_expression
+
+# Un conteneur couvre 2^16 identifiants de ligne (les 16 bits de poids faible).
+# En dessous de ARRAY_MAX valeurs il reste un tableau trié, au-delà il devient
+# un bitset de 8 Kio représenté par un entier Python (opérations bit à bit en C).
+CHUNK_BITS = 16
+CHUNK_SIZE = 1 << CHUNK_BITS
+CHUNK_MASK = CHUNK_SIZE - 1
+ARRAY_MAX = 4096
+_FULL_CHUNK = (1 << CHUNK_SIZE) - 1
+_BYTE_BITS = [tuple(b for b in range(8) if byte >> b & 1) for byte in range(256)]
+
+
+def _bitset_values(bits):
+    data = bits.to_bytes(CHUNK_SIZE // 8, "little")
+    for i, byte in enumerate(data):
+        if byte:
+            base = i << 3
+            for b in _BYTE_BITS[byte]:
+                yield base + b
+
+
+def _array_to_bitset(values):
+    bits = 0
+    for v in values:
+        bits |= 1 << v
+    return bits
+
+
+def _normalize(container):
+    """Choose the cheapest representation for a container, or None if empty."""
+    if isinstance(container, int):
+        count = bin(container).count("1")
+        if count == 0:
+            return None
+        if count <= ARRAY_MAX:
+            return array("H", _bitset_values(container))
+        return container
+    if not container:
+        return None
+    if len(container) > ARRAY_MAX:
+        return _array_to_bitset(container)
+    return container
+
+
+def _and(a, b):
+    if isinstance(a, int) and isinstance(b, int):
+        return _normalize(a & b)
+    if isinstance(a, int):
+        a, b = b, a
+    if isinstance(b, int):
+        return _normalize(array("H", (v for v in a if b >> v & 1)))
+    other = set(b)
+    return _normalize(array("H", (v for v in a if v in other)))
+
+
+def _or(a, b):
+    if isinstance(a, int) or isinstance(b, int):
+        bits_a = a if isinstance(a, int) else _array_to_bitset(a)
+        bits_b = b if isinstance(b, int) else _array_to_bitset(b)
+        return _normalize(bits_a | bits_b)
+    return _normalize(array("H", sorted(set(a).union(b))))
+
+
+def _andnot(a, b):
+    if isinstance(a, int):
+        bits_b = b if isinstance(b, int) else _array_to_bitset(b)
+        return _normalize(a & ~bits_b)
+    if isinstance(b, int):
+        return _normalize(array("H", (v for v in a if not b >> v & 1)))
+    other = set(b)
+    return _normalize(array("H", (v for v in a if v not in other)))
+
+
+class RoaringBitmap:
+    """Compressed set of row ids using the roaring layout.
+
+    Row ids are split on their high 16 bits into containers; sparse containers
+    are sorted arrays and dense ones are bitsets, so both low- and high-density
+    value lists stay compact and AND/OR/NOT run container by container.
+    """
+
+    __slots__ = ("containers",)
+
+    def __init__(self, values=None):
+        self.containers = {}
+        if values is not None:
+            for v in values:
+                self.add(v)
+
+    @classmethod
+    def range(cls, stop):
+        """Bitmap containing every row id in [0, stop)."""
+        bitmap = cls()
+        full_chunks, rest = divmod(stop, CHUNK_SIZE)
+        for high in range(full_chunks):
+            bitmap.containers[high] = _FULL_CHUNK
+        if rest:
+            bitmap.containers[full_chunks] = _normalize((1 << rest) - 1)
+        return bitmap
+
+    def add(self, value):
+        high, low = value >> CHUNK_BITS, value & CHUNK_MASK
+        container = self.containers.get(high)
+        if container is None:
+            self.containers[high] = array("H", [low])
+        elif isinstance(container, int):
+            self.containers[high] = container | (1 << low)
+        else:
+            lo, hi = 0, len(container)
+            while lo < hi:
+                mid = (lo + hi) // 2
+                if container[mid] < low:
+                    lo = mid + 1
+                else:
+                    hi = mid
+            if lo < len(container) and container[lo] == low:
+                return
+            container.insert(lo, low)
+            if len(container) > ARRAY_MAX:
+                self.containers[high] = _array_to_bitset(container)
+
+    def discard(self, value):
+        high, low = value >> CHUNK_BITS, value & CHUNK_MASK
+        container = self.containers.get(high)
+        if container is None:
+            return
+        if isinstance(container, int):
+            container = _normalize(container & ~(1 << low))
+        else:
+            try:
+                container.remove(low)
+            except ValueError:
+                return
+            container = _normalize(container)
+        if container is None:
+            del self.containers[high]
+        else:
+            self.containers[high] = container
+
+    def __contains__(self, value):
+        container = self.containers.get(value >> CHUNK_BITS)
+        if container is None:
+            return False
+        low = value & CHUNK_MASK
+        if isinstance(container, int):
+            return bool(container >> low & 1)
+        return low in container
+
+    def __iter__(self):
+        for high in sorted(self.containers):
+            base = high << CHUNK_BITS
+            container = self.containers[high]
+            values = _bitset_values(container) if isinstance(container, int) else container
+            for low in values:
+                yield base + low
+
+    def __len__(self):
+        return sum(
+            bin(c).count("1") if isinstance(c, int) else len(c)
+            for c in self.containers.values()
+        )
+
+    def __bool__(self):
+        return bool(self.containers)
+
+    def _combine(self, other, op, keep_left, keep_right):
+        result = RoaringBitmap()
+        for high in self.containers.keys() | other.containers.keys():
+            a = self.containers.get(high)
+            b = other.containers.get(high)
+            if a is not None and b is not None:
+                container = op(a, b)
+            elif a is not None:
+                container = _copy(a) if keep_left else None
+            else:
+                container = _copy(b) if keep_right else None
+            if container is not None:
+                result.containers[high] = container
+        return result
+
+    def __and__(self, other):
+        return self._combine(other, _and, False, False)
+
+    def __or__(self, other):
+        return self._combine(other, _or, True, True)
+
+    def __sub__(self, other):
+        return self._combine(other, _andnot, True, False)
+
+    def invert(self, universe):
+        """Complement within [0, universe), i.e. SQL NOT over a table of that size."""
+        return RoaringBitmap.range(universe) - self
+
+    def copy(self):
+        bitmap = RoaringBitmap()
+        bitmap.containers = {high: _copy(c) for high, c in self.containers.items()}
+        return bitmap
+
+
+def _copy(container):
+    return container if isinstance(container, int) else array("H", container)
+
+
+def _index_key(value):
+    try:
+        hash(value)
+        return value
+    except TypeError:
+        return repr(value)
+
+
+class BitmapIndex:
+    """One RoaringBitmap of row ids per distinct column value."""
+
+    def __init__(self, column, values=None):
+        self.column = column
+        self.bitmaps = {}
+        self._ordered = None
+        for value in values or []:
+            self.bitmaps[_index_key(value)] = RoaringBitmap()
+
+    @property
+    def source_columns(self):
+        return (self.column,)
+
+    def value_of(self, row):
+        return row.get(self.column)
+
+    def build(self, rows):
+        for row_id, row in enumerate(rows):
+            self.add_row(row, row_id)
+
+    def add_row(self, row, row_id):
+        self.add(self.value_of(row), row_id)
+
+    def remove_row(self, row, row_id):
+        self.remove(self.value_of(row), row_id)
+
+    def add(self, value, row_id):
+        key = _index_key(value)
+        bitmap = self.bitmaps.get(key)
+        if bitmap is None:
+            bitmap = self.bitmaps[key] = RoaringBitmap()
+            self._ordered = None
+        bitmap.add(row_id)
+
+    def remove(self, value, row_id):
+        bitmap = self.bitmaps.get(_index_key(value))
+        if bitmap is not None:
+            bitmap.discard(row_id)
+
+    def delete_rows(self, deleted):
+        """Drop the given sorted row ids and shift the following ones down, as the table does."""
+        deleted_set = set(deleted)
+        for key, bitmap in self.bitmaps.items():
+            self.bitmaps[key] = RoaringBitmap(
+                row_id - bisect_left(deleted, row_id) for row_id in bitmap if row_id not in deleted_set
+            )
+
+    def lookup(self, value):
+        bitmap = self.bitmaps.get(_index_key(value))
+        return bitmap.copy() if bitmap is not None else RoaringBitmap()
+
+    def lookup_any(self, values):
+        result = RoaringBitmap()
+        for value in values:
+            bitmap = self.bitmaps.get(_index_key(value))
+            if bitmap is not None:
+                result = result | bitmap
+        return result
+
+    def lookup_matching(self, test):
+        """Row ids of every value for which `test(value)` holds (ranges, LIKE)."""
+        row_ids = []
+        for key, bitmap in self.bitmaps.items():
+            if bitmap and test(key):
+                row_ids.extend(bitmap)
+        return RoaringBitmap(sorted(row_ids))
+
+    def ordered_keys(self, sort_key):
+        """Non-NULL keys sorted by `sort_key`, cached until a new key appears (ORDER BY ... LIMIT)."""
+        if self._ordered is None:
+            self._ordered = sorted((key for key in self.bitmaps if key is not None), key=sort_key)
+        return self._ordered
+
+    def cardinality(self):
+        return sum(1 for bitmap in self.bitmaps.values() if bitmap)
+
+
+class JsonPathIndex(BitmapIndex):
+    """Bitmap index keyed on a JSON path expression such as `data->'a'->'b'`."""
+
+    def __init__(self, expression, values=None):
+        column, _, _ = parse_json_expression(expression)
+        super().__init__(column, values)
+        self.expression = expression
+
+    def value_of(self, row):
+        return evaluate_json_expression(row, self.expression)
+
+
+class CoveringIndex(BitmapIndex):
+    """Bitmap index whose entries also carry INCLUDE column values.
+
+    `entries[row_id]` holds [key, *included values] for every row, so a query
+    reading only covered columns is answered without opening the table.
+    """
+
+    def __init__(self, column, include):
+        super().__init__(column)
+        self.include = list(include)
+        self.entries = []
+
+    @property
+    def source_columns(self):
+        return (self.column, *self.include)
+
+    def add_row(self, row, row_id):
+        entry = [row.get(self.column)] + [row.get(col) for col in self.include]
+        if row_id == len(self.entries):
+            self.entries.append(entry)
+        else:
+            self.entries[row_id] = entry
+        self.add(entry[0], row_id)
+
+    def remove_row(self, row, row_id):
+        self.remove(row.get(self.column), row_id)
+
+    def delete_rows(self, deleted):
+        super().delete_rows(deleted)
+        deleted_set = set(deleted)
+        self.entries = [entry for row_id, entry in enumerate(self.entries) if row_id not in deleted_set]
+
+    def row(self, row_id):
+        return dict(zip(self.source_columns, self.entries[row_id]))
+
+    def to_dict(self):
+        return {"column": self.column, "include": self.include, "entries": self.entries}
+
+    @classmethod
+    def from_dict(cls, data):
+        index = cls(data["column"], data["include"])
+        index.entries = data["entries"]
+        for row_id, entry in enumerate(index.entries):
+            index.add(entry[0], row_id)
+        return index
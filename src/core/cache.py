@@ -1,4 +1,6 @@
 import json
+from collections import OrderedDict
+
 try:
     import redis
     _REDIS_AVAILABLE = True
@@ -39,4 +41,51 @@ class RedisCache:
                 return
             except Exception:
                 pass
-        self._store[key] = value
\ No newline at end of file
+        self._store[key] = value
+
+class ResultCache:
+    """LRU cache of SELECT results, each tagged with the versions of the tables it read.
+
+    An entry is only served while every table still has the version it was
+    computed from (see core.table_storage.table_version), so a write makes
+    the results over its table unreachable without scanning the cache. The
+    number of entries and the total number of cached rows are bounded; the
+    least recently used entries are evicted first.
+    """
+
+    def __init__(self, max_entries, max_rows):
+        self.max_entries = max_entries
+        self.max_rows = max_rows
+        self.entries = OrderedDict()
+        self.rows = 0
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key, versions):
+        entry = self.entries.get(key)
+        if entry is None or entry[0] != versions:
+            if entry is not None:
+                self._evict(key)
+            self.misses += 1
+            return None
+        self.entries.move_to_end(key)
+        self.hits += 1
+        return entry[1]
+
+    def put(self, key, versions, rows):
+        if key in self.entries:
+            self._evict(key)
+        if not self.max_entries or len(rows) > self.max_rows:
+            return
+        self.entries[key] = (versions, rows)
+        self.rows += len(rows)
+        while len(self.entries) > self.max_entries or self.rows > self.max_rows:
+            self._evict(next(iter(self.entries)))
+
+    def clear(self):
+        self.entries.clear()
+        self.rows = 0
+
+    def _evict(self, key):
+        _, rows = self.entries.pop(key)
+        self.rows -= len(rows)
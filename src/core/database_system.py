@@ -1,13 +1,34 @@
 import os
 import logging
+from dataclasses import replace
+from itertools import chain, groupby, islice
 from multiprocessing import Pool, cpu_count
 
 import config.config as conf
 from config.language import LANGUAGES
+from core.bitmap_index import BitmapIndex, CoveringIndex, JsonPathIndex, RoaringBitmap
 from core.bplus_tree import BPlusTree
+from core.cache import ResultCache
+from core.executor import SPILL_PARTITIONS, Divide, HashJoin, IndexNestedLoopJoin, MergeJoin, NestedLoopJoin, value_key
+from core.expressions import compile_expression, compiled_expression, expression_columns, split_equi_join
+from core.fulltext_index import FullTextIndex
+from core.parallel import aggregate_range, block_ranges, ordered_results, scan_range
+from core.planner import Planner, parse_hints
+from core.statistics import analyze_rows
+from core.vectorized import Batch, compile_mask, expression_values
+from core.table_storage import TableFile, read_table, table_version, write_table
 from managers.backup_manager import BackupManager
-from utils.file_utils import get_obfuscated_name, read_msgpack, write_msgpack
-from utils.filter_utils import filter_rows
+from query.prepared import PreparedStatement
+from query.materialized import ViewMaintainer, delta_path, log_changes, pending_changes, reads_column, view_columns
+from query.query_parser import base_tables, select_rows
+from query.sql_ast import BinaryOp, Column, Select
+from query.sql_parser import SQLSyntaxError, generated_expression, parse_expression, parse_sql
+from utils.file_utils import append_msgpack, get_obfuscated_name, read_msgpack, read_msgpack_log, write_msgpack
+from utils.filter_utils import (
+    LIKE_OPS, RANGE_OPS, as_predicate, coerce_predicate, compile_predicate, compile_value_test, predicate_columns,
+    predicate_leaves, predicate_shape,
+)
+from utils.json_utils import compile_path, extract_path, is_json_type, load_json_value, parse_json_expression
 from utils.logger_utils import print_error, print_response, print_success, print_warning
 from utils.utils import encrypt_data, generate_obfuscated_name
 from datetime import datetime
@@ -16,6 +37,42 @@ import msgpack
 import json
 from src.core.procedures import ProcedureManager
 
+INDEX_CLASSES = {"bitmap": BitmapIndex, "fulltext": FullTextIndex, "jsonpath": JsonPathIndex, "covering": CoveringIndex}
+# Index persistés à côté des fichiers de table, pour ne pas relire la table au chargement.
+PERSISTED_INDEX_EXTENSIONS = {"fulltext": ".fts", "covering": ".cov"}
+# Forme historique des conditions de full_outer_join() (expression Python) : chaînes, `==` et row1['col'] / row2["col"].
+_LEGACY_JOIN_TOKEN = re.compile(r"""'(?:[^'\\]|\\.)*'|"((?:[^"\\]|\\.)*)"|==|\brow([12])\[\s*(['"])(\w+)\3\s*\]""")
+
+
+def _legacy_join_condition(condition, table1, table2):
+    """Rewrite a condition of the former eval()-based full_outer_join() (`row1['id'] == row2['ref']`) in SQL."""
+    def rewrite(match):
+        text = match.group()
+        if text == "==":
+            return "="
+        if match.group(2):
+            return f"{(table1, table2)[int(match.group(2)) - 1]}.{match.group(4)}"
+        if match.group(1) is not None:
+            return "'" + match.group(1).replace("'", "''") + "'"
+        return text
+    return _LEGACY_JOIN_TOKEN.sub(rewrite, condition)
+
+
+def _project(row, columns):
+    return {col: row.get(col) for col in columns}
+
+
+def _apply_index_change(index, change):
+    """Apply a logged index change: {"insert": [[row_id, row]]}, {"update": [[row_id, old, new]]} or {"delete": [row_id]}."""
+    for row_id, row in change.get("insert", ()):
+        index.add_row(row, row_id)
+    for row_id, old_row, new_row in change.get("update", ()):
+        index.remove_row(old_row, row_id)
+        index.add_row(new_row, row_id)
+    if "delete" in change:
+        index.delete_rows(change["delete"])
+
+
 class DatabaseSystem:
     def __init__(self, key, metadata_key, replicator, cache, user_manager, language=None):
         if language is None:
@@ -31,6 +88,13 @@ class DatabaseSystem:
         self.logger = self._setup_logger()
         self.backup_manager = BackupManager(self)
         self.procedure_manager = ProcedureManager(os.path.join(conf.CONFIG["DATA_DIR"], "procedures"))
+        # Requêtes préparées de chaque utilisateur : {nom d'utilisateur: {nom: PreparedStatement}}.
+        self.prepared_statements = {}
+        # Plans d'accès d'une requête préparée, prêtés par PreparedStatement.execute() le temps d'une exécution.
+        self.scan_plans = None
+        self.result_cache = ResultCache(conf.result_cache_entries, conf.result_cache_rows)
+        # Processus de travail des parcours parallèles, lancés au premier parcours qui en a besoin.
+        self._pool = None
 
     def _setup_logger(self):
         logger = logging.getLogger("audit")
@@ -123,7 +187,7 @@ class DatabaseSystem:
             "unique_keys": constraints.get("unique_keys", [])
         }
 
-        write_msgpack(table_path, table_data, self.metadata_key)
+        write_table(table_path, table_data, self.metadata_key)
         metadata.setdefault("tables", {})[table_name] = table_obfuscated
         write_msgpack(metadata_path, metadata, self.metadata_key)
 
@@ -135,72 +199,138 @@ class DatabaseSystem:
         print_success(LANGUAGES[self.language]["table_created"].format(table=table_name))
 
     def insert_record(self, table_name, record, user):
+        self.insert_records(table_name, [record], user)
+
+    def insert_records(self, table_name, records, user):
+        """Insert a batch of records with one table write and one index update.
+
+        Every record is checked first (constraints see earlier records of the
+        batch); on the first violation nothing is written. Returns the number
+        of inserted rows.
+        """
         try:
             if not self.current_database:
                 print_error(LANGUAGES[self.language]["no_db_selected"])
-                return
+                return 0
             if user["role"] != "admin" and "insert" not in user.get("permissions", {}).get(self.current_database, {}).get(table_name, {}):
                 print_error(LANGUAGES[self.language]["permission_denied"])
-                return
+                return 0
             table_path = self._get_table_path(table_name)
             if not table_path:
                 print_error(LANGUAGES[self.language]["table_not_found"])
-                return
-            table_data = read_msgpack(table_path, self.metadata_key)
-            constraints = table_data.get("constraints", {})
-            # NOT NULL
-            for col in constraints.get("not_null", []):
-                if col not in record or record[col] is None:
-                    print_error(LANGUAGES[self.language]["not_null_violation"].format(col=col))
-                    return
-            # UNIQUE
-            for col in constraints.get("unique_keys", []):
-                for row in table_data["rows"]:
-                    if row.get(col) == record.get(col):
-                        print_error(LANGUAGES[self.language]["unique_violation"].format(val=record.get(col), col=col))
-                        return
-            # PRIMARY KEY
-            for col in constraints.get("primary_keys", []):
-                for row in table_data["rows"]:
-                    if row.get(col) == record.get(col):
-                        print_error(LANGUAGES[self.language]["primary_key_duplicate"].format(col=col, val=record.get(col)))
-                        return
-            # FOREIGN KEY
-            for fk in constraints.get("foreign_keys", {}).values():
-                ref_table = fk["ref_table"]
-                ref_cols = fk["ref_columns"]
-                fk_cols = fk["columns"]
+                return 0
+            table = TableFile(table_path, self.metadata_key)
+            if self._view_write_refused(table_name, table.header):
+                return 0
+            ref_rows = {}
+            constraints = table.header.get("constraints", {})
+            taken = self._taken_values(table, constraints)
+            for record in records:
+                if not self._decode_json_columns(table.header.get("columns", {}), record):
+                    return 0
+                if self._writes_generated(constraints, record):
+                    return 0
+                self._compute_generated(constraints, record)
+                if not self._check_insert_constraints(constraints, record, ref_rows, taken):
+                    return 0
+            inserted = [(table.append(record), record) for record in records]
+            table.save()
+            self._index_insert(table_name, table, inserted)
+            self._maintain_views(table_name, records, [])
+            if len(records) == 1:
+                self.logger.info(f"User: {user['username']} - Inserted record into {table_name}: {records[0]}")
+                print_success(LANGUAGES[self.language]["record_inserted"])
+            else:
+                self.logger.info(f"User: {user['username']} - Inserted {len(records)} records into {table_name}")
+                print_success(LANGUAGES[self.language]["records_inserted"].format(count=len(records)))
+            return len(records)
+        except Exception as e:
+            print_error(LANGUAGES[self.language]["insert_failed"].format(error=str(e)))
+            return 0
+
+    def _taken_values(self, table, constraints):
+        """{column: value keys already stored} for the UNIQUE and PRIMARY KEY columns, read in one pass over the table."""
+        keyed = list(dict.fromkeys([*constraints.get("unique_keys", []), *constraints.get("primary_keys", [])]))
+        taken = {col: set() for col in keyed}
+        if keyed:
+            for _, row in table.scan():
+                for col in keyed:
+                    taken[col].add(value_key(row.get(col)))
+        return taken
+
+    def _check_insert_constraints(self, constraints, record, ref_rows, taken):
+        """Check NOT NULL, UNIQUE, PRIMARY KEY, FOREIGN KEY and CHECK.
+
+        `taken` comes from _taken_values() and receives the keys of an
+        accepted record, so later records of a batch see it; `ref_rows`
+        caches referenced tables.
+        """
+        # NOT NULL
+        for col in constraints.get("not_null", []):
+            if col not in record or record[col] is None:
+                print_error(LANGUAGES[self.language]["not_null_violation"].format(col=col))
+                return False
+        # UNIQUE
+        for col in constraints.get("unique_keys", []):
+            if value_key(record.get(col)) in taken[col]:
+                print_error(LANGUAGES[self.language]["unique_violation"].format(val=record.get(col), col=col))
+                return False
+        # PRIMARY KEY
+        for col in constraints.get("primary_keys", []):
+            if value_key(record.get(col)) in taken[col]:
+                print_error(LANGUAGES[self.language]["primary_key_duplicate"].format(col=col, val=record.get(col)))
+                return False
+        # FOREIGN KEY
+        for fk in constraints.get("foreign_keys", {}).values():
+            ref_table = fk["ref_table"]
+            ref_cols = fk["ref_columns"]
+            fk_cols = fk["columns"]
+            if ref_table not in ref_rows:
                 ref_path = self._get_table_path(ref_table)
                 if not ref_path:
                     print_error(LANGUAGES[self.language]["table_not_found"])
-                    return
-                ref_data = read_msgpack(ref_path, self.metadata_key)
-                found = False
-                for ref_row in ref_data["rows"]:
-                    if all(record.get(fk_col) == ref_row.get(ref_col) for fk_col, ref_col in zip(fk_cols, ref_cols)):
-                        found = True
-                        break
-                if not found:
-                    print_error(LANGUAGES[self.language]["foreign_key_violation"].format(col=','.join(fk_cols), val=','.join(str(record.get(fk_col)) for fk_col in fk_cols), ref_table=ref_table, ref_col=','.join(ref_cols)))
-                    return
-            # CHECK
-            for check in constraints.get("checks", []):
-                check_name, check_condition = check
-                try:
-                    if not eval(check_condition, {}, record):
-                        print_error(LANGUAGES[self.language]["check_violation"].format(col=check_name, condition=check_condition))
-                        return
-                except Exception as e:
-                    print_error(f"Erreur d'évaluation CHECK: {str(e)}")
-                    return
-            table_data["rows"].append(record)
-            write_msgpack(table_path, table_data, self.metadata_key)
-            self.logger.info(f"User: {user['username']} - Inserted record into {table_name}: {record}")
-            print_success(LANGUAGES[self.language]["record_inserted"])
-        except Exception as e:
-            print_error(LANGUAGES[self.language]["insert_failed"].format(error=str(e)))
+                    return False
+                ref_rows[ref_table] = read_table(ref_path, self.metadata_key)["rows"]
+            found = False
+            for ref_row in ref_rows[ref_table]:
+                if all(record.get(fk_col) == ref_row.get(ref_col) for fk_col, ref_col in zip(fk_cols, ref_cols)):
+                    found = True
+                    break
+            if not found:
+                print_error(LANGUAGES[self.language]["foreign_key_violation"].format(col=','.join(fk_cols), val=','.join(str(record.get(fk_col)) for fk_col in fk_cols), ref_table=ref_table, ref_col=','.join(ref_cols)))
+                return False
+        if not self._check_constraints(constraints, record):
+            return False
+        for col, values in taken.items():
+            values.add(value_key(record.get(col)))
+        return True
+
+    def _check_constraints(self, constraints, row):
+        """CHECK constraints, compiled once per process; only a FALSE result is a violation (NULL passes, as in SQL)."""
+        for check_name, check_condition in constraints.get("checks", []):
+            try:
+                passed = compiled_expression(check_condition)(row)
+            except (SQLSyntaxError, ValueError) as e:
+                print_error(f"Erreur d'évaluation CHECK: {str(e)}")
+                return False
+            if passed is False:
+                print_error(LANGUAGES[self.language]["check_violation"].format(col=check_name, condition=check_condition))
+                return False
+        return True
+
+    def _compute_generated(self, constraints, row):
+        for column_name, expression in constraints.get("generated", {}).items():
+            row[column_name] = compiled_expression(expression)(row)
+
+    def _writes_generated(self, constraints, column_names):
+        """Report and return True if a statement assigns a generated column."""
+        written = [col for col in column_names if col in constraints.get("generated", {})]
+        if written:
+            print_error(LANGUAGES[self.language]["generated_column_write"].format(col=written[0]))
+        return bool(written)
 
     def update_record(self, table_name, set_clause, conditions, user):
+        """Update matching rows; `set_clause` is a {col: value} dict or a legacy "col=value" string."""
         if not self.current_database:
             print_error(LANGUAGES[self.language]["no_db_selected"])
             return
@@ -211,74 +341,118 @@ class DatabaseSystem:
         if not table_path:
             print_error(LANGUAGES[self.language]["table_not_found"])
             return
-        set_col = set_clause.split('=')[0].strip()
-        set_val = set_clause.split('=')[1].strip().strip("'")
-        table_data = read_msgpack(table_path, self.metadata_key)
-        if set_col not in table_data["columns"]:
+        if isinstance(set_clause, dict):
+            assignments = dict(set_clause)
+        else:
+            set_col, set_val = set_clause.split('=', 1)
+            assignments = {set_col.strip(): set_val.strip().strip("'")}
+        table = TableFile(table_path, self.metadata_key)
+        if self._view_write_refused(table_name, table.header):
+            return
+        table_data = table.to_dict()
+        if any(col not in table_data["columns"] for col in assignments):
             print_error(LANGUAGES[self.language]["column_invalid"])
             return
+        if not self._decode_json_columns(table_data["columns"], assignments):
+            return
         constraints = table_data.get("constraints", {})
+        if self._writes_generated(constraints, assignments):
+            return
         updated = False
-        for row in table_data["rows"]:
-            if all(row.get(k) == v for k, v in conditions.items()):
-                # NOT NULL
-                if set_val is None and set_col in constraints.get("not_null", []):
-                    print_error(LANGUAGES[self.language]["not_null_violation"].format(col=set_col))
-                    return
-                # UNIQUE
-                if set_col in constraints.get("unique_keys", []):
-                    for other in table_data["rows"]:
-                        if other is not row and other.get(set_col) == set_val:
-                            print_error(LANGUAGES[self.language]["unique_violation"].format(val=set_val, col=set_col))
-                            return
-                # PRIMARY KEY
-                if set_col in constraints.get("primary_keys", []):
-                    for other in table_data["rows"]:
-                        if other is not row and other.get(set_col) == set_val:
-                            print_error(LANGUAGES[self.language]["primary_key_duplicate"].format(col=set_col, val=set_val))
-                            return
+        changes = []
+        predicate = coerce_predicate(as_predicate(conditions), table_data["columns"])
+        if self._unknown_columns(predicate, table_data["columns"]):
+            return
+        matches = compile_predicate(predicate)
+        for row_id, row in enumerate(table_data["rows"]):
+            if matches(row):
+                new_row = {**row, **assignments}
+                self._compute_generated(constraints, new_row)
+                for set_col, set_val in assignments.items():
+                    # NOT NULL
+                    if set_val is None and set_col in constraints.get("not_null", []):
+                        print_error(LANGUAGES[self.language]["not_null_violation"].format(col=set_col))
+                        return
+                    # UNIQUE
+                    if set_col in constraints.get("unique_keys", []):
+                        for other in table_data["rows"]:
+                            if other is not row and other.get(set_col) == set_val:
+                                print_error(LANGUAGES[self.language]["unique_violation"].format(val=set_val, col=set_col))
+                                return
+                    # PRIMARY KEY
+                    if set_col in constraints.get("primary_keys", []):
+                        for other in table_data["rows"]:
+                            if other is not row and other.get(set_col) == set_val:
+                                print_error(LANGUAGES[self.language]["primary_key_duplicate"].format(col=set_col, val=set_val))
+                                return
                 # FOREIGN KEY
                 for fk in constraints.get("foreign_keys", {}).values():
-                    if set_col in fk["columns"]:
-                        ref_table = fk["ref_table"]
-                        ref_cols = fk["ref_columns"]
-                        fk_cols = fk["columns"]
-                        ref_path = self._get_table_path(ref_table)
-                        if not ref_path:
-                            print_error(LANGUAGES[self.language]["table_not_found"])
-                            return
-                        ref_data = read_msgpack(ref_path, self.metadata_key)
-                        found = False
-                        for ref_row in ref_data["rows"]:
-                            if all((set_val if fk_col == set_col else row.get(fk_col)) == ref_row.get(ref_col) for fk_col, ref_col in zip(fk_cols, ref_cols)):
-                                found = True
-                                break
-                        if not found:
-                            print_error(LANGUAGES[self.language]["foreign_key_violation"].format(col=set_col, val=set_val, ref_table=ref_table, ref_col=','.join(ref_cols)))
-                            return
-                # CHECK
-                for check in constraints.get("checks", []):
-                    check_name, check_condition = check
-                    temp_row = row.copy()
-                    temp_row[set_col] = set_val
-                    try:
-                        if not eval(check_condition, {}, temp_row):
-                            print_error(LANGUAGES[self.language]["check_violation"].format(col=check_name, condition=check_condition))
-                            return
-                    except Exception as e:
-                        print_error(f"Erreur d'évaluation CHECK: {str(e)}")
+                    if not set(assignments) & set(fk["columns"]):
+                        continue
+                    ref_table = fk["ref_table"]
+                    ref_cols = fk["ref_columns"]
+                    fk_cols = fk["columns"]
+                    ref_path = self._get_table_path(ref_table)
+                    if not ref_path:
+                        print_error(LANGUAGES[self.language]["table_not_found"])
                         return
-                row[set_col] = set_val
+                    ref_data = read_table(ref_path, self.metadata_key)
+                    found = False
+                    for ref_row in ref_data["rows"]:
+                        if all(new_row.get(fk_col) == ref_row.get(ref_col) for fk_col, ref_col in zip(fk_cols, ref_cols)):
+                            found = True
+                            break
+                    if not found:
+                        print_error(LANGUAGES[self.language]["foreign_key_violation"].format(col=','.join(fk_cols), val=','.join(str(new_row.get(fk_col)) for fk_col in fk_cols), ref_table=ref_table, ref_col=','.join(ref_cols)))
+                        return
+                # CHECK
+                if not self._check_constraints(constraints, new_row):
+                    return
+                changes.append((row_id, row.copy()))
+                row.update(new_row)
+                table.mark_dirty(row_id)
                 updated = True
         if updated:
-            write_msgpack(table_path, table_data, self.metadata_key)
-            self.replicator.replicate({"operation": "update", "table": table_name, "set": set_clause, "conditions": conditions})
-            self.cache.set(f"{self.current_database}:{table_name}", table_data["rows"])
-            self.logger.info(f"User: {user['username']} - Updated {table_name}: SET {set_clause} WHERE {conditions}")
+            table.save()
+            self._index_update(table_name, table, set(assignments) | set(constraints.get("generated", {})), changes)
+            self._maintain_views(table_name, [table_data["rows"][row_id] for row_id, _ in changes], [row for _, row in changes])
+            self.replicator.replicate({"operation": "update", "table": table_name, "set": assignments, "conditions": conditions})
+            self.logger.info(f"User: {user['username']} - Updated {table_name}: SET {assignments} WHERE {conditions}")
             print_success(LANGUAGES[self.language]["data_updated"])
         else:
             print_warning(LANGUAGES[self.language]["no_row_updated"])
 
+    def delete_record(self, table_name, conditions, user):
+        if not self.current_database:
+            print_error(LANGUAGES[self.language]["no_db_selected"])
+            return
+        if user["role"] != "admin" and "delete" not in user.get("permissions", {}).get(self.current_database, {}).get(table_name, {}):
+            print_error(LANGUAGES[self.language]["permission_denied"])
+            return
+        table_path = self._get_table_path(table_name)
+        if not table_path:
+            print_error(LANGUAGES[self.language]["table_not_found"])
+            return
+        table = TableFile(table_path, self.metadata_key)
+        if self._view_write_refused(table_name, table.header):
+            return
+        predicate = coerce_predicate(as_predicate(conditions), table.header.get("columns", {})) if conditions else None
+        if self._unknown_columns(predicate, table.header.get("columns", {})):
+            return
+        deleted_ids = [row_id for row_id, _ in table.scan(predicate)] if predicate else list(range(table.row_count))
+        if not deleted_ids:
+            print_warning(LANGUAGES[self.language]["no_row_deleted"])
+            return
+        deleted = set(deleted_ids)
+        rows = table.rows()
+        table.set_rows([row for row_id, row in enumerate(rows) if row_id not in deleted])
+        table.save()
+        self._index_delete(table_name, table, deleted_ids)
+        self._maintain_views(table_name, [], [rows[row_id] for row_id in deleted_ids])
+        self.replicator.replicate({"operation": "delete", "table": table_name, "conditions": conditions})
+        self.logger.info(f"User: {user['username']} - Deleted {len(deleted_ids)} rows from {table_name} WHERE {conditions}")
+        print_success(LANGUAGES[self.language]["rows_deleted"].format(count=len(deleted_ids)))
+
     def alter_table(self, table_name, action, column_name, column_type=None, default_value=None, user=None):
         if not self.current_database or (user["role"] != "admin" and "alter" not in user.get("permissions", {}).get(self.current_database, {}).get(table_name, {})):
             print_error(LANGUAGES[self.language]["permission_denied"])
@@ -287,7 +461,13 @@ class DatabaseSystem:
         if not table_path:
             print_error(LANGUAGES[self.language]["table_not_found"])
             return
-        table_data = read_msgpack(table_path, self.metadata_key)
+        if action.upper() == "SET":
+            return self.set_table_option(table_name, column_name, default_value, user)
+        if action.upper() == "ADD" and generated_expression(column_type or ""):
+            return self.add_generated_column(table_name, column_name, generated_expression(column_type), user)
+        table_data = read_table(table_path, self.metadata_key)
+        if self._view_write_refused(table_name, table_data):
+            return
         if action.upper() == "ADD":
             if column_name in table_data["columns"]:
                 print_error(LANGUAGES[self.language]["column_already_exists"])
@@ -299,13 +479,48 @@ class DatabaseSystem:
             if column_name not in table_data["columns"]:
                 print_error(LANGUAGES[self.language]["column_not_exists"])
                 return
+            if self._view_dependents(self._read_metadata()[1], table_name, column_name):
+                return
             del table_data["columns"][column_name]
             for row in table_data["rows"]:
                 row.pop(column_name, None)
-        write_msgpack(table_path, table_data, self.metadata_key)
+            if column_name in table_data.get("bloom_columns", []):
+                table_data["bloom_columns"].remove(column_name)
+        write_table(table_path, table_data, self.metadata_key)
+        # Index reconstruits depuis la table au prochain usage ; ceux qui lisent une colonne supprimée disparaissent.
+        self.invalidate_indexes(table_name)
+        if action.upper() == "DROP":
+            self._drop_column_indexes(table_name, column_name)
         self.logger.info(f"User: {user['username']} - Altered table {table_name}: {action} {column_name}")
         print_success(f"Table {table_name} modifiée")
 
+    def _drop_column_indexes(self, table_name, column_name):
+        """Remove the index definitions keyed on a dropped column or covering it in INCLUDE."""
+        metadata_path, metadata = self._read_metadata()
+        definitions = metadata.get("indexes", {}).get(table_name, {})
+        stale = [key for key, definition in definitions.items()
+                 if key.split("->", 1)[0] == column_name or column_name in definition.get("include", ())]
+        for key in stale:
+            del definitions[key]
+        if stale:
+            write_msgpack(metadata_path, metadata, self.metadata_key)
+
+    def set_table_option(self, table_name, option, value, user):
+        """`ALTER TABLE name SET (option = value)`; `result_cache = off` keeps the results over a table out of the cache."""
+        if option.lower() != "result_cache":
+            print_error(LANGUAGES[self.language]["table_option_invalid"].format(option=option))
+            return
+        enabled = {"on": True, "true": True, "off": False, "false": False}.get(str(value).lower())
+        if enabled is None:
+            print_error(LANGUAGES[self.language]["table_option_invalid"].format(option=f"{option} = {value}"))
+            return
+        metadata_path, metadata = self._read_metadata()
+        options = metadata.setdefault("table_options", {}).setdefault(table_name, {})
+        options["result_cache"] = enabled
+        write_msgpack(metadata_path, metadata, self.metadata_key)
+        self.logger.info(f"User: {user['username']} - Set {option} = {value} on {table_name}")
+        print_success(LANGUAGES[self.language]["table_option_set"].format(table=table_name, option=option, value=value))
+
     def drop_table(self, table_name, user):
         if not self.current_database:
             print_error(LANGUAGES[self.language]["no_db_selected"])
@@ -321,10 +536,17 @@ class DatabaseSystem:
         db_path = os.path.join(conf.CONFIG["DATA_DIR"], db_obfuscated)
         metadata_path = os.path.join(db_path, ".metadata.msgpack")
         metadata = read_msgpack(metadata_path, self.metadata_key)
+        if table_name in metadata.get("materialized_views", {}):
+            print_error(LANGUAGES[self.language]["materialized_view_read_only"].format(view_name=table_name))
+            return
+        if self._view_dependents(metadata, table_name):
+            return
         table_obfuscated = metadata["tables"].pop(table_name, None)
         if table_obfuscated:
+            metadata.get("statistics", {}).pop(table_name, None)
             os.remove(os.path.join(db_path, table_obfuscated + ".msgpack"))
             write_msgpack(metadata_path, metadata, self.metadata_key)
+            self.invalidate_indexes(table_name, drop_definitions=True)
             self.logger.info(f"User: {user['username']} - Dropped table: {table_name}")
             print_success(LANGUAGES[self.language]["table_dropped"].format(table=table_name))
         else:
@@ -352,24 +574,139 @@ class DatabaseSystem:
         except Exception as e:
             print_error(LANGUAGES[self.language]["db_deletion_failed"].format(error=str(e)))
 
-    def join_tables(self, table1, table2, col1, col2, user):
+    def join_tables(self, table1, table2, col1, col2, user, hints=None, residual=None, kind="inner"):
+        """Equi-join two tables on table1.col1 = table2.col2, with the join method chosen by the planner."""
+        rows = self.join_rows(table1, table2, col1, col2, user, hints, residual, kind)
+        return list(rows) if rows is not None else []
+
+    def join_rows(self, table1, table2, col1, col2, user, hints=None, residual=None, kind="inner", names=None):
+        """Lazy form of join_tables(): an iterator of merged rows, or None once an error is reported.
+
+        `residual`, if given, is a compiled condition over (table1 row,
+        table2 row) pairs for the rest of an ON clause. `kind` is "inner",
+        "left", "right" or "full"; unmatched rows of a preserved side are
+        padded with NULL for every catalog column of the other table. A
+        column of both tables is also stored as `name.column`, `names`
+        being the aliases of the two sides (the table names by default).
+        """
         if not self.current_database or (user["role"] != "admin" and "select" not in user.get("permissions", {}).get(self.current_database, {}).get(table1, {})) or \
         (user["role"] != "admin" and "select" not in user.get("permissions", {}).get(self.current_database, {}).get(table2, {})):
             print_error(LANGUAGES[self.language]["permission_denied"])
-            return []
-        
+            return None
+
         table1_path = self._get_table_path(table1)
         table2_path = self._get_table_path(table2)
         if not table1_path or not table2_path:
             print_error(LANGUAGES[self.language]["table_not_found"])
-            return []
-        
-        table1_data = read_msgpack(table1_path, self.metadata_key)["rows"]
-        table2_data = read_msgpack(table2_path, self.metadata_key)["rows"]
-        
-        return [{**row1, **row2} for row1 in table1_data for row2 in table2_data if row1[col1] == row2[col2]]
+            return None
+
+        files = {table1: TableFile(table1_path, self.metadata_key), table2: TableFile(table2_path, self.metadata_key)}
+        plan = self.plan_join(table1, table2, col1, col2, hints, files, kind)
+        pairs = self._join_pairs(plan, files, {table1: col1, table2: col2}, table1, table2, residual, kind)
+        columns1, columns2 = (list(files[name].header.get("columns", {})) for name in (table1, table2))
+        name1, name2 = names or (table1, table2)
+        # Sans les clés qualifiées, la colonne de droite écraserait celle de gauche.
+        shared = [col for col in columns1 if col in columns2]
+
+        def merge(row1, row2):
+            if row1 is None:
+                row1 = dict.fromkeys(columns1)
+                row = {**row1, **row2}
+            elif row2 is None:
+                row2 = dict.fromkeys(columns2)
+                row = {**row2, **row1}
+            else:
+                row = {**row1, **row2}
+            for col in shared:
+                row[f"{name1}.{col}"] = row1.get(col)
+                row[f"{name2}.{col}"] = row2.get(col)
+            return row
+
+        return (merge(row1, row2) for row1, row2 in pairs)
+
+    def plan_join(self, table1, table2, col1, col2, hints=None, files=None, kind="inner"):
+        """Return the cheapest JoinPlan for table1.col1 = table2.col2; rejected candidates are in `plan.alternatives`."""
+        if files is None:
+            files = {name: TableFile(self._get_table_path(name), self.metadata_key) for name in (table1, table2)}
+        keys = {table1: col1, table2: col2}
+        _, metadata = self._read_metadata()
+        definitions = metadata.get("indexes", {})
+        statistics = metadata.get("statistics", {})
+        inner_indexed = [name for name in files if definitions.get(name, {}).get(keys[name], {}).get("type") in ("bitmap", "covering")]
+        # Un index bitmap rend aussi ses lignes dans l'ordre des clés (jointure par fusion).
+        ordered = {name: "index" for name in inner_indexed}
+        for name in files:
+            if name not in ordered and statistics.get(name, {}).get("columns", {}).get(keys[name], {}).get("sorted"):
+                ordered[name] = "sorted"
+        return Planner(statistics).plan_join(
+            table1, table2, col1, col2, {name: table.row_count for name, table in files.items()},
+            inner_indexed, parse_hints(hints), ordered, conf.join_memory_rows, kind,
+        )
 
-    def create_index(self, table_name, column_name, user, index_type="bplus"):
+    def _join_pairs(self, plan, files, keys, table1, table2, residual=None, kind="inner"):
+        """(table1 row, table2 row) pairs produced by the join operator of a JoinPlan; None stands for a NULL-padded side."""
+        outer, inner = plan.outer, plan.inner
+        if table1 == table2:
+            outer, inner = table1, table2
+        outer_key, inner_key = keys[outer], keys[inner]
+
+        def combine(outer_row, inner_row):
+            return (outer_row, inner_row) if outer == table1 else (inner_row, outer_row)
+
+        if kind != "inner":
+            # Jointure externe : le reste de ON décide de la correspondance, il est donc vérifié dans la jointure.
+            condition = (lambda outer_row, inner_row: residual(combine(outer_row, inner_row))) if residual else None
+            preserved = (kind in ("left", "full"), kind in ("right", "full"))
+            if outer != table1:
+                preserved = preserved[::-1]
+            return self._hash_join(files, outer, inner, outer_key, inner_key, combine, condition, *preserved)
+        pairs = self._inner_join_pairs(plan, files, keys, table1, table2, outer, inner, combine)
+        if residual is not None:
+            return (pair for pair in pairs if residual(pair) is True)
+        return pairs
+
+    def _hash_join(self, files, outer, inner, outer_key, inner_key, combine, condition=None, probe_outer=False, build_outer=False):
+        # Les deux côtés sont lus bloc par bloc : le côté construit peut déborder sur disque.
+        outer_rows = (row for _, row in files[outer].scan(cache=False))
+        inner_rows = (row for _, row in files[inner].scan(cache=False))
+        partitions = max(SPILL_PARTITIONS, 2 * -(-files[inner].row_count // max(conf.join_memory_rows, 1)))
+        return HashJoin(outer_rows, inner_rows, outer_key, inner_key, combine, conf.join_memory_rows, partitions,
+                        self.metadata_key, condition, probe_outer, build_outer)
+
+    def _inner_join_pairs(self, plan, files, keys, table1, table2, outer, inner, combine):
+        outer_key, inner_key = keys[outer], keys[inner]
+        if plan.method == "merge_join":
+            try:
+                left = self._ordered_rows(table1, files[table1], keys[table1])
+                right = self._ordered_rows(table2, files[table2], keys[table2])
+                return MergeJoin(left, right, keys[table1], keys[table2], lambda row1, row2: (row1, row2))
+            except TypeError:
+                # Clés de types non comparables : repli sur le hachage.
+                pass
+        # Le côté externe est lu en flux, bloc par bloc.
+        outer_rows = (row for _, row in files[outer].scan(cache=False))
+        if plan.method == "index_nested_loop" and table1 != table2:
+            index = self._get_index(inner, inner_key, files[inner], ("bitmap", "covering"))
+            if index is not None:
+                lookup = lambda value: files[inner].fetch(list(index.lookup(value)))
+                return IndexNestedLoopJoin(outer_rows, outer_key, lookup, combine)
+        if plan.method == "nested_loop":
+            return NestedLoopJoin(outer_rows, files[inner].rows(), outer_key, inner_key, combine)
+        return self._hash_join(files, outer, inner, outer_key, inner_key, combine)
+
+    def _ordered_rows(self, table_name, table, column_name):
+        """Rows with a non-NULL `column_name`, in key order: read through a bitmap index, or sorted."""
+        index = self._get_index(table_name, column_name, table, ("bitmap", "covering"))
+        if index is not None:
+            bitmaps = [(key, bitmap) for key, bitmap in index.bitmaps.items() if key is not None and bitmap]
+            bitmaps.sort(key=lambda item: item[0])
+            return (row for _, bitmap in bitmaps for row in table.fetch(list(bitmap)))
+        rows = [row for row in table.rows() if row.get(column_name) is not None]
+        # Timsort reconnaît les séries déjà triées : une table rangée dans l'ordre de la clé se trie en O(n).
+        rows.sort(key=lambda row: row[column_name])
+        return rows
+
+    def create_index(self, table_name, column_name, user, index_type="bplus", include=None):
         if not self.current_database or (user["role"] != "admin" and "create" not in user.get("permissions", {}).get(self.current_database, {}).get(table_name, {})):
             print_error(LANGUAGES[self.language]["permission_denied"])
             return
@@ -377,23 +714,290 @@ class DatabaseSystem:
         if not table_path:
             print_error(LANGUAGES[self.language]["table_not_found"])
             return
-        table_data = read_msgpack(table_path, self.metadata_key)
-        if column_name not in table_data["columns"]:
+        table = TableFile(table_path, self.metadata_key)
+        columns = table.header.get("columns", {})
+        expression = parse_json_expression(column_name) if index_type == "jsonpath" else None
+        if include:
+            # INCLUDE (...) : index couvrant, les colonnes incluses sont stockées dans l'index.
+            index_type = "covering"
+        if any(col not in columns for col in [expression[0] if expression else column_name, *(include or [])]):
             print_error(LANGUAGES[self.language]["column_not_exists"])
             return
         index_key = f"{self.current_database}.{table_name}.{column_name}"
-        if index_key not in self.indexes:
+        if index_type == "bloom":
+            # Les filtres de Bloom vivent dans l'en-tête du fichier de table, bloc par bloc.
+            bloom_columns = table.header.setdefault("bloom_columns", [])
+            if column_name not in bloom_columns:
+                bloom_columns.append(column_name)
+                table.rebuild_filters()
+                table.save()
+        elif index_key not in self.indexes or index_type in INDEX_CLASSES:
+            rows = table.rows()
             if index_type == "bplus":
                 self.indexes[index_key] = BPlusTree()
             elif index_type == "hash":
                 self.indexes[index_key] = {}
-            for row in table_data["rows"]:
+            elif index_type in ("fulltext", "jsonpath", "covering"):
+                self.indexes[index_key] = self._new_index({"type": index_type, "include": include}, column_name)
+                self.indexes[index_key].build(rows)
+            elif index_type == "bitmap":
+                self.indexes[index_key] = self._build_bitmap_index(columns, rows, column_name)
+                distinct = self.indexes[index_key].cardinality()
+                if rows and distinct > len(rows) // 2:
+                    print_warning(LANGUAGES[self.language]["bitmap_high_cardinality"].format(column=column_name, distinct=distinct))
+            else:
+                print_error(LANGUAGES[self.language]["index_type_not_supported"].format(index_type=index_type))
+                return
+            for row in rows:
                 if index_type == "bplus":
                     self.indexes[index_key].insert(row[column_name], row)
                 elif index_type == "hash":
                     self.indexes[index_key][row[column_name]] = row
+        if index_type in INDEX_CLASSES:
+            definition = {"type": index_type}
+            if index_type == "covering":
+                definition["include"] = list(include)
+            if index_type in PERSISTED_INDEX_EXTENSIONS:
+                definition["file"] = generate_obfuscated_name()
+                write_msgpack(self._index_path(definition), self.indexes[index_key].to_dict(), self.metadata_key)
+            metadata_path, metadata = self._read_metadata()
+            previous = metadata.setdefault("indexes", {}).setdefault(table_name, {}).get(column_name)
+            if previous and previous.get("file"):
+                self._remove_index_files(previous)
+            metadata["indexes"][table_name][column_name] = definition
+            write_msgpack(metadata_path, metadata, self.metadata_key)
         self.logger.info(f"User: {user['username']} - Created {index_type} index on {table_name}.{column_name}")
-        print_success(LANGUAGES[self.language]["index_created"].format(table=table_name, column=column_name))
+        print_success(LANGUAGES[self.language]["index_created"].format(index_type=index_type.upper(), table=table_name, column=column_name))
+
+    def _build_bitmap_index(self, columns, rows, column_name):
+        # Pour une colonne de type ENUM, on amorce un bitmap par valeur déclarée.
+        enum_values = self._enum_values(columns.get(column_name))
+        index = BitmapIndex(column_name, enum_values)
+        index.build(rows)
+        return index
+
+    def _enum_values(self, column_type):
+        if not column_type:
+            return None
+        enum_name = str(column_type).split()[0]
+        db_path = os.path.join(conf.CONFIG["DATA_DIR"], get_obfuscated_name(self.current_database, self.key))
+        enum_path = os.path.join(db_path, f"{enum_name}.enum")
+        if not os.path.exists(enum_path):
+            return None
+        enum_data = read_msgpack(enum_path, self.metadata_key) or {}
+        return [v.strip().strip("'") for v in enum_data.get("values", [])]
+
+    def _decode_json_columns(self, columns, record):
+        """Parse JSONB values once at write time so rows store the decoded document."""
+        for col, value in record.items():
+            if isinstance(value, str) and is_json_type(columns.get(col)):
+                try:
+                    record[col] = json.loads(value)
+                except ValueError as e:
+                    print_error(LANGUAGES[self.language]["invalid_json"].format(col=col, error=str(e)))
+                    return False
+        return True
+
+    def _metadata_path(self):
+        db_obfuscated = get_obfuscated_name(self.current_database, self.key)
+        return os.path.join(conf.CONFIG["DATA_DIR"], db_obfuscated, ".metadata.msgpack")
+
+    def _read_metadata(self):
+        metadata_path = self._metadata_path()
+        return metadata_path, read_msgpack(metadata_path, self.metadata_key)
+
+    def _index_definitions(self, table_name):
+        _, metadata = self._read_metadata()
+        return metadata.get("indexes", {}).get(table_name, {})
+
+    def _get_index(self, table_name, column_name, table, index_types, definitions=None):
+        """Return the index of one of `index_types` (a type name or a tuple) on a column, loading it lazily."""
+        if isinstance(index_types, str):
+            index_types = (index_types,)
+        index_key = f"{self.current_database}.{table_name}.{column_name}"
+        index = self.indexes.get(index_key)
+        if index is not None:
+            return index if type(index) in (INDEX_CLASSES.get(t) for t in index_types) else None
+        if definitions is None:
+            definitions = self._index_definitions(table_name)
+        definition = definitions.get(column_name)
+        if not definition or definition.get("type") not in index_types:
+            return None
+        if definition.get("file"):
+            index = self._load_persisted_index(definition, table, column_name)
+        elif definition["type"] == "jsonpath":
+            index = JsonPathIndex(column_name)
+            index.build(table.rows())
+        else:
+            # Les bitmaps ne sont pas persistés : reconstruction paresseuse depuis le catalogue.
+            index = self._build_bitmap_index(table.header.get("columns", {}), table.rows(), column_name)
+        self.indexes[index_key] = index
+        return index
+
+    def _new_index(self, definition, column_name):
+        if definition["type"] == "covering":
+            return CoveringIndex(column_name, definition["include"])
+        return INDEX_CLASSES[definition["type"]](column_name)
+
+    def _index_path(self, definition):
+        db_path = os.path.join(conf.CONFIG["DATA_DIR"], get_obfuscated_name(self.current_database, self.key))
+        return os.path.join(db_path, definition["file"] + PERSISTED_INDEX_EXTENSIONS[definition["type"]])
+
+    def _index_log_path(self, definition):
+        return self._index_path(definition) + ".log"
+
+    def _remove_index_files(self, definition):
+        for path in (self._index_path(definition), self._index_log_path(definition)):
+            if os.path.exists(path):
+                os.remove(path)
+
+    def _load_persisted_index(self, definition, table, column_name):
+        index_path = self._index_path(definition)
+        if os.path.exists(index_path):
+            index = INDEX_CLASSES[definition["type"]].from_dict(read_msgpack(index_path, self.metadata_key))
+            for change in read_msgpack_log(self._index_log_path(definition), self.metadata_key):
+                _apply_index_change(index, change)
+            return index
+        index = self._new_index(definition, column_name)
+        index.build(table.rows())
+        self._remove_index_files(definition)
+        write_msgpack(index_path, index.to_dict(), self.metadata_key)
+        return index
+
+    def _maintained_indexes(self, table_name, table):
+        """In-memory indexes of a table that writes must keep current.
+
+        Persisted (full-text, covering) indexes are loaded first so their files
+        never go stale; bitmap indexes that are not loaded are simply rebuilt on next use.
+        """
+        definitions = self._index_definitions(table_name)
+        for column_name, definition in definitions.items():
+            if definition.get("file"):
+                self._get_index(table_name, column_name, table, definition["type"], definitions)
+        return [(column_name, index, definitions.get(column_name)) for column_name, index in self._table_indexes(table_name).items()]
+
+    def _table_indexes(self, table_name):
+        prefix = f"{self.current_database}.{table_name}."
+        return {key[len(prefix):]: index for key, index in self.indexes.items() if key.startswith(prefix)}
+
+    def _change_index(self, index, definition, change):
+        """Apply one statement's change to an index and persist it.
+
+        A persisted index only appends the change to its log; the snapshot is
+        rewritten (and the log emptied) once the log outgrows it, so a write
+        costs its own size plus an amortized share of the snapshot.
+        """
+        _apply_index_change(index, change)
+        if not definition or not definition.get("file"):
+            return
+        log_path = self._index_log_path(definition)
+        append_msgpack(log_path, change, self.metadata_key)
+        if os.path.getsize(log_path) >= os.path.getsize(self._index_path(definition)):
+            write_msgpack(self._index_path(definition), index.to_dict(), self.metadata_key)
+            os.remove(log_path)
+
+    def _index_insert(self, table_name, table, inserted):
+        """Index new rows; `inserted` holds (row_id, record) pairs."""
+        for column_name, index, definition in self._maintained_indexes(table_name, table):
+            if isinstance(index, (BitmapIndex, FullTextIndex)):
+                rows = [[row_id, _project(record, index.source_columns)] for row_id, record in inserted]
+                self._change_index(index, definition, {"insert": rows})
+
+    def _index_update(self, table_name, table, column_names, changes):
+        """Reindex updated rows; `changes` holds (row_id, row before the update)."""
+        for _, index, definition in self._maintained_indexes(table_name, table):
+            # Un index d'expression JSON ou couvrant dépend de plusieurs colonnes source.
+            if not isinstance(index, (BitmapIndex, FullTextIndex)) or column_names.isdisjoint(index.source_columns):
+                continue
+            new_rows = table.fetch([row_id for row_id, _ in changes])
+            rows = [[row_id, _project(old_row, index.source_columns), _project(new_row, index.source_columns)]
+                    for (row_id, old_row), new_row in zip(changes, new_rows)]
+            self._change_index(index, definition, {"update": rows})
+
+    def _index_delete(self, table_name, table, deleted_ids):
+        for column_name, index, definition in self._maintained_indexes(table_name, table):
+            if isinstance(index, (BitmapIndex, FullTextIndex)):
+                self._change_index(index, definition, {"delete": list(deleted_ids)})
+            else:
+                del self.indexes[f"{self.current_database}.{table_name}.{column_name}"]
+
+    def invalidate_indexes(self, table_name, drop_definitions=False):
+        for column_name in self._table_indexes(table_name):
+            del self.indexes[f"{self.current_database}.{table_name}.{column_name}"]
+        metadata_path, metadata = self._read_metadata()
+        definitions = metadata.get("indexes", {}).get(table_name, {})
+        for definition in definitions.values():
+            if definition.get("file"):
+                self._remove_index_files(definition)
+        if drop_definitions and metadata.get("indexes", {}).pop(table_name, None) is not None:
+            write_msgpack(metadata_path, metadata, self.metadata_key)
+
+    def _bitmap_candidates(self, table_name, predicate, table, scores=None, negate=False):
+        """Resolve a predicate to a RoaringBitmap of row ids using bitmap and full-text indexes.
+
+        Returns (bitmap, exact): bitmap is None when the indexes cannot narrow the
+        scan, and exact is True when no residual filtering is needed. BM25 scores
+        of MATCH predicates are accumulated into `scores` when given. As in
+        compile_predicate, NOT is pushed down to the leaves, whose negation
+        leaves out the NULL rows.
+        """
+        op = predicate[0]
+        if op == "not":
+            return self._bitmap_candidates(table_name, predicate[1], table, None, not negate)
+        if op in ("=", "!=", "in"):
+            index = self._get_index(table_name, predicate[1], table, ("bitmap", "jsonpath", "covering"))
+            if index is None:
+                return None, False
+            if op == "in":
+                values = [value for value in predicate[2] if value is not None]
+                if negate and len(values) < len(predicate[2]):
+                    return RoaringBitmap(), True
+                bitmap = index.lookup_any(values)
+            else:
+                bitmap = index.lookup(predicate[2])
+            if (op == "!=") == negate:
+                return bitmap, True
+            bitmap = bitmap.invert(table.row_count)
+            # NOT (col = v) ne retient pas les lignes NULL ; IS NOT NULL est l'inverse exact de IS NULL.
+            return (bitmap if predicate[2] is None else bitmap - index.lookup(None)), True
+        if op in RANGE_OPS or op in LIKE_OPS:
+            index = self._get_index(table_name, predicate[1], table, ("bitmap", "jsonpath", "covering"))
+            if index is None:
+                return None, False
+            # Intervalles et LIKE : union des bitmaps des valeurs distinctes qui conviennent. Les clés
+            # des valeurs non hachables sont des repr(), d'où la revérification des lignes.
+            return index.lookup_matching(compile_value_test(op, predicate[2], negate)), False
+        if op == "match":
+            index = self._get_index(table_name, predicate[1], table, "fulltext")
+            if index is None or negate:
+                return None, False
+            matches = index.search(predicate[2])
+            if scores is not None:
+                for row_id, score in matches.items():
+                    scores[row_id] = scores.get(row_id, 0.0) + score
+            return RoaringBitmap(sorted(matches)), True
+        if negate and op in ("and", "or"):
+            op = "or" if op == "and" else "and"
+        if op == "and":
+            result, exact = None, True
+            for child in predicate[1]:
+                bitmap, child_exact = self._bitmap_candidates(table_name, child, table, scores, negate)
+                if bitmap is None:
+                    exact = False
+                    continue
+                result = bitmap if result is None else result & bitmap
+                exact = exact and child_exact
+            return result, exact and result is not None
+        if op == "or":
+            result, exact = None, True
+            for child in predicate[1]:
+                bitmap, child_exact = self._bitmap_candidates(table_name, child, table, scores, negate)
+                if bitmap is None:
+                    return None, False
+                result = bitmap if result is None else result | bitmap
+                exact = exact and child_exact
+            return result, exact
+        return None, False
 
     def shard_table(self, table_name, shard_column, num_shards, user):
         if not self.current_database:
@@ -403,7 +1007,7 @@ class DatabaseSystem:
         if not table_path:
             print_error(LANGUAGES[self.language]["table_not_found"])
             return
-        table_data = read_msgpack(table_path, self.metadata_key)
+        table_data = read_table(table_path, self.metadata_key)
         if shard_column not in table_data["columns"]:
             print_error(LANGUAGES[self.language]["column_invalid"])
             return
@@ -451,32 +1055,177 @@ class DatabaseSystem:
         table_list = "\n".join(tables)
         print_success(LANGUAGES[self.language]["list_tables"].format(list=table_list))
 
-    def create_materialized_view(self, view_name, query, user):
+    def create_materialized_view(self, view_name, definition, user, deferred=False):
+        """Create a view stored as a table and kept up to date from its base tables.
+
+        `definition` is the query text, recorded in the catalog. A view
+        refreshed ON COMMIT is maintained by every write to its base tables;
+        an ON DEMAND (`deferred`) view logs those writes until REFRESH.
+        """
         if not self.current_database or (user["role"] != "admin" and "create" not in user.get("permissions", {}).get(self.current_database, {}).get(view_name, {})):
             print_error(LANGUAGES[self.language]["permission_denied"])
             return
-        view_path = os.path.join(conf.CONFIG["DATA_DIR"], f"{view_name}.view")
-        result = self.query_raw(query, user)
-        write_msgpack(view_path, result, self.metadata_key)
-        print_success(f"Materialized view {view_name} created.")
+        if self._get_table_path(view_name):
+            print_error(LANGUAGES[self.language]["table_exists"])
+            return
+        try:
+            query = parse_sql(definition)
+            tables = base_tables(query)
+            for table_name in tables:
+                if not self._get_table_path(table_name):
+                    print_error(LANGUAGES[self.language]["table_not_found"])
+                    return
+                if user["role"] != "admin" and "select" not in user.get("permissions", {}).get(self.current_database, {}).get(table_name, {}):
+                    print_error(LANGUAGES[self.language]["permission_denied"])
+                    return
+            types = view_columns(query, self)
+            maintainer = ViewMaintainer(query, self, types)
+            rows, groups = maintainer.compute()
+        except (SQLSyntaxError, ValueError, TypeError) as e:
+            print_error(LANGUAGES[self.language]["query_failed"].format(error=str(e)))
+            return
+        columns = {col: types.get(col, "") for col in maintainer.columns}
+        table_data = {
+            "columns": columns,
+            "constraints": {},
+            "rows": rows,
+            "defaults": {},
+            "nullable": dict.fromkeys(columns, True),
+            "primary_keys": [],
+            "unique_keys": [],
+            "materialized_view": True,
+        }
+        if groups is not None:
+            table_data["view_groups"] = groups
+        metadata_path, metadata = self._read_metadata()
+        table_obfuscated = generate_obfuscated_name()
+        write_table(os.path.join(os.path.dirname(metadata_path), table_obfuscated + ".msgpack"), table_data, self.metadata_key)
+        metadata.setdefault("tables", {})[view_name] = table_obfuscated
+        metadata.setdefault("materialized_views", {})[view_name] = {"query": definition, "tables": tables, "deferred": deferred}
+        write_msgpack(metadata_path, metadata, self.metadata_key)
+        self.logger.info(f"User: {user['username']} - Created materialized view: {view_name}")
+        print_success(LANGUAGES[self.language]["materialized_view_created"].format(view_name=view_name))
 
-    def refresh_materialized_view(self, view_name, query, user):
+    def refresh_materialized_view(self, view_name, user, concurrently=False):
+        """Bring a view up to date.
+
+        An ON DEMAND view that deltas can maintain applies the changes logged
+        since its last refresh; other views are recomputed. CONCURRENTLY
+        always recomputes, but only rewrites the rows that changed.
+        """
         if not self.current_database or (user["role"] != "admin" and "update" not in user.get("permissions", {}).get(self.current_database, {}).get(view_name, {})):
             print_error(LANGUAGES[self.language]["permission_denied"])
             return
-        view_path = os.path.join(conf.CONFIG["DATA_DIR"], f"{view_name}.view")
-        result = self.query_raw(query, user)
-        write_msgpack(view_path, result, self.metadata_key)
-        print_success(f"Materialized view {view_name} refreshed.")
+        _, metadata = self._read_metadata()
+        view = metadata.get("materialized_views", {}).get(view_name)
+        if view is None:
+            print_error(LANGUAGES[self.language]["materialized_view_not_found"].format(view_name=view_name))
+            return
+        view_path = self._get_table_path(view_name)
+        try:
+            table = TableFile(view_path, self.metadata_key)
+            maintainer = self._view_maintainer(view, table)
+            pending = pending_changes(view_path, self.metadata_key) if view["deferred"] else {}
+            # Deltas de plusieurs tables d'une jointure : chacun devrait être joint à l'état antérieur de l'autre.
+            if view["deferred"] and maintainer.incremental and not concurrently and len(pending) <= 1:
+                changes = [], []
+                for table_name, (inserted, deleted) in pending.items():
+                    changes = maintainer.apply(table, table_name, inserted, deleted)
+            else:
+                changes = maintainer.refresh(table, concurrently)
+        except (SQLSyntaxError, ValueError, TypeError) as e:
+            print_error(LANGUAGES[self.language]["query_failed"].format(error=str(e)))
+            return
+        table.save()
+        if os.path.exists(delta_path(view_path)):
+            os.remove(delta_path(view_path))
+        self.invalidate_indexes(view_name)
+        self._maintain_views(view_name, *changes)
+        self.logger.info(f"User: {user['username']} - Refreshed materialized view: {view_name}")
+        print_success(LANGUAGES[self.language]["materialized_view_refreshed"].format(view_name=view_name))
 
-    def create_cte(self, cte_name, query, user):
-        if not self.current_database:
-            print_error(LANGUAGES[self.language]["no_db_selected"])
+    def drop_materialized_view(self, view_name, user):
+        if not self.current_database or (user["role"] != "admin" and "drop" not in user.get("permissions", {}).get(self.current_database, {}).get(view_name, {})):
+            print_error(LANGUAGES[self.language]["permission_denied"])
+            return
+        metadata_path, metadata = self._read_metadata()
+        views = metadata.get("materialized_views", {})
+        if view_name not in views:
+            print_error(LANGUAGES[self.language]["materialized_view_not_found"].format(view_name=view_name))
+            return
+        if self._view_dependents(metadata, view_name):
             return
-        cte_path = os.path.join(conf.CONFIG["DATA_DIR"], f"{cte_name}.cte")
-        result = self.query_raw(query, user)
-        write_msgpack(cte_path, result, self.metadata_key)
-        print_success(f"CTE {cte_name} created.")
+        view_path = self._get_table_path(view_name)
+        for path in (view_path, delta_path(view_path)):
+            if os.path.exists(path):
+                os.remove(path)
+        del views[view_name]
+        del metadata["tables"][view_name]
+        metadata.get("statistics", {}).pop(view_name, None)
+        write_msgpack(metadata_path, metadata, self.metadata_key)
+        self.invalidate_indexes(view_name, drop_definitions=True)
+        self.logger.info(f"User: {user['username']} - Dropped materialized view: {view_name}")
+        print_success(LANGUAGES[self.language]["materialized_view_dropped"].format(view_name=view_name))
+
+    def _view_maintainer(self, view, table):
+        return ViewMaintainer(parse_sql(view["query"]), self, table.header.get("columns", {}))
+
+    def _view_dependents(self, metadata, table_name, column_name=None):
+        """Report and return the materialized views that read `table_name` (or its column), which then cannot be dropped."""
+        dependents = [
+            name for name, view in metadata.get("materialized_views", {}).items()
+            if table_name in view["tables"] and (column_name is None or reads_column(view["query"], column_name))
+        ]
+        if dependents and column_name is not None:
+            print_error(LANGUAGES[self.language]["materialized_view_column_dependents"].format(
+                table=table_name, column=column_name, views=", ".join(dependents)))
+        elif dependents:
+            print_error(LANGUAGES[self.language]["materialized_view_dependents"].format(table=table_name, views=", ".join(dependents)))
+        return dependents
+
+    def _unknown_columns(self, predicate, columns):
+        """Report the columns a WHERE clause reads that the table does not have (`WHERE v > w` with no column w)."""
+        unknown = predicate_columns(predicate) - set(columns) if predicate is not None and columns else set()
+        if unknown:
+            print_error(f"{LANGUAGES[self.language]['column_not_exists']}: {', '.join(sorted(unknown))}")
+        return bool(unknown)
+
+    def _view_write_refused(self, table_name, header):
+        # Une vue matérialisée ne change que par REFRESH ou par ses tables de base.
+        if header.get("materialized_view"):
+            print_error(LANGUAGES[self.language]["materialized_view_read_only"].format(view_name=table_name))
+            return True
+        return False
+
+    def _maintain_views(self, table_name, inserted, deleted):
+        """Carry the rows a write added to and removed from `table_name` over to the materialized views reading it.
+
+        ON COMMIT views are updated before the write returns, ON DEMAND views
+        only log the rows; a view's own changes then reach the views built on it.
+        """
+        if not inserted and not deleted:
+            return
+        _, metadata = self._read_metadata()
+        for view_name, view in metadata.get("materialized_views", {}).items():
+            if table_name not in view["tables"]:
+                continue
+            view_path = self._get_table_path(view_name)
+            try:
+                if view["deferred"]:
+                    log_changes(view_path, self.metadata_key, table_name, inserted, deleted)
+                    continue
+                table = TableFile(view_path, self.metadata_key)
+                maintainer = self._view_maintainer(view, table)
+                if maintainer.incremental:
+                    changes = maintainer.apply(table, table_name, inserted, deleted)
+                else:
+                    changes = maintainer.refresh(table)
+                table.save()
+            except Exception as e:
+                print_error(LANGUAGES[self.language]["materialized_view_failed"].format(view_name=view_name, error=str(e)))
+                continue
+            self.invalidate_indexes(view_name)
+            self._maintain_views(view_name, *changes)
 
     def grant_all_privileges(self, username, user):
         if user["role"] != "admin":
@@ -498,7 +1247,16 @@ class DatabaseSystem:
         self.user_manager.revoke(username, "*", "*", ["ALL PRIVILEGES"], user["role"])
         print_success(f"All privileges revoked from {username}.")
 
-    def merge_records(self, target_table, source_table, on_condition, when_matched, when_not_matched, user):
+    def merge_records(self, target_table, source_table, on_condition, when_matched, when_not_matched, user,
+                      target_alias=None, source_alias=None, delete_matched=False):
+        """MERGE the rows of `source_table` into `target_table`.
+
+        `on_condition` is a condition (text or parsed) over qualified columns
+        such as `target.id = source.id`; `when_matched` and `when_not_matched`
+        map target columns to expressions, or are None. Everything is compiled
+        once; an equality between a target and a source column in the ON
+        clause turns the pairwise comparison into a hash lookup.
+        """
         if not self.current_database:
             print_error(LANGUAGES[self.language]["no_db_selected"])
             return
@@ -507,56 +1265,83 @@ class DatabaseSystem:
         if not target_path or not source_path:
             print_error(LANGUAGES[self.language]["table_not_found"])
             return
-        
-        target_data = read_msgpack(target_path, self.metadata_key)
-        source_data = read_msgpack(source_path, self.metadata_key)
-        
+        scopes = {target_table: 0, source_table: 1}
+        if target_alias:
+            scopes[target_alias] = 0
+        if source_alias:
+            scopes[source_alias] = 1
+        try:
+            on = parse_expression(on_condition) if isinstance(on_condition, str) else on_condition
+            matches = compile_expression(on, scopes=scopes)
+            updates, inserts = (
+                {col: compile_expression(parse_expression(expr) if isinstance(expr, str) else expr, scopes=scopes)
+                 for col, expr in (clause or {}).items()}
+                for clause in (when_matched, when_not_matched)
+            )
+        except (SQLSyntaxError, ValueError) as e:
+            print_error(str(e))
+            return
+        target_data = read_table(target_path, self.metadata_key)
+        if self._view_write_refused(target_table, target_data):
+            return
+        source_data = read_table(source_path, self.metadata_key)
+        constraints = target_data.get("constraints", {})
+        if any(col not in target_data["columns"] for col in [*updates, *inserts]):
+            print_error(LANGUAGES[self.language]["column_invalid"])
+            return
+        if self._writes_generated(constraints, [*updates, *inserts]):
+            return
+        target_rows = target_data["rows"]
+        key = split_equi_join(on, scopes)
+        buckets = None
+        if key[0] is not None:
+            buckets = {}
+            try:
+                for row in target_rows:
+                    if row.get(key[0]) is not None:
+                        buckets.setdefault(row[key[0]], []).append(row)
+            except TypeError:
+                # Valeurs non hachables (JSON) : comparaison ligne à ligne.
+                buckets = None
+        deleted = set()
+        new_rows = []
+        # Versions d'origine des lignes modifiées ou supprimées, pour les vues matérialisées.
+        before = {}
         for source_row in source_data["rows"]:
+            candidates = target_rows
+            if buckets is not None:
+                try:
+                    candidates = buckets.get(source_row.get(key[1]), ())
+                except TypeError:
+                    pass
             matched = False
-            for target_row in target_data["rows"]:
-                if eval(on_condition, {"target": target_row, "source": source_row}):
-                    matched = True
-                    if when_matched:
-                        exec(when_matched, {"target": target_row, "source": source_row})
-            if not matched and when_not_matched:
-                new_row = {}
-                exec(when_not_matched, {"new_row": new_row, "source": source_row})
-                target_data["rows"].append(new_row)
-        
-        write_msgpack(target_path, target_data, self.metadata_key)
-        print_success(f"MERGE operation completed on {target_table}.")
-
-    def query_with_window_function(self, table_name, select_columns, partition_by_clause, order_by_clause, user):
-        if not self.current_database:
-            print_error(LANGUAGES[self.language]["no_db_selected"])
-            return []
-        table_path = self._get_table_path(table_name)
-        if not table_path:
-            print_error(LANGUAGES[self.language]["table_not_found"])
-            return []
-        
-        table_data = read_msgpack(table_path, self.metadata_key)
-        rows = table_data["rows"]
-        
-        if partition_by_clause:
-            partition_column = partition_by_clause.split()[2]
-            partitions = {}
-            for row in rows:
-                key = row[partition_column]
-                partitions.setdefault(key, []).append(row)
-        else:
-            partitions = {"all": rows}
-        
-        result = []
-        for partition_key, partition_rows in partitions.items():
-            if order_by_clause:
-                order_column = order_by_clause.split()[2]
-                partition_rows.sort(key=lambda x: x[order_column])
-            for i, row in enumerate(partition_rows):
-                row["row_number"] = i + 1
-                result.append(row)
-        
-        return result
+            for target_row in candidates:
+                if id(target_row) in deleted or matches((target_row, source_row)) is not True:
+                    continue
+                matched = True
+                if delete_matched or updates:
+                    before.setdefault(id(target_row), dict(target_row))
+                if delete_matched:
+                    deleted.add(id(target_row))
+                elif updates:
+                    target_row.update({col: evaluate((target_row, source_row)) for col, evaluate in updates.items()})
+                    self._compute_generated(constraints, target_row)
+                    # Une violation annule tout le MERGE : rien n'est écrit avant la fin de la boucle.
+                    if not self._check_constraints(constraints, target_row):
+                        return
+            if not matched and inserts:
+                new_row = {col: evaluate(({}, source_row)) for col, evaluate in inserts.items()}
+                self._compute_generated(constraints, new_row)
+                if not self._check_constraints(constraints, new_row):
+                    return
+                new_rows.append(new_row)
+        target_data["rows"] = [row for row in target_rows if id(row) not in deleted] + new_rows
+        write_table(target_path, target_data, self.metadata_key)
+        self.invalidate_indexes(target_table)
+        changed = [row for row in target_rows if id(row) in before and id(row) not in deleted]
+        self._maintain_views(target_table, changed + new_rows, list(before.values()))
+        self.logger.info(f"User: {user['username']} - Merged {source_table} into {target_table}")
+        print_success(LANGUAGES[self.language]["merge_completed"].format(table=target_table))
 
     def query_json(self, table_name, json_column, json_path, user):
         if not self.current_database:
@@ -566,16 +1351,19 @@ class DatabaseSystem:
         if not table_path:
             print_error(LANGUAGES[self.language]["table_not_found"])
             return []
-        table_data = read_msgpack(table_path, self.metadata_key)
-        rows = table_data["rows"]
+        try:
+            steps = compile_path(json_path)
+        except ValueError as e:
+            print_error(f"JSON extraction error: {str(e)}")
+            return []
         result = []
-        for row in rows:
+        for _, row in TableFile(table_path, self.metadata_key).scan():
             if json_column in row:
                 try:
-                    json_data = json.loads(row[json_column])
-                    value = eval(f"json_data{json_path}")
+                    # Les colonnes JSONB sont déjà décodées ; seules les colonnes texte sont parsées.
+                    value = extract_path(load_json_value(row[json_column]), steps)
                     result.append({json_column: value})
-                except Exception as e:
+                except ValueError as e:
                     print_error(f"JSON extraction error: {str(e)}")
         return result
 
@@ -587,7 +1375,7 @@ class DatabaseSystem:
         if not table_path:
             print_error(LANGUAGES[self.language]["table_not_found"])
             return []
-        table_data = read_msgpack(table_path, self.metadata_key)
+        table_data = read_table(table_path, self.metadata_key)
         rows = table_data["rows"]
         result = []
         for row in rows:
@@ -596,33 +1384,30 @@ class DatabaseSystem:
         return {"array_agg": result}
 
     def full_outer_join(self, table1, table2, condition, user):
-        if not self.current_database:
-            print_error(LANGUAGES[self.language]["no_db_selected"])
+        """FULL OUTER JOIN on a condition such as `table1.id = table2.ref`, run as an outer hash join (see join_rows).
+
+        The former Python forms `table1.id == table2.ref` and
+        `row1['id'] == row2['ref']` are still accepted.
+        """
+        scopes = {table1: 0, table2: 1}
+        try:
+            col1, col2, residual = split_equi_join(parse_expression(_legacy_join_condition(condition, table1, table2)), scopes)
+        except SQLSyntaxError as e:
+            print_error(str(e))
             return []
-        table1_path = self._get_table_path(table1)
-        table2_path = self._get_table_path(table2)
-        if not table1_path or not table2_path:
-            print_error(LANGUAGES[self.language]["table_not_found"])
+        if col1 is None:
+            print_error("JOIN ... ON : une égalité entre une colonne de chaque table est requise")
             return []
-        table1_data = read_msgpack(table1_path, self.metadata_key)["rows"]
-        table2_data = read_msgpack(table2_path, self.metadata_key)["rows"]
-        result = []
-        matched_rows = set()
-        for row1 in table1_data:
-            match_found = False
-            for row2 in table2_data:
-                if eval(condition, {"row1": row1, "row2": row2}):
-                    result.append({**row1, **row2})
-                    match_found = True
-                    matched_rows.add(id(row2))
-            if not match_found:
-                result.append({**row1, **{col: None for col in table2_data[0].keys()}})
-        for row2 in table2_data:
-            if id(row2) not in matched_rows:
-                result.append({**{col: None for col in table1_data[0].keys()}, **row2})
-        return result
+        residual = compile_expression(residual, scopes=scopes) if residual is not None else None
+        return self.join_tables(table1, table2, col1, col2, user, residual=residual, kind="full")
 
     def division_operation(self, table1, table2, user):
+        """Relational division table1 ÷ table2.
+
+        The divisor columns are those of table2, which table1 must also have;
+        returns the distinct values of table1's other columns that occur with
+        every row of table2 (e.g. customers who bought every listed product).
+        """
         if not self.current_database:
             print_error(LANGUAGES[self.language]["no_db_selected"])
             return []
@@ -631,10 +1416,16 @@ class DatabaseSystem:
         if not table1_path or not table2_path:
             print_error(LANGUAGES[self.language]["table_not_found"])
             return []
-        table1_data = read_msgpack(table1_path, self.metadata_key)["rows"]
-        table2_data = read_msgpack(table2_path, self.metadata_key)["rows"]
-        result = [row1 for row1 in table1_data if all(any(row1[col] == row2[col] for row2 in table2_data) for col in table2_data[0])]
-        return result
+        dividend = TableFile(table1_path, self.metadata_key)
+        divisor = TableFile(table2_path, self.metadata_key)
+        dividend_columns = list(dividend.header.get("columns", {}))
+        divisor_columns = list(divisor.header.get("columns", {}))
+        if not divisor_columns or any(col not in dividend_columns for col in divisor_columns):
+            print_error(LANGUAGES[self.language]["column_not_exists"])
+            return []
+        quotient = [col for col in dividend_columns if col not in divisor_columns]
+        rows = (row for _, row in dividend.scan(cache=False))
+        return list(Divide(rows, divisor.rows(), quotient, divisor_columns))
 
     def json_table(self, table_name, json_column, path, columns, user):
         if not self.current_database:
@@ -644,17 +1435,20 @@ class DatabaseSystem:
         if not table_path:
             print_error(LANGUAGES[self.language]["table_not_found"])
             return []
-        table_data = read_msgpack(table_path, self.metadata_key)
-        rows = table_data["rows"]
+        try:
+            steps = compile_path(path)
+        except ValueError as e:
+            print_error(f"JSON_TABLE extraction error: {str(e)}")
+            return []
         result = []
-        for row in rows:
+        for _, row in TableFile(table_path, self.metadata_key).scan():
             if json_column in row:
                 try:
-                    json_data = json.loads(row[json_column])
-                    extracted_data = eval(f"json_data{path}")
-                    for item in extracted_data:
-                        result.append({col: item.get(col) for col in columns})
-                except Exception as e:
+                    extracted_data = extract_path(load_json_value(row[json_column]), steps)
+                    for item in extracted_data or []:
+                        if isinstance(item, dict):
+                            result.append({col: item.get(col) for col in columns})
+                except ValueError as e:
                     print_error(f"JSON_TABLE extraction error: {str(e)}")
         return result
 
@@ -666,28 +1460,25 @@ class DatabaseSystem:
         if not table_path:
             print_error(LANGUAGES[self.language]["table_not_found"])
             return
-        table_data = read_msgpack(table_path, self.metadata_key)
+        try:
+            expr = parse_expression(expression)
+        except SQLSyntaxError as e:
+            print_error(str(e))
+            return
+        table_data = read_table(table_path, self.metadata_key)
         if column_name in table_data["columns"]:
             print_error(LANGUAGES[self.language]["column_already_exists"])
             return
+        if not expression_columns(expr) <= set(table_data["columns"]):
+            print_error(LANGUAGES[self.language]["column_not_exists"])
+            return
         table_data["columns"][column_name] = f"GENERATED AS ({expression})"
-        for row in table_data["rows"]:
-            row[column_name] = eval(expression, {"row": row})
-        write_msgpack(table_path, table_data, self.metadata_key)
-        print_success(f"Generated column {column_name} added to {table_name}.")
-
-    def recursive_cte(self, cte_name, anchor_query, recursive_query, main_query, user):
-        if not self.current_database:
-            print_error(LANGUAGES[self.language]["no_db_selected"])
-            return []
-        cte_result = self.query_raw(anchor_query, user)
-        while True:
-            new_rows = self.query_raw(recursive_query, user)
-            if not new_rows:
-                break
-            cte_result.extend(new_rows)
-        final_result = self.query_raw(main_query, user)
-        return final_result
+        table_data.setdefault("constraints", {}).setdefault("generated", {})[column_name] = expression
+        # Calcul par lots de colonnes sur les lignes existantes ; les INSERT et UPDATE suivants le maintiennent.
+        for row, value in zip(table_data["rows"], expression_values(expr, table_data["rows"])):
+            row[column_name] = value
+        write_table(table_path, table_data, self.metadata_key)
+        print_success(LANGUAGES[self.language]["generated_column_added"].format(column=column_name, table=table_name))
 
     def create_sequence(self, sequence_name, start_value, increment_by, user):
         if not self.current_database:
@@ -767,12 +1558,12 @@ class DatabaseSystem:
         if not table_path:
             print_error(LANGUAGES[self.language]["table_not_found"])
             return
-        table_data = read_msgpack(table_path, self.metadata_key)
+        table_data = read_table(table_path, self.metadata_key)
         if column_name not in table_data["columns"]:
             print_error(LANGUAGES[self.language]["column_not_exists"])
             return
         table_data["columns"][column_name] = f"MASKED USING {mask_function}"
-        write_msgpack(table_path, table_data, self.metadata_key)
+        write_table(table_path, table_data, self.metadata_key)
         print_success(f"Data masking added to column {column_name} in table {table_name}.")
 
     def enable_row_level_security(self, table_name, user):
@@ -783,43 +1574,296 @@ class DatabaseSystem:
         if not table_path:
             print_error(LANGUAGES[self.language]["table_not_found"])
             return
-        table_data = read_msgpack(table_path, self.metadata_key)
+        table_data = read_table(table_path, self.metadata_key)
         table_data["row_level_security"] = True
-        write_msgpack(table_path, table_data, self.metadata_key)
+        write_table(table_path, table_data, self.metadata_key)
         print_success(f"Row-level security enabled for table {table_name}.")
 
+    def result_versions(self, statement, user):
+        """Versions of the tables a query reads, which tag its cached result; None when the result must not be cached.
+
+        Results are not cached for a user lacking SELECT on one of the
+        tables (the query reports the error), nor over a table whose
+        `result_cache` option is off.
+        """
+        if not self.current_database or not self.result_cache.max_entries:
+            return None
+        metadata_path, metadata = self._read_metadata()
+        tables = metadata.get("tables", {})
+        options = metadata.get("table_options", {})
+        versions = []
+        for table_name in base_tables(statement):
+            if table_name not in tables or options.get(table_name, {}).get("result_cache") is False:
+                return None
+            if user and user["role"] != "admin" and "select" not in user.get("permissions", {}).get(self.current_database, {}).get(table_name, {}):
+                return None
+            versions.append(table_version(os.path.join(os.path.dirname(metadata_path), tables[table_name] + ".msgpack")))
+        return tuple(versions)
+
     def execute_with_hints(self, query, hints, user):
-        if "USE INDEX" in hints:
-            print_warning("Hint: Using index for query optimization.")
-        if "PARALLEL" in hints:
-            print_warning("Hint: Executing query in parallel mode.")
-        return self.query_raw(query, user)
+        """Run a SELECT with `/*+ ... */` hints applied as planner directives (see core.planner.parse_hints)."""
+        statement = parse_sql(query)
+        if not isinstance(statement, Select):
+            raise ValueError(LANGUAGES[self.language]["command_not_supported"])
+        return select_rows(replace(statement, hints=[*statement.hints, *hints]), self, user)
 
-    def query(self, table_name, conditions=None, user=None):
+    def query(self, table_name, conditions=None, user=None, columns=None, hints=None):
         """
         Query a table with optional conditions.
+
+        Conditions are either a {col: value} dict or a predicate tree (see
+        utils.filter_utils.as_predicate). The planner picks a sequential,
+        index, bitmap or index-only scan from catalog statistics; `hints` are
+        `/*+ ... */` texts that force a method. When `columns` is given rows
+        are projected on them.
         """
         try:
-            if not self.current_database:
-                print_error(LANGUAGES[self.language]["no_db_selected"])
-                return []
-            if user and user["role"] != "admin" and "select" not in user.get("permissions", {}).get(self.current_database, {}).get(table_name, {}):
-                print_error(LANGUAGES[self.language]["permission_denied"])
-                return []
-            table_path = self._get_table_path(table_name)
-            if not table_path:
-                print_error(LANGUAGES[self.language]["table_not_found"])
-                return []
-            table_data = read_msgpack(table_path, self.metadata_key)
-            rows = table_data["rows"]
-            if conditions:
-                filtered_rows = [row for row in rows if all(row.get(k) == v for k, v in conditions.items())]
-                return filtered_rows
-            return rows
+            rows = self.scan_rows(table_name, conditions, user, columns, hints)
+            return list(rows) if rows is not None else []
         except Exception as e:
             print_error(f"Erreur : La requête a échoué. {str(e)}")
             return []
 
+    def scan_rows(self, table_name, conditions=None, user=None, columns=None, hints=None):
+        """Lazy form of query(): an iterator over the planned scan, or None once an error is reported.
+
+        Blocks are decrypted as rows are pulled, so a consumer that stops early
+        (LIMIT) never reads the rest of the table.
+        """
+        scan = self._open_scan(table_name, conditions, user, columns, hints)
+        if scan is None:
+            return None
+        return self._scan_rows(*scan, columns)
+
+    def ordered_scan_rows(self, table_name, order, limit, conditions=None, user=None, columns=None, hints=None):
+        """scan_rows() for ORDER BY ... LIMIT: (rows, ordered), or None once an error is reported.
+
+        `order` is the first OrderItem; `ordered` tells whether the planner
+        chose to read an index in the order of that key, so that the caller
+        can stop after `limit` rows and their ties.
+        """
+        scan = self._open_scan(table_name, conditions, user, columns, hints, (order, limit))
+        if scan is None:
+            return None
+        return self._scan_rows(*scan, columns), scan[0].method == "index_order_scan"
+
+    def _scan_rows(self, plan, batches, columns):
+        rows = (row for batch in batches for row in batch.selected_rows())
+        if columns and plan.method != "index_only_scan":
+            return self._project(rows, columns)
+        return rows
+
+    def scan_batches(self, table_name, conditions=None, user=None, columns=None, hints=None, aggregates=None):
+        """Planned scan as an iterator of Batch objects (one per table block), or None once an error is reported.
+
+        Predicates are evaluated on whole batches (see core.vectorized); batch
+        consumers such as aggregates read typed column vectors directly. With
+        `aggregates` = (group columns, aggregate FunctionCalls), a parallel
+        scan yields a PartialAggregate per block range instead.
+        """
+        scan = self._open_scan(table_name, conditions, user, columns, hints, aggregates=aggregates)
+        return scan[1] if scan is not None else None
+
+    def _open_scan(self, table_name, conditions, user, columns, hints, order=None, aggregates=None):
+        if not self.current_database:
+            print_error(LANGUAGES[self.language]["no_db_selected"])
+            return None
+        if user and user["role"] != "admin" and "select" not in user.get("permissions", {}).get(self.current_database, {}).get(table_name, {}):
+            print_error(LANGUAGES[self.language]["permission_denied"])
+            return None
+        table_path = self._get_table_path(table_name)
+        if not table_path:
+            print_error(LANGUAGES[self.language]["table_not_found"])
+            return None
+        table = TableFile(table_path, self.metadata_key)
+        # Littéraux convertis au type déclaré des colonnes : id = '5' trouve l'entier 5.
+        predicate = coerce_predicate(as_predicate(conditions), table.header.get("columns", {})) if conditions else None
+        if self._unknown_columns(predicate, table.header.get("columns", {})):
+            return None
+        plan = self.plan_scan(table_name, predicate, columns, hints, table, order, aggregates is not None)
+        return plan, self._iter_batches(table_name, plan, predicate, table, columns, aggregates)
+
+    def plan_scan(self, table_name, predicate=None, columns=None, hints=None, table=None, order=None, aggregated=False):
+        """Return the cheapest ScanPlan for a table access; rejected candidates are in `plan.alternatives`.
+
+        `order` = (first OrderItem, limit) plans an ORDER BY ... LIMIT, where
+        an index on the sort key may be read in key order. `aggregated` tells
+        that the rows feed an aggregate, which a parallel scan computes in its
+        workers. While a prepared statement runs, its earlier plans for a
+        predicate of the same shape are reused until the catalog changes.
+        """
+        key = None
+        if self.scan_plans is not None:
+            # Plan générique : les valeurs liées ne changent pas la méthode ; un index créé ou un ANALYZE la remet en cause.
+            key = (self.current_database, table_name, predicate_shape(predicate) if predicate is not None else None,
+                   tuple(columns or ()), tuple(hints or ()), repr(order), aggregated, table_version(self._metadata_path()))
+            if key in self.scan_plans:
+                plan, position = self.scan_plans[key]
+                # La feuille parcourue par l'index est reprise dans le prédicat de cette exécution.
+                return plan if position is None else replace(plan, condition=list(predicate_leaves(predicate))[position])
+        if table is None:
+            table = TableFile(self._get_table_path(table_name), self.metadata_key)
+        _, metadata = self._read_metadata()
+        planner = Planner(metadata.get("statistics", {}))
+        indexes = metadata.get("indexes", {}).get(table_name, {})
+        directives = parse_hints(hints)
+        pruned_blocks = len(table.candidate_blocks(predicate))
+        candidates = planner.scan_candidates(
+            table_name, predicate, columns, indexes,
+            table.row_count, table.num_blocks, pruned_blocks, table.block_rows,
+            self._parallel_workers(directives, pruned_blocks), aggregated,
+        )
+        if order is not None:
+            candidates = planner.ordered_candidates(candidates, table_name, predicate, indexes, table.row_count, table.num_blocks, order)
+        plan = planner.choose(candidates, directives)
+        if key is not None:
+            leaves = list(predicate_leaves(predicate)) if plan.condition is not None else []
+            self.scan_plans[key] = plan, next((i for i, leaf in enumerate(leaves) if leaf is plan.condition), None)
+        return plan
+
+    def _parallel_workers(self, directives, blocks):
+        """Degree of parallelism of a sequential scan over `blocks` blocks.
+
+        `parallel_workers` (0: one per core) sizes the worker pool; the
+        PARALLEL(n) hint asks for n of them, PARALLEL(1) for a serial scan.
+        A worker gets at least one block.
+        """
+        limit = conf.parallel_workers or cpu_count()
+        requested = directives.get("parallel")
+        return min(requested or limit, limit, blocks)
+
+    def _worker_pool(self):
+        if self._pool is None:
+            self._pool = Pool(conf.parallel_workers or cpu_count())
+        return self._pool
+
+    def _iter_batches(self, table_name, plan, predicate, table, columns=None, aggregates=None):
+        # Le prédicat est compilé une fois pour tout le parcours.
+        mask = compile_mask(predicate) if predicate is not None else None
+        if plan.method == "index_only_scan":
+            rows = self._index_only_scan(table_name, plan.index, predicate, columns, table)
+            if rows is not None:
+                while True:
+                    chunk = list(islice(rows, table.block_rows))
+                    if not chunk:
+                        return
+                    yield Batch(chunk)
+        elif plan.method == "index_order_scan":
+            index = self._get_index(table_name, plan.index, table, ("bitmap", "covering"))
+            if index is not None:
+                # Une valeur de clé après l'autre, dans l'ordre du ORDER BY : le consommateur s'arrête après LIMIT lignes.
+                for bitmap in self._ordered_bitmaps(index, plan.order):
+                    for _, group in groupby(bitmap, key=lambda row_id: row_id // table.block_rows):
+                        batch = Batch(table.fetch(list(group)))
+                        yield batch.filter(mask) if mask is not None else batch
+                return
+        elif plan.method in ("index_scan", "bitmap_scan"):
+            scores = {}
+            condition = plan.condition if plan.method == "index_scan" else predicate
+            candidates, exact = self._bitmap_candidates(table_name, condition, table, scores)
+            if candidates is not None:
+                row_ids = list(candidates)
+                if scores:
+                    # MATCH(...) : résultats classés par pertinence BM25 décroissante.
+                    row_ids.sort(key=lambda row_id: -scores.get(row_id, 0.0))
+                residual = not (exact and condition is predicate)
+                # Un lot par suite de lignes d'un même bloc : le bloc n'est déchiffré qu'une fois.
+                for _, group in groupby(row_ids, key=lambda row_id: row_id // table.block_rows):
+                    batch = Batch(table.fetch(list(group)))
+                    yield batch.filter(mask) if residual else batch
+                return
+        # Les zone maps et filtres de Bloom de l'en-tête évitent de déchiffrer les blocs exclus.
+        blocks = table.candidate_blocks(predicate)
+        tokens = [table.encrypted_block(block_no) for block_no in blocks] if plan.method == "parallel_seq_scan" else None
+        if tokens and None not in tokens:
+            yield from self._parallel_batches(tokens, plan.workers, predicate, columns, aggregates)
+            return
+        for block_no in blocks:
+            batch = Batch(table.block(block_no, cache=False))
+            yield batch.filter(mask) if mask is not None else batch
+
+    def _parallel_batches(self, tokens, workers, predicate, columns, aggregates):
+        """Batches (or PartialAggregates under an aggregate) of a sequential scan run by `workers` worker processes.
+
+        Workers receive the encrypted blocks of their range and the predicate;
+        results come back in block order, so rows keep the order of a serial scan.
+        """
+        ranges = block_ranges(tokens, workers)
+        if aggregates is not None:
+            group_by, calls = aggregates
+            tasks = [(self.metadata_key, chunk, predicate, group_by, calls) for chunk in ranges]
+            yield from ordered_results(self._worker_pool(), aggregate_range, tasks, workers)
+            return
+        tasks = [(self.metadata_key, chunk, predicate, columns) for chunk in ranges]
+        for rows in ordered_results(self._worker_pool(), scan_range, tasks, workers):
+            yield Batch(rows)
+
+    def _ordered_bitmaps(self, index, item):
+        """Non-empty bitmaps of an index in the order of an OrderItem on its key, NULL placed as asked."""
+        keys = index.ordered_keys(value_key)
+        keys = reversed(keys) if item.descending else iter(keys)
+        nulls = index.bitmaps.get(None)
+        if nulls:
+            nulls_last = not item.descending if item.nulls_first is None else not item.nulls_first
+            keys = chain(keys, [None]) if nulls_last else chain([None], keys)
+        return (bitmap for bitmap in map(index.bitmaps.get, keys) if bitmap)
+
+    def analyze(self, table_name=None, user=None):
+        """Collect planner statistics for one table, or every table of the current database."""
+        if not self.current_database:
+            print_error(LANGUAGES[self.language]["no_db_selected"])
+            return
+        metadata_path, metadata = self._read_metadata()
+        table_names = [table_name] if table_name else list(metadata.get("tables", {}))
+        statistics = metadata.setdefault("statistics", {})
+        for name in table_names:
+            table_path = self._get_table_path(name)
+            if not table_path:
+                print_error(LANGUAGES[self.language]["table_not_found"])
+                return
+            table = TableFile(table_path, self.metadata_key)
+            statistics[name] = analyze_rows(table.rows(), list(table.header.get("columns", {})))
+        write_msgpack(metadata_path, metadata, self.metadata_key)
+        if user:
+            self.logger.info(f"User: {user['username']} - Analyzed: {', '.join(table_names)}")
+        print_success(LANGUAGES[self.language]["table_analyzed"].format(tables=", ".join(table_names)))
+
+    def _project(self, rows, columns):
+        return ({col: row.get(col) for col in columns} for row in rows)
+
+    def _index_only_scan(self, table_name, column_name, predicate, columns, table):
+        """Answer a query from the covering index on `column_name` alone, or return None if it is unavailable.
+
+        Table blocks are only decrypted when the index file is missing (e.g. after TRUNCATE) and must be rebuilt.
+        """
+        index = self._get_index(table_name, column_name, table, "covering")
+        if index is None:
+            return None
+        key_value = self._equality_on(predicate, column_name)
+        row_ids = index.lookup(key_value[0]) if key_value else range(len(index.entries))
+        rows = (index.row(row_id) for row_id in row_ids)
+        if predicate is not None:
+            matches = compile_predicate(predicate)
+            rows = (row for row in rows if matches(row))
+        return self._project(rows, columns)
+
+    def _equality_on(self, predicate, column_name):
+        """(value,) if the predicate requires column = value at its top level, else None."""
+        if predicate is None:
+            return None
+        if predicate[0] == "=" and predicate[1] == column_name:
+            return (predicate[2],)
+        if predicate[0] == "and":
+            for child in predicate[1]:
+                found = self._equality_on(child, column_name)
+                if found:
+                    return found
+        return None
+
+    def prepare(self, sql, user=None):
+        """Parse, validate and plan `sql` once; returns a PreparedStatement with execute/executemany."""
+        return PreparedStatement.from_sql(self, sql, user)
+
     def create_procedure(self, name, code, user, is_function=False):
         if user["role"] != "admin":
             print_error(LANGUAGES[self.language]["permission_denied"])
@@ -0,0 +1,898 @@
+import heapq
+import json
+from itertools import groupby, islice, takewhile
+
+import config.config as conf
+from core.expressions import aggregate_calls, compile_expression, evaluate_expression, expression_columns, free_columns, replace_aggregates
+from core.spill import SpillArea
+from core.vectorized import Accumulator, Batch, PartialAggregate, accumulate, accumulate_groups, group_ids
+from core.window import evaluate_partition
+from query.sql_ast import Column, Star
+from utils.filter_utils import compile_predicate
+
+# Exécution en pipeline (modèle Volcano) : chaque opérateur est un itérable
+# qui tire les lignes de son enfant à la demande. Seul Sort matérialise son
+# entrée, HashAggregate n'en garde qu'un état par groupe ; Limit arrête de
+# tirer dès qu'il a assez de lignes. BatchScan, ScalarAggregate et
+# HashAggregate travaillent par lots (core.vectorized). HashJoin,
+# HashAggregate et HashSetOp débordent sur disque (core.spill) au-delà de
+# leur budget mémoire. RecursiveUnion évalue WITH RECURSIVE par itérations
+# semi-naïves sur une WorkTable ; Materialize garde une CTE lue plusieurs fois.
+# Window lit une entrée triée par Sort et ne garde qu'une partition à la fois.
+# Sous un agrégat, un BatchScan parallèle rend des agrégats partiels
+# (PartialAggregate), calculés par les processus de travail et fusionnés ici.
+SPILL_PARTITIONS = 16
+
+
+def value_key(value):
+    # Types mêlés dans une colonne : nombres, puis chaînes, puis le reste (JSON) comparé sous forme de texte.
+    if isinstance(value, (int, float)):
+        return 0, value
+    if isinstance(value, str):
+        return 1, value
+    return 2, json.dumps(value, sort_keys=True, default=str)
+
+
+def sort_key(column, descending=False, nulls_first=None):
+    """Key for `list.sort(key=..., reverse=descending)` placing NULLs as ORDER BY asks."""
+    # Par défaut NULL en dernier en ordre croissant, en premier en ordre décroissant (comme PostgreSQL).
+    nulls_last = not descending if nulls_first is None else not nulls_first
+    null = (1 if nulls_last != descending else -1, 0, 0)
+
+    def key(row):
+        value = row.get(column)
+        if value is None:
+            return null
+        kind = type(value)
+        if kind is int or kind is float:
+            return 0, 0, value
+        if kind is str:
+            return 0, 1, value
+        return (0, *value_key(value))
+    return key
+
+
+def _pass_key(item, kinds):
+    """Cheapest key sorting on one OrderItem given the types found in the column: the raw value when they compare."""
+    column = item.column
+    if not (kinds - {type(None)} <= {int, float} or kinds - {type(None)} == {str}):
+        return sort_key(column, item.descending, item.nulls_first)
+    if type(None) not in kinds:
+        return lambda row: row.get(column)
+    null = sort_key(column, item.descending, item.nulls_first)({})
+    return lambda row: null if (value := row.get(column)) is None else (0, 0, value)
+
+
+def _ascending_key(item, kinds=None):
+    """Ascending key of one OrderItem (heapq): DESC numbers are negated, other DESC keys wrapped.
+
+    `kinds`, the types seen in the column, enables the raw-value fast paths.
+    """
+    column = item.column
+    nulls_last = not item.descending if item.nulls_first is None else not item.nulls_first
+    null = (1 if nulls_last else -1, 0)
+    kinds = kinds - {type(None)} if kinds is not None else {object}
+    if kinds <= {int, float} and item.descending:
+        return lambda row: null if (value := row.get(column)) is None else (0, -value)
+    if (kinds <= {int, float} or kinds == {str}) and not item.descending:
+        return lambda row: null if (value := row.get(column)) is None else (0, value)
+    key = sort_key(column, item.descending, item.nulls_first)
+    return (lambda row: _Descending(key(row))) if item.descending else key
+
+
+def order_key(order_by, kinds=None):
+    """Single ascending key for a list of OrderItem, for heapq.merge and heapq.nsmallest."""
+    keys = [_ascending_key(item, kinds and kinds[item.column]) for item in order_by]
+    if len(keys) == 1:
+        return keys[0]
+    return lambda row: [key(row) for key in keys]
+
+
+class _Descending:
+    """Wrapper inverting the order of a key, for DESC columns of a merge key."""
+    __slots__ = ("key",)
+
+    def __init__(self, key):
+        self.key = key
+
+    def __lt__(self, other):
+        return other.key < self.key
+
+    def __eq__(self, other):
+        return self.key == other.key
+
+
+class Operator:
+    """Base physical operator: iterate it to pull rows."""
+
+    def __iter__(self):
+        raise NotImplementedError
+
+
+class Scan(Operator):
+    """Leaf operator over DatabaseSystem.scan_rows; the planner chooses the access method."""
+
+    def __init__(self, db_system, table, predicate=None, user=None, columns=None, hints=None, order=None):
+        self.db_system = db_system
+        self.table = table
+        self.predicate = predicate
+        self.user = user
+        self.columns = columns
+        self.hints = hints
+        # (OrderItem, limit) d'un ORDER BY ... LIMIT : le planificateur peut lire un index dans l'ordre.
+        self.order = order
+        self.ordered = False
+
+    def __iter__(self):
+        if self.order is None:
+            rows = self.db_system.scan_rows(self.table, self.predicate, self.user, self.columns, self.hints)
+            return iter(rows if rows is not None else ())
+        scan = self.db_system.ordered_scan_rows(self.table, *self.order, self.predicate, self.user, self.columns, self.hints)
+        if scan is None:
+            return iter(())
+        rows, self.ordered = scan
+        return iter(rows)
+
+
+class BatchScan(Operator):
+    """Leaf operator yielding Batch objects (one per table block) instead of rows."""
+
+    def __init__(self, db_system, table, predicate=None, user=None, columns=None, hints=None, aggregates=None):
+        self.db_system = db_system
+        self.table = table
+        self.predicate = predicate
+        self.user = user
+        self.columns = columns
+        self.hints = hints
+        self.aggregates = aggregates
+
+    def partial(self, group_by, calls):
+        """Same scan for an aggregate: a parallel scan then yields PartialAggregates along with (or instead of) batches."""
+        return BatchScan(self.db_system, self.table, self.predicate, self.user, self.columns, self.hints, (group_by, calls))
+
+    def __iter__(self):
+        batches = self.db_system.scan_batches(self.table, self.predicate, self.user, self.columns, self.hints, self.aggregates)
+        return iter(batches if batches is not None else ())
+
+
+class JoinScan(Operator):
+    """Leaf operator over DatabaseSystem.join_rows: left.left_key = right.right_key, method chosen by the planner."""
+
+    def __init__(self, db_system, left, right, left_key, right_key, user=None, hints=None, residual=None, kind="inner",
+                 names=None):
+        self.db_system = db_system
+        self.left = left
+        self.right = right
+        self.left_key = left_key
+        self.right_key = right_key
+        self.user = user
+        self.hints = hints
+        self.residual = residual
+        self.kind = kind
+        self.names = names
+
+    def __iter__(self):
+        rows = self.db_system.join_rows(self.left, self.right, self.left_key, self.right_key,
+                                        self.user, self.hints, self.residual, self.kind, self.names)
+        return iter(rows if rows is not None else ())
+
+
+class DivisionScan(Operator):
+    """Leaf operator over DatabaseSystem.division_operation: `FROM dividend DIVISION divisor`."""
+
+    def __init__(self, db_system, dividend, divisor, user=None):
+        self.db_system = db_system
+        self.dividend = dividend
+        self.divisor = divisor
+        self.user = user
+
+    def __iter__(self):
+        return iter(self.db_system.division_operation(self.dividend, self.divisor, self.user))
+
+
+class Filter(Operator):
+    def __init__(self, child, predicate):
+        self.child = child
+        self.predicate = predicate
+
+    def __iter__(self):
+        matches = compile_predicate(self.predicate)
+        return (row for row in self.child if matches(row))
+
+
+class Project(Operator):
+    """Compute the select list: `output` holds (alias, expression) pairs."""
+
+    def __init__(self, child, output):
+        self.child = child
+        self.output = output
+
+    def __iter__(self):
+        if all(isinstance(expr, Column) and "->" not in expr.name and expr.table is None for _, expr in self.output):
+            names = [(alias, expr.name) for alias, expr in self.output]
+            return ({alias: row.get(name) for alias, name in names} for row in self.child)
+        compiled = [(alias, compile_expression(expr)) for alias, expr in self.output]
+        return ({alias: evaluate(row) for alias, evaluate in compiled} for row in self.child)
+
+
+class Limit(Operator):
+    def __init__(self, child, count):
+        self.child = child
+        self.count = count
+
+    def __iter__(self):
+        return islice(iter(self.child), self.count)
+
+
+class Sort(Operator):
+    """External merge sort on a list of OrderItem.
+
+    Runs of at most `memory_rows` rows are sorted in memory; when the input
+    holds more, each run is written to an encrypted spill file and the runs
+    are merged with heapq.merge, so memory stays O(memory_rows + runs).
+    """
+
+    def __init__(self, child, order_by, memory_rows=None, spill_key=None):
+        self.child = child
+        self.order_by = order_by
+        self.memory_rows = memory_rows
+        self.spill_key = spill_key
+        self.runs = 0
+        self.kinds = {}
+
+    def _sorted(self, rows):
+        # Tris stables successifs, de la dernière clé à la première.
+        for item in reversed(self.order_by):
+            kinds = {type(row.get(item.column)) for row in rows}
+            self.kinds.setdefault(item.column, set()).update(kinds)
+            rows.sort(key=_pass_key(item, kinds), reverse=item.descending)
+        return rows
+
+    def __iter__(self):
+        self.kinds = {}
+        child = iter(self.child)
+        rows = list(islice(child, self.memory_rows)) if self.memory_rows else list(child)
+        run = self._sorted(rows)
+        extra = next(child, None) if self.memory_rows else None
+        if extra is None:
+            self.runs = 1
+            yield from run
+            return
+        with SpillArea(self.spill_key, "sort-") as area:
+            files = []
+            while run:
+                file = area.new_file()
+                for row in run:
+                    file.append(row)
+                file.flush()
+                files.append(file)
+                rows = [extra] if extra is not None else []
+                rows.extend(islice(child, self.memory_rows - len(rows)))
+                extra = None
+                run = self._sorted(rows)
+            self.runs = len(files)
+            # Fusion à k voies : heapq.merge est stable, les ex æquo gardent l'ordre des passes.
+            yield from heapq.merge(*files, key=order_key(self.order_by, self.kinds))
+
+
+class TopN(Operator):
+    """ORDER BY ... LIMIT k: a heap of k rows instead of a sort of the whole input.
+
+    When the child already yields rows in order of the first sort key
+    (`child.ordered`, set by an index order scan), reading stops once k rows,
+    and their ties on that key if there are further keys, are in.
+    """
+
+    def __init__(self, child, order_by, count):
+        self.child = child
+        self.order_by = order_by
+        self.count = count
+
+    def __iter__(self):
+        rows = iter(self.child)
+        key = order_key(self.order_by)
+        if not getattr(self.child, "ordered", False):
+            return iter(heapq.nsmallest(self.count, rows, key=key))
+        first = list(islice(rows, self.count))
+        if len(first) == self.count and first and len(self.order_by) > 1:
+            # Les ex æquo sur la première clé peuvent encore passer devant sur les suivantes.
+            column = self.order_by[0].column
+            last = first[-1].get(column)
+            first.extend(takewhile(lambda row: row.get(column) == last, rows))
+        return iter(heapq.nsmallest(self.count, first, key=key))
+
+
+class Window(Operator):
+    """Window functions over a child sorted on PARTITION BY then ORDER BY, one partition in memory at a time.
+
+    `calls` holds (slot, FunctionCall) pairs sharing the same `window`; each
+    output row is a copy of the input row with one column per slot.
+    """
+
+    def __init__(self, child, window, calls):
+        self.child = child
+        self.window = window
+        self.calls = calls
+
+    def __iter__(self):
+        columns = self.window.partition_by
+        slots = [slot for slot, _ in self.calls]
+        functions = [call for _, call in self.calls]
+        for _, rows in groupby(self.child, key=lambda row: tuple(row.get(col) for col in columns)):
+            rows = list(rows)
+            values = evaluate_partition(rows, self.window, functions)
+            for position, row in enumerate(rows):
+                # Copie : les lignes peuvent venir du cache de blocs.
+                yield {**row, **{slot: column[position] for slot, column in zip(slots, values)}}
+
+
+class HashAggregate(Operator):
+    """GROUP BY by hashing: one Accumulator per aggregate and group, never the input rows.
+
+    `child` yields rows or Batches; numeric aggregates of a Batch are folded
+    per group with NumPy, and the PartialAggregates of a parallel scan are
+    merged group by group. `output` holds (alias, expression) pairs over the
+    group columns and aggregates, `having` an expression tree. Once
+    `memory_groups` groups are held, rows of new groups are partitioned on
+    disk on the hash of their key, and each partition is aggregated in turn.
+    """
+
+    def __init__(self, child, group_by, output, having=None, memory_groups=None, partitions=SPILL_PARTITIONS, spill_key=None):
+        self.child = child
+        self.group_by = group_by
+        self.output = output
+        self.having = having
+        self.memory_groups = memory_groups
+        self.partitions = partitions
+        self.spill_key = spill_key
+        self.spilled = False
+
+    def __iter__(self):
+        expressions = [expr for _, expr in self.output] + ([self.having] if self.having is not None else [])
+        loose = set().union(*(free_columns(expr) for expr in expressions)) - set(self.group_by)
+        if loose:
+            raise ValueError(f"Colonne ni groupée ni agrégée : {', '.join(sorted(loose))}")
+        calls = [call for expr in expressions for call in aggregate_calls(expr)]
+        # Les résultats d'agrégats sont lus comme des colonnes « #i » de la ligne de groupe.
+        slots = {id(call): f"#{position}" for position, call in enumerate(calls)}
+        output = [(alias, compile_expression(replace_aggregates(expr, slots))) for alias, expr in self.output]
+        having = compile_expression(replace_aggregates(self.having, slots)) if self.having is not None else None
+        source = self.child.partial(self.group_by, calls) if isinstance(self.child, BatchScan) else self.child
+        groups = self._groups(source, calls, 0)
+        if not self.group_by:
+            # Sans GROUP BY (HAVING seul), une entrée vide forme quand même un groupe.
+            first = next(groups, None)
+            groups = iter([first or ((), [Accumulator(call.name, call.distinct) for call in calls])])
+        for key, accumulators in groups:
+            row = dict(zip(self.group_by, key))
+            row.update((f"#{position}", accumulator.result()) for position, accumulator in enumerate(accumulators))
+            if having is not None and having(row) is not True:
+                continue
+            yield {alias: evaluate(row) for alias, evaluate in output}
+
+    def _groups(self, source, calls, depth):
+        """(key, accumulators) of every group of `source`; partitions spilled at this depth are aggregated afterwards."""
+        groups = {}
+        area, files = None, None
+        arguments = [compile_expression(call.args[0]) if call.args and not isinstance(call.args[0], Star) else None for call in calls]
+        columns = list(dict.fromkeys([*self.group_by, *(col for call in calls for arg in call.args for col in sorted(expression_columns(arg)))]))
+
+        def spill(key, row):
+            nonlocal area, files
+            if area is None:
+                area = SpillArea(self.spill_key, "aggregate-").__enter__()
+                files = [area.new_file() for _ in range(self.partitions)]
+                self.spilled = True
+            files[hash((depth, key)) % self.partitions].append(row)
+
+        def fold(key, partial):
+            accumulators = groups.get(key)
+            if accumulators is not None:
+                for accumulator, other in zip(accumulators, partial):
+                    accumulator.merge(other)
+            elif self.memory_groups is None or len(groups) < self.memory_groups:
+                groups[key] = partial
+            else:
+                # Agrégat partiel d'un groupe hors budget : son état est débordé avec les lignes.
+                spill(key, {"#key": list(key), "#state": [accumulator.state() for accumulator in partial]})
+
+        def add(row):
+            if "#state" in row:
+                fold(tuple(row["#key"]), [Accumulator.from_state(call.name, state) for call, state in zip(calls, row["#state"])])
+                return
+            key = tuple(row.get(col) for col in self.group_by)
+            accumulators = groups.get(key)
+            if accumulators is None:
+                if self.memory_groups is None or len(groups) < self.memory_groups:
+                    accumulators = groups[key] = [Accumulator(call.name, call.distinct) for call in calls]
+                else:
+                    spill(key, {col: row.get(col) for col in columns})
+                    return
+            for accumulator, argument in zip(accumulators, arguments):
+                if argument is None:
+                    accumulator.add_rows(1)
+                else:
+                    accumulator.add(argument(row))
+
+        try:
+            for item in source:
+                if isinstance(item, PartialAggregate):
+                    for key, partial in item.groups.items():
+                        fold(key, partial)
+                    continue
+                if not isinstance(item, Batch):
+                    add(item)
+                    continue
+                if not len(item):
+                    continue
+                if not conf.vectorized_execution or area is not None:
+                    for row in item.selected_rows():
+                        add(row)
+                    continue
+                keys, ids = group_ids(item, self.group_by)
+                new = sum(key not in groups for key in keys)
+                if self.memory_groups is not None and len(groups) + new > self.memory_groups:
+                    for row in item.selected_rows():
+                        add(row)
+                    continue
+                states = [groups.get(key) or groups.setdefault(key, [Accumulator(call.name, call.distinct) for call in calls]) for key in keys]
+                for position, call in enumerate(calls):
+                    accumulate_groups([state[position] for state in states], call, item, ids)
+            yield from groups.items()
+            groups.clear()
+            for file in files or ():
+                if len(file):
+                    yield from self._groups(file, calls, depth + 1)
+        finally:
+            if area is not None:
+                area.__exit__(None, None, None)
+
+
+class ScalarAggregate(Operator):
+    """Aggregates without GROUP BY over a stream of batches: one output row, O(1) state per aggregate."""
+
+    def __init__(self, batches, output):
+        self.batches = batches
+        self.output = output
+
+    def __iter__(self):
+        for _, expr in self.output:
+            if free_columns(expr):
+                raise ValueError(f"Colonne hors agrégat sans GROUP BY : {', '.join(sorted(free_columns(expr)))}")
+        calls = [call for _, expr in self.output for call in aggregate_calls(expr)]
+        accumulators = {id(call): Accumulator(call.name, call.distinct) for call in calls}
+        batches = self.batches.partial((), calls) if isinstance(self.batches, BatchScan) else self.batches
+        for batch in batches:
+            if isinstance(batch, PartialAggregate):
+                for call, partial in zip(calls, batch.groups.get((), ())):
+                    accumulators[id(call)].merge(partial)
+                continue
+            if not isinstance(batch, Batch):
+                batch = Batch(batch)
+            for call in calls:
+                accumulate(accumulators[id(call)], call, batch)
+        results = {key: accumulator.result() for key, accumulator in accumulators.items()}
+        yield {alias: evaluate_expression(expr, {}, results) for alias, expr in self.output}
+
+
+class HashJoin(Operator):
+    """Equi-join: builds a hash table on `build`, then streams `probe` through it. NULL keys never match.
+
+    `condition(probe_row, build_row)` holds the rest of the ON clause. With
+    `probe_outer` or `build_outer` (LEFT, RIGHT, FULL OUTER JOIN), rows of
+    that side left unmatched come out as combine(row, None) or
+    combine(None, row); matched build rows are flagged in a bytearray.
+    When the build side holds more than `memory_rows` rows, both sides are
+    partitioned on the hash of their key into spill files (Grace hash join)
+    and each pair of partitions is then joined in memory. A `persistent`
+    join that fitted in memory keeps its hash table: iterating it again only
+    re-reads `probe`.
+    """
+
+    def __init__(self, probe, build, probe_key, build_key, combine, memory_rows=None, partitions=SPILL_PARTITIONS,
+                 spill_key=None, condition=None, probe_outer=False, build_outer=False, persistent=False):
+        self.probe = probe
+        self.build = build
+        self.probe_key = probe_key
+        self.build_key = build_key
+        self.combine = combine
+        self.memory_rows = memory_rows
+        self.partitions = partitions
+        self.spill_key = spill_key
+        self.condition = condition
+        self.probe_outer = probe_outer
+        self.build_outer = build_outer
+        self.spilled = False
+        self.persistent = persistent
+        self.table = None
+
+    def __iter__(self):
+        if self.table is not None:
+            yield from self._join(self.probe, *self.table)
+            return
+        build = iter(self.build)
+        rows, unkeyed = [], []
+        for row in build:
+            if row.get(self.build_key) is None:
+                if self.build_outer:
+                    unkeyed.append(row)
+                continue
+            rows.append(row)
+            if self.memory_rows is not None and len(rows) > self.memory_rows:
+                yield from self._partitioned(rows, build, unkeyed)
+                break
+        else:
+            buckets = self._buckets(rows)
+            if self.persistent and not self.build_outer:
+                # Table de hachage gardée pour les itérations suivantes (CTE récursive).
+                self.table = rows, buckets
+            yield from self._join(self.probe, rows, buckets)
+        for row in unkeyed:
+            yield self.combine(None, row)
+
+    def _buckets(self, rows):
+        buckets = {}
+        for position, row in enumerate(rows):
+            buckets.setdefault(row[self.build_key], []).append(position)
+        return buckets
+
+    def _join(self, probe, rows, buckets):
+        matched = bytearray(len(rows)) if self.build_outer else None
+        for row in probe:
+            found = False
+            for position in buckets.get(row.get(self.probe_key), ()):
+                match = rows[position]
+                if self.condition is not None and self.condition(row, match) is not True:
+                    continue
+                found = True
+                if matched is not None:
+                    matched[position] = 1
+                yield self.combine(row, match)
+            if not found and self.probe_outer:
+                yield self.combine(row, None)
+        if matched is not None:
+            for position, row in enumerate(rows):
+                if not matched[position]:
+                    yield self.combine(None, row)
+
+    def _partitioned(self, rows, build, unkeyed):
+        self.spilled = True
+        with SpillArea(self.spill_key, "hashjoin-") as area:
+            build_parts = [area.new_file() for _ in range(self.partitions)]
+            probe_parts = [area.new_file() for _ in range(self.partitions)]
+            for row in rows:
+                build_parts[hash(row[self.build_key]) % self.partitions].append(row)
+            rows.clear()
+            for row in build:
+                value = row.get(self.build_key)
+                if value is not None:
+                    build_parts[hash(value) % self.partitions].append(row)
+                elif self.build_outer:
+                    unkeyed.append(row)
+            for row in self.probe:
+                value = row.get(self.probe_key)
+                if value is not None:
+                    probe_parts[hash(value) % self.partitions].append(row)
+                elif self.probe_outer:
+                    yield self.combine(row, None)
+            # Une partition à la fois en mémoire ; une clé très fréquente reste dans une seule partition.
+            for build_part, probe_part in zip(build_parts, probe_parts):
+                if not len(build_part) and (not self.probe_outer or not len(probe_part)):
+                    continue
+                if not len(probe_part) and not self.build_outer:
+                    continue
+                rows = list(build_part)
+                yield from self._join(probe_part, rows, self._buckets(rows))
+
+
+class MergeJoin(Operator):
+    """Equi-join of two inputs sorted on their keys, NULL keys excluded: one pass over each side."""
+
+    def __init__(self, left, right, left_key, right_key, combine):
+        self.left = left
+        self.right = right
+        self.left_key = left_key
+        self.right_key = right_key
+        self.combine = combine
+
+    def __iter__(self):
+        left, right = iter(self.left), iter(self.right)
+        left_row, right_row = next(left, None), next(right, None)
+        while left_row is not None and right_row is not None:
+            value = left_row[self.left_key]
+            other = right_row[self.right_key]
+            if value < other:
+                left_row = next(left, None)
+            elif value > other:
+                right_row = next(right, None)
+            else:
+                # Série de clés égales à droite, jointe à chaque ligne de la série de gauche.
+                run = []
+                while right_row is not None and right_row[self.right_key] == value:
+                    run.append(right_row)
+                    right_row = next(right, None)
+                while left_row is not None and left_row[self.left_key] == value:
+                    for match in run:
+                        yield self.combine(left_row, match)
+                    left_row = next(left, None)
+
+
+class NestedLoopJoin(Operator):
+    """Equi-join re-reading `inner` (an iterable that can be iterated again) for each outer row."""
+
+    def __init__(self, outer, inner, outer_key, inner_key, combine):
+        self.outer = outer
+        self.inner = inner
+        self.outer_key = outer_key
+        self.inner_key = inner_key
+        self.combine = combine
+
+    def __iter__(self):
+        for row in self.outer:
+            value = row.get(self.outer_key)
+            if value is None:
+                continue
+            for match in self.inner:
+                if match.get(self.inner_key) == value:
+                    yield self.combine(row, match)
+
+
+class IndexNestedLoopJoin(Operator):
+    """Equi-join probing an index for each outer row: `lookup(value)` returns the matching inner rows."""
+
+    def __init__(self, outer, outer_key, lookup, combine):
+        self.outer = outer
+        self.outer_key = outer_key
+        self.lookup = lookup
+        self.combine = combine
+
+    def __iter__(self):
+        for row in self.outer:
+            value = row.get(self.outer_key)
+            if value is not None:
+                for match in self.lookup(value):
+                    yield self.combine(row, match)
+
+
+class Divide(Operator):
+    """Relational division `dividend ÷ divisor` by hashing.
+
+    Yields each distinct `quotient` tuple of the dividend that appears with
+    every row of the divisor on the `divisor_columns`; NULL never matches.
+    Both inputs are read once: O(|dividend| + |divisor|).
+    """
+
+    def __init__(self, dividend, divisor, quotient, divisor_columns):
+        self.dividend = dividend
+        self.divisor = divisor
+        self.quotient = quotient
+        self.divisor_columns = divisor_columns
+
+    def __iter__(self):
+        ordinals = {}
+        for row in self.divisor:
+            ordinals.setdefault(tuple(row.get(col) for col in self.divisor_columns), len(ordinals))
+        groups = {}
+        for row in self.dividend:
+            key = tuple(row.get(col) for col in self.quotient)
+            matched = groups.setdefault(key, set())
+            values = tuple(row.get(col) for col in self.divisor_columns)
+            if None not in values and values in ordinals:
+                matched.add(ordinals[values])
+        # Un diviseur contenant NULL n'est jamais couvert ; un diviseur vide divise tout.
+        needed = len(ordinals) if all(None not in values for values in ordinals) else -1
+        for key, matched in groups.items():
+            if len(matched) == needed:
+                yield dict(zip(self.quotient, key))
+
+
+
+def _canonical(value):
+    # Valeur hachable et stable : les documents JSON sont comparés sous forme de texte.
+    if value is None or isinstance(value, (str, int, float)):
+        return value
+    return json.dumps(value, sort_keys=True, default=str)
+
+
+class HashSetOp(Operator):
+    """UNION, INTERSECT and EXCEPT [ALL] by hashing rows as tuples of their values.
+
+    Columns are matched by position and named after `left`. INTERSECT and
+    EXCEPT count the rows of `right` per key, then stream `left` through the
+    counts; UNION keeps the set of keys already returned, and UNION ALL
+    simply chains both inputs. Once `memory_rows` keys are held, rows of new
+    keys are partitioned on disk by hash and each partition is processed
+    afterwards, as HashAggregate does with its groups.
+    """
+
+    def __init__(self, left, right, op, all=False, memory_rows=None, partitions=SPILL_PARTITIONS, spill_key=None):
+        self.left = left
+        self.right = right
+        self.op = op
+        self.all = all
+        self.memory_rows = memory_rows
+        self.partitions = partitions
+        self.spill_key = spill_key
+        self.spilled = False
+        self.names = [None, None]
+
+    def __iter__(self):
+        self.names = [None, None]
+        if self.op == "union" and self.all:
+            for side, child in ((0, self.left), (1, self.right)):
+                for row in child:
+                    yield self._row(side, self._values(side, row))
+            return
+        # INTERSECT / EXCEPT : le côté droit est compté avant de parcourir le gauche.
+        sides = ((0, self.left), (1, self.right)) if self.op == "union" else ((1, self.right), (0, self.left))
+        yield from self._combine(((side, self._values(side, row)) for side, child in sides for row in child), 0)
+
+    def _values(self, side, row):
+        values = list(row.values())
+        if self.names[side] is None:
+            self.names[side] = list(row)
+            other = self.names[1 - side]
+            if other is not None and len(other) != len(values):
+                raise ValueError(f"{self.op.upper()} : les deux requêtes doivent renvoyer le même nombre de colonnes")
+        return values
+
+    def _row(self, side, values):
+        return dict(zip(self.names[0] or self.names[side], values))
+
+    def _combine(self, stream, depth):
+        """Rows of the set operation over (side, values) pairs; partitions spilled at this depth are processed afterwards."""
+        counts = {}
+        area, files = None, None
+        union, distinct = self.op == "union", not self.all
+        try:
+            for side, values in stream:
+                key = tuple(_canonical(value) for value in values)
+                count = counts.get(key)
+                if count is None:
+                    # Seuls UNION, le côté compté et EXCEPT (sans ALL) mémorisent une nouvelle clé.
+                    stores = union or side == 1 or self.op == "except" and distinct
+                    full = self.memory_rows is not None and len(counts) >= self.memory_rows
+                    if area is not None or stores and full:
+                        if area is None:
+                            area = SpillArea(self.spill_key, "setop-").__enter__()
+                            files = [area.new_file() for _ in range(self.partitions)]
+                            self.spilled = True
+                        files[hash((depth, key)) % self.partitions].append([side, values])
+                        continue
+                if union:
+                    if count is None:
+                        counts[key] = 1
+                        yield self._row(side, values)
+                elif side == 1:
+                    counts[key] = (count or 0) + 1
+                elif self.op == "intersect":
+                    if count:
+                        counts[key] = count - 1 if self.all else 0
+                        yield self._row(side, values)
+                elif count:
+                    # EXCEPT ALL : chaque ligne de droite retire une ligne de gauche.
+                    if self.all:
+                        counts[key] = count - 1
+                elif self.all or count is None:
+                    if distinct:
+                        counts[key] = 0
+                    yield self._row(side, values)
+            counts.clear()
+            for file in files or ():
+                if len(file):
+                    yield from self._combine(((side, values) for side, values in file), depth + 1)
+        finally:
+            if area is not None:
+                area.__exit__(None, None, None)
+
+
+class Rename(Operator):
+    """Rows of `child` with their columns renamed by position, as in `WITH name (col, ...) AS (...)`."""
+
+    def __init__(self, child, columns):
+        self.child = child
+        self.columns = columns
+
+    def __iter__(self):
+        for row in self.child:
+            if len(row) != len(self.columns):
+                raise ValueError(f"{len(self.columns)} colonnes déclarées, {len(row)} reçues")
+            yield dict(zip(self.columns, row.values()))
+
+
+class Materialize(Operator):
+    """Rows of `child`, computed on the first iteration and replayed by the next ones (a CTE read several times).
+
+    Past `memory_rows` rows, the rest goes to an encrypted spill file, removed
+    with the operator at the end of the statement.
+    """
+
+    def __init__(self, child, memory_rows=None, spill_key=None):
+        self.child = child
+        self.memory_rows = memory_rows
+        self.spill_key = spill_key
+        self.rows = None
+        self.file = None
+        self.area = None
+        self.spilled = False
+
+    def __iter__(self):
+        if self.rows is None:
+            rows = []
+            for row in self.child:
+                if self.file is None and (self.memory_rows is None or len(rows) < self.memory_rows):
+                    rows.append(row)
+                    continue
+                if self.file is None:
+                    # Le répertoire temporaire est supprimé quand l'opérateur est libéré.
+                    self.area = SpillArea(self.spill_key, "cte-").__enter__()
+                    self.file = self.area.new_file()
+                    self.spilled = True
+                self.file.append(row)
+            self.rows = rows
+        # Générateur : tant qu'une lecture est en cours, l'opérateur (et son fichier) reste vivant.
+        yield from self.rows
+        if self.file is not None:
+            yield from self.file
+
+
+class WorkTable(Operator):
+    """Rows produced by the previous iteration of a recursive CTE; RecursiveUnion replaces them at each step."""
+
+    def __init__(self):
+        self.rows = []
+
+    def __iter__(self):
+        return iter(self.rows)
+
+
+class RecursiveUnion(Operator):
+    """`anchor UNION [ALL] step` of WITH RECURSIVE, by semi-naive iteration.
+
+    `step` reads the CTE through `work`, which only holds the rows that are
+    new since the previous iteration, so each row is joined once. Without
+    `all`, rows already produced are dropped by hashing their values. Rows
+    are renamed after `columns`, or after the first anchor row. Iteration
+    stops when a step adds no row; past `max_iterations` steps or
+    `max_rows` rows a ValueError is raised.
+    """
+
+    def __init__(self, anchor, step, work, all=False, columns=None, max_iterations=None, max_rows=None):
+        self.anchor = anchor
+        self.step = step
+        self.work = work
+        self.all = all
+        self.columns = columns
+        self.max_iterations = max_iterations
+        self.max_rows = max_rows
+
+    def __iter__(self):
+        names = list(self.columns or ()) or None
+        seen = set()
+        total, iteration = 0, 0
+        source = self.anchor
+        while True:
+            delta = []
+            for row in source:
+                values = list(row.values())
+                if names is None:
+                    names = list(row)
+                elif len(values) != len(names):
+                    raise ValueError(f"WITH RECURSIVE : {len(names)} colonnes attendues, {len(values)} reçues")
+                if not self.all:
+                    key = tuple(_canonical(value) for value in values)
+                    if key in seen:
+                        continue
+                    seen.add(key)
+                delta.append(dict(zip(names, values)))
+            if not delta:
+                return
+            if self.max_iterations is not None and iteration > self.max_iterations:
+                raise ValueError(f"WITH RECURSIVE : plus de {self.max_iterations} itérations (recursive_max_iterations)")
+            total += len(delta)
+            if self.max_rows is not None and total > self.max_rows:
+                raise ValueError(f"WITH RECURSIVE : plus de {self.max_rows} lignes (recursive_max_rows)")
+            yield from delta
+            self.work.rows = delta
+            source = self.step
+            iteration += 1
@@ -0,0 +1,340 @@
+import operator
+from functools import lru_cache
+
+from query.sql_ast import BinaryOp, Column, FunctionCall, InList, Literal, Star, UnaryOp, WindowCall
+from query.sql_parser import PARSE_CACHE_SIZE, parse_expression
+from utils.filter_utils import like_regex
+from utils.json_utils import evaluate_json_expression
+
+# Évaluation ligne à ligne des expressions (liste SELECT, CHECK, colonnes
+# générées, MERGE). Un arbre est compilé une fois en fermetures Python ;
+# le pendant vectorisé (tableaux NumPy par lot) est dans core.vectorized.
+ARITHMETIC = {
+    "+": operator.add,
+    "-": operator.sub,
+    "*": operator.mul,
+    "/": operator.truediv,
+    "%": operator.mod,
+}
+COMPARISONS = {
+    "=": operator.eq,
+    "!=": operator.ne,
+    "<": operator.lt,
+    "<=": operator.le,
+    ">": operator.gt,
+    ">=": operator.ge,
+}
+AGGREGATE_FUNCTIONS = ("count", "sum", "avg", "min", "max")
+# Fonctions scalaires autorisées dans les expressions stockées ; NULL en entrée donne NULL.
+SCALAR_FUNCTIONS = {
+    "lower": str.lower,
+    "upper": str.upper,
+    "trim": str.strip,
+    "length": len,
+    "abs": abs,
+    "round": round,
+}
+
+
+def aggregate_calls(expr):
+    """Aggregate FunctionCall nodes of an expression, e.g. both calls of `sum(a) / count(*)`."""
+    if isinstance(expr, FunctionCall) and expr.name in AGGREGATE_FUNCTIONS:
+        return [expr]
+    return [call for child in _children(expr) for call in aggregate_calls(child)]
+
+
+def is_aggregate(expr):
+    return bool(aggregate_calls(expr))
+
+
+def replace_aggregates(expr, slots):
+    """Copy of an expression where each aggregate or window call becomes Column(slots[id(call)]).
+
+    GROUP BY compiles its select list and HAVING once this way, then
+    evaluates them on a row holding the group columns and aggregate results;
+    window results are likewise columns added to each row.
+    """
+    if id(expr) in slots:
+        return Column(slots[id(expr)])
+    if isinstance(expr, BinaryOp):
+        return BinaryOp(expr.op, replace_aggregates(expr.left, slots), replace_aggregates(expr.right, slots))
+    if isinstance(expr, UnaryOp):
+        return UnaryOp(expr.op, replace_aggregates(expr.operand, slots))
+    if isinstance(expr, InList):
+        return InList(replace_aggregates(expr.expr, slots), [replace_aggregates(item, slots) for item in expr.items])
+    if isinstance(expr, FunctionCall):
+        return FunctionCall(expr.name, [replace_aggregates(arg, slots) for arg in expr.args], expr.distinct)
+    return expr
+
+
+def _children(expr):
+    if isinstance(expr, BinaryOp):
+        return [expr.left, expr.right]
+    if isinstance(expr, UnaryOp):
+        return [expr.operand]
+    if isinstance(expr, InList):
+        return [expr.expr, *expr.items]
+    if isinstance(expr, FunctionCall):
+        return expr.args
+    if isinstance(expr, WindowCall):
+        return expr.function.args
+    return []
+
+
+def window_calls(expr):
+    """WindowCall nodes of an expression, e.g. the call of `rank() OVER (ORDER BY score) - 1`."""
+    if isinstance(expr, WindowCall):
+        return [expr]
+    return [call for child in _children(expr) for call in window_calls(child)]
+
+
+def free_columns(expr):
+    """Columns read outside any aggregate call (they must be grouped on)."""
+    if isinstance(expr, Column):
+        return {expr.name}
+    if isinstance(expr, FunctionCall) and expr.name in AGGREGATE_FUNCTIONS:
+        return set()
+    return set().union(*(free_columns(child) for child in _children(expr)))
+
+
+def expression_columns(expr):
+    """Base columns an expression reads (JSON paths count as their column)."""
+    if isinstance(expr, Column):
+        return {expr.name.split("->", 1)[0]}
+    columns = set().union(*(expression_columns(child) for child in _children(expr)))
+    if isinstance(expr, WindowCall):
+        window = expr.window
+        columns |= {name.split("->", 1)[0] for name in [*window.partition_by, *(item.column for item in window.order_by)]}
+    return columns
+
+
+def conjuncts(expr):
+    """Operands of the top-level ANDs of a condition."""
+    if isinstance(expr, BinaryOp) and expr.op == "and":
+        return conjuncts(expr.left) + conjuncts(expr.right)
+    return [expr]
+
+
+def split_equi_join(condition, scopes):
+    """Split a two-table condition into (column of table 0, column of table 1, residual).
+
+    The key is the first `a.x = b.y` conjunct linking the tables at
+    positions 0 and 1 of `scopes` ({table or alias: position}); the residual
+    is the AND of the other conjuncts, or None. Without such an equality
+    both columns are None and the whole condition is residual.
+    """
+    parts = conjuncts(condition)
+    for position, part in enumerate(parts):
+        if not (isinstance(part, BinaryOp) and part.op == "=" and isinstance(part.left, Column) and isinstance(part.right, Column)):
+            continue
+        sides = [part.left, part.right]
+        if any(side.table not in scopes or "->" in side.name for side in sides):
+            continue
+        if [scopes[side.table] for side in sides] == [1, 0]:
+            sides.reverse()
+        elif [scopes[side.table] for side in sides] != [0, 1]:
+            continue
+        rest = parts[:position] + parts[position + 1:]
+        residual = None
+        for other in rest:
+            residual = other if residual is None else BinaryOp("and", residual, other)
+        return sides[0].name, sides[1].name, residual
+    return None, None, condition
+
+
+def expression_label(expr):
+    """Default output name of a select item, e.g. `sum(price * qty)`."""
+    if isinstance(expr, Column):
+        return expr.name
+    if isinstance(expr, Literal):
+        return repr(expr.value) if isinstance(expr.value, str) else str(expr.value)
+    if isinstance(expr, Star):
+        return "*"
+    if isinstance(expr, FunctionCall):
+        args = ", ".join(expression_label(arg) for arg in expr.args)
+        return f"{expr.name}({'distinct ' if expr.distinct else ''}{args})"
+    if isinstance(expr, WindowCall):
+        window = expr.window
+        clauses = []
+        if window.partition_by:
+            clauses.append(f"partition by {', '.join(window.partition_by)}")
+        if window.order_by:
+            clauses.append("order by " + ", ".join(item.column + (" desc" if item.descending else "") for item in window.order_by))
+        return f"{expression_label(expr.function)} over ({' '.join(clauses)})"
+    if isinstance(expr, UnaryOp):
+        if expr.op == "not":
+            return f"not {expression_label(expr.operand)}"
+        return f"{expression_label(expr.operand)} {expr.op}"
+    if isinstance(expr, InList):
+        return f"{expression_label(expr.expr)} in ({', '.join(expression_label(item) for item in expr.items)})"
+    return f"{expression_label(expr.left)} {expr.op} {expression_label(expr.right)}"
+
+
+def _column_getter(expr, scopes):
+    name = expr.name
+    if scopes is None:
+        if "->" in name:
+            return lambda row: evaluate_json_expression(row, name)
+        if expr.table is not None:
+            # Jointure avec une CTE : une colonne présente des deux côtés est aussi rangée sous `table.colonne`.
+            qualified = f"{expr.table}.{name}"
+            return lambda row: row[qualified] if qualified in row else row.get(name)
+        return lambda row: row.get(name)
+    # Plusieurs tables (MERGE) : la « ligne » est un tuple de lignes, une par table.
+    if expr.table is not None:
+        if expr.table not in scopes:
+            raise ValueError(f"Table inconnue dans l'expression : {expr.table}")
+        position = scopes[expr.table]
+        return lambda rows: rows[position].get(name)
+    return lambda rows: next((row[name] for row in rows if name in row), None)
+
+
+def _compare(compare, left, right):
+    def evaluate(row):
+        a, b = left(row), right(row)
+        if a is None or b is None:
+            return None
+        try:
+            return compare(a, b)
+        except TypeError:
+            return None
+    return evaluate
+
+
+def _like(op, left, right, pattern_expr):
+    if isinstance(pattern_expr, Literal) and isinstance(pattern_expr.value, str):
+        matches = like_regex(pattern_expr.value, op == "ilike").fullmatch
+        pattern = None
+    else:
+        matches, pattern = None, right
+
+    def evaluate(row):
+        value = left(row)
+        if not isinstance(value, str):
+            return None
+        if pattern is None:
+            return matches(value) is not None
+        text = pattern(row)
+        return like_regex(text, op == "ilike").fullmatch(value) is not None if isinstance(text, str) else None
+    return evaluate
+
+
+def _logical(op, left, right):
+    # Logique à trois valeurs : NULL (None) signifie « inconnu ».
+    if op == "and":
+        def evaluate(row):
+            a = left(row)
+            if a is False:
+                return False
+            b = right(row)
+            if b is False:
+                return False
+            return None if a is None or b is None else True
+        return evaluate
+
+    def evaluate(row):
+        a = left(row)
+        if a is True:
+            return True
+        b = right(row)
+        if b is True:
+            return True
+        return None if a is None or b is None else False
+    return evaluate
+
+
+def _arithmetic(op, left, right):
+    apply = ARITHMETIC[op]
+
+    def evaluate(row):
+        a, b = left(row), right(row)
+        if a is None or b is None or op in ("/", "%") and b == 0:
+            return None
+        return apply(a, b)
+    return evaluate
+
+
+def _function(expr, args):
+    if expr.name == "coalesce":
+        return lambda row: next((value for value in (arg(row) for arg in args) if value is not None), None)
+    function = SCALAR_FUNCTIONS.get(expr.name)
+    if function is None:
+        raise ValueError(f"Fonction non supportée : {expr.name}")
+
+    def evaluate(row):
+        values = [arg(row) for arg in args]
+        if any(value is None for value in values):
+            return None
+        try:
+            return function(*values)
+        except (TypeError, ValueError):
+            return None
+    return evaluate
+
+
+def compile_expression(expr, aggregates=None, scopes=None):
+    """Compile an expression tree once into a closure row -> value.
+
+    NULL operands and division by zero give None; comparisons and AND/OR/NOT
+    follow SQL three-valued logic (None is unknown). `aggregates` maps
+    id(FunctionCall) to computed aggregate values, for select items such as
+    `sum(a) / count(*)`. With `scopes` ({table or alias: position}) the
+    closure takes a tuple of rows and qualified columns read the row of
+    their table.
+    """
+    if isinstance(expr, Column):
+        return _column_getter(expr, scopes)
+    if isinstance(expr, Literal):
+        value = expr.value
+        return lambda row: value
+    if aggregates is not None and id(expr) in aggregates:
+        value = aggregates[id(expr)]
+        return lambda row: value
+    if isinstance(expr, BinaryOp):
+        left = compile_expression(expr.left, aggregates, scopes)
+        right = compile_expression(expr.right, aggregates, scopes)
+        if expr.op in ARITHMETIC:
+            return _arithmetic(expr.op, left, right)
+        if expr.op in COMPARISONS:
+            return _compare(COMPARISONS[expr.op], left, right)
+        if expr.op in ("like", "ilike"):
+            return _like(expr.op, left, right, expr.right)
+        return _logical(expr.op, left, right)
+    if isinstance(expr, UnaryOp):
+        operand = compile_expression(expr.operand, aggregates, scopes)
+        if expr.op == "is null":
+            return lambda row: operand(row) is None
+        if expr.op == "is not null":
+            return lambda row: operand(row) is not None
+
+        def negate(row):
+            value = operand(row)
+            return None if value is None else not value
+        return negate
+    if isinstance(expr, InList):
+        value_of = compile_expression(expr.expr, aggregates, scopes)
+        items = [compile_expression(item, aggregates, scopes) for item in expr.items]
+
+        def contains(row):
+            value = value_of(row)
+            if value is None:
+                return None
+            candidates = [item(row) for item in items]
+            if value in candidates:
+                return True
+            return None if None in candidates else False
+        return contains
+    if isinstance(expr, FunctionCall) and expr.name not in AGGREGATE_FUNCTIONS:
+        return _function(expr, [compile_expression(arg, aggregates, scopes) for arg in expr.args])
+    raise ValueError(f"Expression non supportée : {expression_label(expr)}")
+
+
+def evaluate_expression(expr, row, aggregates=None):
+    """One-off evaluation of an expression on a row; loops should use compile_expression."""
+    return compile_expression(expr, aggregates)(row)
+
+
+@lru_cache(maxsize=PARSE_CACHE_SIZE)
+def compiled_expression(text):
+    """Closure for a stored expression text (CHECK, GENERATED AS), parsed and compiled once per process."""
+    return compile_expression(parse_expression(text))
@@ -0,0 +1,172 @@
+import math
+from bisect import bisect_left
+
+from query.nlp_model import tokenize_text
+
+BM25_K1 = 1.2
+BM25_B = 0.75
+
+
+def _write_varint(buf, value):
+    while value >= 0x80:
+        buf.append((value & 0x7F) | 0x80)
+        value >>= 7
+    buf.append(value)
+
+
+def encode_postings(postings):
+    """Delta + varint encode a sorted [(row_id, term_frequency), ...] list."""
+    buf = bytearray()
+    previous = 0
+    for row_id, tf in postings:
+        _write_varint(buf, row_id - previous)
+        _write_varint(buf, tf)
+        previous = row_id
+    return buf
+
+
+def decode_postings(data):
+    postings = []
+    row_id = 0
+    value = shift = 0
+    pending_doc = None
+    for byte in data:
+        value |= (byte & 0x7F) << shift
+        if byte & 0x80:
+            shift += 7
+            continue
+        if pending_doc is None:
+            row_id += value
+            pending_doc = row_id
+        else:
+            postings.append((pending_doc, value))
+            pending_doc = None
+        value = shift = 0
+    return postings
+
+
+def term_frequencies(text):
+    frequencies = {}
+    tokens = tokenize_text(text) if isinstance(text, str) else []
+    for token in tokens:
+        frequencies[token] = frequencies.get(token, 0) + 1
+    return frequencies, len(tokens)
+
+
+class FullTextIndex:
+    """Inverted index over one text column with compressed posting lists and BM25 scoring."""
+
+    def __init__(self, column):
+        self.column = column
+        self.postings = {}
+        self.last_row = {}
+        self.df = {}
+        self.doc_lengths = {}
+        self.total_length = 0
+
+    @property
+    def source_columns(self):
+        return (self.column,)
+
+    def value_of(self, row):
+        return row.get(self.column)
+
+    def build(self, rows):
+        for row_id, row in enumerate(rows):
+            self.add_row(row, row_id)
+
+    def add_row(self, row, row_id):
+        self.add(self.value_of(row), row_id)
+
+    def remove_row(self, row, row_id):
+        self.remove(self.value_of(row), row_id)
+
+    def add(self, text, row_id):
+        frequencies, length = term_frequencies(text)
+        if not length or row_id in self.doc_lengths:
+            return
+        self.doc_lengths[row_id] = length
+        self.total_length += length
+        for term, tf in frequencies.items():
+            last = self.last_row.get(term)
+            if last is None or row_id > last:
+                # Cas courant (insertion en fin de table) : ajout direct sans décoder la liste.
+                buf = self.postings.setdefault(term, bytearray())
+                _write_varint(buf, row_id - (last or 0))
+                _write_varint(buf, tf)
+                self.last_row[term] = row_id
+            else:
+                postings = decode_postings(self.postings[term])
+                postings.insert(bisect_left(postings, (row_id, 0)), (row_id, tf))
+                self.postings[term] = encode_postings(postings)
+            self.df[term] = self.df.get(term, 0) + 1
+
+    def remove(self, text, row_id):
+        frequencies, length = term_frequencies(text)
+        if row_id not in self.doc_lengths:
+            return
+        self.total_length -= self.doc_lengths.pop(row_id)
+        for term in frequencies:
+            postings = [p for p in decode_postings(self.postings.get(term, b"")) if p[0] != row_id]
+            self._store(term, postings)
+
+    def delete_rows(self, deleted):
+        """Drop the given sorted row ids and shift the following ones down, as the table does."""
+        deleted_set = set(deleted)
+
+        def remap(row_id):
+            return row_id - bisect_left(deleted, row_id)
+
+        for term in list(self.postings):
+            postings = [(remap(r), tf) for r, tf in decode_postings(self.postings[term]) if r not in deleted_set]
+            self._store(term, postings)
+        for row_id in deleted:
+            self.total_length -= self.doc_lengths.pop(row_id, 0)
+        self.doc_lengths = {remap(r): length for r, length in self.doc_lengths.items()}
+
+    def _store(self, term, postings):
+        if postings:
+            self.postings[term] = encode_postings(postings)
+            self.last_row[term] = postings[-1][0]
+            self.df[term] = len(postings)
+        else:
+            self.postings.pop(term, None)
+            self.last_row.pop(term, None)
+            self.df.pop(term, None)
+
+    def search(self, query):
+        """Return {row_id: bm25_score} for rows containing at least one query term."""
+        scores = {}
+        doc_count = len(self.doc_lengths)
+        if not doc_count:
+            return scores
+        avg_length = self.total_length / doc_count
+        for term in set(tokenize_text(query)):
+            data = self.postings.get(term)
+            if not data:
+                continue
+            df = self.df[term]
+            idf = math.log((doc_count - df + 0.5) / (df + 0.5) + 1)
+            for row_id, tf in decode_postings(data):
+                norm = BM25_K1 * (1 - BM25_B + BM25_B * self.doc_lengths[row_id] / avg_length)
+                scores[row_id] = scores.get(row_id, 0.0) + idf * tf * (BM25_K1 + 1) / (tf + norm)
+        return scores
+
+    def to_dict(self):
+        return {
+            "column": self.column,
+            "postings": {term: bytes(data) for term, data in self.postings.items()},
+            "doc_lengths": list(self.doc_lengths.items()),
+        }
+
+    @classmethod
+    def from_dict(cls, data):
+        index = cls(data["column"])
+        index.doc_lengths = {row_id: length for row_id, length in data["doc_lengths"]}
+        index.total_length = sum(index.doc_lengths.values())
+        for term, raw in data["postings"].items():
+            postings = decode_postings(raw)
+            index.postings[term] = bytearray(raw)
+            index.last_row[term] = postings[-1][0]
+            index.df[term] = len(postings)
+        return index
@@ -0,0 +1,56 @@
+from collections import deque
+from itertools import islice
+
+from core.table_storage import decode_block
+from core.vectorized import Batch, compile_mask, partial_aggregate
+
+# Parcours séquentiels parallèles : la table est découpée en plages de blocs
+# contigus, et chaque processus de travail déchiffre, décompacte et filtre
+# sa plage. Il ne renvoie que les lignes retenues (projetées sur les colonnes
+# utiles) ou, sous un agrégat, ses agrégats partiels, fusionnés dans le
+# processus principal. Les fonctions exécutées par les processus sont au
+# niveau du module pour pouvoir être envoyées par pickle.
+RANGES_PER_WORKER = 4
+# Au plus tant de blocs par plage : un LIMIT satisfait tôt n'attend pas une longue plage.
+MAX_RANGE_BLOCKS = 16
+
+
+def block_ranges(blocks, workers):
+    """Split a list of blocks (numbers or tokens) into contiguous ranges, several per worker for balance."""
+    size = -(-len(blocks) // (workers * RANGES_PER_WORKER))
+    size = max(1, min(size, MAX_RANGE_BLOCKS))
+    return [blocks[start:start + size] for start in range(0, len(blocks), size)]
+
+
+def _batches(key, tokens, predicate):
+    mask = compile_mask(predicate) if predicate is not None else None
+    for token in tokens:
+        batch = Batch(decode_block(token, key))
+        yield batch.filter(mask) if mask is not None else batch
+
+
+def scan_range(key, tokens, predicate, columns):
+    """Worker task: rows of some encrypted blocks that match the predicate, projected on `columns` (all if None)."""
+    rows = [row for batch in _batches(key, tokens, predicate) for row in batch.selected_rows()]
+    if columns:
+        return [{col: row.get(col) for col in columns} for row in rows]
+    return rows
+
+
+def aggregate_range(key, tokens, predicate, group_by, calls):
+    """Worker task: PartialAggregate of the matching rows of some encrypted blocks."""
+    return partial_aggregate(_batches(key, tokens, predicate), group_by, calls)
+
+
+def ordered_results(pool, function, tasks, window):
+    """Results of function(*task) computed by the pool, yielded in task order.
+
+    At most `window` tasks are in flight: a consumer that stops early (LIMIT)
+    leaves the rest of the table unread.
+    """
+    tasks = iter(tasks)
+    pending = deque(pool.apply_async(function, task) for task in islice(tasks, window))
+    while pending:
+        result = pending.popleft().get()
+        pending.extend(pool.apply_async(function, task) for task in islice(tasks, 1))
+        yield result
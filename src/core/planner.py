@@ -0,0 +1,299 @@
+import math
+import re
+from dataclasses import dataclass, field
+from typing import Any, Optional
+
+from core.statistics import distinct_values, selectivity
+from utils.filter_utils import LIKE_OPS, RANGE_OPS, predicate_columns, predicate_leaves
+
+# Modèle de coût, en « blocs déchiffrés » : déchiffrer et décompacter un bloc
+# de 1024 lignes coûte 1, évaluer un prédicat sur une ligne beaucoup moins.
+BLOCK_COST = 1.0
+ROW_COST = 0.002
+INDEX_PROBE_COST = 0.05
+INDEX_ENTRY_COST = 0.0005
+HASH_BUILD_COST = 0.004
+# Écriture puis relecture d'une ligne débordée sur disque (jointure par hachage partitionnée).
+SPILL_ROW_COST = 0.006
+SORT_ROW_COST = 0.00025
+# Parcours parallèle : envoi des plages aux processus de travail, puis retour de chaque ligne retenue (pickle).
+PARALLEL_SETUP_COST = 10.0
+PARALLEL_ROW_COST = 0.0007
+
+BITMAP_INDEX_TYPES = ("bitmap", "jsonpath", "covering")
+# Intervalles et LIKE passent par l'index en parcourant ses valeurs distinctes, puis les lignes sont revérifiées.
+KEY_SCAN_OPS = RANGE_OPS + LIKE_OPS
+
+# Directives /*+ ... */ reconnues, à la pg_hint_plan.
+_HINT_RE = re.compile(r"(USE\s+INDEX|NO\s+INDEX|\w+)\s*(?:\(([^)]*)\))?", re.IGNORECASE)
+_SCAN_HINTS = {
+    "SEQSCAN": "seq_scan", "FULL": "seq_scan", "NOINDEX": "seq_scan", "NO INDEX": "seq_scan",
+    "INDEXSCAN": "index_scan", "INDEX": "index_scan", "USE INDEX": "index_scan",
+    "BITMAPSCAN": "bitmap_scan", "INDEXONLYSCAN": "index_only_scan",
+}
+_JOIN_HINTS = {
+    "NESTLOOP": "nested_loop", "HASHJOIN": "hash_join", "INDEXNESTLOOP": "index_nested_loop", "MERGEJOIN": "merge_join",
+}
+
+
+@dataclass
+class ScanPlan:
+    method: str
+    table: str
+    index: Optional[str] = None
+    condition: Optional[tuple] = None
+    rows: float = 0.0
+    cost: float = 0.0
+    alternatives: list = field(default_factory=list)
+    order: Any = None
+    workers: int = 1
+
+
+@dataclass
+class JoinPlan:
+    method: str
+    outer: str
+    inner: str
+    rows: float = 0.0
+    cost: float = 0.0
+    alternatives: list = field(default_factory=list)
+
+
+def parse_hints(hints):
+    """Turn `/*+ ... */` hint texts into planner directives ({"scan", "index", "join", "leading", "parallel"})."""
+    directives = {}
+    for text in hints or []:
+        for name, args in _HINT_RE.findall(text):
+            name = " ".join(name.upper().split())
+            args = args.replace(",", " ").split()
+            if name in _SCAN_HINTS:
+                directives["scan"] = _SCAN_HINTS[name]
+                if args and directives["scan"] != "seq_scan":
+                    # INDEXSCAN(col) ou INDEXSCAN(table col) : le dernier argument nomme la colonne.
+                    directives["index"] = args[-1]
+            elif name in _JOIN_HINTS:
+                directives["join"] = _JOIN_HINTS[name]
+            elif name == "LEADING" and args:
+                directives["leading"] = args
+            elif name == "PARALLEL":
+                directives["parallel"] = int(args[-1]) if args and args[-1].isdigit() else 0
+    return directives
+
+
+def blocks_touched(num_blocks, rows):
+    """Expected distinct blocks read when fetching `rows` random rows (Cardenas)."""
+    if num_blocks <= 0 or rows <= 0:
+        return 0.0
+    return num_blocks * (1.0 - (1.0 - 1.0 / num_blocks) ** rows)
+
+
+def _conjuncts(predicate):
+    return predicate[1] if predicate[0] == "and" else [predicate]
+
+
+def _indexable(leaf, indexes):
+    if leaf[0] in ("and", "or", "not", "expr"):
+        return False
+    definition = indexes.get(leaf[1]) or {}
+    if leaf[0] in ("=", "!=", "in") or leaf[0] in KEY_SCAN_OPS:
+        return definition.get("type") in BITMAP_INDEX_TYPES
+    return leaf[0] == "match" and definition.get("type") == "fulltext"
+
+
+def _bitmap_coverage(predicate, indexes):
+    """(usable, exact, probes) for resolving a predicate on bitmap/full-text indexes, as _bitmap_candidates does."""
+    op = predicate[0]
+    if op in ("and", "or"):
+        results = [_bitmap_coverage(child, indexes) for child in predicate[1]]
+        probes = sum(r[2] for r in results if r[0])
+        if op == "and":
+            return any(r[0] for r in results), all(r[0] and r[1] for r in results), probes
+        return all(r[0] for r in results), all(r[1] for r in results), probes
+    if op == "not":
+        usable, exact, probes = _bitmap_coverage(predicate[1], indexes)
+        return usable and exact, exact, probes
+    usable = _indexable(predicate, indexes)
+    return usable, usable and op not in KEY_SCAN_OPS, int(usable)
+
+
+class Planner:
+    """Cost-based choice of scan and join methods from catalog statistics and index definitions."""
+
+    def __init__(self, statistics=None):
+        self.statistics = statistics or {}
+
+    def scan_candidates(self, table_name, predicate, columns, indexes, row_count, num_blocks, pruned_blocks, block_rows,
+                        workers=1, aggregated=False):
+        """Scan plans for a table access; with `workers` > 1 the sequential scan may also run in parallel.
+
+        A parallel scan divides the block and row costs by `workers` but pays
+        to start and to send back its rows, unless `aggregated`: its workers
+        then return partial aggregates only.
+        """
+        stats = self.statistics.get(table_name)
+        rows = row_count * (selectivity(stats, predicate) if predicate is not None else 1.0)
+        candidates = []
+        # Un MATCH indexé doit passer par l'index : lui seul fournit le classement BM25.
+        ranked = predicate is not None and any(
+            leaf[0] == "match" and _indexable(leaf, indexes) for leaf in predicate_leaves(predicate))
+        scanned = pruned_blocks * block_rows if predicate is not None else row_count
+        seq_scan = ScanPlan("seq_scan", table_name, rows=rows,
+                            cost=pruned_blocks * BLOCK_COST + min(scanned, row_count) * ROW_COST)
+        if not ranked:
+            candidates.append(seq_scan)
+            if workers > 1:
+                candidates.append(ScanPlan(
+                    "parallel_seq_scan", table_name, rows=rows, workers=workers,
+                    cost=PARALLEL_SETUP_COST + seq_scan.cost / workers + (0 if aggregated else rows * PARALLEL_ROW_COST),
+                ))
+        if predicate is None:
+            return candidates + self._index_only_candidates(table_name, None, columns, indexes, row_count, rows)
+        for leaf in _conjuncts(predicate):
+            if leaf[0] == "!=" or not _indexable(leaf, indexes) or (ranked and leaf[0] != "match"):
+                continue
+            if ranked and len(_conjuncts(predicate)) > 1:
+                break
+            matched = row_count * selectivity(stats, leaf)
+            # Chaque ligne trouvée est extraite de son bloc, puis refiltrée si l'index ne couvre qu'une partie du prédicat.
+            fetch = matched * ROW_COST * (1 if leaf == predicate and leaf[0] not in KEY_SCAN_OPS else 2)
+            probe = INDEX_PROBE_COST * (len(leaf[2]) if leaf[0] == "in" else 1)
+            if leaf[0] in KEY_SCAN_OPS:
+                probe += distinct_values(stats, leaf[1], row_count) * INDEX_ENTRY_COST
+            candidates.append(ScanPlan(
+                "index_scan", table_name, index=leaf[1], condition=leaf, rows=rows,
+                cost=probe + matched * INDEX_ENTRY_COST + blocks_touched(num_blocks, matched) * BLOCK_COST + fetch,
+            ))
+        usable, exact, probes = _bitmap_coverage(predicate, indexes)
+        if usable and (probes > 1 or ranked and not candidates):
+            candidates.append(ScanPlan(
+                "bitmap_scan", table_name, rows=rows,
+                cost=probes * INDEX_PROBE_COST + rows * INDEX_ENTRY_COST * probes
+                + blocks_touched(num_blocks, rows) * BLOCK_COST + rows * ROW_COST * (1 if exact else 2),
+            ))
+        if not ranked:
+            candidates += self._index_only_candidates(table_name, predicate, columns, indexes, row_count, rows)
+        return candidates or [seq_scan]
+
+    def _index_only_candidates(self, table_name, predicate, columns, indexes, row_count, rows):
+        if not columns or predicate is not None and any(leaf[0] == "match" for leaf in predicate_leaves(predicate)):
+            return []
+        needed = set(columns) | (predicate_columns(predicate) if predicate is not None else set())
+        candidates = []
+        for column_name, definition in indexes.items():
+            if definition.get("type") != "covering" or not needed <= {column_name, *definition["include"]}:
+                continue
+            keyed = predicate is not None and any(
+                leaf[0] == "=" and leaf[1] == column_name for leaf in _conjuncts(predicate))
+            # Sans égalité sur la clé, toutes les entrées de l'index sont parcourues.
+            read = rows if keyed else row_count
+            candidates.append(ScanPlan(
+                "index_only_scan", table_name, index=column_name, rows=rows,
+                cost=INDEX_PROBE_COST + read * (INDEX_ENTRY_COST + ROW_COST),
+            ))
+        return candidates
+
+    def ordered_candidates(self, candidates, table_name, predicate, indexes, row_count, num_blocks, order):
+        """Scan plans for ORDER BY ... LIMIT, `order` being (first OrderItem, limit).
+
+        The other candidates pay for the top-N heap over their rows; an index
+        order scan reads a bitmap or covering index on the sort key in key
+        order and stops after about limit / selectivity rows.
+        """
+        item, limit = order
+        for plan in candidates:
+            plan.cost += plan.rows * SORT_ROW_COST * max(1.0, math.log2(max(limit, 1)))
+        # Sans parcours séquentiel candidat, un MATCH impose l'ordre BM25 de son index.
+        ranked = not any(plan.method == "seq_scan" for plan in candidates)
+        if ranked or (indexes.get(item.column) or {}).get("type") not in ("bitmap", "covering") or not row_count:
+            return candidates
+        stats = self.statistics.get(table_name)
+        fraction = selectivity(stats, predicate) if predicate is not None else 1.0
+        fetched = min(row_count, limit / max(fraction, 1.0 / row_count))
+        candidates.append(ScanPlan(
+            "index_order_scan", table_name, index=item.column, rows=row_count * fraction, order=item,
+            cost=INDEX_PROBE_COST + distinct_values(stats, item.column, row_count) * INDEX_ENTRY_COST
+            + blocks_touched(num_blocks, fetched) * BLOCK_COST + fetched * ROW_COST * (2 if predicate is not None else 1),
+        ))
+        return candidates
+
+    def choose(self, candidates, directives=None):
+        """Cheapest candidate, unless a hint names a feasible method (and index).
+
+        SEQSCAN covers both sequential scans; PARALLEL picks a parallel one when there is one.
+        """
+        directives = directives or {}
+        forced = [
+            plan for plan in candidates
+            if plan.method.removeprefix("parallel_") == directives.get("scan")
+            and (directives.get("index") is None or plan.index in (None, directives["index"]))
+        ]
+        if directives.get("parallel", 1) != 1:
+            forced = [plan for plan in forced or candidates if plan.workers > 1] or forced
+        ordered = sorted(forced or candidates, key=lambda plan: plan.cost)
+        chosen = ordered[0]
+        chosen.alternatives = [plan for plan in sorted(candidates, key=lambda plan: plan.cost) if plan is not chosen]
+        return chosen
+
+    def _merge_join_plan(self, left, right, sizes, ordered, rows):
+        cost = (sizes[left] + sizes[right]) * ROW_COST + rows * ROW_COST
+        for table in (left, right):
+            count = sizes[table]
+            if ordered.get(table) == "index":
+                # Lignes relues dans l'ordre des clés : accès aléatoires aux blocs.
+                cost += count * ROW_COST
+            elif ordered.get(table) == "sorted":
+                # Tri en O(n) sur une entrée déjà triée (Timsort), O(n log n) sinon.
+                cost += count * SORT_ROW_COST
+            elif count:
+                cost += count * max(math.log2(count), 1) * SORT_ROW_COST
+        return JoinPlan("merge_join", left, right, rows, cost)
+
+    def plan_join(self, left, right, left_column, right_column, sizes, inner_indexed=(), directives=None,
+                  ordered=None, memory_rows=None, kind="inner"):
+        """Pick the join method and which side drives it.
+
+        `sizes` maps each table to its row count; `inner_indexed` lists the
+        tables that have a bitmap index on their join column, usable as the
+        inner side of an index nested loop. `ordered` maps a table to "index"
+        when that index can also return its rows in key order, or "sorted"
+        when ANALYZE found them stored in key order; a merge join then skips
+        the sort of that side. A hash join whose build side exceeds
+        `memory_rows` pays for spilling both sides to disk. Outer joins
+        (`kind` left, right or full) are always hash joins, built on either side.
+        """
+        directives = directives or {}
+        ordered = ordered or {}
+        left_rows, right_rows = sizes[left], sizes[right]
+        distinct = max(distinct_values(self.statistics.get(left), left_column, left_rows),
+                       distinct_values(self.statistics.get(right), right_column, right_rows))
+        rows = left_rows * right_rows / max(distinct, 1)
+        # Une jointure externe rend au moins chaque ligne du côté préservé.
+        if kind in ("left", "full"):
+            rows = max(rows, left_rows)
+        if kind in ("right", "full"):
+            rows = max(rows, right_rows)
+        candidates = []
+        for outer, inner in ((left, right), (right, left)):
+            outer_rows, inner_rows = sizes[outer], sizes[inner]
+            candidates.append(JoinPlan("nested_loop", outer, inner, rows, outer_rows * inner_rows * ROW_COST))
+            # Table de hachage construite sur le côté interne, sondée par le côté externe.
+            cost = inner_rows * HASH_BUILD_COST + outer_rows * ROW_COST + rows * ROW_COST
+            if memory_rows is not None and inner_rows > memory_rows:
+                cost += (inner_rows + outer_rows) * SPILL_ROW_COST
+            candidates.append(JoinPlan("hash_join", outer, inner, rows, cost))
+            if inner in inner_indexed:
+                candidates.append(JoinPlan("index_nested_loop", outer, inner, rows,
+                                           outer_rows * (INDEX_PROBE_COST + ROW_COST) + rows * INDEX_ENTRY_COST))
+        if kind == "inner":
+            candidates.append(self._merge_join_plan(left, right, sizes, ordered, rows))
+        else:
+            # Jointures externes : lignes sans correspondance repérées pendant le sondage de la table de hachage.
+            candidates = [plan for plan in candidates if plan.method == "hash_join"]
+        leading = directives.get("leading")
+        if leading:
+            candidates = [plan for plan in candidates if plan.outer == leading[0]] or candidates
+        forced = [plan for plan in candidates if plan.method == directives.get("join")]
+        ordered = sorted(forced or candidates, key=lambda plan: plan.cost)
+        chosen = ordered[0]
+        chosen.alternatives = [plan for plan in sorted(candidates, key=lambda plan: plan.cost) if plan is not chosen]
+        return chosen
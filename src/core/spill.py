@@ -0,0 +1,79 @@
+import os
+import tempfile
+
+import msgpack
+
+from core.table_storage import BLOCK_ROWS
+from utils.utils import decrypt_data, encrypt_data
+
+# Débordement sur disque des opérateurs bloquants (jointure par hachage) :
+# les lignes sont écrites par paquets de BLOCK_ROWS, chiffrés avec la clé de
+# la base comme les blocs de table, dans un répertoire temporaire supprimé
+# à la fin de l'opérateur.
+
+
+class SpillFile:
+    """Append-only temporary file of rows, read back in insertion order."""
+
+    def __init__(self, path, key=None):
+        self.path = path
+        self.key = key
+        self.buffer = []
+        self.count = 0
+
+    def append(self, row):
+        self.buffer.append(row)
+        self.count += 1
+        if len(self.buffer) >= BLOCK_ROWS:
+            self.flush()
+
+    def flush(self):
+        if not self.buffer:
+            return
+        data = msgpack.packb(self.buffer)
+        if self.key is not None:
+            data = encrypt_data(data, self.key)
+        with open(self.path, "ab") as f:
+            f.write(len(data).to_bytes(4, "little") + data)
+        self.buffer = []
+
+    def __len__(self):
+        return self.count
+
+    def __iter__(self):
+        self.flush()
+        if not os.path.exists(self.path):
+            return
+        with open(self.path, "rb") as f:
+            while True:
+                size = f.read(4)
+                if not size:
+                    break
+                data = f.read(int.from_bytes(size, "little"))
+                if self.key is not None:
+                    data = decrypt_data(data, self.key)
+                    if data is None:
+                        raise ValueError("Impossible de décrypter le fichier de débordement.")
+                    data = data.encode() if isinstance(data, str) else data
+                yield from msgpack.unpackb(data, raw=False)
+
+
+class SpillArea:
+    """Temporary directory handing out SpillFiles; use as a context manager."""
+
+    def __init__(self, key=None, prefix="spill-"):
+        self.key = key
+        self.prefix = prefix
+        self.directory = None
+        self.files = 0
+
+    def __enter__(self):
+        self.directory = tempfile.TemporaryDirectory(prefix=self.prefix)
+        return self
+
+    def __exit__(self, *exc):
+        self.directory.cleanup()
+
+    def new_file(self):
+        self.files += 1
+        return SpillFile(os.path.join(self.directory.name, f"{self.files}.bin"), self.key)
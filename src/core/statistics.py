@@ -0,0 +1,160 @@
+from bisect import bisect_left, bisect_right
+
+from utils.filter_utils import like_prefix
+
+# Statistiques collectées par ANALYZE et stockées dans le catalogue de la base
+# (clé "statistics"), au même titre que les définitions d'index.
+HISTOGRAM_BUCKETS = 32
+MOST_COMMON_VALUES = 10
+
+# Sélectivités par défaut quand aucune statistique n'est disponible (mêmes ordres de grandeur que PostgreSQL).
+DEFAULT_EQ_SELECTIVITY = 0.005
+DEFAULT_RANGE_SELECTIVITY = 1 / 3
+DEFAULT_MATCH_SELECTIVITY = 0.01
+DEFAULT_LIKE_SELECTIVITY = 0.05
+
+
+def _hashable(value):
+    return not isinstance(value, (dict, list))
+
+
+def analyze_column(values):
+    """Row-count independent statistics for one column: null fraction, distinct count, MCVs and histogram."""
+    total = len(values)
+    present = [v for v in values if v is not None]
+    stats = {"null_frac": (total - len(present)) / total if total else 0.0}
+    if not present or not all(_hashable(v) for v in present):
+        # Documents JSON : seules la fraction de NULL et une estimation grossière sont utiles.
+        stats["n_distinct"] = len(present)
+        return stats
+    counts = {}
+    for value in present:
+        counts[value] = counts.get(value, 0) + 1
+    stats["n_distinct"] = len(counts)
+    common = sorted(counts.items(), key=lambda item: -item[1])[:MOST_COMMON_VALUES]
+    # Une valeur n'est « fréquente » que si elle apparaît plus souvent que la moyenne.
+    average = len(present) / len(counts)
+    stats["mcv"] = [[value, count / total] for value, count in common if count > average]
+    try:
+        ordered = sorted(present)
+    except TypeError:
+        return stats
+    stats["min"], stats["max"] = ordered[0], ordered[-1]
+    # Lignes rangées dans l'ordre de la colonne : la jointure par fusion n'a rien à trier.
+    stats["sorted"] = present == ordered
+    # Histogramme équi-profondeur : bornes des quantiles.
+    buckets = min(HISTOGRAM_BUCKETS, len(ordered))
+    stats["histogram"] = [ordered[(len(ordered) - 1) * i // buckets] for i in range(buckets + 1)]
+    return stats
+
+
+def analyze_rows(rows, columns):
+    """Statistics of a whole table, as stored in the catalog."""
+    return {
+        "row_count": len(rows),
+        "columns": {col: analyze_column([row.get(col) for row in rows]) for col in columns},
+    }
+
+
+def _histogram_fraction(histogram, value, inclusive):
+    """Fraction of non-NULL values below `value` (or at most `value` when inclusive)."""
+    buckets = len(histogram) - 1
+    if buckets <= 0:
+        return 0.5
+    position = (bisect_right if inclusive else bisect_left)(histogram, value)
+    if position == 0:
+        return 0.0
+    if position > buckets:
+        return 1.0
+    low, high = histogram[position - 1], histogram[position]
+    within = 0.5
+    if isinstance(value, (int, float)) and isinstance(low, (int, float)) and high != low:
+        # Interpolation linéaire dans le seau.
+        within = min(max((value - low) / (high - low), 0.0), 1.0)
+    return (position - 1 + within) / buckets
+
+
+def equality_selectivity(column_stats, value):
+    if column_stats is None:
+        return DEFAULT_EQ_SELECTIVITY
+    null_frac = column_stats.get("null_frac", 0.0)
+    if value is None:
+        return null_frac
+    mcv = column_stats.get("mcv", [])
+    for common, frequency in mcv:
+        if common == value:
+            return frequency
+    remaining = 1.0 - null_frac - sum(frequency for _, frequency in mcv)
+    others = column_stats.get("n_distinct", 0) - len(mcv)
+    return max(remaining, 0.0) / others if others > 0 else 0.0
+
+
+def range_selectivity(column_stats, op, value):
+    if column_stats is None or value is None:
+        return DEFAULT_RANGE_SELECTIVITY if value is not None else 0.0
+    histogram = column_stats.get("histogram")
+    if not histogram:
+        return DEFAULT_RANGE_SELECTIVITY
+    try:
+        below = _histogram_fraction(histogram, value, op in ("<=", ">"))
+    except TypeError:
+        return DEFAULT_RANGE_SELECTIVITY
+    fraction = below if op in ("<", "<=") else 1.0 - below
+    return fraction * (1.0 - column_stats.get("null_frac", 0.0))
+
+
+def like_selectivity(column_stats, pattern):
+    """LIKE 'abc%' is estimated as the range ['abc', 'abc\uffff'] when a histogram exists."""
+    prefix = like_prefix(pattern)
+    if not prefix or column_stats is None or not column_stats.get("histogram"):
+        return DEFAULT_LIKE_SELECTIVITY
+    try:
+        inside = (_histogram_fraction(column_stats["histogram"], prefix + "\uffff", True)
+                  - _histogram_fraction(column_stats["histogram"], prefix, False))
+    except TypeError:
+        return DEFAULT_LIKE_SELECTIVITY
+    # Préfixe contenu dans un seul seau : on compte la moitié du seau.
+    inside = max(inside, 0.5 / (len(column_stats["histogram"]) - 1 or 1))
+    return inside * (1.0 - column_stats.get("null_frac", 0.0))
+
+
+def selectivity(statistics, predicate):
+    """Estimated fraction of rows satisfying a predicate tree (independence between conjuncts)."""
+    columns = (statistics or {}).get("columns", {})
+    op = predicate[0]
+    if op == "and":
+        result = 1.0
+        for child in predicate[1]:
+            result *= selectivity(statistics, child)
+        return result
+    if op == "or":
+        miss = 1.0
+        for child in predicate[1]:
+            miss *= 1.0 - selectivity(statistics, child)
+        return 1.0 - miss
+    if op == "not":
+        return 1.0 - selectivity(statistics, predicate[1])
+    if op == "match":
+        return DEFAULT_MATCH_SELECTIVITY
+    if op == "expr":
+        return DEFAULT_RANGE_SELECTIVITY
+    # Les expressions JSON n'ont pas de statistiques propres.
+    column_stats = columns.get(predicate[1])
+    if op == "=":
+        return equality_selectivity(column_stats, predicate[2])
+    if op == "!=":
+        null_frac = column_stats.get("null_frac", 0.0) if column_stats else 0.0
+        return max(1.0 - null_frac - equality_selectivity(column_stats, predicate[2]), 0.0)
+    if op == "in":
+        return min(sum(equality_selectivity(column_stats, value) for value in set(predicate[2]) if value is not None), 1.0)
+    if op in ("like", "ilike"):
+        return like_selectivity(column_stats, predicate[2]) if op == "like" else DEFAULT_LIKE_SELECTIVITY
+    return range_selectivity(column_stats, op, predicate[2])
+
+
+def distinct_values(statistics, column, row_count):
+    """Estimated number of distinct values of a column (join size estimation)."""
+    column_stats = (statistics or {}).get("columns", {}).get(column)
+    if column_stats and column_stats.get("n_distinct"):
+        return column_stats["n_distinct"]
+    return max(row_count, 1)
@@ -0,0 +1,322 @@
+import os
+import hashlib
+import msgpack
+
+from utils.utils import decrypt_data, encrypt_data
+from utils.filter_utils import as_predicate, compile_predicate, like_prefix
+
+# Format segmenté : un en-tête chiffré (schéma, zone maps, filtres de Bloom)
+# suivi de blocs de lignes chiffrés séparément, pour que le scan puisse
+# écarter un bloc sans le déchiffrer. Les anciens fichiers (un seul jeton
+# Fernet) sont lus tels quels et migrés à la première écriture.
+MAGIC = b"DBPYSEG1"
+BLOCK_ROWS = 1024
+BLOOM_BITS_PER_ROW = 10
+BLOOM_HASHES = 7
+# Compteur d'écritures par fichier de table (cache de résultats) : chaque save() l'incrémente.
+_versions = {}
+
+
+def _decrypt(token, key):
+    data = decrypt_data(token, key)
+    if data is None:
+        raise ValueError("Impossible de décrypter le bloc de table.")
+    return data.encode() if isinstance(data, str) else data
+
+
+def decode_block(token, key):
+    """Rows of one encrypted block token (also run by parallel scan workers, see core.parallel)."""
+    return msgpack.unpackb(_decrypt(token, key), raw=False)
+
+
+def _bloom_key(value):
+    # 1, 1.0 et True sont égaux en Python : on normalise avant de hacher.
+    if isinstance(value, float) and value.is_integer():
+        value = int(value)
+    return msgpack.packb(value, default=repr)
+
+
+def _bloom_positions(value, num_bits):
+    digest = hashlib.blake2b(_bloom_key(value), digest_size=16).digest()
+    h1 = int.from_bytes(digest[:8], "little")
+    h2 = int.from_bytes(digest[8:], "little") | 1
+    return [(h1 + i * h2) % num_bits for i in range(BLOOM_HASHES)]
+
+
+def build_bloom(values):
+    values = [v for v in values if v is not None]
+    num_bits = max(64, len(values) * BLOOM_BITS_PER_ROW)
+    bits = bytearray((num_bits + 7) // 8)
+    for value in values:
+        for pos in _bloom_positions(value, num_bits):
+            bits[pos >> 3] |= 1 << (pos & 7)
+    return bytes(bits)
+
+
+def bloom_may_contain(bloom, value):
+    num_bits = len(bloom) * 8
+    return all(bloom[pos >> 3] >> (pos & 7) & 1 for pos in _bloom_positions(value, num_bits))
+
+
+def build_zone_map(rows):
+    """Per-column {"min", "max", "nulls"} for one block.
+
+    Columns whose values are not mutually comparable only record their null
+    count, which makes them never skippable on range predicates.
+    """
+    zone = {}
+    columns = {}
+    for row in rows:
+        for col, value in row.items():
+            columns.setdefault(col, []).append(value)
+    for col, values in columns.items():
+        present = [v for v in values if v is not None]
+        stats = {"nulls": len(values) - len(present) + (len(rows) - len(values))}
+        if present and not any(isinstance(v, (dict, list)) for v in present):
+            try:
+                stats["min"] = min(present)
+                stats["max"] = max(present)
+            except TypeError:
+                pass
+        zone[col] = stats
+    return zone
+
+
+def block_may_match(zone, blooms, predicate):
+    """Return False only when the block provably holds no matching row."""
+    op = predicate[0]
+    if op == "and":
+        return all(block_may_match(zone, blooms, p) for p in predicate[1])
+    if op == "or":
+        return any(block_may_match(zone, blooms, p) for p in predicate[1])
+    if op == "in":
+        return any(block_may_match(zone, blooms, ("=", predicate[1], value)) for value in predicate[2] if value is not None)
+    if op == "like" and "->" not in predicate[1]:
+        # LIKE 'abc%' : bloc exclu si toutes ses chaînes sont avant 'abc' ou commencent après.
+        prefix = like_prefix(predicate[2])
+        stats = zone.get(predicate[1])
+        if not prefix or stats is None or not isinstance(stats.get("min"), str) or not isinstance(stats.get("max"), str):
+            return stats is not None
+        return not (stats["max"] < prefix or stats["min"][:len(prefix)] > prefix)
+    if op not in ("=", "<", "<=", ">", ">="):
+        return True
+    column, value = predicate[1], predicate[2]
+    if "->" in column:
+        # Chemin JSON : les zone maps ne couvrent que les colonnes entières.
+        return True
+    stats = zone.get(column)
+    if stats is None:
+        # Colonne absente de toutes les lignes du bloc : seule "= NULL" peut matcher.
+        return value is None and op == "="
+    if value is None:
+        return op == "=" and stats.get("nulls", 0) > 0
+    if "min" not in stats:
+        return True
+    try:
+        low, high = stats["min"], stats["max"]
+        if op == "=" and (value < low or value > high):
+            return False
+        if op == "<" and not low < value:
+            return False
+        if op == "<=" and not low <= value:
+            return False
+        if op == ">" and not high > value:
+            return False
+        if op == ">=" and not high >= value:
+            return False
+    except TypeError:
+        return True
+    bloom = blooms.get(column)
+    if op == "=" and bloom is not None:
+        return bloom_may_contain(bloom, value)
+    return True
+
+
+class TableFile:
+    """Block-oriented access to one encrypted table file.
+
+    The header is decrypted on open; row blocks are decrypted only when a scan
+    or fetch actually needs them. Writes re-encrypt dirty blocks only.
+    """
+
+    def __init__(self, path, key):
+        self.path = path
+        self.key = key
+        self.header = {}
+        self._encrypted = []
+        self._blocks = {}
+        self._dirty = set()
+        self._header_dirty = False
+        self.blocks_read = 0
+        self._load()
+
+    def _load(self):
+        if not os.path.exists(self.path):
+            raise FileNotFoundError(self.path)
+        with open(self.path, "rb") as f:
+            raw = f.read()
+        if raw.startswith(MAGIC):
+            container = msgpack.unpackb(raw[len(MAGIC):], raw=False)
+            self.header = msgpack.unpackb(_decrypt(container["header"], self.key), raw=False)
+            self._encrypted = container["blocks"]
+            return
+        legacy = msgpack.unpackb(_decrypt(raw, self.key), raw=False)
+        self.set_rows(legacy.pop("rows", []))
+        self.header.update(legacy)
+
+    @classmethod
+    def create(cls, path, key, table_data):
+        table = cls.__new__(cls)
+        table.path = path
+        table.key = key
+        table.header = {}
+        table._encrypted = []
+        table._blocks = {}
+        table._dirty = set()
+        table.blocks_read = 0
+        table.set_header({k: v for k, v in table_data.items() if k != "rows"})
+        table.set_rows(table_data.get("rows", []))
+        return table
+
+    @property
+    def row_count(self):
+        return self.header.get("row_count", 0)
+
+    @property
+    def block_rows(self):
+        return self.header.get("block_rows", BLOCK_ROWS)
+
+    @property
+    def num_blocks(self):
+        return len(self._encrypted)
+
+    def set_header(self, header):
+        preserved = {k: self.header[k] for k in ("row_count", "block_rows", "zone_maps", "blooms") if k in self.header}
+        self.header = {**header, **preserved}
+        self._header_dirty = True
+
+    def block(self, block_no, cache=True):
+        rows = self._blocks.get(block_no)
+        if rows is None:
+            rows = decode_block(self._encrypted[block_no], self.key)
+            if cache:
+                self._blocks[block_no] = rows
+            self.blocks_read += 1
+        return rows
+
+    def encrypted_block(self, block_no):
+        """Stored token of a block, or None while the block exists only in memory (unsaved or legacy file)."""
+        return None if block_no in self._dirty else self._encrypted[block_no]
+
+    def rows(self):
+        result = []
+        for block_no in range(self.num_blocks):
+            result.extend(self.block(block_no))
+        return result
+
+    def to_dict(self):
+        data = {k: v for k, v in self.header.items() if k not in ("row_count", "block_rows", "zone_maps", "blooms")}
+        data["rows"] = self.rows()
+        return data
+
+    def candidate_blocks(self, predicate=None):
+        """Block numbers that zone maps and Bloom filters cannot exclude; reads the header only."""
+        if predicate is None:
+            return list(range(self.num_blocks))
+        zone_maps = self.header.get("zone_maps", [])
+        blooms = self.header.get("blooms", [])
+        result = []
+        for block_no in range(self.num_blocks):
+            if block_no < len(zone_maps) and zone_maps[block_no] is not None:
+                block_blooms = (blooms[block_no] if block_no < len(blooms) else None) or {}
+                if not block_may_match(zone_maps[block_no], block_blooms, predicate):
+                    continue
+            result.append(block_no)
+        return result
+
+    def scan(self, conditions=None, blocks=None, cache=True):
+        """Yield (row_id, row), skipping blocks excluded by zone maps or Bloom filters.
+
+        With cache=False decrypted blocks are not kept, so a streaming scan holds one block at a time.
+        """
+        predicate = as_predicate(conditions) if conditions else None
+        test = compile_predicate(predicate) if predicate is not None else None
+        size = self.block_rows
+        for block_no in self.candidate_blocks(predicate) if blocks is None else blocks:
+            for offset, row in enumerate(self.block(block_no, cache)):
+                if test is None or test(row):
+                    yield block_no * size + offset, row
+
+    def fetch(self, row_ids):
+        size = self.block_rows
+        return [self.block(row_id // size)[row_id % size] for row_id in row_ids]
+
+    def set_rows(self, rows):
+        size = self.block_rows
+        self._blocks = {i: list(rows[start:start + size]) for i, start in enumerate(range(0, len(rows), size))}
+        self._encrypted = [None] * len(self._blocks)
+        self._dirty = set(self._blocks)
+        self.header["row_count"] = len(rows)
+        self.header["block_rows"] = size
+        self.header["zone_maps"] = [None] * len(self._blocks)
+        self.header["blooms"] = [None] * len(self._blocks)
+        self._header_dirty = True
+
+    def append(self, row):
+        size = self.block_rows
+        row_id = self.row_count
+        block_no = row_id // size
+        if block_no == self.num_blocks:
+            self._encrypted.append(None)
+            self._blocks[block_no] = []
+            self.header.setdefault("zone_maps", []).append(None)
+            self.header.setdefault("blooms", []).append(None)
+        self.block(block_no).append(row)
+        self._dirty.add(block_no)
+        self.header["row_count"] = row_id + 1
+        self._header_dirty = True
+        return row_id
+
+    def mark_dirty(self, row_id):
+        self._dirty.add(row_id // self.block_rows)
+        self._header_dirty = True
+
+    def save(self):
+        bloom_columns = self.header.get("bloom_columns", [])
+        for block_no in sorted(self._dirty):
+            rows = self.block(block_no)
+            self.header["zone_maps"][block_no] = build_zone_map(rows)
+            self.header["blooms"][block_no] = {col: build_bloom(row.get(col) for row in rows) for col in bloom_columns}
+            self._encrypted[block_no] = encrypt_data(msgpack.packb(rows), self.key)
+        self._dirty.clear()
+        container = {
+            "header": encrypt_data(msgpack.packb(self.header), self.key),
+            "blocks": self._encrypted,
+        }
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        temp_path = self.path + ".tmp"
+        with open(temp_path, "wb") as f:
+            f.write(MAGIC + msgpack.packb(container))
+        os.replace(temp_path, self.path)
+        _versions[self.path] = _versions.get(self.path, 0) + 1
+        self._header_dirty = False
+
+    def rebuild_filters(self):
+        """Recompute zone maps and Bloom filters for every block (e.g. new Bloom columns)."""
+        for block_no in range(self.num_blocks):
+            self.block(block_no)
+            self._dirty.add(block_no)
+
+
+def table_version(path):
+    """Version of a table file: its write counter in this process, plus its modification time for writes by others."""
+    return _versions.get(path, 0), os.stat(path).st_mtime_ns
+
+
+def read_table(path, key):
+    """Load a whole table as the legacy {"columns", "rows", ...} dict."""
+    return TableFile(path, key).to_dict()
+
+
+def write_table(path, table_data, key):
+    TableFile.create(path, key, table_data).save()
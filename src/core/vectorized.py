@@ -0,0 +1,398 @@
+import operator
+from itertools import compress
+
+import numpy as np
+
+import config.config as conf
+from core.expressions import ARITHMETIC, compile_expression
+from core.table_storage import BLOCK_ROWS
+from query.sql_ast import BinaryOp, Column, Literal, Star
+from utils.filter_utils import as_predicate, column_value, compile_predicate, compile_value_test
+
+# Exécution vectorisée : un lot de lignes (un bloc de table) est décodé
+# colonne par colonne en tableaux NumPy typés, puis prédicats, arithmétique
+# et agrégats sont évalués sur les tableaux entiers. Les colonnes non
+# numériques et les cas non couverts (JSON, LIKE, MATCH) repassent par
+# le prédicat compilé ligne à ligne, avec le même résultat.
+_COMPARATORS = {
+    "=": operator.eq,
+    "!=": operator.ne,
+    "<": operator.lt,
+    "<=": operator.le,
+    ">": operator.gt,
+    ">=": operator.ge,
+}
+
+
+def _is_number(value):
+    return isinstance(value, (int, float)) and not isinstance(value, bool)
+
+
+def column_vector(values):
+    """Return (array, nulls) for a list of values: int64 or float64 when possible, object otherwise."""
+    kinds = set(map(type, values))
+    if type(None) in kinds:
+        kinds.discard(type(None))
+        nulls = np.fromiter((v is None for v in values), dtype=bool, count=len(values))
+    else:
+        nulls = np.zeros(len(values), dtype=bool)
+    if kinds and kinds <= {int, float}:
+        filled = [0 if v is None else v for v in values] if nulls.any() else values
+        try:
+            return np.array(filled, dtype=np.int64 if kinds == {int} else np.float64), nulls
+        except OverflowError:
+            pass
+    array = np.empty(len(values), dtype=object)
+    array[:] = values
+    return array, nulls
+
+
+class Batch:
+    """A list of rows with lazily decoded column vectors and an optional selection mask."""
+
+    def __init__(self, rows, selection=None):
+        self.rows = rows
+        self.selection = selection
+        self._columns = {}
+
+    def __len__(self):
+        return len(self.rows) if self.selection is None else int(self.selection.sum())
+
+    def column(self, name):
+        vector = self._columns.get(name)
+        if vector is None:
+            vector = self._columns[name] = column_vector([row.get(name) for row in self.rows])
+        return vector
+
+    def filter(self, predicate):
+        """Narrow the selection to rows matching a predicate tree or a mask compiled by compile_mask."""
+        mask = predicate(self) if callable(predicate) else predicate_mask(self, predicate)
+        self.selection = mask if self.selection is None else self.selection & mask
+        return self
+
+    def selected_rows(self):
+        return self.rows if self.selection is None else list(compress(self.rows, self.selection))
+
+
+def _row_mask(batch, test):
+    return np.fromiter((test(row) for row in batch.rows), dtype=bool, count=len(batch.rows))
+
+
+def _leaf_mask(op, column, value, negate=False):
+    value_test = compile_value_test(op, value, negate)
+    members = [v for v in value if v is not None] if op == "in" else None
+    numeric = all(map(_is_number, members)) if op == "in" else _is_number(value)
+
+    def mask(batch):
+        if value is None and op in _COMPARATORS:
+            nulls = batch.column(column)[1]
+            # IS NULL / IS NOT NULL ; une autre comparaison avec NULL n'est jamais vraie.
+            if op not in ("=", "!="):
+                return np.zeros(len(nulls), dtype=bool)
+            return nulls.copy() if (op == "=") != negate else ~nulls
+        if numeric:
+            values, nulls = batch.column(column)
+            if values.dtype != object:
+                if op == "in":
+                    if negate and len(members) < len(value):
+                        return np.zeros(len(nulls), dtype=bool)
+                    result = np.isin(values, members)
+                else:
+                    result = _COMPARATORS[op](values, value)
+                # Une ligne NULL est inconnue : exclue du test comme de sa négation.
+                return (~result if negate else result) & ~nulls
+        # Colonne non numérique : test compilé sur les valeurs brutes.
+        return np.fromiter((value_test(row.get(column)) for row in batch.rows), dtype=bool, count=len(batch.rows))
+    return mask
+
+
+def compile_mask(predicate, negate=False):
+    """Compile a predicate tree once into a closure batch -> boolean mask, with compile_predicate semantics."""
+    if not conf.vectorized_execution:
+        test = compile_predicate(predicate, negate)
+        return lambda batch: _row_mask(batch, test)
+    op = predicate[0]
+    if op in ("and", "or"):
+        if negate:
+            op = "or" if op == "and" else "and"
+        masks = [compile_mask(child, negate) for child in predicate[1]]
+        if not masks:
+            return lambda batch: np.full(len(batch.rows), op == "and")
+        combine = np.logical_and if op == "and" else np.logical_or
+        return lambda batch: combine.reduce([mask(batch) for mask in masks])
+    if op == "not":
+        return compile_mask(predicate[1], not negate)
+    if op not in _COMPARATORS and op != "in" or "->" in predicate[1]:
+        test = compile_predicate(predicate, negate)
+        return lambda batch: _row_mask(batch, test)
+    return _leaf_mask(op, predicate[1], predicate[2], negate)
+
+
+def predicate_mask(batch, predicate):
+    """Boolean mask of the rows satisfying a predicate tree."""
+    return compile_mask(predicate)(batch)
+
+
+def expression_vector(expr, batch):
+    """(array, nulls) of a scalar expression over the selected rows of a batch."""
+    if isinstance(expr, Column):
+        values, nulls = batch.column(expr.name) if "->" not in expr.name else _json_vector(expr.name, batch)
+        if batch.selection is not None:
+            return values[batch.selection], nulls[batch.selection]
+        return values, nulls
+    count = len(batch)
+    if isinstance(expr, Literal):
+        if expr.value is None:
+            return np.zeros(count), np.ones(count, dtype=bool)
+        return np.full(count, expr.value, dtype=object if not _is_number(expr.value) else None), np.zeros(count, dtype=bool)
+    if isinstance(expr, BinaryOp) and expr.op in ARITHMETIC:
+        left, left_nulls = expression_vector(expr.left, batch)
+        right, right_nulls = expression_vector(expr.right, batch)
+        nulls = left_nulls | right_nulls
+        if expr.op in ("/", "%"):
+            zero = right == 0
+            nulls = nulls | zero
+            right = np.where(zero, 1, right)
+        if _arithmetic_may_overflow(expr.op, left, right):
+            # Entiers qui pourraient dépasser int64 : calcul exact en entiers Python, comme le chemin ligne à ligne.
+            left, right = left.astype(object), right.astype(object)
+        if left.dtype == object or right.dtype == object:
+            result = np.empty(count, dtype=object)
+            for i in np.flatnonzero(~nulls):
+                result[i] = ARITHMETIC[expr.op](left[i], right[i])
+            return result, nulls
+        with np.errstate(all="ignore"):
+            return ARITHMETIC[expr.op](left, right), nulls
+    # Comparaisons, fonctions, IN... : évaluation compilée ligne à ligne.
+    evaluate = compile_expression(expr)
+    return column_vector([evaluate(row) for row in batch.selected_rows()])
+
+
+def expression_values(expr, rows):
+    """Values of a scalar expression for every row of a list, block by block (generated columns)."""
+    if not conf.vectorized_execution:
+        evaluate = compile_expression(expr)
+        return [evaluate(row) for row in rows]
+    result = []
+    for start in range(0, len(rows), BLOCK_ROWS):
+        values, nulls = expression_vector(expr, Batch(rows[start:start + BLOCK_ROWS]))
+        result.extend(None if null else value for value, null in zip(values.tolist(), nulls.tolist()))
+    return result
+
+
+def _json_vector(expression, batch):
+    return column_vector([column_value(row, expression) for row in batch.rows])
+
+
+def _python(value):
+    return value.item() if isinstance(value, np.generic) else value
+
+
+def _magnitude(values):
+    """Largest absolute value of an int64 array, as a Python int."""
+    return max(-int(values.min()), int(values.max())) if len(values) else 0
+
+
+def _may_overflow(values):
+    """True if summing an int64 array could leave the int64 range (NumPy would wrap around silently)."""
+    return values.dtype == np.int64 and _magnitude(values) * len(values) > np.iinfo(np.int64).max
+
+
+def _arithmetic_may_overflow(op, left, right):
+    if left.dtype != np.int64 or right.dtype != np.int64 or op not in ("+", "-", "*"):
+        return False
+    a, b = _magnitude(left), _magnitude(right)
+    return (a * b if op == "*" else a + b) > np.iinfo(np.int64).max
+
+
+class Accumulator:
+    """Running state of one aggregate (COUNT, SUM, AVG, MIN, MAX), fed row by row or by array."""
+
+    def __init__(self, function, distinct=False):
+        self.function = function
+        self.distinct = set() if distinct else None
+        self.count = 0
+        self.total = 0
+        self.low = None
+        self.high = None
+
+    def add(self, value):
+        if value is None:
+            return
+        if self.distinct is not None:
+            if value in self.distinct:
+                return
+            self.distinct.add(value)
+        self.count += 1
+        if self.function in ("sum", "avg"):
+            self.total += value
+        elif self.function == "min" and (self.low is None or value < self.low):
+            self.low = value
+        elif self.function == "max" and (self.high is None or value > self.high):
+            self.high = value
+
+    def add_rows(self, count):
+        """COUNT(*): rows are counted whatever their values."""
+        self.count += count
+
+    def add_vector(self, values, nulls):
+        if self.distinct is not None or values.dtype == object:
+            for value in values[~nulls]:
+                self.add(_python(value))
+            return
+        present = values[~nulls]
+        if not len(present):
+            return
+        self.count += len(present)
+        if self.function in ("sum", "avg"):
+            # Au-delà de l'intervalle int64, somme exacte en entiers Python, comme le chemin ligne à ligne.
+            self.total += sum(present.tolist()) if _may_overflow(present) else _python(present.sum())
+        elif self.function == "min":
+            low = _python(present.min())
+            self.low = low if self.low is None else min(self.low, low)
+        elif self.function == "max":
+            high = _python(present.max())
+            self.high = high if self.high is None else max(self.high, high)
+
+    def add_summary(self, count, total=0, low=None, high=None):
+        """Fold the count, sum and extremes of some non-NULL values (not for DISTINCT)."""
+        self.count += count
+        self.total += total
+        if low is not None:
+            self.low = low if self.low is None else min(self.low, low)
+        if high is not None:
+            self.high = high if self.high is None else max(self.high, high)
+
+    def merge(self, other):
+        """Fold a partial state of the same aggregate into this one."""
+        if self.distinct is not None:
+            for value in other.distinct:
+                self.add(value)
+            return
+        self.add_summary(other.count, other.total, other.low, other.high)
+
+    def state(self):
+        """Serializable state, e.g. for a spill file; Accumulator.from_state rebuilds it."""
+        return [self.count, self.total, self.low, self.high, None if self.distinct is None else list(self.distinct)]
+
+    @classmethod
+    def from_state(cls, function, state):
+        count, total, low, high, distinct = state
+        accumulator = cls(function, distinct is not None)
+        accumulator.count, accumulator.total, accumulator.low, accumulator.high = count, total, low, high
+        if distinct is not None:
+            accumulator.distinct = set(distinct)
+        return accumulator
+
+    def result(self):
+        if self.function == "count":
+            return self.count
+        if not self.count:
+            return None
+        if self.function == "sum":
+            return self.total
+        if self.function == "avg":
+            return self.total / self.count
+        return self.low if self.function == "min" else self.high
+
+
+def accumulate(accumulator, call, batch):
+    """Feed the selected rows of a batch to the accumulator of an aggregate FunctionCall."""
+    if not call.args or isinstance(call.args[0], Star):
+        accumulator.add_rows(len(batch))
+    elif conf.vectorized_execution:
+        accumulator.add_vector(*expression_vector(call.args[0], batch))
+    else:
+        evaluate = compile_expression(call.args[0])
+        for row in batch.selected_rows():
+            accumulator.add(evaluate(row))
+
+
+def group_ids(batch, columns):
+    """(keys, ids) for the selected rows of a batch: distinct key tuples and, per row, the position of its key."""
+    vectors = [expression_vector(Column(name), batch) for name in columns]
+    if len(vectors) == 1 and vectors[0][0].dtype != object and not vectors[0][1].any():
+        keys, ids = np.unique(vectors[0][0], return_inverse=True)
+        return [(key,) for key in keys.tolist()], ids.reshape(-1)
+    lists = [[None if null else value for value, null in zip(values.tolist(), nulls.tolist())] for values, nulls in vectors]
+    positions = {}
+    ids = [positions.setdefault(key, len(positions)) for key in zip(*lists)] if lists else [0] * len(batch)
+    keys = list(positions) if lists else [()] * bool(ids)
+    return keys, np.array(ids, dtype=np.intp)
+
+
+def accumulate_groups(accumulators, call, batch, ids):
+    """Feed a batch to one accumulator per group: `ids` gives the group of each selected row (see group_ids)."""
+    count = len(accumulators)
+    if not call.args or isinstance(call.args[0], Star):
+        for accumulator, rows in zip(accumulators, np.bincount(ids, minlength=count).tolist()):
+            accumulator.add_rows(rows)
+        return
+    values, nulls = expression_vector(call.args[0], batch)
+    # Une somme par groupe qui pourrait dépasser int64 est faite en entiers Python, valeur par valeur.
+    exact = call.name in ("sum", "avg") and _may_overflow(values[~nulls])
+    if call.distinct or values.dtype == object or exact:
+        for group, value, null in zip(ids.tolist(), values.tolist(), nulls.tolist()):
+            if not null:
+                accumulators[group].add(value)
+        return
+    present = ~nulls
+    ids, values = ids[present], values[present]
+    counts = np.bincount(ids, minlength=count).tolist()
+    totals = lows = highs = [None] * count
+    if call.name in ("sum", "avg"):
+        totals = np.zeros(count, dtype=values.dtype)
+        np.add.at(totals, ids, values)
+        totals = totals.tolist()
+    elif call.name == "min":
+        lows = np.full(count, np.inf if values.dtype.kind == "f" else np.iinfo(np.int64).max, dtype=values.dtype)
+        np.minimum.at(lows, ids, values)
+        lows = lows.tolist()
+    elif call.name == "max":
+        highs = np.full(count, -np.inf if values.dtype.kind == "f" else np.iinfo(np.int64).min, dtype=values.dtype)
+        np.maximum.at(highs, ids, values)
+        highs = highs.tolist()
+    for accumulator, rows, total, low, high in zip(accumulators, counts, totals, lows, highs):
+        if rows:
+            accumulator.add_summary(rows, total or 0, low, high)
+
+
+class PartialAggregate:
+    """Aggregates of part of an input, {group key: [Accumulator per call]}; merged by the aggregate operators.
+
+    Parallel scans send one per block range back from their worker processes.
+    """
+
+    def __init__(self, groups):
+        self.groups = groups
+
+
+def partial_aggregate(batches, group_by, calls):
+    """PartialAggregate of the selected rows of some batches, grouped on `group_by` (key () without GROUP BY)."""
+    groups = {}
+    arguments = [compile_expression(call.args[0]) if call.args and not isinstance(call.args[0], Star) else None for call in calls]
+    for batch in batches:
+        if not len(batch):
+            continue
+        if not conf.vectorized_execution:
+            for row in batch.selected_rows():
+                key = tuple(row.get(col) for col in group_by)
+                accumulators = groups.get(key) or groups.setdefault(key, [Accumulator(call.name, call.distinct) for call in calls])
+                for accumulator, argument in zip(accumulators, arguments):
+                    if argument is None:
+                        accumulator.add_rows(1)
+                    else:
+                        accumulator.add(argument(row))
+            continue
+        keys, ids = group_ids(batch, group_by)
+        states = [groups.get(key) or groups.setdefault(key, [Accumulator(call.name, call.distinct) for call in calls]) for key in keys]
+        for position, call in enumerate(calls):
+            accumulate_groups([state[position] for state in states], call, batch, ids)
+    return PartialAggregate(groups)
+
+
+def filter_rows(rows, conditions):
+    """Rows of a list matching conditions ({col: value} or a predicate tree)."""
+    if not rows:
+        return []
+    return Batch(rows).filter(as_predicate(conditions)).selected_rows()
@@ -0,0 +1,195 @@
+from bisect import bisect_left, bisect_right
+from collections import deque
+from itertools import accumulate as running
+
+from core.expressions import AGGREGATE_FUNCTIONS, compile_expression
+from query.sql_ast import Literal, Star
+
+# Fonctions de fenêtre, évaluées sur une partition déjà triée (voir
+# executor.Window). Les cadres ROWS/RANGE avancent de façon monotone : les
+# sommes et comptes passent par des sommes préfixes, MIN et MAX par une file
+# monotone, sans recalculer chaque cadre.
+RANKING_FUNCTIONS = ("row_number", "rank", "dense_rank", "ntile", "lag", "lead")
+
+
+def _literal_argument(call, position, default):
+    if len(call.args) <= position:
+        return default
+    arg = call.args[position]
+    if not isinstance(arg, Literal) or not isinstance(arg.value, int) or arg.value < 0:
+        raise ValueError(f"{call.name.upper()} : l'argument {position + 1} doit être un entier positif")
+    return arg.value
+
+
+def _peer_bounds(rows, order_by):
+    """(first, last) index of the peer group of each row: rows with equal ORDER BY values."""
+    columns = [item.column for item in order_by]
+    firsts, lasts = [], []
+    start = 0
+    keys = [tuple(row.get(col) for col in columns) for row in rows]
+    for i in range(1, len(rows) + 1):
+        if i == len(rows) or keys[i] != keys[start]:
+            firsts.extend([start] * (i - start))
+            lasts.extend([i - 1] * (i - start))
+            start = i
+    return firsts, lasts
+
+
+def _ranking(call, rows, peers):
+    count = len(rows)
+    if call.name == "row_number":
+        return list(range(1, count + 1))
+    if call.name == "rank":
+        return [first + 1 for first in peers[0]]
+    if call.name == "dense_rank":
+        ranks, rank = [], 0
+        for i, first in enumerate(peers[0]):
+            rank += first == i
+            ranks.append(rank)
+        return ranks
+    if call.name == "ntile":
+        buckets = _literal_argument(call, 0, None)
+        if not buckets:
+            raise ValueError("NTILE : le nombre de groupes doit être un entier strictement positif")
+        # Les `count % buckets` premiers groupes ont une ligne de plus.
+        size, extra = divmod(count, buckets)
+        tiles = []
+        for tile in range(buckets):
+            tiles.extend([tile + 1] * (size + (tile < extra)))
+        return tiles
+    # LAG / LEAD (expr [, offset [, défaut]])
+    if not call.args:
+        raise ValueError(f"{call.name.upper()} : une expression est requise")
+    evaluate = compile_expression(call.args[0])
+    values = [evaluate(row) for row in rows]
+    offset = _literal_argument(call, 1, 1)
+    default = compile_expression(call.args[2]) if len(call.args) > 2 else (lambda row: None)
+    step = -offset if call.name == "lag" else offset
+    return [values[i + step] if 0 <= i + step < count else default(rows[i]) for i in range(count)]
+
+
+def _range_offsets(rows, item, frame, peers):
+    """Frame bounds of a RANGE frame with numeric offsets, by binary search on the single ORDER BY value."""
+    values = [row.get(item.column) for row in rows]
+    present = [i for i, value in enumerate(values) if value is not None]
+    if any(not isinstance(values[i], (int, float)) for i in present):
+        raise ValueError("RANGE avec décalage : la colonne ORDER BY doit être numérique")
+    # Les valeurs non NULL sont contiguës ; en ordre décroissant on cherche sur leurs opposés.
+    low = present[0] if present else 0
+    keys = [-values[i] if item.descending else values[i] for i in present]
+
+    def bound(i, edge, is_start):
+        kind, offset = edge
+        if kind == "current":
+            return peers[0][i] if is_start else peers[1][i]
+        if offset is None:
+            return 0 if kind == "preceding" else len(rows) - 1
+        if values[i] is None:
+            return peers[0][i] if is_start else peers[1][i]
+        target = keys[i - low] + (offset if kind == "following" else -offset)
+        if is_start:
+            return low + bisect_left(keys, target)
+        return low + bisect_right(keys, target) - 1
+
+    return [bound(i, frame.start, True) for i in range(len(rows))], [bound(i, frame.end, False) for i in range(len(rows))]
+
+
+def frame_bounds(rows, window, peers):
+    """(starts, ends): inclusive row indexes of the frame of every row of a partition."""
+    count = len(rows)
+    frame = window.frame
+    if frame is None:
+        # Cadre par défaut : toute la partition sans ORDER BY, sinon du début jusqu'aux pairs de la ligne courante.
+        if not window.order_by:
+            return [0] * count, [count - 1] * count
+        return [0] * count, list(peers[1])
+    if frame.unit == "range":
+        if any(edge[0] != "current" and edge[1] is not None for edge in (frame.start, frame.end)):
+            if len(window.order_by) != 1:
+                raise ValueError("RANGE avec décalage : une seule colonne ORDER BY est requise")
+            return _range_offsets(rows, window.order_by[0], frame, peers)
+
+    def bound(i, edge, is_start):
+        kind, offset = edge
+        if kind == "current":
+            if frame.unit == "range":
+                return peers[0][i] if is_start else peers[1][i]
+            return i
+        if offset is None:
+            return 0 if kind == "preceding" else count - 1
+        return i - offset if kind == "preceding" else i + offset
+
+    return ([max(bound(i, frame.start, True), 0) for i in range(count)],
+            [min(bound(i, frame.end, False), count - 1) for i in range(count)])
+
+
+def _sliding_extreme(values, starts, ends, better):
+    """MIN or MAX of every frame with a monotonic deque: O(n) while frames only move forward."""
+    result = []
+    window = deque()
+    added = 0
+    previous = (0, -1)
+    for start, end in zip(starts, ends):
+        if start < previous[0] or end < previous[1]:
+            # Cadre reculé (cas marginal) : recalcul direct.
+            frame = [value for value in values[start:end + 1] if value is not None]
+            result.append((min if better(0, 1) else max)(frame) if frame else None)
+            window.clear()
+            added = max(start, 0)
+            previous = (start, -1)
+            continue
+        while added <= end:
+            if values[added] is not None:
+                while window and not better(values[window[-1]], values[added]):
+                    window.pop()
+                window.append(added)
+            added += 1
+        while window and window[0] < start:
+            window.popleft()
+        result.append(values[window[0]] if window and start <= end else None)
+        previous = (start, end)
+    return result
+
+
+def _framed_aggregate(call, rows, starts, ends):
+    if call.distinct:
+        raise ValueError(f"{call.name.upper()}(DISTINCT ...) OVER n'est pas supporté")
+    if not call.args or isinstance(call.args[0], Star):
+        return [max(end - start + 1, 0) for start, end in zip(starts, ends)]
+    evaluate = compile_expression(call.args[0])
+    values = [evaluate(row) for row in rows]
+    if call.name in ("min", "max"):
+        better = (lambda a, b: a < b) if call.name == "min" else (lambda a, b: a > b)
+        return _sliding_extreme(values, starts, ends, better)
+    counts = [0, *running(value is not None for value in values)]
+    if call.name == "count":
+        return [counts[end + 1] - counts[start] if start <= end else 0 for start, end in zip(starts, ends)]
+    if any(value is not None and not isinstance(value, (int, float)) for value in values):
+        raise ValueError(f"{call.name.upper()} OVER : valeurs non numériques")
+    sums = [0, *running(0 if value is None else value for value in values)]
+    result = []
+    for start, end in zip(starts, ends):
+        present = counts[end + 1] - counts[start] if start <= end else 0
+        if not present:
+            result.append(None)
+            continue
+        total = sums[end + 1] - sums[start]
+        result.append(total / present if call.name == "avg" else total)
+    return result
+
+
+def evaluate_partition(rows, window, calls):
+    """One list of values per FunctionCall of `calls`, over the rows of a partition sorted on window.order_by."""
+    peers = _peer_bounds(rows, window.order_by)
+    bounds = None
+    columns = []
+    for call in calls:
+        if call.name in RANKING_FUNCTIONS:
+            columns.append(_ranking(call, rows, peers))
+        elif call.name in AGGREGATE_FUNCTIONS:
+            if bounds is None:
+                bounds = frame_bounds(rows, window, peers)
+            columns.append(_framed_aggregate(call, rows, *bounds))
+        else:
+            raise ValueError(f"Fonction de fenêtre non supportée : {call.name}")
+    return columns
@@ -4,6 +4,7 @@ import time
 
 import config.config as conf
 from config.language import LANGUAGES
+from core.table_storage import read_table, write_table
 from utils.file_utils import read_msgpack, write_msgpack
 from utils.logger_utils import print_error, print_success
 
@@ -34,7 +35,7 @@ class BackupManager:
                 data["databases"][db_name] = {"metadata": metadata}
                 for table_name, table_obf in metadata.get("tables", {}).items():
                     table_path = os.path.join(db_path, table_obf + ".msgpack")
-                    data["databases"][db_name][table_name] = read_msgpack(table_path, self.db_system.metadata_key)
+                    data["databases"][db_name][table_name] = read_table(table_path, self.db_system.metadata_key)
             write_msgpack(backup_path, data, self.db_system.key)
             print_success(LANGUAGES[conf.global_language]["backup_created"].format(backup_file=backup_path))
         except Exception as e:
@@ -59,7 +60,7 @@ class BackupManager:
                     if table_name != "metadata":
                         table_obf = db_data["metadata"]["tables"][table_name]
                         table_path = os.path.join(db_path, table_obf + ".msgpack")
-                        write_msgpack(table_path, table_data, self.db_system.metadata_key)
+                        write_table(table_path, table_data, self.db_system.metadata_key)
             print_success(LANGUAGES[conf.global_language]["restore_completed"].format(backup_file=backup_path))
         except Exception as e:
             print_error(f"Restore failed: {str(e)}")
@@ -0,0 +1,380 @@
+import dataclasses
+import os
+from collections import Counter
+
+from core.executor import Scan, _canonical
+from core.expressions import (
+    AGGREGATE_FUNCTIONS, aggregate_calls, compile_expression, free_columns, is_aggregate, replace_aggregates, window_calls,
+)
+from core.table_storage import TableFile, write_table
+from core.vectorized import Accumulator
+from query.query_parser import base_tables, build_select, derived_source, plan_select
+from query.sql_ast import Column, FunctionCall, Select, SetOperation, Star, With
+from query.sql_parser import normalize_query, parse_sql, tokenize
+from utils.filter_utils import coerce_predicate
+
+# Maintenance des vues matérialisées. Une vue est une table du catalogue
+# (marquée `materialized_view` dans son en-tête) dont le contenu suit ses
+# tables de base : chaque écriture y reporte ses lignes insérées et
+# supprimées (une mise à jour est une suppression plus une insertion). Pour
+# une sélection, projection ou équijointure interne, le delta de la vue est
+# la requête de la vue évaluée sur les seules lignes modifiées, passées comme
+# une CTE à la place de leur table ; pour un GROUP BY, l'en-tête garde l'état
+# de chaque groupe (lignes, compte, somme, extrêmes), ajusté par le delta.
+# Une somme de flottants ajustée par deltas peut s'écarter de quelques ulps
+# du recalcul ; un groupe vidé repart de zéro et REFRESH recalcule tout.
+# Les autres requêtes sont recalculées entièrement.
+
+# Les droits de lecture sur les tables de base sont vérifiés à la création ;
+# la maintenance lit ensuite les tables quel que soit l'auteur de l'écriture.
+MAINTENANCE_USER = {"username": "materialized-view", "role": "admin"}
+AGGREGATE_TYPES = {"count": "INT", "avg": "FLOAT"}
+
+
+def is_incremental(query):
+    """True for a selection, projection, inner equi-join or GROUP BY that deltas can maintain.
+
+    HAVING, ORDER BY, LIMIT, DIVISION, outer joins, self-joins, window
+    functions, SELECT DISTINCT and aggregates with DISTINCT, set operations
+    and WITH are recomputed instead.
+    """
+    if not isinstance(query, Select) or query.divisor is not None or query.having is not None or query.distinct:
+        return False
+    if query.order_by or query.limit is not None:
+        return False
+    if query.join is not None and (query.join.kind != "inner" or query.join.table == query.table):
+        return False
+    expressions = [expr for _, expr in plan_select(query)[0] or ()]
+    if any(window_calls(expr) for expr in expressions):
+        return False
+    return not any(call.distinct for expr in expressions for call in aggregate_calls(expr))
+
+
+def delta_path(view_path):
+    """Log of the changes not yet applied to an ON DEMAND view, next to its table file."""
+    return os.path.splitext(view_path)[0] + ".delta"
+
+
+def _catalog_columns(query, db_system):
+    """{column: declared type} of the base tables of a SELECT; as in a merged join row, the last table wins."""
+    columns = {}
+    for name in base_tables(query):
+        path = db_system._get_table_path(name)
+        if path:
+            columns.update(TableFile(path, db_system.metadata_key).header.get("columns", {}))
+    return columns
+
+
+def _output_type(expr, catalog):
+    if isinstance(expr, Column):
+        return catalog.get(expr.name, "")
+    if isinstance(expr, FunctionCall) and expr.name in AGGREGATE_FUNCTIONS:
+        return AGGREGATE_TYPES.get(expr.name) or (_output_type(expr.args[0], catalog) if expr.args else "")
+    return ""
+
+
+def view_columns(query, db_system):
+    """{column: type} of a view: declared types are kept for plain columns, COUNT is INT and AVG FLOAT.
+
+    The columns of a WITH query are only known from its rows ({} here).
+    """
+    if isinstance(query, With):
+        return {}
+    if isinstance(query, SetOperation):
+        return view_columns(query.left, db_system)
+    catalog = _catalog_columns(query, db_system)
+    output, _ = plan_select(query)
+    if output is None:
+        return catalog
+    return {alias: _output_type(expr, catalog) for alias, expr in output}
+
+
+def _selects(query):
+    if isinstance(query, With):
+        for cte in query.ctes:
+            yield from _selects(cte.query)
+        yield from _selects(query.query)
+    elif isinstance(query, SetOperation):
+        yield from _selects(query.left)
+        yield from _selects(query.right)
+    else:
+        yield query
+
+
+def reads_column(definition, column_name):
+    """True if a view definition may read `column_name`: it names it, or one of its SELECTs lists `*`.
+
+    Conservative: an alias or CTE column of the same name also counts.
+    """
+    tokens, _ = tokenize(normalize_query(definition))
+    if any(token.kind in ("ident", "quoted") and token.value == column_name for token in tokens):
+        return True
+    return any(isinstance(item.expr, Star) for select in _selects(parse_sql(definition)) for item in select.items)
+
+
+class ViewMaintainer:
+    """Contents of one materialized view: full computation and application of base-table deltas.
+
+    `query` is the parsed definition; `columns` the view columns (the rows
+    written to the view keep only those).
+    """
+
+    def __init__(self, query, db_system, columns):
+        self.db_system = db_system
+        self.columns = list(columns)
+        self.incremental = is_incremental(query)
+        if self.incremental and query.where is not None:
+            # Les deltas sont filtrés hors du parcours de table : littéraux convertis ici une fois pour toutes.
+            query = dataclasses.replace(query, where=coerce_predicate(query.where, _catalog_columns(query, db_system)))
+        self.query = query
+        output = plan_select(query)[0] if isinstance(query, Select) else None
+        self.grouped = self.incremental and (bool(query.group_by) or any(is_aggregate(expr) for _, expr in output or ()))
+        if self.grouped:
+            self._compile_aggregates(output)
+
+    def _compile_aggregates(self, output):
+        expressions = [expr for _, expr in output]
+        loose = set().union(*(free_columns(expr) for expr in expressions)) - set(self.query.group_by)
+        if loose:
+            raise ValueError(f"Colonne ni groupée ni agrégée : {', '.join(sorted(loose))}")
+        self.calls = [call for expr in expressions for call in aggregate_calls(expr)]
+        slots = {id(call): f"#{position}" for position, call in enumerate(self.calls)}
+        self.output = [(alias, compile_expression(replace_aggregates(expr, slots))) for alias, expr in output]
+        self.arguments = [
+            compile_expression(call.args[0]) if call.args and not isinstance(call.args[0], Star) else None for call in self.calls
+        ]
+
+    # -- contenu complet ---------------------------------------------------
+
+    def compute(self):
+        """(rows, groups) of the whole view; groups is the aggregate state (None without GROUP BY)."""
+        if not self.grouped:
+            return self._rows(build_select(self.query, self.db_system, MAINTENANCE_USER)), None
+        groups = {}
+        if not self.query.group_by:
+            groups[()] = self._new_group([])
+        self._fold(groups, self._source(), 1)
+        entries = [entry for entry in groups.values() if entry[1] > 0 or not self.query.group_by]
+        return [self._visible(entry) for entry in entries], entries
+
+    def _rows(self, rows):
+        rows = list(rows)
+        if not self.columns and rows:
+            self.columns = list(rows[0])
+        return [{col: row.get(col) for col in self.columns} for row in rows]
+
+    def _source(self, ctes=None, query=None):
+        """Rows of the FROM, JOIN and WHERE of the view query, before grouping and projection."""
+        query = query or self.query
+        source = derived_source(query, self.db_system, MAINTENANCE_USER, ctes)
+        if source is None:
+            source = Scan(self.db_system, query.table, query.where, MAINTENANCE_USER, None, query.hints)
+        return source
+
+    # -- deltas ------------------------------------------------------------
+
+    def apply(self, table, table_name, inserted, deleted):
+        """Fold the changes of one base table into the view file `table`; returns the (inserted, deleted) view rows."""
+        if not self.grouped:
+            plus, minus = (
+                self._rows(build_select(self.query, self.db_system, MAINTENANCE_USER, ctes={table_name: rows})) if rows else []
+                for rows in (inserted, deleted)
+            )
+            return self._write_rows(table, plus, minus)
+        entries = table.header.get("view_groups", [])
+        groups = {self._key(entry[0]): entry for entry in entries}
+        touched, stale = set(), set()
+        # Suppressions d'abord : un extrême retiré est recalculé sur l'état final des tables.
+        if deleted:
+            stale = self._fold(groups, self._source({table_name: deleted}), -1, touched)
+        if inserted:
+            self._fold(groups, self._source({table_name: inserted}), 1, touched)
+        self._recompute(groups, stale)
+        return self._write_groups(table, entries, groups, touched)
+
+    def refresh(self, table, concurrently=False):
+        """Replace the contents of the view file by a full computation; returns the (inserted, deleted) view rows.
+
+        CONCURRENTLY only rewrites the rows that changed; the view is saved
+        in one atomic file replacement either way.
+        """
+        rows, entries = self.compute()
+        if not table.header.get("columns"):
+            # Vue sur un WITH : colonnes connues seulement une fois des lignes calculées.
+            table.header["columns"] = dict.fromkeys(self.columns, "")
+        old_rows = table.rows()
+        if not concurrently:
+            table.set_rows(rows)
+            if entries is not None:
+                table.header["view_groups"] = entries
+            return rows, old_rows
+        if entries is None:
+            return self._write_rows(table, rows, old_rows)
+        current = table.header.get("view_groups", [])
+        groups = {self._key(entry[0]): entry for entry in current}
+        fresh = {self._key(entry[0]): entry for entry in entries}
+        for key, entry in groups.items():
+            if key not in fresh:
+                entry[1] = 0
+        for key, entry in fresh.items():
+            if key in groups:
+                groups[key][1:] = entry[1:]
+            else:
+                groups[key] = entry
+        return self._write_groups(table, current, groups, set(groups))
+
+    def _write_rows(self, table, plus, minus):
+        """Append `plus` and remove one occurrence of each row of `minus` (rows are a bag)."""
+        counts = Counter(self._row_key(row) for row in minus)
+        added = []
+        for row in plus:
+            key = self._row_key(row)
+            if counts[key] > 0:
+                # Ligne insérée puis supprimée dans le même lot.
+                counts[key] -= 1
+            else:
+                added.append(row)
+        removed = []
+        if +counts:
+            kept = []
+            for row in table.rows():
+                key = self._row_key(row)
+                if counts[key] > 0:
+                    counts[key] -= 1
+                    removed.append(row)
+                else:
+                    kept.append(row)
+            table.set_rows(kept + added)
+        else:
+            for row in added:
+                table.append(row)
+        return added, removed
+
+    def _row_key(self, row):
+        return tuple(_canonical(row.get(col)) for col in self.columns)
+
+    # -- état des agrégats -------------------------------------------------
+
+    def _key(self, values):
+        return tuple(_canonical(value) for value in values)
+
+    def _new_group(self, values):
+        # [valeurs du groupe, lignes, [compte, somme, minimum, maximum] par agrégat]
+        return [values, 0, [[0, 0, None, None] for _ in self.calls]]
+
+    def _fold(self, groups, rows, sign, touched=None):
+        """Add (sign 1) or remove (sign -1) source rows from the group states; returns the keys whose MIN or MAX was removed."""
+        stale = set()
+        group_by = self.query.group_by
+        for row in rows:
+            values = [row.get(col) for col in group_by]
+            key = self._key(values)
+            entry = groups.get(key)
+            if entry is None:
+                entry = groups[key] = self._new_group(values)
+            entry[1] += sign
+            if touched is not None:
+                touched.add(key)
+            for call, argument, state in zip(self.calls, self.arguments, entry[2]):
+                if argument is None:
+                    state[0] += sign
+                    continue
+                value = argument(row)
+                if value is None:
+                    continue
+                state[0] += sign
+                if call.name in ("sum", "avg"):
+                    state[1] += sign * value
+                elif call.name == "min":
+                    if sign > 0:
+                        state[2] = value if state[2] is None or value < state[2] else state[2]
+                    elif state[2] is not None and not value > state[2]:
+                        stale.add(key)
+                elif call.name == "max":
+                    if sign > 0:
+                        state[3] = value if state[3] is None or value > state[3] else state[3]
+                    elif state[3] is not None and not value < state[3]:
+                        stale.add(key)
+            if entry[1] == 0:
+                # Groupe vidé : état remis à zéro, sans extrême périmé ni reste de somme.
+                entry[2] = self._new_group(values)[2]
+        return stale
+
+    def _recompute(self, groups, keys):
+        """Recompute from the base tables the groups that lost their MIN or MAX, reading only their rows."""
+        keys = [key for key in keys if groups[key][1] > 0]
+        if not keys:
+            return
+        group_by = self.query.group_by
+        where = self.query.where
+        if group_by:
+            condition = ("or", [("and", [("=", col, value) for col, value in zip(group_by, groups[key][0])]) for key in keys])
+            where = condition if where is None else ("and", [where, condition])
+        fresh = {key: self._new_group(groups[key][0]) for key in keys}
+        self._fold(fresh, self._source(query=dataclasses.replace(self.query, where=where)), 1)
+        for key in keys:
+            groups[key][1:] = fresh[key][1:]
+
+    def _visible(self, entry):
+        row = dict(zip(self.query.group_by, entry[0]))
+        for position, (call, state) in enumerate(zip(self.calls, entry[2])):
+            accumulator = Accumulator(call.name)
+            accumulator.count, accumulator.total, accumulator.low, accumulator.high = state
+            row[f"#{position}"] = accumulator.result()
+        return {alias: evaluate(row) for alias, evaluate in self.output}
+
+    def _write_groups(self, table, entries, groups, touched):
+        """Rewrite the rows of the touched groups in place, append new groups and drop emptied ones."""
+        positions = {self._key(entry[0]): position for position, entry in enumerate(entries)}
+        added, removed, emptied = [], [], set()
+        for key in touched:
+            entry = groups[key]
+            position = positions.get(key)
+            if entry[1] <= 0 and self.query.group_by:
+                if position is not None:
+                    emptied.add(position)
+                continue
+            row = self._visible(entry)
+            if position is None:
+                table.append(row)
+                entries.append(entry)
+                added.append(row)
+                continue
+            stored = table.fetch([position])[0]
+            if stored != row:
+                removed.append(dict(stored))
+                added.append(row)
+                stored.clear()
+                stored.update(row)
+                table.mark_dirty(position)
+        if emptied:
+            rows = table.rows()
+            removed.extend(rows[position] for position in emptied)
+            table.set_rows([row for position, row in enumerate(rows) if position not in emptied])
+            entries[:] = [entry for position, entry in enumerate(entries) if position not in emptied]
+        table.header["view_groups"] = entries
+        return added, removed
+
+
+def log_changes(view_path, metadata_key, table_name, inserted, deleted):
+    """Record base-table changes for an ON DEMAND view; REFRESH applies them."""
+    path = delta_path(view_path)
+    if not os.path.exists(path):
+        write_table(path, {"columns": {}, "rows": []}, metadata_key)
+    log = TableFile(path, metadata_key)
+    for sign, rows in ((-1, deleted), (1, inserted)):
+        for row in rows:
+            log.append({"table": table_name, "sign": sign, "row": row})
+    log.save()
+
+
+def pending_changes(view_path, metadata_key):
+    """{table: (inserted, deleted)} logged for an ON DEMAND view since its last refresh."""
+    path = delta_path(view_path)
+    if not os.path.exists(path):
+        return {}
+    changes = {}
+    for entry in TableFile(path, metadata_key).rows():
+        inserted, deleted = changes.setdefault(entry["table"], ([], []))
+        (inserted if entry["sign"] > 0 else deleted).append(entry["row"])
+    return changes
@@ -1,11 +1,24 @@
 import json
 import os
 import importlib
+import re
+import unicodedata
 import config.config as conf
 from config.language import LANGUAGES
 from utils.logger_utils import print_error, print_response, print_success
 
 
+# Même normalisation que le Tokenizer Keras (minuscules, ponctuation retirée),
+# avec en plus la suppression des accents ; partagée avec l'index plein texte.
+_TOKEN_RE = re.compile(r"[^\W_]+")
+
+
+def tokenize_text(text):
+    text = unicodedata.normalize("NFKD", text.lower())
+    text = "".join(c for c in text if not unicodedata.combining(c))
+    return _TOKEN_RE.findall(text)
+
+
 class NLPModel:
     def __init__(self, model_path=None):
         self.model_path = model_path
@@ -179,11 +192,11 @@ class NLPModel:
             pass
 
         if self.examples:
-            qset = set(query.lower().split())
+            qset = set(tokenize_text(query))
             best = None
             best_score = 0
             for i, ex in enumerate(self.examples):
-                s = set(ex.get('query', '').lower().split())
+                s = set(tokenize_text(ex.get('query', '')))
                 score = len(qset & s)
                 if score > best_score:
                     best_score = score
@@ -0,0 +1,85 @@
+from config.language import LANGUAGES
+from core.expressions import expression_columns
+from core.table_storage import TableFile
+from query.query_parser import execute_statement, plan_select, select_rows
+from query.sql_ast import Insert, Prepare, Select, SetOperation, Update, With
+from query.sql_parser import bind_params, parse_sql
+from utils.filter_utils import predicate_columns
+
+
+class PreparedStatement:
+    """Statement parsed, validated and planned once, then executed with different parameters."""
+
+    def __init__(self, db_system, statement, param_count, user=None, name=None):
+        self.db_system = db_system
+        self.statement = statement
+        self.param_count = param_count
+        self.user = user
+        self.name = name
+        self._validate()
+        # Le plan de projection ne dépend pas des paramètres : calculé une seule fois.
+        self.plan = plan_select(statement) if isinstance(statement, Select) else None
+        # Plans d'accès par forme de prédicat, gardés d'une exécution à l'autre (voir DatabaseSystem.plan_scan).
+        self.scan_plans = {}
+
+    @classmethod
+    def from_sql(cls, db_system, sql, user=None):
+        prepared = sql if isinstance(sql, Prepare) else parse_sql(sql, allow_params=True)
+        if prepared is None:
+            raise ValueError(LANGUAGES[db_system.language]["command_not_supported"])
+        return cls(db_system, prepared.statement, prepared.param_count, user, prepared.name)
+
+    def _validate(self):
+        table_name = getattr(self.statement, "table", None)
+        if table_name is None:
+            return
+        language = LANGUAGES[self.db_system.language]
+        table_path = self.db_system._get_table_path(table_name)
+        if not table_path:
+            raise ValueError(language["table_not_found"])
+        # Seul l'en-tête est déchiffré, pas les blocs de lignes.
+        known = set(TableFile(table_path, self.db_system.metadata_key).header.get("columns", {}))
+        referenced = set()
+        if isinstance(self.statement, Insert):
+            referenced.update(self.statement.columns)
+            if any(len(values) != len(self.statement.columns) for values in self.statement.rows):
+                raise ValueError("Le nombre de colonnes et de valeurs ne correspondent pas")
+        elif isinstance(self.statement, Update):
+            referenced.update(self.statement.assignments)
+        elif isinstance(self.statement, Select):
+            for item in self.statement.items:
+                referenced.update(expression_columns(item.expr))
+        if getattr(self.statement, "where", None):
+            referenced.update(predicate_columns(self.statement.where))
+        if referenced - known:
+            raise ValueError(f"{language['column_not_exists']}: {', '.join(sorted(referenced - known))}")
+
+    def bind(self, params):
+        params = list(params)
+        if len(params) != self.param_count:
+            raise ValueError(LANGUAGES[self.db_system.language]["prepared_param_count"].format(
+                name=self.name or "?", expected=self.param_count, given=len(params)))
+        return bind_params(self.statement, params) if self.param_count else self.statement
+
+    def execute(self, params=(), user=None):
+        """Run with `params`; SELECT returns its rows, other statements return the handler's result."""
+        statement = self.bind(params)
+        user = user or self.user
+        if isinstance(statement, (Select, SetOperation, With)):
+            self.db_system.scan_plans = self.scan_plans
+            try:
+                return select_rows(statement, self.db_system, user, self.plan)
+            finally:
+                self.db_system.scan_plans = None
+        return execute_statement(statement, self.db_system, user)
+
+    def executemany(self, rows, user=None):
+        """Run once per parameter tuple; an INSERT goes through a single batched write."""
+        user = user or self.user
+        if not isinstance(self.statement, Insert):
+            return [self.execute(params, user) for params in rows]
+        records = []
+        for params in rows:
+            statement = self.bind(params)
+            records.extend(dict(zip(statement.columns, values)) for values in statement.rows)
+        return self.db_system.insert_records(self.statement.table, records, user)
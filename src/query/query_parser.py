@@ -1,11 +1,28 @@
+import copy
+import dataclasses
 import json
+from itertools import islice
+
 import sqlparse
 from tabulate import tabulate
 
 import config.config as conf
 from config.language import LANGUAGES
 from query.nlp_model import nlp_model
-from utils.file_utils import read_msgpack, write_msgpack
+from query.sql_ast import (
+    AlterTable, Analyze, Column, CreateDatabase, CreateIndex, CreateMaterializedView, CreateTable, Deallocate, Delete,
+    Describe, DropDatabase, DropMaterializedView, DropTable, Execute, Explain, Insert, Merge, OrderItem, Prepare,
+    RefreshMaterializedView, Select, SetLanguage, SetOperation, Show, Star, Truncate, Update, Use, With,
+)
+from query.sql_parser import parse_sql
+from core.executor import (
+    BatchScan, DivisionScan, Filter, HashAggregate, HashJoin, HashSetOp, JoinScan, Limit, Materialize, Project,
+    RecursiveUnion, Rename, ScalarAggregate, Scan, Sort, TopN, Window, WorkTable,
+)
+from core.expressions import (
+    compile_expression, expression_columns, expression_label, is_aggregate, replace_aggregates, split_equi_join, window_calls,
+)
+from core.table_storage import BLOCK_ROWS, TableFile, read_table, write_table
 from utils.logger_utils import print_error, print_response, print_success, print_warning
 import re
 
@@ -22,16 +39,503 @@ def find_token_value(tokens, keyword):
                 return tokens[i + 1].value
     return None
 
+
+def plan_select(statement):
+    """Return (output, columns).
+
+    output holds (alias, expression) pairs, or is None when whole rows are
+    returned (SELECT *); columns are the base columns to fetch, or None for
+    all of them. With GROUP BY, `*` stands for the group columns.
+    """
+    grouped = bool(statement.group_by) or statement.having is not None
+    if not grouped and any(isinstance(item.expr, Star) for item in statement.items):
+        return None, None
+    output = []
+    for item in statement.items:
+        if isinstance(item.expr, Star):
+            output.extend((name, Column(name)) for name in statement.group_by)
+        else:
+            output.append((item.alias or expression_label(item.expr), item.expr))
+    labels = [label for label, _ in output]
+    # `SELECT a.x, b.x` : deux sorties nommées x garderaient la dernière seulement.
+    output = [(f"{expr.table}.{label}" if isinstance(expr, Column) and expr.table and label == expr.name
+               and labels.count(label) > 1 else label, expr) for label, expr in output]
+    # Projection poussée jusqu'au parcours : permet un parcours d'index couvrant.
+    # Après un GROUP BY, ORDER BY porte sur les lignes de sortie.
+    names = [*statement.group_by, *(col for _, expr in output for col in sorted(expression_columns(expr)))]
+    if statement.having is not None:
+        names.extend(sorted(expression_columns(statement.having)))
+    if not grouped:
+        names.extend(item.column for item in statement.order_by)
+    return output, list(dict.fromkeys(names)) or None
+
+
+def join_condition(statement):
+    """(left key, right key, residual) of `FROM a JOIN b ON ...`; the residual is compiled over (a row, b row) pairs."""
+    join = statement.join
+    scopes = {statement.table: 0, join.table: 1}
+    if statement.alias:
+        scopes[statement.alias] = 0
+    if join.alias:
+        scopes[join.alias] = 1
+    left_key, right_key, residual = split_equi_join(join.on, scopes)
+    if left_key is None:
+        raise ValueError("JOIN ... ON : une égalité entre une colonne de chaque table est requise")
+    return left_key, right_key, compile_expression(residual, scopes=scopes) if residual is not None else None
+
+
+def join_source(statement, db_system, user, ctes=None):
+    if ctes and (statement.table in ctes or statement.join.table in ctes):
+        return cte_join_source(statement, db_system, user, ctes)
+    left_key, right_key, residual = join_condition(statement)
+    names = (statement.alias or statement.table, statement.join.alias or statement.join.table)
+    node = JoinScan(db_system, statement.table, statement.join.table, left_key, right_key, user, statement.hints, residual,
+                    statement.join.kind, names)
+    # WHERE s'applique aux lignes fusionnées.
+    return Filter(node, statement.where) if statement.where is not None else node
+
+
+def cte_join_source(statement, db_system, user, ctes):
+    """Inner hash join where one side at least is a CTE: the CTE probes a hash table built on the other side.
+
+    A column present on both sides is also stored as `alias.column` in the
+    merged row, so that `c.qty * b.qty` reads each side.
+    """
+    join = statement.join
+    if join.kind != "inner":
+        raise ValueError("Seul INNER JOIN est supporté avec une CTE")
+    left_key, right_key, residual = join_condition(statement)
+    tables = (statement.table, join.table)
+    names = (statement.alias or statement.table, join.alias or join.table)
+    sides = [ctes[table] if table in ctes else Scan(db_system, table, None, user, None, statement.hints) for table in tables]
+    probe = 0 if statement.table in ctes else 1
+
+    def merge(left, right):
+        row = {**left, **right}
+        for column in left.keys() & right.keys():
+            row[f"{names[0]}.{column}"] = left[column]
+            row[f"{names[1]}.{column}"] = right[column]
+        return row
+
+    def pair(probe_row, build_row):
+        return (probe_row, build_row) if probe == 0 else (build_row, probe_row)
+
+    condition = (lambda probe_row, build_row: residual(pair(probe_row, build_row))) if residual is not None else None
+    keys = (left_key, right_key)
+    # Table de hachage gardée d'une itération à l'autre quand la sonde est la WorkTable d'une CTE récursive.
+    node = HashJoin(sides[probe], sides[1 - probe], keys[probe], keys[1 - probe], lambda *rows: merge(*pair(*rows)),
+                    conf.join_memory_rows, spill_key=db_system.metadata_key, condition=condition,
+                    persistent=isinstance(sides[probe], WorkTable))
+    return Filter(node, statement.where) if statement.where is not None else node
+
+
+def derived_source(statement, db_system, user, ctes=None):
+    """Rows of a FROM that is not a plain table scan (JOIN, DIVISION, CTE), filtered by WHERE; None otherwise."""
+    if statement.join is not None:
+        return join_source(statement, db_system, user, ctes)
+    if ctes and (statement.table in ctes or statement.divisor in ctes):
+        if statement.divisor is not None:
+            raise ValueError("DIVISION n'est pas supportée avec une CTE")
+        node = ctes[statement.table]
+        return Filter(node, statement.where) if statement.where is not None else node
+    if statement.divisor is None:
+        return None
+    node = DivisionScan(db_system, statement.table, statement.divisor, user)
+    return Filter(node, statement.where) if statement.where is not None else node
+
+
+def row_batches(rows, size=BLOCK_ROWS):
+    rows = iter(rows)
+    while True:
+        chunk = list(islice(rows, size))
+        if not chunk:
+            return
+        yield chunk
+
+
+def build_select(statement, db_system, user, plan=None, ctes=None):
+    """Pipelined operator tree for a SELECT; rows are pulled lazily, so LIMIT stops the scan early.
+
+    `ctes` maps the names of the CTEs visible to the statement to their rows.
+    """
+    if isinstance(statement, With):
+        return build_with(statement, db_system, user, ctes)
+    if isinstance(statement, SetOperation):
+        return build_set_operation(statement, db_system, user, ctes)
+    output, columns = plan or plan_select(statement)
+    calls = [call for _, expr in output or () for call in window_calls(expr)]
+    if calls and (statement.group_by or statement.having is not None or any(is_aggregate(expr) for _, expr in output)):
+        raise ValueError("Les fonctions de fenêtre ne se combinent pas avec GROUP BY ni avec des agrégats")
+    if statement.group_by or statement.having is not None:
+        source = derived_source(statement, db_system, user, ctes)
+        if source is None:
+            source = BatchScan(db_system, statement.table, statement.where, user, columns, statement.hints)
+        node = HashAggregate(source, statement.group_by, output, statement.having, conf.aggregate_memory_groups,
+                             spill_key=db_system.metadata_key)
+        return ordered(distinct_rows(node, db_system) if statement.distinct else node, statement, db_system)
+    if output is not None and any(is_aggregate(expr) for _, expr in output):
+        # Agrégats sans GROUP BY : évalués par lots sur des vecteurs de colonnes.
+        source = derived_source(statement, db_system, user, ctes)
+        if source is not None:
+            batches = row_batches(source)
+        else:
+            batches = BatchScan(db_system, statement.table, statement.where, user, columns, statement.hints)
+        node = ScalarAggregate(batches, output)
+        return Limit(node, statement.limit) if statement.limit is not None else node
+    node = derived_source(statement, db_system, user, ctes)
+    if node is None:
+        top = (statement.order_by[0], statement.limit) if statement.order_by and statement.limit is not None and not (calls or statement.distinct) else None
+        node = Scan(db_system, statement.table, statement.where, user, columns, statement.hints, top)
+    if calls:
+        node, output, statement = windowed(node, output, calls, statement, db_system)
+    if statement.distinct:
+        # Doublons retirés après la projection : ORDER BY porte alors sur les colonnes de sortie.
+        if output is not None:
+            node = Project(node, output)
+            missing = [item.column for item in statement.order_by if item.column not in {alias for alias, _ in output}]
+            if missing:
+                raise ValueError(f"SELECT DISTINCT : les colonnes de ORDER BY doivent figurer dans la liste SELECT ({', '.join(missing)})")
+        return ordered(distinct_rows(node, db_system), statement, db_system)
+    node = ordered(node, statement, db_system)
+    if output is not None:
+        node = Project(node, output)
+    return node
+
+
+def distinct_rows(node, db_system):
+    """SELECT DISTINCT: the UNION of the rows with nothing, which keeps the first of each set of equal rows."""
+    return HashSetOp(node, [], "union", False, conf.set_memory_rows, spill_key=db_system.metadata_key)
+
+
+def build_set_operation(statement, db_system, user, ctes=None):
+    """UNION / INTERSECT / EXCEPT [ALL] of two SELECTs (or nested combinations), then ORDER BY and LIMIT."""
+    left = build_select(statement.left, db_system, user, ctes=ctes)
+    right = build_select(statement.right, db_system, user, ctes=ctes)
+    node = HashSetOp(left, right, statement.op, statement.all, conf.set_memory_rows, spill_key=db_system.metadata_key)
+    return ordered(node, statement, db_system)
+
+
+def references(query, name):
+    """How many times a SELECT or set operation reads `name` in its FROM or JOIN clauses."""
+    if isinstance(query, SetOperation):
+        return references(query.left, name) + references(query.right, name)
+    return (query.table == name) + (query.join is not None and query.join.table == name)
+
+
+def base_tables(query, hidden=()):
+    """Catalog tables read by a SELECT, set operation or WITH, in order of appearance; CTE names are not tables."""
+    if isinstance(query, With):
+        hidden = {*hidden, *(cte.name for cte in query.ctes)}
+        names = [name for cte in query.ctes for name in base_tables(cte.query, hidden)] + base_tables(query.query, hidden)
+    elif isinstance(query, SetOperation):
+        names = base_tables(query.left, hidden) + base_tables(query.right, hidden)
+    else:
+        names = [query.table, query.join.table if query.join is not None else None, query.divisor]
+    return list(dict.fromkeys(name for name in names if name and name not in hidden))
+
+
+def build_with(statement, db_system, user, ctes=None):
+    """Final query of a WITH, with its CTEs planned as part of it.
+
+    A CTE read once is inlined: its operator tree feeds the reader directly.
+    One read several times (or from the recursive part of a recursive CTE,
+    which runs once per iteration) is computed once by Materialize. An
+    unused CTE is never run, and none of them outlives the statement.
+    """
+    ctes = dict(ctes or {})
+    for position, cte in enumerate(statement.ctes):
+        if statement.recursive and references(cte.query, cte.name):
+            node = recursive_union(cte, db_system, user, ctes)
+        else:
+            node = build_select(cte.query, db_system, user, ctes=ctes)
+            if cte.columns:
+                node = Rename(node, cte.columns)
+        readers = references(statement.query, cte.name)
+        for later in statement.ctes[position + 1:]:
+            body = later.query
+            if statement.recursive and isinstance(body, SetOperation) and references(body, later.name):
+                # La partie récursive est réévaluée à chaque itération.
+                readers += references(body.left, cte.name) + 2 * references(body.right, cte.name)
+            else:
+                readers += references(body, cte.name)
+        if readers > 1:
+            node = Materialize(node, conf.cte_memory_rows, db_system.metadata_key)
+        ctes[cte.name] = node
+    return build_select(statement.query, db_system, user, ctes=ctes)
+
+
+def recursive_union(cte, db_system, user, ctes):
+    """`anchor UNION [ALL] step` of a recursive CTE; `step` reads the CTE as the rows of the previous iteration."""
+    body = cte.query
+    if not isinstance(body, SetOperation) or body.op != "union" or references(body.left, cte.name) or not references(body.right, cte.name):
+        raise ValueError(f"WITH RECURSIVE {cte.name} : <requête initiale> UNION [ALL] <requête récursive> attendu")
+    if body.order_by or body.limit is not None:
+        raise ValueError(f"WITH RECURSIVE {cte.name} : ORDER BY et LIMIT ne sont pas supportés dans la CTE")
+    work = WorkTable()
+    anchor = build_select(body.left, db_system, user, ctes=ctes)
+    step = build_select(body.right, db_system, user, ctes={**ctes, cte.name: work})
+    return RecursiveUnion(anchor, step, work, body.all, cte.columns, conf.recursive_max_iterations, conf.recursive_max_rows)
+
+
+def windowed(node, output, calls, statement, db_system):
+    """Window operators for the OVER calls of the select list: one Sort + Window per distinct window.
+
+    Each call becomes a `#w<n>` column; the select list and ORDER BY items
+    naming a window output are rewritten to read it.
+    """
+    slots = {id(call): f"#w{i}" for i, call in enumerate(calls)}
+    specs = []
+    for call in calls:
+        for window, members in specs:
+            if window == call.window:
+                members.append((slots[id(call)], call.function))
+                break
+        else:
+            specs.append((call.window, [(slots[id(call)], call.function)]))
+    for window, members in specs:
+        # Tri sur PARTITION BY puis ORDER BY : Window ne garde qu'une partition.
+        keys = [OrderItem(column) for column in window.partition_by] + window.order_by
+        if keys:
+            node = Sort(node, keys, conf.sort_memory_rows, db_system.metadata_key)
+        node = Window(node, window, members)
+    output = [(alias, replace_aggregates(expr, slots)) for alias, expr in output]
+    # ORDER BY sur un alias de fonction de fenêtre : tri sur la colonne calculée.
+    names = set(slots.values())
+    aliases = {alias: expr.name for alias, expr in output if isinstance(expr, Column) and expr.name in names}
+    if any(item.column in aliases for item in statement.order_by):
+        order_by = [dataclasses.replace(item, column=aliases.get(item.column, item.column)) for item in statement.order_by]
+        statement = dataclasses.replace(statement, order_by=order_by)
+    return node, output, statement
+
+
+def ordered(node, statement, db_system):
+    """ORDER BY and LIMIT over a row stream: a top-N heap when both are given, an external sort otherwise."""
+    if statement.order_by and statement.limit is not None:
+        return TopN(node, statement.order_by, statement.limit)
+    if statement.order_by:
+        node = Sort(node, statement.order_by, conf.sort_memory_rows, db_system.metadata_key)
+    return Limit(node, statement.limit) if statement.limit is not None else node
+
+
+def select_rows(statement, db_system, user, plan=None):
+    """Rows of a query, served from the result cache while none of the tables it reads has been written.
+
+    The key is the bound statement (its AST, literals and parameters
+    included); callers get copies of the cached rows.
+    """
+    versions = db_system.result_versions(statement, user)
+    if versions is None:
+        return list(build_select(statement, db_system, user, plan))
+    key = (db_system.current_database, repr(statement))
+    rows = db_system.result_cache.get(key, versions)
+    if rows is None:
+        rows = list(build_select(statement, db_system, user, plan))
+        db_system.result_cache.put(key, versions, rows)
+    return [dict(row) for row in rows]
+
+
+def _run_select(statement, db_system, user):
+    print_response(json.dumps(select_rows(statement, db_system, user), indent=2), "info")
+
+
+def _run_insert(statement, db_system, user):
+    records = []
+    for values in statement.rows:
+        if len(statement.columns) != len(values):
+            print_error("Le nombre de colonnes et de valeurs ne correspondent pas")
+            continue
+        records.append(dict(zip(statement.columns, values)))
+    # Un INSERT multi-lignes passe par une seule écriture de table.
+    return db_system.insert_records(statement.table, records, user) if records else 0
+
+
+def _run_use(statement, db_system, user):
+    if db_system.use_database(statement.database):
+        print_success(LANGUAGES[conf.global_language]["db_selected"].format(db=statement.database))
+    else:
+        print_error(LANGUAGES[conf.global_language]["db_not_found"])
+
+
+def _run_truncate(statement, db_system, user):
+    table_path = db_system._get_table_path(statement.table)
+    if table_path:
+        table_data = read_table(table_path, db_system.metadata_key)
+        if db_system._view_write_refused(statement.table, table_data):
+            return
+        rows, table_data["rows"] = table_data["rows"], []
+        write_table(table_path, table_data, db_system.metadata_key)
+        db_system.invalidate_indexes(statement.table)
+        db_system._maintain_views(statement.table, [], rows)
+        print_success(LANGUAGES[db_system.language]["table_truncated"].format(table=statement.table))
+    else:
+        print_error(LANGUAGES[db_system.language]["table_not_found"])
+
+
+def _run_describe(statement, db_system, user):
+    table_name = statement.table
+    table_path = db_system._get_table_path(table_name)
+    if table_path:
+        table_data = TableFile(table_path, db_system.metadata_key).header
+        columns = table_data.get("columns", {})
+        constraints = table_data.get("constraints", {})
+        defaults = table_data.get("defaults", {})
+        nullable = table_data.get("nullable", {})
+        primary_keys = table_data.get("primary_keys", [])
+        unique_keys = table_data.get("unique_keys", [])
+
+        table_structure = [
+            [
+                col,
+                typ,
+                defaults.get(col, "None"),
+                "YES" if nullable.get(col, False) else "NO",
+                "YES" if col in primary_keys else "NO",
+                "YES" if col in unique_keys else "NO"
+            ]
+            for col, typ in columns.items()
+        ]
+
+        constraints_structure = [[name, definition] for name, definition in constraints.items()]
+
+        structure = "Table Structure:\n"
+        structure += tabulate(
+            table_structure,
+            headers=["Column", "Type", "Default Value", "Nullable", "Primary Key", "Unique"],
+            tablefmt="grid"
+        )
+
+        if constraints:
+            structure += "\n\nConstraints:\n"
+            structure += tabulate(
+                constraints_structure,
+                headers=["Constraint Name", "Definition"],
+                tablefmt="grid"
+            )
+
+        print_response(LANGUAGES[db_system.language]["table_structure"].format(table=table_name, structure=structure), "info")
+    else:
+        print_error(LANGUAGES[db_system.language]["table_not_found"])
+
+
+def _session_statements(db_system, user):
+    """Prepared statements of a user: a name given by PREPARE is only visible to its author."""
+    return db_system.prepared_statements.setdefault(user["username"], {})
+
+
+def _run_prepare(statement, db_system, user):
+    _session_statements(db_system, user)[statement.name] = db_system.prepare(statement, user)
+    print_success(LANGUAGES[db_system.language]["prepared_created"].format(name=statement.name))
+
+
+def _run_execute(statement, db_system, user):
+    prepared = _session_statements(db_system, user).get(statement.name)
+    if prepared is None:
+        print_error(LANGUAGES[db_system.language]["prepared_not_found"].format(name=statement.name))
+        return
+    result = prepared.execute(statement.params, user)
+    if isinstance(prepared.statement, (Select, SetOperation, With)):
+        print_response(json.dumps(result, indent=2), "info")
+
+
+def _run_deallocate(statement, db_system, user):
+    if _session_statements(db_system, user).pop(statement.name, None) is None:
+        print_error(LANGUAGES[db_system.language]["prepared_not_found"].format(name=statement.name))
+    else:
+        print_success(LANGUAGES[db_system.language]["prepared_deallocated"].format(name=statement.name))
+
+
+def _run_explain(statement, db_system, user):
+    select = statement.statement
+    if not db_system.current_database or not db_system._get_table_path(select.table):
+        print_error(LANGUAGES[db_system.language]["table_not_found"])
+        return
+    if select.join is not None:
+        if not db_system._get_table_path(select.join.table):
+            print_error(LANGUAGES[db_system.language]["table_not_found"])
+            return
+        left_key, right_key, _ = join_condition(select)
+        plan = db_system.plan_join(select.table, select.join.table, left_key, right_key, select.hints, kind=select.join.kind)
+        rows = [
+            ["*" if candidate is plan else "", candidate.method, candidate.outer, candidate.inner, round(candidate.rows, 1), round(candidate.cost, 3)]
+            for candidate in [plan, *plan.alternatives]
+        ]
+        print_response(tabulate(rows, headers=["", "plan", "outer", "inner", "rows", "cost"], tablefmt="grid"), "info")
+        return
+    grouped = select.group_by or select.having is not None
+    output, columns = plan_select(select)
+    windows = any(window_calls(expr) for _, expr in output or ())
+    top = (select.order_by[0], select.limit) if select.order_by and select.limit is not None and not (grouped or windows) else None
+    aggregated = grouped or any(is_aggregate(expr) for _, expr in output or ())
+    plan = db_system.plan_scan(select.table, select.where, columns, select.hints, order=top, aggregated=aggregated)
+    rows = [
+        ["*" if candidate is plan else "", candidate.method + (f" ({candidate.workers})" if candidate.workers > 1 else ""),
+         candidate.index or "", round(candidate.rows, 1), round(candidate.cost, 3)]
+        for candidate in [plan, *plan.alternatives]
+    ]
+    print_response(tabulate(rows, headers=["", "plan", "index", "rows", "cost"], tablefmt="grid"), "info")
+
+
+def _run_show(statement, db_system, user):
+    if statement.what == "databases":
+        db_system.show_databases()
+    else:
+        db_system.show_tables()
+
+
+# Les nœuds de l'AST sont partagés par le cache de parsing : les gestionnaires
+# passent des copies aux méthodes de DatabaseSystem qui modifient leurs arguments.
+STATEMENT_HANDLERS = {
+    Select: _run_select,
+    Insert: _run_insert,
+    Update: lambda s, db, user: db.update_record(s.table, dict(s.assignments), s.where or {}, user),
+    Delete: lambda s, db, user: db.delete_record(s.table, s.where or {}, user),
+    Use: _run_use,
+    CreateDatabase: lambda s, db, user: db.create_database(s.name, user),
+    CreateTable: lambda s, db, user: db.create_table(s.name, copy.deepcopy(s.columns), copy.deepcopy(s.constraints), user),
+    CreateIndex: lambda s, db, user: db.create_index(s.table, s.column, user, index_type=s.index_type, include=s.include),
+    AlterTable: lambda s, db, user: db.alter_table(s.table, s.action, s.column, s.column_type, s.default, user),
+    DropTable: lambda s, db, user: db.drop_table(s.name, user),
+    DropDatabase: lambda s, db, user: db.drop_database(s.name, user),
+    Truncate: _run_truncate,
+    Describe: _run_describe,
+    Show: _run_show,
+    SetLanguage: lambda s, db, user: db.set_language(s.language),
+    Prepare: _run_prepare,
+    Execute: _run_execute,
+    Deallocate: _run_deallocate,
+    Analyze: lambda s, db, user: db.analyze(s.table, user),
+    Merge: lambda s, db, user: db.merge_records(
+        s.target, s.source, s.on, s.matched, s.not_matched, user,
+        target_alias=s.target_alias, source_alias=s.source_alias, delete_matched=s.delete_matched,
+    ),
+    Explain: _run_explain,
+    SetOperation: _run_select,
+    With: _run_select,
+    CreateMaterializedView: lambda s, db, user: db.create_materialized_view(s.name, s.definition, user, s.deferred),
+    RefreshMaterializedView: lambda s, db, user: db.refresh_materialized_view(s.name, user, s.concurrently),
+    DropMaterializedView: lambda s, db, user: db.drop_materialized_view(s.name, user),
+}
+
+
+def execute_statement(statement, db_system, user):
+    return STATEMENT_HANDLERS[type(statement)](statement, db_system, user)
+
+
 def execute_query(query, db_system, user, depth=0):
     try:
         if depth > 5:
             print_error(LANGUAGES[conf.global_language]["error"].format(error="Recursion limit reached"))
             return
+        statement = parse_sql(query)
+        if statement is not None:
+            execute_statement(statement, db_system, user)
+            return
+        # Instructions hors grammaire : ancien répartiteur basé sur sqlparse.
         query_lower = query.lower()
         sql_keywords = [
-            "use", "create", "insert", "select", "update", "alter", "drop",
+            "use", "create", "insert", "select", "update", "delete", "alter", "drop",
             "truncate", "describe", "show", "grant", "revoke", "create index",
-            "backup", "restore", "set", "train", "with", "union", "intersect", "except", "exit"
+            "backup", "restore", "set", "train", "with", "exit"
         ]
 
         try:
@@ -82,267 +586,7 @@ def execute_query(query, db_system, user, depth=0):
         if not command:
             print_error(LANGUAGES[conf.global_language]["error"].format(error="Invalid query syntax: no command found"))
             return
-        if command == "use":
-            db_name = tokens[1].value if len(tokens) > 1 else None
-            if db_name:
-                if db_system.use_database(db_name):
-                    print_success(LANGUAGES[conf.global_language]["db_selected"].format(db=db_name))
-                else:
-                    print_error(LANGUAGES[conf.global_language]["db_not_found"])
-            else:
-                print_error("Nom de base de données manquant")
-        elif command == "create" and "database" in query_lower:
-            if len(tokens) != 3:
-                print_error("Syntaxe incorrecte pour la création de la base de données")
-                return
-            db_name = find_token_value(tokens, "database")
-            db_system.create_database(db_name, user)
-        elif command.lower() == "create" and "table" in query_lower:
-            match = re.search(r'create\s+table\s+(\w+)', query, re.IGNORECASE)
-            if not match:
-                print_error("Syntaxe incorrecte pour la création de la table")
-                return
-            table_name = match.group(1)
-
-            try:
-                columns_str = query[query.index("(")+1:query.rindex(")")]
-            except ValueError:
-                print_error("Syntaxe incorrecte : parenthèses manquantes")
-                return
-
-            definitions = re.split(r',\s*(?![^()]*\))', columns_str)
-            columns = {}
-            constraints = {"primary_keys": [], "unique_keys": [], "foreign_keys": {}, "checks": [], "defaults": {}, "not_null": []}
-
-            for definition in definitions:
-                definition = definition.strip()
-                if definition.lower().startswith("constraint"):
-                    parts = definition.split()
-                    if len(parts) < 3:
-                        print_error("Syntaxe incorrecte pour la contrainte")
-                        return
-                    constraint_name = parts[1]
-                    constraint_def = " ".join(parts[2:])
-                    if "primary key" in constraint_def.lower():
-                        constraints["primary_keys"].append(constraint_name)
-                    elif "unique" in constraint_def.lower():
-                        constraints["unique_keys"].append(constraint_name)
-                    elif "foreign key" in constraint_def.lower():
-                        fk_match = re.search(r'foreign key \(([^)]+)\) references (\w+)\(([^)]+)\)', constraint_def, re.IGNORECASE)
-                        if fk_match:
-                            fk_cols = [c.strip() for c in fk_match.group(1).split(",")]
-                            ref_table = fk_match.group(2)
-                            ref_cols = [c.strip() for c in fk_match.group(3).split(",")]
-                            constraints["foreign_keys"][constraint_name] = {
-                                "columns": fk_cols,
-                                "ref_table": ref_table,
-                                "ref_columns": ref_cols
-                            }
-                        else:
-                            print_error(f"Syntaxe incorrecte pour la contrainte FOREIGN KEY: {constraint_def}")
-                    elif "check" in constraint_def.lower():
-                        check_match = re.search(r'check \((.+)\)', constraint_def, re.IGNORECASE)
-                        if check_match:
-                            check_condition = check_match.group(1).strip()
-                            constraints["checks"].append((constraint_name, check_condition))
-                        else:
-                            print_error(f"Syntaxe incorrecte pour la contrainte CHECK: {constraint_def}")
-                else:
-                    parts = definition.split()
-                    if len(parts) < 2:
-                        print_error("Syntaxe incorrecte pour la colonne")
-                        return
-                    col_name = parts[0]
-                    col_definition = " ".join(parts[1:])
-                    columns[col_name] = col_definition
-
-                    if "primary key" in col_definition.lower():
-                        constraints["primary_keys"].append(col_name)
-                    if "unique" in col_definition.lower():
-                        constraints["unique_keys"].append(col_name)
-                    if "not null" in col_definition.lower():
-                        constraints["not_null"].append(col_name)
-                    if "default" in col_definition.lower():
-                        default_value = re.search(r'default\s+(.+)', col_definition, re.IGNORECASE)
-                        if default_value:
-                            constraints["defaults"][col_name] = default_value.group(1)
-
-            db_system.create_table(table_name, columns, constraints, user)
-
-        elif command == "insert":
-            table_name, columns, all_values = None, [], []
-            for i, token in enumerate(tokens):
-                t = token.value if hasattr(token, "value") else token
-                low = t.lower()
-                if low == "into" and i + 1 < len(tokens):
-                    nxt = tokens[i+1].value if hasattr(tokens[i+1], "value") else tokens[i+1]
-                    if "(" in nxt:
-                        table_name = nxt.split("(")[0]
-                        columns = nxt[nxt.index("(")+1:nxt.index(")")].split(",")
-                    else:
-                        table_name = nxt
-                elif low.startswith("values"):
-                    after = t[len("values"):].strip()
-                    if not after and i + 1 < len(tokens):
-                        after = tokens[i+1].value if hasattr(tokens[i+1], "value") else tokens[i+1]
-                    for group in re.findall(r'\((.*?)\)', after):
-                        all_values.append([val.strip() for val in group.split(",")])
-
-            if not table_name or not columns or not all_values:
-                print_error("Requête INSERT incomplète")
-                return
-
-            for values in all_values:
-                if len(columns) != len(values):
-                    print_error("Le nombre de colonnes et de valeurs ne correspondent pas")
-                    continue
-                record = {}
-                for col, val in zip(columns, values):
-                    if val.lower() == "null":
-                        record[col] = None
-                    elif val.lower() in ("true", "false"):
-                        record[col] = val.lower() == "true"
-                    elif val.isdigit():
-                        record[col] = int(val)
-                    else:
-                        record[col] = val.strip("'")
-                db_system.insert_record(table_name, record, user)
-
-        elif command == "select":
-            select_columns = tokens[1].value if len(tokens) > 1 else "*"
-            table_name = find_token_value(tokens, "from")
-            
-            where_clause, group_by_clause, having_clause, order_by_clause, limit_clause = None, None, None, None, None
-            for token in tokens:
-                if token.value.lower().startswith("where"):
-                    where_clause = token.value
-                elif token.value.lower().startswith("group by"):
-                    group_by_clause = token.value
-                elif token.value.lower().startswith("having"):
-                    having_clause = token.value
-                elif token.value.lower().startswith("order by"):
-                    order_by_clause = token.value
-                elif token.value.lower().startswith("limit"):
-                    limit_clause = token.value
-            
-            conditions = {}
-            if where_clause:
-                cond_parts = where_clause.split()[1:]
-                for clause in cond_parts:
-                    if "=" in clause:
-                        k, v = clause.split("=")
-                        conditions[k] = v.strip("'")
-            
-            result = db_system.query(table_name, conditions, user)
-            
-            if group_by_clause:
-                group_columns = group_by_clause.split()[2:]
-                grouped_result = {}
-                for row in result:
-                    key = tuple(row[col] for col in group_columns)
-                    grouped_result.setdefault(key, []).append(row)
-                result = [{"group": key, "rows": rows} for key, rows in grouped_result.items()]
-            
-            if having_clause:
-                having_condition = having_clause.split(" ", 1)[1]
-                result = [group for group in result if eval(having_condition, {"group": group["group"], "rows": group["rows"]})]
-            
-            if order_by_clause:
-                order_columns = order_by_clause.split()[2:]
-                reverse = "desc" in order_columns[-1].lower()
-                result.sort(key=lambda x: tuple(x[col] for col in order_columns if col.lower() != "desc"), reverse=reverse)
-            
-            if limit_clause:
-                limit = int(limit_clause.split()[1])
-                result = result[:limit]
-            
-            print_response(json.dumps(result, indent=2), "info")
-        elif command == "update":
-            table_name = tokens[1].value if len(tokens) > 1 else None
-            set_clause = find_token_value(tokens, "set")
-            where_clause = find_token_value(tokens, "where")
-            conditions = {}
-            if where_clause:
-                for clause in where_clause.split():
-                    if "=" in clause:
-                        k, v = clause.split("=")
-                        conditions[k] = v.strip("'")
-            db_system.update_record(table_name, set_clause, conditions, user)
-        elif command == "alter" and "table" in query_lower:
-            table_name = find_token_value(tokens, "table")
-            action = tokens[3].value.upper() if len(tokens) > 3 else None
-            column_name = tokens[4].value if len(tokens) > 4 else None
-            column_type = tokens[5].value if action and action.lower() == "add" and len(tokens) > 5 else None
-            default_value = None
-            if action and action.lower() == "add" and "default" in query_lower:
-                default_idx = query_lower.index("default") + len("default")
-                default_value = query[default_idx:].strip().strip("'")
-            db_system.alter_table(table_name, action, column_name, column_type, default_value, user)
-        elif command == "drop" and "table" in query_lower:
-            table_name = find_token_value(tokens, "table")
-            db_system.drop_table(table_name, user)
-        elif command == "drop" and "database" in query_lower:
-            db_name = find_token_value(tokens, "database")
-            db_system.drop_database(db_name, user)
-        elif command == "truncate":
-            table_name = tokens[1].value if len(tokens) > 1 else None
-            table_path = db_system._get_table_path(table_name)
-            if table_path:
-                table_data = read_msgpack(table_path, db_system.metadata_key)
-                table_data["rows"] = []
-                write_msgpack(table_path, table_data, db_system.metadata_key)
-                print_success(LANGUAGES[db_system.language]["table_truncated"].format(table=table_name))
-            else:
-                print_error(LANGUAGES[db_system.language]["table_not_found"])
-        elif command == "describe":
-            table_name = tokens[1].value if len(tokens) > 1 else None
-            table_path = db_system._get_table_path(table_name)
-            if table_path:
-                table_data = read_msgpack(table_path, db_system.metadata_key)
-                columns = table_data.get("columns", {})
-                constraints = table_data.get("constraints", {})
-                defaults = table_data.get("defaults", {})
-                nullable = table_data.get("nullable", {})
-                primary_keys = table_data.get("primary_keys", [])
-                unique_keys = table_data.get("unique_keys", [])
-
-                table_structure = [
-                    [
-                        col,
-                        typ,
-                        defaults.get(col, "None"),
-                        "YES" if nullable.get(col, False) else "NO",
-                        "YES" if col in primary_keys else "NO",
-                        "YES" if col in unique_keys else "NO"
-                    ]
-                    for col, typ in columns.items()
-                ]
-
-                constraints_structure = [[name, definition] for name, definition in constraints.items()]
-
-                structure = "Table Structure:\n"
-                structure += tabulate(
-                    table_structure,
-                    headers=["Column", "Type", "Default Value", "Nullable", "Primary Key", "Unique"],
-                    tablefmt="grid"
-                )
-
-                if constraints:
-                    structure += "\n\nConstraints:\n"
-                    structure += tabulate(
-                        constraints_structure,
-                        headers=["Constraint Name", "Definition"],
-                        tablefmt="grid"
-                    )
-
-                print_response(LANGUAGES[db_system.language]["table_structure"].format(table=table_name, structure=structure), "info")
-            else:
-                print_error(LANGUAGES[db_system.language]["table_not_found"])
-        elif command == "show" and "databases" in query_lower:
-            db_system.show_databases()
-        elif command == "show" and "tables" in query_lower:
-            db_system.show_tables()
-        elif command == "create" and "user" in query_lower:
+        if command == "create" and "user" in query_lower:
             if user["role"] != "admin":
                 print_error(LANGUAGES[db_system.language]["permission_denied"])
                 return
@@ -386,54 +630,14 @@ def execute_query(query, db_system, user, depth=0):
                 print_error("Database and table must be specified")
                 return
             db_system.user_manager.revoke(username, db_table[0], db_table[1], permissions, caller_role=user["role"])
-        elif command == "join":
-            table1 = tokens[1].value if len(tokens) > 1 else None
-            table2 = tokens[3].value if len(tokens) > 3 else None
-            condition = find_token_value(tokens, "on")
-            result = db_system.join_tables(table1, table2, condition, user)
-            print_response(json.dumps(result, indent=2), "info")
-        elif command == "create" and "index" in query_lower:
-            table_name = tokens[3].value if len(tokens) > 3 else None
-            column_name = tokens[5].value if len(tokens) > 5 else None
-            db_system.create_index(table_name, column_name, user)
         elif command == "backup":
             db_system.backup_manager.backup()
         elif command == "restore":
             backup_file = tokens[1].value if len(tokens) > 1 else None
             db_system.backup_manager.restore(backup_file)
-        elif command == "set" and "language" in query_lower:
-            lang = tokens[2].value.lower() if len(tokens) > 2 else None
-            db_system.set_language(lang)
         elif command == "train" and "nlp" in query_lower and "model" in query_lower:
             training_data_file = tokens[3].value if len(tokens) > 3 else None
             nlp_model.train(training_data_file)
-        elif command == "with":
-            cte_definitions = []
-            main_query = None
-            if "as" in query_lower:
-                cte_parts = query_lower.split("as")
-                for i in range(0, len(cte_parts) - 1, 2):
-                    cte_name = cte_parts[i].strip().split()[-1]
-                    cte_query = cte_parts[i + 1].strip().split("select")[0]
-                    cte_definitions.append((cte_name, cte_query))
-                main_query = "select" + query_lower.split("select")[-1]
-            for cte_name, cte_query in cte_definitions:
-                db_system.create_cte(cte_name, cte_query, user)
-            execute_query(main_query, db_system, user)
-        elif command in ["union", "intersect", "except"]:
-            queries = query_lower.split(command)
-            if len(queries) != 2:
-                print_error(f"Syntax error in {command.upper()} query")
-                return
-            result1 = db_system.query_raw(queries[0].strip(), user)
-            result2 = db_system.query_raw(queries[1].strip(), user)
-            if command == "union":
-                result = result1 + [row for row in result2 if row not in result1]
-            elif command == "intersect":
-                result = [row for row in result1 if row in result2]
-            elif command == "except":
-                result = [row for row in result1 if row not in result2]
-            print_response(json.dumps(result, indent=2), "info")
         elif command == "grant" and "all privileges" in query_lower:
             username = find_token_value(tokens, "to")
             if not username:
@@ -464,20 +668,6 @@ def execute_query(query, db_system, user, depth=0):
                 print_error("Nom de savepoint manquant pour RELEASE SAVEPOINT.")
                 return
             db_system.transaction_manager.release_savepoint(savepoint_name, user)
-        elif command == "merge":
-            target_table = find_token_value(tokens, "into")
-            source_table = find_token_value(tokens, "using")
-            on_condition = find_token_value(tokens, "on")
-            when_matched = find_token_value(tokens, "when matched then")
-            when_not_matched = find_token_value(tokens, "when not matched then")
-            if not (target_table and source_table and on_condition):
-                print_error("Syntax error in MERGE statement. Usage: MERGE INTO ... USING ... ON ...")
-                return
-            try:
-                db_system.merge_records(target_table, source_table, on_condition, when_matched, when_not_matched, user)
-                print_success(LANGUAGES[db_system.language]["merge_completed"].format(table=target_table))
-            except Exception as e:
-                print_error(LANGUAGES[db_system.language]["query_failed"].format(error=str(e)))
         elif command == "select" and "as of" in query_lower:
             table_name = find_token_value(tokens, "from")
             timestamp = find_token_value(tokens, "as of")
@@ -511,19 +701,6 @@ def execute_query(query, db_system, user, depth=0):
                 print_success(LANGUAGES[db_system.language]["row_level_security_enabled"].format(table=table_name))
             except Exception as e:
                 print_error(LANGUAGES[db_system.language]["query_failed"].format(error=str(e)))
-        elif command == "select" and "over" in query_lower:
-            select_columns = tokens[1].value if len(tokens) > 1 else "*"
-            table_name = find_token_value(tokens, "from")
-            partition_by_clause = find_token_value(tokens, "partition by")
-            order_by_clause = find_token_value(tokens, "order by")
-            if not table_name:
-                print_error("Syntax error: SELECT ... FROM ... OVER ...")
-                return
-            try:
-                result = db_system.query_with_window_function(table_name, select_columns, partition_by_clause, order_by_clause, user)
-                print_response(json.dumps(result, indent=2), "info")
-            except Exception as e:
-                print_error(LANGUAGES[db_system.language]["query_failed"].format(error=str(e)))
         elif command == "select" and "json_table" in query_lower:
             table_name = find_token_value(tokens, "from")
             json_column = find_token_value(tokens, "json_table")
@@ -537,19 +714,6 @@ def execute_query(query, db_system, user, depth=0):
                 print_response(json.dumps(result, indent=2), "info")
             except Exception as e:
                 print_error(LANGUAGES[db_system.language]["json_table_error"].format(error=str(e)))
-        elif command == "with" and "recursive" in query_lower:
-            cte_name = find_token_value(tokens, "with")
-            anchor_query = find_token_value(tokens, "as")
-            recursive_query = find_token_value(tokens, "union all")
-            main_query = query_lower.split("select")[-1]
-            if not (cte_name and anchor_query and recursive_query and main_query):
-                print_error("Syntax error: WITH RECURSIVE ...")
-                return
-            try:
-                result = db_system.recursive_cte(cte_name, anchor_query, recursive_query, main_query, user)
-                print_response(json.dumps(result, indent=2), "info")
-            except Exception as e:
-                print_error(LANGUAGES[db_system.language]["recursive_cte_completed"].format(cte_name=cte_name))
         elif command == "savepoint":
             savepoint_name = tokens[1].value if len(tokens) > 1 else None
             if not savepoint_name:
@@ -580,29 +744,6 @@ def execute_query(query, db_system, user, depth=0):
                 print_success(LANGUAGES[db_system.language]["savepoint_released"].format(savepoint_name=savepoint_name))
             except Exception as e:
                 print_error(LANGUAGES[db_system.language]["query_failed"].format(error=str(e)))
-        elif command == "join" and "full outer" in query_lower:
-            table1 = tokens[1].value if len(tokens) > 1 else None
-            table2 = tokens[3].value if len(tokens) > 3 else None
-            condition = find_token_value(tokens, "on")
-            if not (table1 and table2 and condition):
-                print_error("Syntax error: JOIN ... FULL OUTER ... ON ...")
-                return
-            try:
-                result = db_system.full_outer_join(table1, table2, condition, user)
-                print_response(json.dumps(result, indent=2), "info")
-            except Exception as e:
-                print_error(LANGUAGES[db_system.language]["query_failed"].format(error=str(e)))
-        elif command == "select" and "division" in query_lower:
-            table1 = find_token_value(tokens, "from")
-            table2 = find_token_value(tokens, "division")
-            if not (table1 and table2):
-                print_error("Syntax error: SELECT ... FROM ... DIVISION ...")
-                return
-            try:
-                result = db_system.division_operation(table1, table2, user)
-                print_response(json.dumps(result, indent=2), "info")
-            except Exception as e:
-                print_error(LANGUAGES[db_system.language]["query_failed"].format(error=str(e)))
         elif command == "select" and "/*+" in query_lower:
             hints = re.findall(r'/\*\+(.+?)\*/', query)
             query_without_hints = re.sub(r'/\*\+.+?\*/', '', query)
@@ -675,21 +816,6 @@ def execute_query(query, db_system, user, depth=0):
                 print_success(LANGUAGES[db_system.language]["nested_transaction_rolled_back"])
             except Exception as e:
                 print_error(LANGUAGES[db_system.language]["query_failed"].format(error=str(e)))
-        elif command == "create" and "materialized view" in query_lower:
-            view_name = find_token_value(tokens, "view")
-            select_query = query[query.lower().index("as")+2:].strip()
-            try:
-                db_system.create_materialized_view(view_name, select_query, user)
-                print_success(LANGUAGES[db_system.language]["materialized_view_created"].format(view_name=view_name))
-            except Exception as e:
-                print_error(LANGUAGES[db_system.language]["query_failed"].format(error=str(e)))
-        elif command == "refresh" and "materialized view" in query_lower:
-            view_name = find_token_value(tokens, "view")
-            try:
-                db_system.refresh_materialized_view(view_name, user)
-                print_success(LANGUAGES[db_system.language]["materialized_view_refreshed"].format(view_name=view_name))
-            except Exception as e:
-                print_error(LANGUAGES[db_system.language]["query_failed"].format(error=str(e)))
         elif command == "shard" and "table" in query_lower:
             table_name = find_token_value(tokens, "table")
             shard_column = find_token_value(tokens, "by")
@@ -0,0 +1,296 @@
+from dataclasses import dataclass, field
+from typing import Any, Optional
+
+# Arbre syntaxique produit par query.sql_parser. Les clauses WHERE sont
+# représentées par les prédicats en tuples de utils.filter_utils, que
+# DatabaseSystem.query sait déjà évaluer et pousser vers les index ; les
+# expressions (listes SELECT, CHECK, colonnes générées, MERGE) sont des
+# nœuds compilés en fermetures par core.expressions. Les nœuds sont
+# immuables : le cache d'analyse de sql_parser rend le même arbre à chaque
+# requête identique, qui se dérive avec dataclasses.replace.
+
+
+@dataclass(frozen=True)
+class Column:
+    name: str
+    table: Optional[str] = None
+
+
+@dataclass(frozen=True)
+class Star:
+    table: Optional[str] = None
+
+
+@dataclass(frozen=True)
+class Literal:
+    value: Any
+
+
+@dataclass(frozen=True)
+class BinaryOp:
+    """`left op right`: arithmetic (+ - * / %), comparison (= != < <= > >= like ilike) or logical (and, or)."""
+    op: str
+    left: Any
+    right: Any
+
+
+@dataclass(frozen=True)
+class UnaryOp:
+    """`op operand` with op one of "not", "is null", "is not null"."""
+    op: str
+    operand: Any
+
+
+@dataclass(frozen=True)
+class InList:
+    expr: Any
+    items: list
+
+
+@dataclass(frozen=True)
+class FunctionCall:
+    name: str
+    args: list
+    distinct: bool = False
+
+
+@dataclass(frozen=True)
+class WindowFrame:
+    """`ROWS | RANGE BETWEEN start AND end`; a bound is ("preceding" | "following", n or None for UNBOUNDED) or ("current", 0)."""
+    unit: str
+    start: tuple
+    end: tuple
+
+
+@dataclass(frozen=True)
+class Window:
+    """`OVER (PARTITION BY ... ORDER BY ... frame)`; order_by holds OrderItem."""
+    partition_by: list = field(default_factory=list)
+    order_by: list = field(default_factory=list)
+    frame: Optional[WindowFrame] = None
+
+
+@dataclass(frozen=True)
+class WindowCall:
+    """`function(args) OVER (window)`: ROW_NUMBER, RANK, LAG... or an aggregate over a frame."""
+    function: FunctionCall
+    window: Window
+
+
+@dataclass(frozen=True)
+class SelectItem:
+    expr: Any
+    alias: Optional[str] = None
+
+
+@dataclass(frozen=True)
+class OrderItem:
+    """`column [ASC | DESC] [NULLS FIRST | LAST]`; nulls_first None means NULL last ascending, first descending."""
+    column: str
+    descending: bool = False
+    nulls_first: Optional[bool] = None
+
+
+@dataclass(frozen=True)
+class Join:
+    """`[INNER | LEFT | RIGHT | FULL [OUTER]] JOIN table [alias] ON condition`; `on` is an expression tree over both tables."""
+    table: str
+    on: Any
+    alias: Optional[str] = None
+    kind: str = "inner"
+
+
+@dataclass(frozen=True)
+class Select:
+    items: list
+    table: str
+    where: Optional[tuple] = None
+    group_by: list = field(default_factory=list)
+    having: Any = None
+    order_by: list = field(default_factory=list)
+    limit: Optional[int] = None
+    hints: list = field(default_factory=list)
+    alias: Optional[str] = None
+    join: Optional[Join] = None
+    divisor: Optional[str] = None
+    distinct: bool = False
+
+
+@dataclass(frozen=True)
+class SetOperation:
+    """`left UNION | INTERSECT | EXCEPT [ALL] right`; ORDER BY and LIMIT after the last SELECT apply to the whole result."""
+    op: str
+    left: Any
+    right: Any
+    all: bool = False
+    order_by: list = field(default_factory=list)
+    limit: Optional[int] = None
+
+
+@dataclass(frozen=True)
+class CommonTable:
+    """`name [(col, ...)] AS (query)` of a WITH clause; `columns` renames the query's columns by position."""
+    name: str
+    query: Any
+    columns: list = field(default_factory=list)
+
+
+@dataclass(frozen=True)
+class With:
+    """`WITH [RECURSIVE] cte, ... query`: the CTEs are only visible to this statement."""
+    ctes: list
+    query: Any
+    recursive: bool = False
+
+
+@dataclass(frozen=True)
+class Insert:
+    table: str
+    columns: list
+    rows: list
+
+
+@dataclass(frozen=True)
+class Update:
+    table: str
+    assignments: dict
+    where: Optional[tuple] = None
+
+
+@dataclass(frozen=True)
+class Delete:
+    table: str
+    where: Optional[tuple] = None
+
+
+@dataclass(frozen=True)
+class CreateDatabase:
+    name: str
+
+
+@dataclass(frozen=True)
+class CreateTable:
+    name: str
+    columns: dict
+    constraints: dict
+
+
+@dataclass(frozen=True)
+class CreateIndex:
+    table: str
+    column: str
+    index_type: str = "bplus"
+    include: Optional[list] = None
+    name: Optional[str] = None
+
+
+@dataclass(frozen=True)
+class AlterTable:
+    """`ADD [COLUMN] col type [DEFAULT v]`, `DROP [COLUMN] col`, or `SET (option = value)` with the option in `column` and its value in `default`."""
+    table: str
+    action: str
+    column: str
+    column_type: Optional[str] = None
+    default: Any = None
+
+
+@dataclass(frozen=True)
+class DropTable:
+    name: str
+
+
+@dataclass(frozen=True)
+class DropDatabase:
+    name: str
+
+
+@dataclass(frozen=True)
+class CreateMaterializedView:
+    """`CREATE MATERIALIZED VIEW name [REFRESH ON COMMIT | ON DEMAND] AS query`; `definition` is the query text kept in the catalog."""
+    name: str
+    query: Any
+    definition: str
+    deferred: bool = False
+
+
+@dataclass(frozen=True)
+class RefreshMaterializedView:
+    name: str
+    concurrently: bool = False
+
+
+@dataclass(frozen=True)
+class DropMaterializedView:
+    name: str
+
+
+@dataclass(frozen=True)
+class Truncate:
+    table: str
+
+
+@dataclass(frozen=True)
+class Describe:
+    table: str
+
+
+@dataclass(frozen=True)
+class Use:
+    database: str
+
+
+@dataclass(frozen=True)
+class Show:
+    what: str
+
+
+@dataclass(frozen=True)
+class SetLanguage:
+    language: str
+
+
+@dataclass(frozen=True)
+class Param:
+    """Positional placeholder `$n` (1-based), bound at EXECUTE time."""
+    index: int
+
+
+@dataclass(frozen=True)
+class Prepare:
+    name: str
+    statement: Any
+    param_count: int = 0
+
+
+@dataclass(frozen=True)
+class Execute:
+    name: str
+    params: list = field(default_factory=list)
+
+
+@dataclass(frozen=True)
+class Deallocate:
+    name: str
+
+
+@dataclass(frozen=True)
+class Merge:
+    """MERGE INTO target USING source ON condition; `matched` and `not_matched` map target columns to expressions."""
+    target: str
+    source: str
+    on: Any
+    matched: Optional[dict] = None
+    not_matched: Optional[dict] = None
+    target_alias: Optional[str] = None
+    source_alias: Optional[str] = None
+    delete_matched: bool = False
+
+
+@dataclass(frozen=True)
+class Analyze:
+    table: Optional[str] = None
+
+
+@dataclass(frozen=True)
+class Explain:
+    statement: Any
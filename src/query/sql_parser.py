@@ -0,0 +1,1045 @@
+import re
+from dataclasses import fields, is_dataclass, replace
+from functools import lru_cache
+
+from query.sql_ast import (
+    AlterTable, Analyze, BinaryOp, Column, CommonTable, CreateDatabase, CreateIndex, CreateMaterializedView, CreateTable,
+    Deallocate, Delete, Describe, DropDatabase, DropMaterializedView, DropTable, Execute, Explain, FunctionCall, InList, Insert, Join, Literal, Merge, OrderItem, Param,
+    Prepare, RefreshMaterializedView, Select, SelectItem, SetLanguage, SetOperation, Show, Star, Truncate, UnaryOp, Update, Use, Window,
+    WindowCall, WindowFrame, With,
+)
+from utils.json_utils import json_expression_key
+
+PARSE_CACHE_SIZE = 512
+
+_TOKEN_RE = re.compile(r"""
+    (?P<ws>\s+|--[^\n]*)
+  | (?P<hint>/\*\+.*?\*/)
+  | (?P<comment>/\*.*?\*/)
+  | (?P<string>'(?:[^']|'')*')
+  | (?P<number>\d+\.\d*|\.\d+|\d+)
+  | (?P<param>\$\d+)
+  | (?P<ident>[^\W\d]\w*|"[^"]+"|`[^`]+`)
+  | (?P<op>->>|->|<=|>=|!=|<>|[=<>(),.*;+\-/%])
+""", re.VERBOSE | re.DOTALL)
+# Littéraux, identifiants entre guillemets et indications /*+ */ gardés tels quels ;
+# les commentaires sont retirés avant de fusionner les blancs (un `--` irait sinon jusqu'à la fin de l'instruction).
+_NORMALIZE_RE = re.compile(r"('(?:[^']|'')*'|\"[^\"]+\"|`[^`]+`|/\*\+.*?\*/)|(?:\s|--[^\n]*|/\*(?!\+).*?\*/)+", re.DOTALL)
+_GENERATED_RE = re.compile(r"generated\s+(?:always\s+)?as\s*\((.+)\)(?:\s+(?:stored|virtual))?\s*$", re.IGNORECASE | re.DOTALL)
+
+COMPARISON_OPS = ("=", "!=", "<>", "<", "<=", ">", ">=")
+INDEX_TYPES = ("bitmap", "hash", "bloom", "fulltext")
+# Mots qui terminent une liste de sélection ou un nom de table sans alias.
+_CLAUSE_KEYWORDS = {"from", "where", "group", "having", "order", "limit", "union", "intersect", "except", "join", "on"}
+# Mots réservés jamais pris pour un alias implicite (`SELECT DISTINCT g` n'est pas la colonne DISTINCT aliasée g).
+_RESERVED_WORDS = {"select", "distinct", "all"}
+# Mots qui suivent la table du FROM (jointures, division) ; CROSS et NATURAL restent à l'ancien répartiteur.
+_FROM_EXTENSIONS = ("join", "inner", "left", "right", "full", "cross", "natural", "division")
+
+
+class SQLSyntaxError(ValueError):
+    pass
+
+
+class UnsupportedStatement(Exception):
+    """Statement outside the grammar; execute_query falls back to the legacy dispatcher."""
+
+
+class Token:
+    __slots__ = ("kind", "value", "start", "end")
+
+    def __init__(self, kind, value, start, end):
+        self.kind = kind
+        self.value = value
+        self.start = start
+        self.end = end
+
+    def is_keyword(self, *words):
+        return self.kind == "ident" and self.value.lower() in words
+
+    def __repr__(self):
+        return f"{self.kind}:{self.value}"
+
+
+_EOF = Token("eof", "", -1, -1)
+
+
+def tokenize(text):
+    """Return (tokens, hints); `/*+ ... */` optimizer hints are collected apart from the token stream."""
+    tokens, hints = [], []
+    pos = 0
+    while pos < len(text):
+        match = _TOKEN_RE.match(text, pos)
+        if not match:
+            raise SQLSyntaxError(f"Caractère inattendu à la position {pos} : {text[pos]!r}")
+        kind = match.lastgroup
+        value = match.group()
+        if kind == "hint":
+            hints.append(value[3:-2].strip())
+        elif kind == "ident" and value[0] in "\"`":
+            tokens.append(Token("quoted", value[1:-1], match.start(), match.end()))
+        elif kind not in ("ws", "comment"):
+            tokens.append(Token(kind, value, match.start(), match.end()))
+        pos = match.end()
+    return tokens, hints
+
+
+class Parser:
+    """Recursive-descent parser from SQL text to the node classes of query.sql_ast."""
+
+    def __init__(self, text):
+        self.text = text
+        self.tokens, self.hints = tokenize(text)
+        self.pos = 0
+        self.params = set()
+
+    # -- primitives ------------------------------------------------------
+
+    def peek(self, offset=0):
+        index = self.pos + offset
+        return self.tokens[index] if index < len(self.tokens) else _EOF
+
+    def advance(self):
+        token = self.peek()
+        self.pos += 1
+        return token
+
+    def at_keyword(self, *words):
+        return self.peek().is_keyword(*words)
+
+    def accept_keyword(self, *words):
+        """Consume the keyword sequence `words` if it comes next."""
+        if all(self.peek(i).is_keyword(word) for i, word in enumerate(words)):
+            self.pos += len(words)
+            return True
+        return False
+
+    def expect_keyword(self, *words):
+        if not self.accept_keyword(*words):
+            self.error(" ".join(words).upper())
+
+    def accept_op(self, op):
+        token = self.peek()
+        if token.kind == "op" and token.value == op:
+            self.pos += 1
+            return True
+        return False
+
+    def expect_op(self, op):
+        if not self.accept_op(op):
+            self.error(op)
+
+    def error(self, expected):
+        token = self.peek()
+        found = token.value if token is not _EOF else "fin de requête"
+        raise SQLSyntaxError(f"Syntaxe incorrecte : {expected} attendu, trouvé {found!r}")
+
+    def identifier(self):
+        token = self.peek()
+        if token.kind not in ("ident", "quoted"):
+            self.error("identifiant")
+        self.pos += 1
+        return token.value
+
+    def literal(self):
+        token = self.advance()
+        if token.kind == "string":
+            return token.value[1:-1].replace("''", "'")
+        if token.kind == "number":
+            return float(token.value) if "." in token.value else int(token.value)
+        if token.kind == "param":
+            index = int(token.value[1:])
+            if index < 1:
+                self.pos -= 1
+                self.error("paramètre $1, $2...")
+            self.params.add(index)
+            return Param(index)
+        if token.kind == "op" and token.value == "-" and self.peek().kind == "number":
+            return -self.literal()
+        if token.kind == "ident":
+            word = token.value.lower()
+            if word == "null":
+                return None
+            if word in ("true", "false"):
+                return word == "true"
+            # Mot nu : accepté comme chaîne, comme le faisait l'ancien parseur.
+            return token.value
+        self.pos -= 1
+        self.error("valeur")
+
+    def end_of_statement(self):
+        self.accept_op(";")
+        if self.peek() is not _EOF:
+            self.error("fin de requête")
+
+    def source_between(self, start_token, end_index):
+        end = self.tokens[end_index - 1].end if end_index > 0 else start_token.start
+        return self.text[start_token.start:end]
+
+    # -- statements ------------------------------------------------------
+
+    def parse(self, allow_params=False):
+        """Parse one statement; with `allow_params`, `$n` placeholders are allowed and the result is a Prepare node."""
+        token = self.peek()
+        handler = self.STATEMENTS.get(token.value.lower()) if token.kind == "ident" else None
+        if handler is None:
+            raise UnsupportedStatement(token.value)
+        statement = handler(self)
+        self.end_of_statement()
+        if allow_params and not isinstance(statement, Prepare):
+            return Prepare(None, statement, self.param_count())
+        if self.params and not isinstance(statement, Prepare):
+            raise SQLSyntaxError(f"Paramètre ${min(self.params)} sans valeur : utilisez PREPARE puis EXECUTE")
+        return statement
+
+    def param_count(self):
+        count = max(self.params, default=0)
+        missing = set(range(1, count + 1)) - self.params
+        if missing:
+            raise SQLSyntaxError(f"Paramètre ${min(missing)} absent de l'instruction préparée")
+        return count
+
+    def parse_use(self):
+        self.advance()
+        return Use(self.identifier())
+
+    def parse_show(self):
+        self.advance()
+        if self.accept_keyword("databases"):
+            return Show("databases")
+        if self.accept_keyword("tables"):
+            return Show("tables")
+        raise UnsupportedStatement("show")
+
+    def parse_set(self):
+        self.advance()
+        if not self.accept_keyword("language"):
+            raise UnsupportedStatement("set")
+        if not self.accept_op("="):
+            self.accept_keyword("to")
+        return SetLanguage(self.identifier().lower())
+
+    def parse_describe(self):
+        self.advance()
+        return Describe(self.identifier())
+
+    def parse_truncate(self):
+        self.advance()
+        self.accept_keyword("table")
+        return Truncate(self.identifier())
+
+    def parse_drop(self):
+        self.advance()
+        if self.accept_keyword("table"):
+            return DropTable(self.identifier())
+        if self.accept_keyword("database"):
+            return DropDatabase(self.identifier())
+        if self.accept_keyword("materialized", "view"):
+            return DropMaterializedView(self.identifier())
+        raise UnsupportedStatement("drop")
+
+    def parse_create(self):
+        self.advance()
+        if self.accept_keyword("database"):
+            return CreateDatabase(self.identifier())
+        if self.accept_keyword("table"):
+            return self.parse_create_table()
+        if self.accept_keyword("materialized", "view"):
+            return self.parse_create_materialized_view()
+        index_type = "bplus"
+        if self.peek().is_keyword(*INDEX_TYPES) and self.peek(1).is_keyword("index"):
+            index_type = self.advance().value.lower()
+        if self.accept_keyword("index"):
+            return self.parse_create_index(index_type)
+        raise UnsupportedStatement("create")
+
+    def parse_create_materialized_view(self):
+        name = self.identifier()
+        deferred = False
+        if self.accept_keyword("refresh", "on"):
+            if self.accept_keyword("demand"):
+                deferred = True
+            else:
+                self.expect_keyword("commit")
+        self.expect_keyword("as")
+        start = self.peek()
+        if self.at_keyword("with"):
+            query = self.parse_with()
+        elif self.at_keyword("select"):
+            query = self.parse_select()
+        else:
+            self.error("SELECT")
+        return CreateMaterializedView(name, query, self.source_between(start, self.pos), deferred)
+
+    def parse_refresh(self):
+        self.advance()
+        self.expect_keyword("materialized", "view")
+        concurrently = self.accept_keyword("concurrently")
+        return RefreshMaterializedView(self.identifier(), concurrently)
+
+    def parse_create_table(self):
+        name = self.identifier()
+        self.expect_op("(")
+        columns = {}
+        constraints = {"primary_keys": [], "unique_keys": [], "foreign_keys": {}, "checks": [], "defaults": {}, "not_null": []}
+        while True:
+            start = self.peek()
+            depth = 0
+            while not (depth == 0 and self.peek().kind == "op" and self.peek().value in (",", ")")):
+                token = self.advance()
+                if token is _EOF:
+                    self.error(")")
+                if token.kind == "op" and token.value == "(":
+                    depth += 1
+                elif token.kind == "op" and token.value == ")":
+                    depth -= 1
+            if start is self.peek():
+                self.error("définition de colonne")
+            add_table_definition(self.source_between(start, self.pos), columns, constraints)
+            if self.accept_op(")"):
+                break
+            self.expect_op(",")
+        return CreateTable(name, columns, constraints)
+
+    def parse_create_index(self, index_type):
+        name = None
+        if not self.at_keyword("on"):
+            name = self.identifier()
+        self.expect_keyword("on")
+        table = self.identifier()
+        self.expect_op("(")
+        if self.accept_op("("):
+            # Index d'expression : CREATE INDEX ON t ((col->'a'->'b'))
+            operand = self.operand()
+            if "->" not in operand:
+                self.error("expression JSON (colonne->'clé')")
+            self.expect_op(")")
+            column, index_type = operand, "jsonpath"
+        else:
+            column = self.identifier()
+        self.expect_op(")")
+        include = None
+        if self.accept_keyword("include"):
+            self.expect_op("(")
+            include = [self.identifier()]
+            while self.accept_op(","):
+                include.append(self.identifier())
+            self.expect_op(")")
+        return CreateIndex(table, column, index_type, include, name)
+
+    def parse_alter(self):
+        self.advance()
+        if not self.accept_keyword("table"):
+            raise UnsupportedStatement("alter")
+        table = self.identifier()
+        if self.accept_keyword("add"):
+            if self.at_keyword("data"):
+                raise UnsupportedStatement("alter")
+            self.accept_keyword("column")
+            column = self.identifier()
+            start = self.peek()
+            while self.peek() is not _EOF and not self.at_keyword("default") and not (self.peek().kind == "op" and self.peek().value == ";"):
+                self.advance()
+            column_type = self.source_between(start, self.pos) if start is not self.peek() else None
+            default = self.literal() if self.accept_keyword("default") else None
+            return AlterTable(table, "ADD", column, column_type, default)
+        if self.accept_keyword("drop"):
+            self.accept_keyword("column")
+            return AlterTable(table, "DROP", self.identifier())
+        if self.accept_keyword("set"):
+            # Option de table : ALTER TABLE t SET (result_cache = off)
+            self.expect_op("(")
+            option = self.identifier()
+            self.expect_op("=")
+            value = self.literal()
+            self.expect_op(")")
+            return AlterTable(table, "SET", option, default=value)
+        raise UnsupportedStatement("alter")
+
+    def parse_insert(self):
+        self.advance()
+        self.expect_keyword("into")
+        table = self.identifier()
+        self.expect_op("(")
+        columns = [self.identifier()]
+        while self.accept_op(","):
+            columns.append(self.identifier())
+        self.expect_op(")")
+        if not self.at_keyword("values"):
+            raise UnsupportedStatement("insert")
+        self.advance()
+        rows = [self.value_tuple()]
+        while self.accept_op(","):
+            rows.append(self.value_tuple())
+        return Insert(table, columns, rows)
+
+    def value_tuple(self):
+        self.expect_op("(")
+        values = [self.literal()]
+        while self.accept_op(","):
+            values.append(self.literal())
+        self.expect_op(")")
+        return values
+
+    def parse_update(self):
+        self.advance()
+        table = self.identifier()
+        self.expect_keyword("set")
+        assignments = {}
+        while True:
+            column = self.identifier()
+            self.expect_op("=")
+            assignments[column] = self.literal()
+            if not self.accept_op(","):
+                break
+        where = self.where_clause() if self.accept_keyword("where") else None
+        return Update(table, assignments, where)
+
+    def parse_delete(self):
+        self.advance()
+        self.expect_keyword("from")
+        table = self.identifier()
+        where = self.where_clause() if self.accept_keyword("where") else None
+        return Delete(table, where)
+
+    def parse_select(self):
+        """A SELECT, or SELECTs combined by UNION / INTERSECT / EXCEPT [ALL]; INTERSECT binds tighter."""
+        node = self.intersection()
+        while self.at_keyword("union", "except"):
+            op = self.advance().value.lower()
+            all_rows = self.set_quantifier()
+            node = SetOperation(op, node, self.intersection(), all_rows)
+        if isinstance(node, SetOperation):
+            # ORDER BY / LIMIT après le dernier SELECT portent sur tout le résultat.
+            node, order_by, limit = _without_last_order(node)
+            node = replace(node, order_by=order_by, limit=limit)
+        return node
+
+    def intersection(self):
+        node = self.select_core()
+        while self.at_keyword("intersect"):
+            self.advance()
+            all_rows = self.set_quantifier()
+            node = SetOperation("intersect", node, self.select_core(), all_rows)
+        return node
+
+    def set_quantifier(self):
+        """`ALL` keeps duplicates; `DISTINCT`, the default, removes them."""
+        if self.accept_keyword("all"):
+            return True
+        self.accept_keyword("distinct")
+        return False
+
+    def select_core(self):
+        self.expect_keyword("select")
+        distinct = not self.accept_keyword("all") and self.accept_keyword("distinct")
+        items = [self.select_item()]
+        while self.accept_op(","):
+            items.append(self.select_item())
+        self.expect_keyword("from")
+        table = self.identifier()
+        if self.at_keyword("as") and self.peek(1).is_keyword("of"):
+            raise UnsupportedStatement("select")
+        alias = None
+        if self.accept_keyword("as") or self.peek().kind in ("ident", "quoted") and not self.at_keyword(*_CLAUSE_KEYWORDS, *_FROM_EXTENSIONS, *_RESERVED_WORDS):
+            alias = self.identifier()
+        join = divisor = where = having = limit = None
+        group_by, order_by = [], []
+        kind = self.join_kind()
+        if kind:
+            join = self.join_clause(kind)
+        elif self.accept_keyword("division"):
+            divisor = self.identifier()
+        if self.peek().kind == "op" and self.peek().value == "," or self.at_keyword(*_FROM_EXTENSIONS):
+            raise UnsupportedStatement("select")
+        if self.accept_keyword("where"):
+            where = self.where_clause(qualified=join is not None)
+        if self.accept_keyword("group", "by"):
+            group_by.append(self.identifier())
+            while self.accept_op(","):
+                group_by.append(self.identifier())
+        if self.accept_keyword("having"):
+            having = self.condition()
+        if self.accept_keyword("order", "by"):
+            order_by.append(self.order_item())
+            while self.accept_op(","):
+                order_by.append(self.order_item())
+        if self.accept_keyword("limit"):
+            token = self.advance()
+            if token.kind != "number" or "." in token.value:
+                self.pos -= 1
+                self.error("entier après LIMIT")
+            limit = int(token.value)
+        if (order_by or limit is not None) and self.at_keyword("union", "intersect", "except"):
+            # Comme en SQL standard : seul le dernier SELECT d'une combinaison peut trier ou limiter.
+            self.error("fin de requête")
+        return Select(items, table, where, group_by, having, order_by, limit, list(self.hints), alias, join, divisor, distinct)
+
+    def join_kind(self):
+        """Consume `[INNER] JOIN` or `LEFT|RIGHT|FULL [OUTER] JOIN` and return the join kind, or None."""
+        if self.accept_keyword("join") or self.accept_keyword("inner", "join"):
+            return "inner"
+        for kind in ("left", "right", "full"):
+            if self.accept_keyword(kind, "join") or self.accept_keyword(kind, "outer", "join"):
+                return kind
+        return None
+
+    def join_clause(self, kind):
+        table = self.identifier()
+        alias = self.table_alias("on")
+        self.expect_keyword("on")
+        return Join(table, self.condition(), alias, kind)
+
+    def select_item(self):
+        token = self.peek()
+        if token.kind == "op" and token.value == "*":
+            self.advance()
+            return SelectItem(Star())
+        if token.kind in ("ident", "quoted") and self.peek(1).kind == "op" and self.peek(1).value == "." and self.peek(2).value == "*":
+            table = self.identifier()
+            self.pos += 2
+            return SelectItem(Star(table))
+        expr = self.expression()
+        alias = None
+        if self.accept_keyword("as"):
+            alias = self.identifier()
+        elif self.peek().kind in ("ident", "quoted") and not self.at_keyword(*_CLAUSE_KEYWORDS, *_RESERVED_WORDS):
+            alias = self.identifier()
+        return SelectItem(expr, alias)
+
+    def function_call(self):
+        name = self.identifier().lower()
+        self.expect_op("(")
+        distinct = self.accept_keyword("distinct")
+        args = []
+        if self.accept_op("*"):
+            args.append(Star())
+        elif not (self.peek().kind == "op" and self.peek().value == ")"):
+            args.append(self.call_argument())
+            while self.accept_op(","):
+                args.append(self.call_argument())
+        self.expect_op(")")
+        if self.accept_keyword("over"):
+            return WindowCall(FunctionCall(name, args, distinct), self.window_spec())
+        if self.at_keyword("filter", "within"):
+            raise UnsupportedStatement("select")
+        return FunctionCall(name, args, distinct)
+
+    def window_spec(self):
+        """`( [PARTITION BY col, ...] [ORDER BY item, ...] [ROWS | RANGE frame] )` after OVER."""
+        self.expect_op("(")
+        partition_by, order_by, frame = [], [], None
+        if self.accept_keyword("partition", "by"):
+            partition_by.append(self.predicate_column())
+            while self.accept_op(","):
+                partition_by.append(self.predicate_column())
+        if self.accept_keyword("order", "by"):
+            order_by.append(self.order_item())
+            while self.accept_op(","):
+                order_by.append(self.order_item())
+        if self.at_keyword("rows", "range"):
+            unit = self.advance().value.lower()
+            if self.accept_keyword("between"):
+                start = self.frame_bound()
+                self.expect_keyword("and")
+                end = self.frame_bound()
+            else:
+                start, end = self.frame_bound(), ("current", 0)
+            # Le début du cadre ne peut pas suivre sa fin (CURRENT ROW AND 1 PRECEDING).
+            kinds = ("preceding", "current", "following")
+            if start == ("following", None) or end == ("preceding", None) or kinds.index(start[0]) > kinds.index(end[0]):
+                self.error("cadre de fenêtre valide")
+            frame = WindowFrame(unit, start, end)
+        self.expect_op(")")
+        return Window(partition_by, order_by, frame)
+
+    def frame_bound(self):
+        if self.accept_keyword("unbounded", "preceding"):
+            return "preceding", None
+        if self.accept_keyword("unbounded", "following"):
+            return "following", None
+        if self.accept_keyword("current", "row"):
+            return "current", 0
+        token = self.peek()
+        if token.kind != "number":
+            self.error("borne de fenêtre (UNBOUNDED, CURRENT ROW ou n PRECEDING/FOLLOWING)")
+        offset = self.literal()
+        if self.accept_keyword("preceding"):
+            return "preceding", offset
+        if self.accept_keyword("following"):
+            return "following", offset
+        self.error("PRECEDING ou FOLLOWING")
+
+    def call_argument(self):
+        return self.expression()
+
+    def expression(self):
+        """Arithmetic over columns, literals and function calls: + - below * / %, parentheses first."""
+        node = self.term()
+        while self.peek().kind == "op" and self.peek().value in ("+", "-"):
+            node = BinaryOp(self.advance().value, node, self.term())
+        return node
+
+    def term(self):
+        node = self.factor()
+        while self.peek().kind == "op" and self.peek().value in ("*", "/", "%"):
+            node = BinaryOp(self.advance().value, node, self.factor())
+        return node
+
+    def factor(self):
+        token = self.peek()
+        if token.kind == "op" and token.value == "(":
+            self.advance()
+            node = self.condition()
+            self.expect_op(")")
+            return node
+        if token.kind in ("string", "number", "param") or token.is_keyword("null", "true", "false"):
+            return Literal(self.literal())
+        if token.kind == "op" and token.value == "-":
+            self.advance()
+            if self.peek().kind == "number":
+                return Literal(-self.literal())
+            return BinaryOp("-", Literal(0), self.factor())
+        if token.kind in ("ident", "quoted") and self.peek(1).kind == "op" and self.peek(1).value == "(":
+            return self.function_call()
+        return self.column_ref()
+
+    def condition(self):
+        """Boolean expression over arbitrary operands (CHECK, GENERATED AS, MERGE ... ON): OR, AND, NOT, then predicates."""
+        node = self.condition_and()
+        while self.accept_keyword("or"):
+            node = BinaryOp("or", node, self.condition_and())
+        return node
+
+    def condition_and(self):
+        node = self.condition_not()
+        while self.accept_keyword("and"):
+            node = BinaryOp("and", node, self.condition_not())
+        return node
+
+    def condition_not(self):
+        if self.accept_keyword("not"):
+            return UnaryOp("not", self.condition_not())
+        return self.condition_predicate()
+
+    def condition_predicate(self):
+        left = self.expression()
+        token = self.peek()
+        if token.kind == "op" and token.value in COMPARISON_OPS:
+            self.advance()
+            return BinaryOp("!=" if token.value == "<>" else token.value, left, self.expression())
+        if self.accept_keyword("is"):
+            op = "is not null" if self.accept_keyword("not") else "is null"
+            self.expect_keyword("null")
+            return UnaryOp(op, left)
+        negated = self.accept_keyword("not")
+        if self.accept_keyword("in"):
+            self.expect_op("(")
+            items = [self.expression()]
+            while self.accept_op(","):
+                items.append(self.expression())
+            self.expect_op(")")
+            node = InList(left, items)
+        elif self.accept_keyword("between"):
+            low = self.expression()
+            self.expect_keyword("and")
+            node = BinaryOp("and", BinaryOp(">=", left, low), BinaryOp("<=", left, self.expression()))
+        elif self.at_keyword("like", "ilike"):
+            node = BinaryOp(self.advance().value.lower(), left, self.expression())
+        elif negated:
+            self.error("IN, BETWEEN ou LIKE")
+        else:
+            return left
+        return UnaryOp("not", node) if negated else node
+
+    def column_ref(self):
+        name = self.operand()
+        table = None
+        if "->" not in name and "." in name:
+            table, name = name.split(".", 1)
+        return Column(name, table)
+
+    def order_item(self):
+        column = self.predicate_column()
+        descending = False
+        if self.accept_keyword("desc"):
+            descending = True
+        else:
+            self.accept_keyword("asc")
+        nulls_first = None
+        if self.accept_keyword("nulls", "first"):
+            nulls_first = True
+        elif self.accept_keyword("nulls", "last"):
+            nulls_first = False
+        return OrderItem(column, descending, nulls_first)
+
+    def parse_prepare(self):
+        self.advance()
+        name = self.identifier()
+        if self.accept_op("("):
+            # Types des paramètres (PREPARE p (int, text) AS ...) : acceptés, non vérifiés.
+            while not self.accept_op(")"):
+                if self.advance() is _EOF:
+                    self.error(")")
+        self.expect_keyword("as")
+        token = self.peek()
+        handler = self.STATEMENTS.get(token.value.lower()) if token.kind == "ident" else None
+        if handler is None or token.value.lower() in ("prepare", "execute", "deallocate"):
+            raise SQLSyntaxError(f"Instruction non préparable : {token.value}")
+        statement = handler(self)
+        return Prepare(name, statement, self.param_count())
+
+    def parse_execute(self):
+        self.advance()
+        name = self.identifier()
+        params = []
+        if self.accept_op("("):
+            if not self.accept_op(")"):
+                params.append(self.literal())
+                while self.accept_op(","):
+                    params.append(self.literal())
+                self.expect_op(")")
+        return Execute(name, params)
+
+    def parse_merge(self):
+        self.advance()
+        self.expect_keyword("into")
+        target = self.identifier()
+        target_alias = self.table_alias("using")
+        self.expect_keyword("using")
+        source = self.identifier()
+        source_alias = self.table_alias("on")
+        self.expect_keyword("on")
+        on = self.condition()
+        matched = not_matched = None
+        delete_matched = False
+        while self.accept_keyword("when"):
+            if self.accept_keyword("matched", "then"):
+                if self.accept_keyword("delete"):
+                    delete_matched = True
+                    continue
+                self.expect_keyword("update", "set")
+                matched = {}
+                while True:
+                    column = self.predicate_column()
+                    self.expect_op("=")
+                    matched[column] = self.expression()
+                    if not self.accept_op(","):
+                        break
+            else:
+                self.expect_keyword("not", "matched", "then", "insert")
+                self.expect_op("(")
+                columns = [self.predicate_column()]
+                while self.accept_op(","):
+                    columns.append(self.predicate_column())
+                self.expect_op(")")
+                self.expect_keyword("values")
+                self.expect_op("(")
+                values = [self.expression()]
+                while self.accept_op(","):
+                    values.append(self.expression())
+                self.expect_op(")")
+                if len(columns) != len(values):
+                    raise SQLSyntaxError("Le nombre de colonnes et de valeurs ne correspondent pas")
+                not_matched = dict(zip(columns, values))
+        if matched is None and not_matched is None and not delete_matched:
+            self.error("WHEN MATCHED ou WHEN NOT MATCHED")
+        return Merge(target, source, on, matched, not_matched, target_alias, source_alias, delete_matched)
+
+    def table_alias(self, next_keyword):
+        if self.accept_keyword("as") or self.peek().kind in ("ident", "quoted") and not self.at_keyword(next_keyword):
+            return self.identifier()
+        return None
+
+    def parse_analyze(self):
+        self.advance()
+        if self.peek() is _EOF or self.peek().kind == "op" and self.peek().value == ";":
+            return Analyze()
+        return Analyze(self.identifier())
+
+    def parse_explain(self):
+        self.advance()
+        if not self.at_keyword("select"):
+            raise UnsupportedStatement("explain")
+        return Explain(self.select_core())
+
+    def parse_with(self):
+        self.advance()
+        recursive = self.accept_keyword("recursive")
+        ctes = [self.common_table()]
+        while self.accept_op(","):
+            ctes.append(self.common_table())
+        if not self.at_keyword("select"):
+            self.error("SELECT")
+        return With(ctes, self.parse_select(), recursive)
+
+    def common_table(self):
+        name = self.identifier()
+        columns = []
+        if self.accept_op("("):
+            columns.append(self.identifier())
+            while self.accept_op(","):
+                columns.append(self.identifier())
+            self.expect_op(")")
+        self.expect_keyword("as")
+        self.expect_op("(")
+        query = self.parse_select()
+        self.expect_op(")")
+        return CommonTable(name, query, columns)
+
+    def parse_deallocate(self):
+        self.advance()
+        self.accept_keyword("prepare")
+        return Deallocate(self.identifier())
+
+    STATEMENTS = {
+        "use": parse_use, "show": parse_show, "set": parse_set, "describe": parse_describe,
+        "truncate": parse_truncate, "drop": parse_drop, "create": parse_create, "alter": parse_alter,
+        "insert": parse_insert, "update": parse_update, "delete": parse_delete, "select": parse_select,
+        "prepare": parse_prepare, "execute": parse_execute, "deallocate": parse_deallocate,
+        "analyze": parse_analyze, "explain": parse_explain, "merge": parse_merge, "with": parse_with,
+        "refresh": parse_refresh,
+    }
+
+    # -- WHERE -----------------------------------------------------------
+
+    def predicate_column(self):
+        column = self.operand()
+        # Requêtes mono-table : `t.col` désigne simplement la colonne `col`.
+        return column.split(".", 1)[1] if "->" not in column and "." in column else column
+
+    def operand(self):
+        """Column name, `t.col`, or a JSON path `col->'a'->>0` in canonical form."""
+        name = self.identifier()
+        if self.peek().kind == "op" and self.peek().value == "." and self.peek(1).kind in ("ident", "quoted"):
+            self.advance()
+            name = f"{name}.{self.identifier()}"
+        steps, as_text = [], False
+        while self.peek().kind == "op" and self.peek().value in ("->", "->>"):
+            as_text = self.advance().value == "->>"
+            token = self.advance()
+            if token.kind == "string":
+                steps.append(token.value[1:-1].replace("''", "'"))
+            elif token.kind == "number" and "." not in token.value:
+                steps.append(int(token.value))
+            else:
+                self.pos -= 1
+                self.error("clé ou position JSON")
+        return json_expression_key(name, steps, as_text) if steps else name
+
+    def where_clause(self, qualified=False):
+        """WHERE condition: parsed by the expression grammar, then lowered to a predicate tree (see lower_condition)."""
+        return lower_condition(self.condition(), qualified)
+
+
+_MIRRORED = {"=": "=", "!=": "!=", "<": ">", "<=": ">=", ">": "<", ">=": "<="}
+_NOT_LITERAL = object()
+
+
+def _without_last_order(node):
+    """(node without the ORDER BY and LIMIT of its last SELECT, that ORDER BY, that LIMIT)."""
+    if isinstance(node, SetOperation):
+        right, order_by, limit = _without_last_order(node.right)
+        return replace(node, right=right), order_by, limit
+    return replace(node, order_by=[], limit=None), node.order_by, node.limit
+
+
+def _leaf_column(expr, qualified):
+    if not isinstance(expr, Column) or expr.table is not None and qualified:
+        return None
+    return expr.name
+
+
+def _literal_value(expr):
+    return expr.value if isinstance(expr, Literal) else _NOT_LITERAL
+
+
+def lower_condition(node, qualified=False):
+    """Predicate tree (see utils.filter_utils.as_predicate) of a parsed WHERE condition.
+
+    `column op literal`, IN lists, LIKE patterns, IS [NOT] NULL and MATCH
+    become leaves that indexes, zone maps and vectorized masks resolve; any
+    other condition (`v > w`, `v + 1 > 11`) is kept as an ("expr", node)
+    leaf evaluated by core.expressions. With `qualified` (rows merged by a
+    join), `t.col` stays in an expression instead of naming the column `col`.
+    """
+    if isinstance(node, BinaryOp) and node.op in ("and", "or"):
+        children = []
+        for side in (node.left, node.right):
+            child = lower_condition(side, qualified)
+            # Chaînes AND / OR et BETWEEN aplatis.
+            children.extend(child[1] if child[0] == node.op else [child])
+        return (node.op, children)
+    if isinstance(node, UnaryOp):
+        if node.op == "not":
+            return ("not", lower_condition(node.operand, qualified))
+        column = _leaf_column(node.operand, qualified)
+        if column is not None:
+            return ("=" if node.op == "is null" else "!=", column, None)
+    elif isinstance(node, BinaryOp) and node.op in _MIRRORED:
+        op, column, value = node.op, _leaf_column(node.left, qualified), _literal_value(node.right)
+        if column is None or value is _NOT_LITERAL:
+            op, column, value = _MIRRORED[op], _leaf_column(node.right, qualified), _literal_value(node.left)
+        if column is not None and value is not _NOT_LITERAL:
+            # Comparaison avec NULL : toujours inconnue (ni vraie ni fausse), comme col IN (NULL).
+            return ("in", column, (None,)) if value is None else (op, column, value)
+    elif isinstance(node, BinaryOp) and node.op in ("like", "ilike"):
+        column, pattern = _leaf_column(node.left, qualified), _literal_value(node.right)
+        if column is not None and isinstance(pattern, (str, Param)):
+            return (node.op, column, pattern)
+    elif isinstance(node, InList):
+        column, values = _leaf_column(node.expr, qualified), [_literal_value(item) for item in node.items]
+        if column is not None and not any(value is _NOT_LITERAL for value in values):
+            return ("in", column, tuple(values))
+    elif isinstance(node, FunctionCall) and node.name == "match":
+        column = _leaf_column(node.args[0], qualified) if len(node.args) == 2 else None
+        terms = _literal_value(node.args[1]) if column is not None else None
+        if not isinstance(terms, str):
+            raise SQLSyntaxError("Syntaxe incorrecte : MATCH(colonne, 'termes de recherche') attendu")
+        return ("match", column, terms)
+    return ("expr", node)
+
+
+def add_table_definition(definition, columns, constraints):
+    """Record one column or CONSTRAINT definition of a CREATE TABLE body."""
+    definition = definition.strip()
+    if definition.lower().startswith("constraint"):
+        parts = definition.split()
+        if len(parts) < 3:
+            raise SQLSyntaxError("Syntaxe incorrecte pour la contrainte")
+        constraint_name = parts[1]
+        constraint_def = " ".join(parts[2:])
+        if "primary key" in constraint_def.lower():
+            constraints["primary_keys"].append(constraint_name)
+        elif "unique" in constraint_def.lower():
+            constraints["unique_keys"].append(constraint_name)
+        elif "foreign key" in constraint_def.lower():
+            fk_match = re.search(r'foreign key \(([^)]+)\) references (\w+)\(([^)]+)\)', constraint_def, re.IGNORECASE)
+            if not fk_match:
+                raise SQLSyntaxError(f"Syntaxe incorrecte pour la contrainte FOREIGN KEY: {constraint_def}")
+            constraints["foreign_keys"][constraint_name] = {
+                "columns": [c.strip() for c in fk_match.group(1).split(",")],
+                "ref_table": fk_match.group(2),
+                "ref_columns": [c.strip() for c in fk_match.group(3).split(",")],
+            }
+        elif "check" in constraint_def.lower():
+            check_match = re.search(r'check \((.+)\)', constraint_def, re.IGNORECASE)
+            if not check_match:
+                raise SQLSyntaxError(f"Syntaxe incorrecte pour la contrainte CHECK: {constraint_def}")
+            # Validée dès la création : une expression invalide n'atteint jamais le catalogue.
+            parse_expression(check_match.group(1).strip())
+            constraints["checks"].append((constraint_name, check_match.group(1).strip()))
+        return
+    parts = definition.split()
+    if len(parts) < 2:
+        raise SQLSyntaxError("Syntaxe incorrecte pour la colonne")
+    col_name = parts[0]
+    col_definition = " ".join(parts[1:])
+    columns[col_name] = col_definition
+    if "primary key" in col_definition.lower():
+        constraints["primary_keys"].append(col_name)
+    if "unique" in col_definition.lower():
+        constraints["unique_keys"].append(col_name)
+    if "not null" in col_definition.lower():
+        constraints["not_null"].append(col_name)
+    generated = generated_expression(col_definition)
+    if generated:
+        parse_expression(generated)
+        constraints.setdefault("generated", {})[col_name] = generated
+        return
+    check = re.search(r'check\s*\(', col_definition, re.IGNORECASE)
+    if check:
+        condition = _parenthesized(col_definition, check.end() - 1)
+        parse_expression(condition)
+        constraints["checks"].append((col_name, condition))
+    default_value = re.search(r'default\s+(.+)', col_definition, re.IGNORECASE)
+    if default_value:
+        constraints["defaults"][col_name] = default_value.group(1)
+
+
+def generated_expression(column_definition):
+    """Expression of a `GENERATED ALWAYS AS (expr) [STORED]` column definition, or None."""
+    generated = _GENERATED_RE.search(column_definition)
+    return generated.group(1).strip() if generated else None
+
+
+def _parenthesized(text, start):
+    """Text inside the parenthesis opened at `start`, up to its matching `)`."""
+    depth = 0
+    for pos in range(start, len(text)):
+        if text[pos] == "(":
+            depth += 1
+        elif text[pos] == ")":
+            depth -= 1
+            if depth == 0:
+                return text[start + 1:pos].strip()
+    raise SQLSyntaxError(f"Parenthèse non fermée : {text[start:]}")
+
+
+def normalize_query(query):
+    """Cache key: comments dropped and whitespace collapsed outside string literals, trailing `;` dropped."""
+    normalized = _NORMALIZE_RE.sub(lambda m: m.group(1) or " ", query).strip()
+    return normalized[:-1].rstrip() if normalized.endswith(";") else normalized
+
+
+@lru_cache(maxsize=PARSE_CACHE_SIZE)
+def _parse_normalized(normalized, allow_params=False):
+    try:
+        return Parser(normalized).parse(allow_params)
+    except UnsupportedStatement:
+        return None
+
+
+def parse_sql(query, allow_params=False):
+    """Parse a statement into an AST node, or None when it is outside the grammar.
+
+    Results are cached on the normalized text, so repeated statements skip
+    lexing and parsing entirely. Returned nodes are shared: callers must not
+    mutate them. With `allow_params`, `$n` placeholders are accepted and the
+    statement comes back wrapped in a Prepare node.
+    """
+    normalized = normalize_query(query)
+    if normalized.split(" ", 1)[0].lower() not in Parser.STATEMENTS:
+        # Ni lexing ni cache pour le reste (langage naturel, instructions legacy).
+        return None
+    return _parse_normalized(normalized, allow_params)
+
+
+@lru_cache(maxsize=PARSE_CACHE_SIZE)
+def parse_expression(text):
+    """Parse a standalone expression or condition (`price * qty`, `age >= 18 AND email LIKE '%@%'`).
+
+    Used for CHECK constraints, generated columns and MERGE; only columns,
+    literals, operators and the functions of core.expressions are allowed,
+    so nothing stored in the catalog can run arbitrary code.
+    """
+    parser = Parser(text)
+    node = parser.condition()
+    parser.end_of_statement()
+    if parser.params:
+        raise SQLSyntaxError(f"Paramètre ${min(parser.params)} interdit dans une expression stockée")
+    return node
+
+
+def parse_where(where_clause):
+    """Parse a standalone `[WHERE] a=1 AND (b='x' OR NOT c>=2)` clause into a predicate tree."""
+    parser = Parser(where_clause)
+    parser.accept_keyword("where")
+    predicate = parser.where_clause()
+    parser.end_of_statement()
+    return predicate
+
+
+def bind_params(node, params):
+    """Copy of an AST node with every Param replaced by its value; the cached node is left intact."""
+    if isinstance(node, Param):
+        return params[node.index - 1]
+    if isinstance(node, tuple):
+        return tuple(bind_params(child, params) for child in node)
+    if isinstance(node, list):
+        return [bind_params(child, params) for child in node]
+    if isinstance(node, dict):
+        return {key: bind_params(value, params) for key, value in node.items()}
+    if is_dataclass(node):
+        return replace(node, **{f.name: bind_params(getattr(node, f.name), params) for f in fields(node)})
+    return node
@@ -42,6 +42,26 @@ def write_msgpack(file_path, content, key):
     with open(file_path, "wb") as f:
         f.write(encrypted_data)
 
+def append_msgpack(file_path, content, key):
+    """Append one encrypted record to a log file: Fernet tokens are base64, one per line."""
+    os.makedirs(os.path.dirname(file_path), exist_ok=True)
+    with open(file_path, "ab") as f:
+        f.write(encrypt_data(msgpack.packb(content), key) + b"\n")
+
+def read_msgpack_log(file_path, key):
+    """Records written by append_msgpack, oldest first ([] if the log does not exist)."""
+    if not os.path.exists(file_path):
+        return []
+    with open(file_path, "rb") as f:
+        tokens = f.read().split()
+    records = []
+    for token in tokens:
+        data = decrypt_data(token, key)
+        if data is None:
+            raise ValueError("Impossible de décrypter le journal.")
+        records.append(msgpack.unpackb(data.encode() if isinstance(data, str) else data, raw=False))
+    return records
+
 @lru_cache(maxsize=1000)
 def cached_read(file_path, key):
     return read_msgpack(file_path, key)
\ No newline at end of file
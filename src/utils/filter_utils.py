@@ -1,27 +1,278 @@
-import numpy as np
-import numba
-
-@numba.jit(nopython=True)
-def fast_filter_rows(data, condition_keys, condition_values):
-    result = []
-    for row in data:
-        match = True
-        for i in range(len(condition_keys)):
-            if row[condition_keys[i]] != condition_values[i]:
-                match = False
-                break
-        if match:
-            result.append(row)
-    return result
-
-def filter_rows(chunk, conditions):
-    if not chunk:
-        return []
-    condition_keys = list(conditions.keys())
-    condition_values = list(conditions.values())
+import operator
+import re
+
+from query.nlp_model import tokenize_text
+from utils.json_utils import evaluate_json_expression, parse_json_expression
+
+_COMPARATORS = {
+    "<": operator.lt,
+    "<=": operator.le,
+    ">": operator.gt,
+    ">=": operator.ge,
+}
+RANGE_OPS = tuple(_COMPARATORS)
+LIKE_OPS = ("like", "ilike")
+
+# Types déclarés (premier mot de la définition de colonne) et type Python des valeurs.
+_TYPE_KINDS = {
+    **dict.fromkeys(("int", "integer", "bigint", "smallint", "tinyint", "serial", "bigserial"), int),
+    **dict.fromkeys(("float", "real", "double", "decimal", "numeric"), float),
+    **dict.fromkeys(("text", "varchar", "char", "character", "string"), str),
+    **dict.fromkeys(("bool", "boolean"), bool),
+}
+
+
+def _expressions():
+    # Import différé : core.expressions importe ce module.
+    from core import expressions
+    return expressions
+
+
+def as_predicate(conditions):
+    """Normalize legacy {col: value} conditions into a predicate tree.
+
+    Predicates are nested tuples: (op, col, value) with op one of =, !=, <,
+    <=, >, >=, ("in", col, values), ("like", col, pattern) and
+    ("ilike", col, pattern), ("match", col, terms) for full-text search,
+    plus ("and", [p, ...]), ("or", [p, ...]) and ("not", p). IS NULL is
+    ("=", col, None) and BETWEEN a conjunction of two ranges. Any other SQL
+    condition is an ("expr", node) leaf over a core.expressions tree.
+    """
+    if isinstance(conditions, dict):
+        return ("and", [("=", k, v) for k, v in conditions.items()])
+    return conditions
+
+
+def predicate_leaves(predicate):
+    """Yield the comparison and MATCH leaves of a predicate tree."""
+    op = predicate[0]
+    if op in ("and", "or"):
+        for child in predicate[1]:
+            yield from predicate_leaves(child)
+    elif op == "not":
+        yield from predicate_leaves(predicate[1])
+    else:
+        yield predicate
+
+
+def predicate_columns(predicate):
+    """Base columns read by a predicate (JSON path expressions count as their column)."""
+    columns = set()
+    for leaf in predicate_leaves(predicate):
+        if leaf[0] == "expr":
+            columns.update(_expressions().expression_columns(leaf[1]))
+            continue
+        expression = parse_json_expression(leaf[1]) if "->" in leaf[1] else None
+        columns.add(expression[0] if expression else leaf[1])
+    return columns
+
+
+def predicate_shape(predicate):
+    """Hashable form of a predicate without its literals (NULL and list lengths are kept), e.g. to key a cached plan."""
+    op = predicate[0]
+    if op in ("and", "or"):
+        return op, tuple(predicate_shape(child) for child in predicate[1])
+    if op == "not":
+        return op, predicate_shape(predicate[1])
+    if op == "expr":
+        # Une condition non réduite garde ses valeurs.
+        return op, repr(predicate[1])
+    return op, predicate[1], _value_shape(predicate[2])
+
+
+def _value_shape(value):
+    if isinstance(value, (list, tuple)):
+        return tuple(_value_shape(item) for item in value)
+    return None if value is None else type(value).__name__
+
+
+def column_value(row, column):
+    """Value of a plain column or of a JSON path expression like `data->'a'->>'b'`."""
+    if "->" in column:
+        return evaluate_json_expression(row, column)
+    return row.get(column)
+
+
+def column_kind(column_type):
+    """Python type of the values of a declared column type (`INT`, `VARCHAR(20)`...), or None."""
+    if not isinstance(column_type, str) or not column_type.strip():
+        return None
+    return _TYPE_KINDS.get(column_type.split()[0].split("(")[0].lower())
+
+
+def coerce_value(value, kind):
+    """Convert a literal to the type of the column it is compared with; unconvertible values are kept."""
+    if value is None or kind is None or type(value) is kind:
+        return value
     try:
-        dtype = [(key, type(value)) for key, value in chunk[0].items()]
-        np_data = np.array([tuple(row.values()) for row in chunk], dtype=dtype)
-        return fast_filter_rows(np_data, condition_keys, condition_values)
-    except Exception:
-        return [row for row in chunk if all(row.get(k) == v for k, v in conditions.items())]
\ No newline at end of file
+        if kind is bool:
+            if isinstance(value, str) and value.lower() in ("true", "false", "1", "0"):
+                return value.lower() in ("true", "1")
+            return bool(value) if isinstance(value, int) and value in (0, 1) else value
+        if isinstance(value, bool):
+            return value
+        if kind is int and isinstance(value, str):
+            number = float(value)
+            return int(number) if number.is_integer() and "." not in value else number
+        if kind is float and isinstance(value, (str, int)):
+            return float(value)
+        if kind is str and isinstance(value, (int, float)):
+            return str(value)
+    except ValueError:
+        pass
+    return value
+
+
+def coerce_predicate(predicate, columns):
+    """Copy of a predicate whose literals are converted to the declared types of `columns` ({col: type})."""
+    if predicate is None:
+        return None
+    op = predicate[0]
+    if op in ("and", "or"):
+        return (op, [coerce_predicate(child, columns) for child in predicate[1]])
+    if op == "not":
+        return (op, coerce_predicate(predicate[1], columns))
+    if op == "expr":
+        return predicate
+    # Les chemins JSON, LIKE et MATCH comparent du texte tel quel.
+    kind = column_kind(columns.get(predicate[1])) if "->" not in predicate[1] else None
+    if kind is None or op in LIKE_OPS or op == "match":
+        return predicate
+    if op == "in":
+        return (op, predicate[1], tuple(coerce_value(value, kind) for value in predicate[2]))
+    return (op, predicate[1], coerce_value(predicate[2], kind))
+
+
+def like_regex(pattern, ignore_case=False):
+    """Compile a LIKE pattern (`%` any string, `_` one character, `\\` escapes) to a regex."""
+    parts, escaped = [], False
+    for char in pattern:
+        if escaped:
+            parts.append(re.escape(char))
+            escaped = False
+        elif char == "\\":
+            escaped = True
+        else:
+            parts.append(".*" if char == "%" else "." if char == "_" else re.escape(char))
+    return re.compile("".join(parts), re.DOTALL | (re.IGNORECASE if ignore_case else 0))
+
+
+def like_prefix(pattern):
+    """Literal text before the first wildcard of a LIKE pattern."""
+    prefix, escaped = [], False
+    for char in pattern:
+        if not escaped and char in "%_":
+            break
+        if not escaped and char == "\\":
+            escaped = True
+            continue
+        prefix.append(char)
+        escaped = False
+    return "".join(prefix)
+
+
+def compile_value_test(op, value, negate=False):
+    """Closure value -> bool for one leaf operator applied to a column value.
+
+    With `negate`, the closure tests NOT (leaf): as in SQL, a NULL (or
+    incomparable) value makes the leaf unknown, so it fails both tests.
+    ("=", col, None) and ("!=", col, None) are IS NULL and IS NOT NULL.
+    """
+    if value is None and op in ("=", "!="):
+        return (lambda v: v is None) if (op == "=") != negate else (lambda v: v is not None)
+    if op == "=":
+        return (lambda v: v is not None and v != value) if negate else (lambda v: v == value)
+    if op == "!=":
+        return (lambda v: v == value) if negate else (lambda v: v is not None and v != value)
+    if op in _COMPARATORS:
+        if value is None:
+            return lambda v: False
+        compare = _COMPARATORS[op]
+
+        def test(v):
+            if v is None:
+                return False
+            try:
+                return compare(v, value) != negate
+            except TypeError:
+                return False
+        return test
+    if op == "in":
+        # NULL n'appartient à aucune liste ; un NOT IN dont la liste contient NULL n'est jamais vrai.
+        present = [v for v in value if v is not None]
+        if negate and len(present) < len(value):
+            return lambda v: False
+        try:
+            members = frozenset(present)
+        except TypeError:
+            members = present
+
+        def test(v):
+            try:
+                return v is not None and (v in members) != negate
+            except TypeError:
+                return False
+        return test
+    if op in LIKE_OPS:
+        matches = like_regex(value, op == "ilike").fullmatch
+        return lambda v: isinstance(v, str) and (matches(v) is not None) != negate
+    if op == "match":
+        terms = set(tokenize_text(value))
+        return lambda v: isinstance(v, str) and terms.isdisjoint(tokenize_text(v)) == negate
+    raise ValueError(f"Unsupported predicate: {op}")
+
+
+def _all(tests):
+    first, *rest = tests
+    if not rest:
+        return first
+    second = _all(rest)
+    return lambda row: first(row) and second(row)
+
+
+def _any(tests):
+    first, *rest = tests
+    if not rest:
+        return first
+    second = _any(rest)
+    return lambda row: first(row) or second(row)
+
+
+def compile_predicate(predicate, negate=False):
+    """Compile a predicate tree once into a closure row -> bool.
+
+    Scans, UPDATE and DELETE compile their WHERE clause once per statement
+    instead of walking the tuple tree for every row. NOT is pushed down to
+    the leaves (De Morgan), where a NULL fails both the test and its
+    negation: the closure is true exactly when SQL's three-valued result is.
+    """
+    op = predicate[0]
+    if op in ("and", "or"):
+        if negate:
+            op = "or" if op == "and" else "and"
+        tests = [compile_predicate(child, negate) for child in predicate[1]]
+        if not tests:
+            return lambda row: op == "and"
+        return _all(tests) if op == "and" else _any(tests)
+    if op == "not":
+        return compile_predicate(predicate[1], not negate)
+    if op == "expr":
+        # Logique à trois valeurs de core.expressions : None (inconnu) échoue au test comme à sa négation.
+        evaluate = _expressions().compile_expression(predicate[1])
+        if not negate:
+            return lambda row: bool(evaluate(row))
+
+        def test(row):
+            value = evaluate(row)
+            return value is not None and not value
+        return test
+    column = predicate[1]
+    value_test = compile_value_test(op, predicate[2], negate)
+    if "->" in column:
+        return lambda row: value_test(evaluate_json_expression(row, column))
+    return lambda row: value_test(row.get(column))
+
+
+def match_predicate(row, predicate):
+    """One-off evaluation of a predicate on a row; loops should use compile_predicate."""
+    return compile_predicate(predicate)(row)
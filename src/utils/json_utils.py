@@ -0,0 +1,101 @@
+import json
+import re
+from functools import lru_cache
+
+JSON_TYPES = ("JSONB",)
+
+_PATH_STEP_RE = re.compile(r"""\.(\w+)|\[\s*(-?\d+)\s*\]|\[\s*'([^']*)'\s*\]|\[\s*"([^"]*)"\s*\]""")
+_ARROW_RE = re.compile(r"""^\s*(\w+)((?:\s*->>?\s*(?:'[^']*'|-?\d+))+)\s*$""")
+_ARROW_STEP_RE = re.compile(r"""(->>?)\s*(?:'([^']*)'|(-?\d+))""")
+
+
+def is_json_type(column_type):
+    return bool(column_type) and str(column_type).split()[0].upper() in JSON_TYPES
+
+
+def load_json_value(value):
+    """Return a decoded JSON document; JSONB columns are already decoded, TEXT ones are parsed."""
+    if isinstance(value, str):
+        return json.loads(value)
+    return value
+
+
+@lru_cache(maxsize=1024)
+def compile_path(path):
+    """Compile `$.a.b[0]` or `['a'][0]` into a tuple of keys and list indexes.
+
+    Replaces the former `eval(f"json_data{path}")`: only member and index
+    steps are accepted, anything else is rejected instead of executed.
+    """
+    path = path.strip()
+    if len(path) > 1 and path[0] == path[-1] and path[0] in ("'", '"'):
+        path = path[1:-1].strip()
+    if path.startswith("$"):
+        path = path[1:]
+    steps = []
+    pos = 0
+    while pos < len(path):
+        match = _PATH_STEP_RE.match(path, pos)
+        if not match:
+            raise ValueError(f"Chemin JSON invalide : {path}")
+        name, index, quoted, double_quoted = match.groups()
+        if index is not None:
+            steps.append(int(index))
+        else:
+            steps.append(next(v for v in (name, quoted, double_quoted) if v is not None))
+        pos = match.end()
+    return tuple(steps)
+
+
+def extract_path(document, steps):
+    for step in steps:
+        if isinstance(step, int):
+            if not isinstance(document, list) or not -len(document) <= step < len(document):
+                return None
+            document = document[step]
+        else:
+            if not isinstance(document, dict):
+                return None
+            document = document.get(step)
+        if document is None:
+            return None
+    return document
+
+
+@lru_cache(maxsize=1024)
+def parse_json_expression(expression):
+    """Parse `col->'a'->0->>'b'` into (column, steps, as_text), or None if not an arrow expression."""
+    match = _ARROW_RE.match(expression)
+    if not match:
+        return None
+    steps = []
+    as_text = False
+    for arrow, key, index in _ARROW_STEP_RE.findall(match.group(2)):
+        steps.append(int(index) if index else key)
+        as_text = arrow == "->>"
+    return match.group(1), tuple(steps), as_text
+
+
+def json_expression_key(column, steps, as_text=False):
+    parts = [str(s) if isinstance(s, int) else f"'{s}'" for s in steps]
+    arrows = ["->"] * len(parts)
+    if as_text and arrows:
+        arrows[-1] = "->>"
+    return column + "".join(a + p for a, p in zip(arrows, parts))
+
+
+def evaluate_json_expression(row, expression):
+    parsed = parse_json_expression(expression)
+    if parsed is None:
+        return None
+    column, steps, as_text = parsed
+    value = row.get(column)
+    if value is None:
+        return None
+    try:
+        value = extract_path(load_json_value(value), steps)
+    except ValueError:
+        return None
+    if as_text and value is not None and not isinstance(value, str):
+        return json.dumps(value) if isinstance(value, (dict, list)) else str(value)
+    return value
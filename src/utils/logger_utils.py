@@ -6,6 +6,8 @@ try:
 except Exception:
     _PROMPT_TOOLKIT_AVAILABLE = False
 
+from html import escape
+
 from tabulate import tabulate
 from datetime import datetime
 
@@ -43,6 +45,9 @@ else:
     response_style = None
 
 def print_response(message, style_class="info"):
+    if _PROMPT_TOOLKIT_AVAILABLE:
+        # Les messages citent des conditions (`qty < 100`) : pas de balisage HTML involontaire.
+        message = escape(str(message))
     print_formatted_text(
         HTML(f"<{style_class}>{message}</{style_class}>"),
         style=response_style
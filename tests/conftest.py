@@ -0,0 +1,51 @@
+import itertools
+import os
+import sys
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path[:0] = [os.path.join(ROOT, "src"), ROOT]
+
+from config.initialization import initialize_system  # noqa: E402
+from query.query_parser import execute_query, select_rows  # noqa: E402
+from query.sql_parser import parse_sql  # noqa: E402
+
+ADMIN = {"username": "admin", "role": "admin", "permissions": {}}
+_database_names = itertools.count()
+
+
+@pytest.fixture(scope="session")
+def db_system(tmp_path_factory):
+    # Clé maître et répertoire de données sont relatifs au répertoire courant : un répertoire temporaire par session.
+    previous = os.getcwd()
+    os.chdir(tmp_path_factory.mktemp("data"))
+    system = initialize_system()
+    yield system
+    if system._pool is not None:
+        system._pool.terminate()
+    os.chdir(previous)
+
+
+@pytest.fixture
+def db(db_system):
+    """The shared DatabaseSystem, using a fresh database."""
+    name = f"test{next(_database_names)}"
+    db_system.create_database(name, ADMIN)
+    db_system.use_database(name)
+    return db_system
+
+
+@pytest.fixture
+def run(db):
+    """Execute SQL statements as admin."""
+    def run(*queries):
+        for query in queries:
+            execute_query(query, db, ADMIN)
+    return run
+
+
+@pytest.fixture
+def select(db):
+    """Rows of a SELECT run as admin."""
+    return lambda query: select_rows(parse_sql(query), db, ADMIN)
@@ -0,0 +1,63 @@
+import pytest
+
+import config.config as conf
+from conftest import ADMIN
+from core.executor import HashAggregate
+from query.query_parser import plan_select
+from query.sql_parser import parse_sql
+
+QUERY = ("SELECT g, COUNT(*) AS n, COUNT(v) AS nv, SUM(v) AS s, AVG(v) AS a, MIN(v) AS lo, MAX(v) AS hi, "
+         "COUNT(DISTINCT v) AS d FROM t GROUP BY g")
+
+
+@pytest.fixture(params=["rows", "vectorized"])
+def sales(request, run, db, monkeypatch):
+    """t(g, v) with 40 groups; returns the expected result of QUERY by group."""
+    monkeypatch.setattr(db.result_cache, "max_entries", 0)
+    monkeypatch.setattr(conf, "vectorized_execution", request.param == "vectorized")
+    monkeypatch.setattr(conf, "parallel_workers", 1)
+    rows = [{"g": i % 40, "v": None if i % 9 == 0 else i % 13} for i in range(3000)]
+    run("CREATE TABLE t (g int, v int)")
+    db.insert_records("t", rows, ADMIN)
+    expected = {}
+    for g in range(40):
+        values = [row["v"] for row in rows if row["g"] == g and row["v"] is not None]
+        expected[g] = {"g": g, "n": sum(row["g"] == g for row in rows), "nv": len(values), "s": sum(values),
+                       "a": sum(values) / len(values), "lo": min(values), "hi": max(values), "d": len(set(values))}
+    return expected
+
+
+def by_group(rows):
+    return {row["g"]: row for row in rows}
+
+
+def test_group_by_aggregates(sales, select):
+    rows = by_group(select(QUERY))
+    assert rows.keys() == sales.keys()
+    for g, expected in sales.items():
+        assert rows[g] == pytest.approx(expected), g
+
+
+def test_having_filters_groups(sales, select):
+    rows = select("SELECT g, SUM(v) AS s FROM t GROUP BY g HAVING SUM(v) > 600 AND COUNT(*) >= 75 ORDER BY g")
+    assert rows == [{"g": g, "s": e["s"]} for g, e in sorted(sales.items()) if e["s"] > 600 and e["n"] >= 75]
+
+
+def test_spilled_groups_give_the_same_result(sales, select, monkeypatch):
+    monkeypatch.setattr(conf, "aggregate_memory_groups", 5)
+    rows = by_group(select(QUERY))
+    for g, expected in sales.items():
+        assert rows[g] == pytest.approx(expected), g
+
+
+def test_aggregate_keeps_state_per_group_only():
+    statement = parse_sql("SELECT g, SUM(v) AS s FROM t GROUP BY g")
+    output, _ = plan_select(statement)
+    node = HashAggregate(({"g": i % 3, "v": i} for i in range(100)), ["g"], output, memory_groups=2, partitions=2)
+    assert sorted(node, key=lambda row: row["g"]) == [{"g": g, "s": sum(range(g, 100, 3))} for g in range(3)]
+    assert node.spilled
+
+
+def test_ungrouped_column_is_rejected(sales, select):
+    with pytest.raises(ValueError):
+        select("SELECT g, v, COUNT(*) AS n FROM t GROUP BY g")
@@ -0,0 +1,76 @@
+import random
+
+import pytest
+
+from conftest import ADMIN
+from core.bitmap_index import RoaringBitmap
+from core.table_storage import TableFile
+from query.sql_parser import parse_sql
+
+STATUSES = ["new", "open", "closed"]
+
+
+def test_roaring_operations_match_sets():
+    generator = random.Random(7)
+    # Conteneurs creux (tableaux) et denses (bitsets), sur plusieurs blocs de 2^16.
+    left = set(generator.sample(range(200_000), 9000)) | set(range(70_000, 76_000))
+    right = set(generator.sample(range(200_000), 300)) | set(range(74_000, 80_000))
+    a, b = RoaringBitmap(left), RoaringBitmap(right)
+    assert set(a & b) == left & right
+    assert set(a | b) == left | right
+    assert set(a - b) == left - right
+    assert set(a.invert(200_000)) == set(range(200_000)) - left
+    assert len(a) == len(left) and list(a) == sorted(left)
+    for value in list(left)[:5000]:
+        a.discard(value)
+    assert set(a) == set(list(left)[5000:])
+
+
+@pytest.fixture
+def events(run, db, monkeypatch):
+    monkeypatch.setattr(db.result_cache, "max_entries", 0)
+    generator = random.Random(3)
+    rows = {i: (generator.choice(STATUSES), generator.choice([0, 1, None]), generator.choice([0, 1])) for i in range(300)}
+    values = ", ".join(f"({i}, '{s}', {'NULL' if a is None else a}, {b})" for i, (s, a, b) in rows.items())
+    run("CREATE TABLE ev (id int, status str, urgent int, billed int)", f"INSERT INTO ev (id, status, urgent, billed) VALUES {values}",
+        "CREATE BITMAP INDEX es ON ev (status)", "CREATE BITMAP INDEX eu ON ev (urgent)", "CREATE BITMAP INDEX eb ON ev (billed)")
+    return rows
+
+
+CONDITIONS = [
+    ("status = 'open' AND urgent = 1 AND billed = 0", lambda s, a, b: s == "open" and a == 1 and b == 0),
+    ("status IN ('new', 'closed') OR urgent = 1", lambda s, a, b: s in ("new", "closed") or a == 1),
+    ("NOT status = 'open' AND billed = 1", lambda s, a, b: s != "open" and b == 1),
+    ("NOT (urgent = 1 OR billed = 1)", lambda s, a, b: a == 0 and b == 0),
+]
+
+
+@pytest.mark.parametrize("condition, expected", CONDITIONS)
+def test_flag_combinations_resolved_on_bitmaps(events, db, select, condition, expected):
+    # Petite table : le planificateur préférerait le parcours séquentiel, l'indication impose les bitmaps.
+    plan = db.plan_scan("ev", parse_sql(f"SELECT id FROM ev WHERE {condition}").where, hints=["BITMAPSCAN"])
+    assert plan.method == "bitmap_scan"
+    ids = sorted(row["id"] for row in select(f"SELECT /*+ BITMAPSCAN */ id FROM ev WHERE {condition}"))
+    assert ids == [i for i, row in events.items() if expected(*row)]
+
+
+def test_bitmaps_follow_writes(events, run, select):
+    run("UPDATE ev SET status = 'open' WHERE id < 20", "DELETE FROM ev WHERE billed = 1 AND id >= 100",
+        "INSERT INTO ev (id, status, urgent, billed) VALUES (500, 'open', 1, 0)")
+    for i in range(20):
+        events[i] = ("open", *events[i][1:])
+    events = {i: row for i, row in events.items() if i < 100 or row[2] == 0}
+    events[500] = ("open", 1, 0)
+    for condition, expected in CONDITIONS:
+        ids = sorted(row["id"] for row in select(f"SELECT /*+ BITMAPSCAN */ id FROM ev WHERE {condition}"))
+        assert ids == [i for i, row in events.items() if expected(*row)], condition
+
+
+def test_enum_column_index_starts_with_declared_values(run, db, select):
+    db.create_enum("mood", "'calm','tense','angry'", ADMIN)
+    run("CREATE TABLE m (id int, mood mood)", "INSERT INTO m (id, mood) VALUES (1, 'calm'), (2, 'tense')",
+        "CREATE BITMAP INDEX im ON m (mood)")
+    index = db._get_index("m", "mood", TableFile(db._get_table_path("m"), db.metadata_key), "bitmap")
+    assert set(index.bitmaps) >= {"calm", "tense", "angry"}
+    assert select("SELECT /*+ BITMAPSCAN */ id FROM m WHERE mood = 'angry'") == []
+    assert select("SELECT /*+ BITMAPSCAN */ id FROM m WHERE mood IN ('calm', 'angry')") == [{"id": 1}]
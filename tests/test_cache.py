@@ -0,0 +1,38 @@
+import pytest
+
+
+@pytest.fixture
+def tables(run):
+    run("CREATE TABLE a (id int, v int)", "INSERT INTO a (id, v) VALUES (1, 10), (2, 20)",
+        "CREATE TABLE b (id int)", "INSERT INTO b (id) VALUES (1)")
+
+
+def test_repeated_select_is_served_from_cache(tables, db, select):
+    first = select("SELECT id, v FROM a WHERE v > 5")
+    hits = db.result_cache.hits
+    assert select("SELECT  id, v FROM a WHERE v > 5 -- même requête") == first
+    assert db.result_cache.hits == hits + 1
+
+
+def test_write_invalidates_cached_result(tables, run, select):
+    select("SELECT id, v FROM a")
+    run("UPDATE a SET v = 0 WHERE id = 1", "INSERT INTO a (id, v) VALUES (3, 30)")
+    assert select("SELECT id, v FROM a") == [{"id": 1, "v": 0}, {"id": 2, "v": 20}, {"id": 3, "v": 30}]
+    run("DELETE FROM a WHERE id = 2")
+    assert select("SELECT id, v FROM a") == [{"id": 1, "v": 0}, {"id": 3, "v": 30}]
+
+
+def test_write_to_other_table_keeps_entry(tables, run, db, select):
+    select("SELECT id, v FROM a")
+    run("INSERT INTO b (id) VALUES (2)")
+    hits = db.result_cache.hits
+    select("SELECT id, v FROM a")
+    assert db.result_cache.hits == hits + 1
+
+
+def test_table_opt_out(tables, run, db, select):
+    run("ALTER TABLE a SET (result_cache = off)")
+    select("SELECT id, v FROM a")
+    hits = db.result_cache.hits
+    assert select("SELECT id, v FROM a") == [{"id": 1, "v": 10}, {"id": 2, "v": 20}]
+    assert db.result_cache.hits == hits
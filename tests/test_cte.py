@@ -0,0 +1,152 @@
+import os
+import tempfile
+
+import pytest
+
+import config.config as conf
+import core.table_storage as table_storage
+import query.query_parser as query_parser
+from conftest import ADMIN
+from core.executor import Materialize
+
+# Arbre de 121 employés : chacun a 3 subordonnés directs, sur 5 niveaux.
+EMPLOYEES = [{"id": i, "manager_id": (i - 1) // 3 if i else None} for i in range(121)]
+
+
+@pytest.fixture
+def employees(run, db, monkeypatch):
+    monkeypatch.setattr(db.result_cache, "max_entries", 0)
+    run("CREATE TABLE employees (id int, manager_id int)")
+    db.insert_records("employees", [dict(row) for row in EMPLOYEES], ADMIN)
+
+
+@pytest.fixture
+def graph(run, db, monkeypatch):
+    """Edges 0 -> 1 -> ... -> 9 -> 0, plus 3 -> 20; 30 -> 31 is not reachable from 0."""
+    monkeypatch.setattr(db.result_cache, "max_entries", 0)
+    edges = [(i, (i + 1) % 10) for i in range(10)] + [(3, 20), (30, 31)]
+    run("CREATE TABLE edges (src int, dst int)")
+    db.insert_records("edges", [{"src": src, "dst": dst} for src, dst in edges], ADMIN)
+
+
+def depth(employee):
+    level = 0
+    while employee:
+        employee = (employee - 1) // 3
+        level += 1
+    return level
+
+
+def test_org_chart(employees, select):
+    rows = select("WITH RECURSIVE chart (id, level) AS ("
+                  "SELECT id, 0 FROM employees WHERE manager_id IS NULL "
+                  "UNION ALL "
+                  "SELECT e.id, c.level + 1 FROM employees e INNER JOIN chart c ON e.manager_id = c.id) "
+                  "SELECT id, level FROM chart")
+    assert sorted((row["id"], row["level"]) for row in rows) == [(i, depth(i)) for i in range(121)]
+
+
+def test_subtree_of_a_manager(employees, select):
+    rows = select("WITH RECURSIVE team AS ("
+                  "SELECT id FROM employees WHERE id = 2 "
+                  "UNION ALL "
+                  "SELECT e.id FROM employees e INNER JOIN team t ON e.manager_id = t.id) "
+                  "SELECT COUNT(*) AS n FROM team")
+    # 2 et ses subordonnés sur les 3 niveaux suivants.
+    assert rows == [{"n": 1 + 3 + 9 + 27}]
+
+
+def test_union_terminates_on_cycles(graph, select):
+    rows = select("WITH RECURSIVE reach (node) AS ("
+                  "SELECT src FROM edges WHERE src = 0 "
+                  "UNION SELECT e.dst FROM edges e INNER JOIN reach r ON e.src = r.node) "
+                  "SELECT node FROM reach ORDER BY node")
+    assert [row["node"] for row in rows] == [*range(10), 20]
+
+
+def test_union_all_on_a_cycle_hits_the_iteration_cap(graph, select, monkeypatch):
+    monkeypatch.setattr(conf, "recursive_max_iterations", 25)
+    with pytest.raises(ValueError, match="recursive_max_iterations"):
+        select("WITH RECURSIVE walk (node) AS ("
+               "SELECT src FROM edges WHERE src = 0 "
+               "UNION ALL SELECT e.dst FROM edges e INNER JOIN walk w ON e.src = w.node) "
+               "SELECT node FROM walk")
+
+
+def test_row_cap(employees, select, monkeypatch):
+    monkeypatch.setattr(conf, "recursive_max_rows", 50)
+    with pytest.raises(ValueError, match="recursive_max_rows"):
+        select("WITH RECURSIVE chart AS ("
+               "SELECT id FROM employees WHERE manager_id IS NULL "
+               "UNION ALL SELECT e.id FROM employees e INNER JOIN chart c ON e.manager_id = c.id) "
+               "SELECT id FROM chart")
+
+
+@pytest.fixture
+def materialized(monkeypatch):
+    """Materialize operators built by the queries of a test."""
+    created = []
+
+    class Recorded(Materialize):
+        def __init__(self, *args, **kwargs):
+            super().__init__(*args, **kwargs)
+            created.append(self)
+
+    monkeypatch.setattr(query_parser, "Materialize", Recorded)
+    return created
+
+
+@pytest.fixture
+def decoded(run, db, monkeypatch):
+    """Blocks decrypted by the queries of a test, over a 5-block table t(id, v)."""
+    monkeypatch.setattr(db.result_cache, "max_entries", 0)
+    monkeypatch.setattr(conf, "parallel_workers", 1)
+    run("CREATE TABLE t (id int, v int)")
+    db.insert_records("t", [{"id": i, "v": i % 10} for i in range(5000)], ADMIN)
+    count = []
+    decode = table_storage.decode_block
+    monkeypatch.setattr(table_storage, "decode_block", lambda *args: count.append(1) or decode(*args))
+    return count
+
+
+def files(directory):
+    return sorted(os.path.join(path, name) for path, _, names in os.walk(directory) for name in names)
+
+
+def test_cte_read_once_is_inlined(decoded, materialized, select):
+    rows = select("WITH c AS (SELECT /*+ SEQSCAN */ id FROM t WHERE v = 3) SELECT id FROM c LIMIT 5")
+    assert rows == [{"id": i} for i in (3, 13, 23, 33, 43)]
+    assert materialized == []
+    # Le LIMIT arrête le parcours de la CTE : un seul bloc lu.
+    assert len(decoded) == 1
+
+
+def test_cte_read_twice_is_computed_once(decoded, materialized, select):
+    rows = select("WITH c AS (SELECT /*+ SEQSCAN */ id FROM t WHERE v = 3) "
+                  "SELECT id FROM c WHERE id < 30 UNION ALL SELECT id FROM c WHERE id > 4980")
+    assert rows == [{"id": i} for i in (3, 13, 23, 4983, 4993)]
+    assert len(materialized) == 1 and not materialized[0].spilled
+    assert len(decoded) == 5
+
+
+def test_large_cte_spills_outside_the_data_directory(decoded, materialized, select, monkeypatch, tmp_path):
+    monkeypatch.setattr(conf, "cte_memory_rows", 100)
+    monkeypatch.setattr(tempfile, "tempdir", str(tmp_path))
+    data = files(".")
+    rows = select("WITH c AS (SELECT id FROM t WHERE v = 3) "
+                  "SELECT COUNT(*) AS n FROM c UNION ALL SELECT MAX(id) FROM c")
+    assert rows == [{"n": 500}, {"n": 4993}]
+    assert materialized[0].spilled
+    assert files(".") == data
+    # Fichier de débordement supprimé avec l'opérateur, à la fin de la requête.
+    materialized.clear()
+    assert os.listdir(tmp_path) == []
+
+
+def test_cte_is_scoped_to_its_statement(run, db, select, monkeypatch):
+    monkeypatch.setattr(db.result_cache, "max_entries", 0)
+    run("CREATE TABLE c (id int)", "INSERT INTO c (id) VALUES (1)",
+        "CREATE TABLE t (id int)", "INSERT INTO t (id) VALUES (2)")
+    assert select("WITH c AS (SELECT id FROM t) SELECT id FROM c") == [{"id": 2}]
+    assert select("SELECT id FROM c") == [{"id": 1}]
+    assert select("WITH c AS (SELECT id FROM t), d AS (SELECT id FROM c) SELECT id FROM d") == [{"id": 2}]
@@ -0,0 +1,43 @@
+import pytest
+
+from conftest import ADMIN
+
+
+@pytest.fixture
+def purchases(run, db, monkeypatch):
+    monkeypatch.setattr(db.result_cache, "max_entries", 0)
+    bought = {"ann": ["pen", "ink", "pad", "pen"], "bob": ["pen", "pad"], "cid": ["ink", "pad", "pen", "cup"], "dan": []}
+    values = ", ".join(f"('{customer}', '{product}')" for customer, products in bought.items() for product in products)
+    run("CREATE TABLE purchases (customer str, product str)", f"INSERT INTO purchases (customer, product) VALUES {values}",
+        "INSERT INTO purchases (customer, product) VALUES ('eve', NULL)",
+        "CREATE TABLE wanted (product str)", "INSERT INTO wanted (product) VALUES ('pen'), ('ink'), ('pad')")
+
+
+def customers(rows):
+    return sorted(row["customer"] for row in rows)
+
+
+def test_quotient_covers_every_divisor_row(purchases, db, select):
+    assert customers(select("SELECT * FROM purchases DIVISION wanted")) == ["ann", "cid"]
+    assert customers(db.division_operation("purchases", "wanted", ADMIN)) == ["ann", "cid"]
+
+
+def test_clauses_apply_to_the_quotient(purchases, select):
+    assert select("SELECT customer FROM purchases DIVISION wanted WHERE customer != 'ann' ORDER BY customer") == \
+        [{"customer": "cid"}]
+    assert select("SELECT COUNT(*) AS n FROM purchases DIVISION wanted") == [{"n": 2}]
+
+
+def test_empty_divisor_divides_everything(purchases, run, select):
+    run("TRUNCATE TABLE wanted")
+    assert customers(select("SELECT * FROM purchases DIVISION wanted")) == ["ann", "bob", "cid", "eve"]
+
+
+def test_null_never_matches(purchases, run, select):
+    run("INSERT INTO wanted (product) VALUES (NULL)")
+    assert select("SELECT * FROM purchases DIVISION wanted") == []
+
+
+def test_divisor_columns_must_exist_in_dividend(purchases, run, db):
+    run("CREATE TABLE other (sku str)", "INSERT INTO other (sku) VALUES ('pen')")
+    assert db.division_operation("purchases", "other", ADMIN) == []
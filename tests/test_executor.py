@@ -0,0 +1,50 @@
+import pytest
+
+import config.config as conf
+import core.table_storage as table_storage
+from conftest import ADMIN
+from core.executor import Filter, Limit, Project
+from query.sql_ast import BinaryOp, Column, Literal
+
+ROWS = 5000
+
+
+@pytest.fixture
+def decoded(run, db, monkeypatch):
+    """Blocks decrypted by the queries of a test, over a 5-block table t(id, v)."""
+    monkeypatch.setattr(db.result_cache, "max_entries", 0)
+    monkeypatch.setattr(conf, "parallel_workers", 1)
+    run("CREATE TABLE t (id int, v int)")
+    db.insert_records("t", [{"id": i, "v": i % 10} for i in range(ROWS)], ADMIN)
+    count = []
+    decode = table_storage.decode_block
+    monkeypatch.setattr(table_storage, "decode_block", lambda *args: count.append(1) or decode(*args))
+    return count
+
+
+def test_operators_pull_rows_lazily():
+    pulled = []
+
+    def source():
+        for i in range(1000):
+            pulled.append(i)
+            yield {"id": i, "v": i % 10}
+
+    node = Limit(Project(Filter(source(), (">", "v", 7)), [("double", BinaryOp("*", Column("id"), Literal(2)))]), 3)
+    assert list(node) == [{"double": 16}, {"double": 18}, {"double": 36}]
+    assert pulled == list(range(19))
+
+
+def test_limit_stops_the_scan(decoded, select):
+    assert select("SELECT /*+ SEQSCAN */ id FROM t WHERE v = 3 LIMIT 5") == [{"id": i} for i in (3, 13, 23, 33, 43)]
+    assert len(decoded) == 1
+
+
+def test_without_limit_every_block_is_read(decoded, select):
+    assert len(select("SELECT /*+ SEQSCAN */ id FROM t WHERE v = 3")) == ROWS // 10
+    assert len(decoded) == 5
+
+
+def test_pipeline_clauses_compose(decoded, select):
+    rows = select("SELECT id, v * 10 AS w FROM t WHERE id < 30 AND v > 6 ORDER BY id DESC LIMIT 4")
+    assert rows == [{"id": 29, "w": 90}, {"id": 28, "w": 80}, {"id": 27, "w": 70}, {"id": 19, "w": 90}]
@@ -0,0 +1,63 @@
+import os
+
+import pytest
+
+
+@pytest.fixture
+def covered(run, db):
+    run("CREATE TABLE c (k str, x int, y int)",
+        "INSERT INTO c (k, x, y) VALUES ('a', 1, 100), ('b', 2, 200), ('a', 3, 300)",
+        "CREATE INDEX ON c (k) INCLUDE (x, y)")
+    assert db.plan_scan("c", ("=", "k", "a"), ["k", "x", "y"]).method == "index_only_scan"
+
+
+def test_drop_included_column_drops_covering_index(covered, run, db, select):
+    run("ALTER TABLE c DROP COLUMN y", "INSERT INTO c (k, x) VALUES ('a', 4)")
+    assert db.plan_scan("c", ("=", "k", "a"), ["k", "x", "y"]).method != "index_only_scan"
+    assert "k" not in db._index_definitions("c")
+    assert select("SELECT k, x, y FROM c WHERE k = 'a'") == [
+        {"k": "a", "x": 1, "y": None}, {"k": "a", "x": 3, "y": None}, {"k": "a", "x": 4, "y": None}]
+
+
+def test_add_column_rebuilds_indexes(covered, run, select):
+    run("ALTER TABLE c ADD COLUMN z int", "INSERT INTO c (k, x, y, z) VALUES ('a', 5, 500, 9)")
+    assert select("SELECT k, x, y FROM c WHERE k = 'a'") == [
+        {"k": "a", "x": 1, "y": 100}, {"k": "a", "x": 3, "y": 300}, {"k": "a", "x": 5, "y": 500}]
+
+
+def test_single_row_writes_append_to_index_log(run, db, select):
+    values = ", ".join(f"('k{i}', {i}, {i})" for i in range(200))
+    run("CREATE TABLE big (k str, x int, y int)", f"INSERT INTO big (k, x, y) VALUES {values}",
+        "CREATE INDEX ON big (k) INCLUDE (x)")
+    definition = db._index_definitions("big")["k"]
+    with open(db._index_path(definition), "rb") as f:
+        snapshot = f.read()
+    run(*[f"INSERT INTO big (k, x, y) VALUES ('new', {i}, 0)" for i in range(3)])
+    with open(db._index_path(definition), "rb") as f:
+        assert f.read() == snapshot
+    assert os.path.exists(db._index_log_path(definition))
+    db.indexes.clear()
+    assert select("SELECT x FROM big WHERE k = 'new'") == [{"x": 0}, {"x": 1}, {"x": 2}]
+
+
+def test_index_log_replayed_on_load(covered, run, db, select):
+    run("INSERT INTO c (k, x, y) VALUES ('a', 4, 400)", "UPDATE c SET y = 0 WHERE x = 1", "DELETE FROM c WHERE x = 3")
+    db.indexes.clear()
+    assert db.plan_scan("c", ("=", "k", "a"), ["k", "x", "y"]).method == "index_only_scan"
+    assert select("SELECT k, x, y FROM c WHERE k = 'a'") == [{"k": "a", "x": 1, "y": 0}, {"k": "a", "x": 4, "y": 400}]
+
+
+def test_merge_refreshes_covering_index(covered, run, select):
+    run("CREATE TABLE s (k str, x int, y int)",
+        "INSERT INTO s (k, x, y) VALUES ('a', 1, 111), ('a', 9, 900)",
+        "MERGE INTO c USING s ON c.x = s.x WHEN MATCHED THEN UPDATE SET y = s.y "
+        "WHEN NOT MATCHED THEN INSERT (k, x, y) VALUES (s.k, s.x, s.y)")
+    assert select("SELECT k, x, y FROM c WHERE k = 'a'") == [
+        {"k": "a", "x": 1, "y": 111}, {"k": "a", "x": 3, "y": 300}, {"k": "a", "x": 9, "y": 900}]
+
+
+def test_truncate_empties_covering_index(covered, run, select):
+    run("TRUNCATE TABLE c")
+    assert select("SELECT k, x, y FROM c WHERE k = 'a'") == []
+    run("INSERT INTO c (k, x, y) VALUES ('a', 7, 700)")
+    assert select("SELECT k, x, y FROM c WHERE k = 'a'") == [{"k": "a", "x": 7, "y": 700}]
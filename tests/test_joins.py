@@ -0,0 +1,94 @@
+import pytest
+
+import config.config as conf
+from conftest import ADMIN
+from core.executor import HashJoin
+
+
+@pytest.fixture
+def tables(run):
+    run("CREATE TABLE a (id int, x text)", "INSERT INTO a (id, x) VALUES (1, 'left'), (2, 'lonely')",
+        "CREATE TABLE a2 (id int, x text, y int)", "INSERT INTO a2 (id, x, y) VALUES (1, 'right', 7)")
+
+
+@pytest.mark.parametrize("hint", ["NESTLOOP", "HASHJOIN", "MERGEJOIN"])
+def test_shared_column_keeps_both_sides(tables, select, hint):
+    assert select(f"SELECT /*+ {hint} */ a.x, a2.x FROM a JOIN a2 ON a.id = a2.id") == [{"a.x": "left", "a2.x": "right"}]
+    assert select(f"SELECT /*+ {hint} */ l.x, r.x, y FROM a l JOIN a2 r ON l.id = r.id") == \
+        [{"l.x": "left", "r.x": "right", "y": 7}]
+
+
+def test_shared_column_in_where_and_outer_join(tables, select):
+    assert select("SELECT a.x FROM a JOIN a2 ON a.id = a2.id WHERE a2.x = 'right'") == [{"x": "left"}]
+    assert select("SELECT a.x FROM a JOIN a2 ON a.id = a2.id WHERE a2.x = 'left'") == []
+    # Ligne de gauche sans correspondance : la colonne de droite vaut NULL, celle de gauche est gardée.
+    assert select("SELECT a.x, a2.x, id FROM a LEFT JOIN a2 ON a.id = a2.id ORDER BY id") == \
+        [{"a.x": "left", "a2.x": "right", "id": 1}, {"a.x": "lonely", "a2.x": None, "id": 2}]
+
+
+@pytest.mark.parametrize("condition", ["a.id = a2.id", "a.id == a2.id", "row1['id'] == row2[\"id\"]"])
+def test_full_outer_join_accepts_legacy_conditions(tables, run, db, condition):
+    run("INSERT INTO a2 (id, x, y) VALUES (3, 'alone', 9)")
+    rows = db.full_outer_join("a", "a2", condition, ADMIN)
+    assert [(row["a.x"], row["a2.x"]) for row in rows] == [("left", "right"), ("lonely", None), (None, "alone")]
+
+
+@pytest.fixture
+def pairs(run, db, monkeypatch):
+    """l(id, k) and r(k, w), with repeated and NULL keys; returns the expected inner join as (id, w) pairs."""
+    monkeypatch.setattr(db.result_cache, "max_entries", 0)
+    left = [{"id": i, "k": None if i % 17 == 0 else i % 40} for i in range(300)]
+    right = [{"k": None if j % 13 == 0 else j % 50, "w": j} for j in range(120)]
+    run("CREATE TABLE l (id int, k int)", "CREATE TABLE r (k int, w int)")
+    db.insert_records("l", left, ADMIN)
+    db.insert_records("r", right, ADMIN)
+    run("CREATE BITMAP INDEX rk ON r (k)")
+    return sorted((a["id"], b["w"]) for a in left for b in right if a["k"] is not None and a["k"] == b["k"])
+
+
+@pytest.mark.parametrize("hint, method", [
+    ("NESTLOOP", "nested_loop"), ("HASHJOIN", "hash_join"), ("MERGEJOIN", "merge_join"),
+    ("INDEXNESTLOOP", "index_nested_loop"),
+])
+def test_join_methods_agree(pairs, db, select, hint, method):
+    assert db.plan_join("l", "r", "k", "k", [hint]).method == method
+    rows = select(f"SELECT /*+ {hint} */ id, w FROM l JOIN r ON l.k = r.k")
+    assert sorted((row["id"], row["w"]) for row in rows) == pairs
+
+
+def test_hash_join_spills_beyond_memory(pairs, select, monkeypatch):
+    monkeypatch.setattr(conf, "join_memory_rows", 10)
+    rows = select("SELECT /*+ HASHJOIN */ id, w FROM l JOIN r ON l.k = r.k")
+    assert sorted((row["id"], row["w"]) for row in rows) == pairs
+    join = HashJoin([{"k": i % 7} for i in range(50)], [{"k": i, "n": i} for i in range(30)], "k", "k",
+                    lambda a, b: (a["k"], b["n"]), memory_rows=5, partitions=4)
+    assert sorted(join) == sorted((i % 7, i % 7) for i in range(50))
+    assert join.spilled
+
+
+def test_residual_on_condition(pairs, select):
+    rows = select("SELECT /*+ HASHJOIN */ id, w FROM l JOIN r ON l.k = r.k AND r.w > 60 AND l.id < 100")
+    assert sorted((row["id"], row["w"]) for row in rows) == [(i, w) for i, w in pairs if w > 60 and i < 100]
+
+
+@pytest.mark.parametrize("kind, expected", [
+    ("LEFT", [(1, "right", 7), (2, None, None)]),
+    ("RIGHT", [(1, "right", 7), (None, "alone", 9), (None, "nokey", 4)]),
+    ("FULL OUTER", [(1, "right", 7), (2, None, None), (None, "alone", 9), (None, "nokey", 4)]),
+])
+def test_outer_joins_pad_with_null(tables, run, select, kind, expected):
+    run("INSERT INTO a2 (id, x, y) VALUES (3, 'alone', 9), (NULL, 'nokey', 4)")
+    rows = select(f"SELECT a.id, a2.x, y FROM a {kind} JOIN a2 ON a.id = a2.id")
+    assert sorted(((row["id"], row["x"], row["y"]) for row in rows), key=repr) == sorted(expected, key=repr)
+
+
+def test_outer_join_with_empty_table_uses_catalog_columns(run, select):
+    run("CREATE TABLE p (id int, name str)", "INSERT INTO p (id, name) VALUES (1, 'a')", "CREATE TABLE q (pid int, qty int)")
+    assert select("SELECT * FROM p LEFT JOIN q ON p.id = q.pid") == [{"id": 1, "name": "a", "pid": None, "qty": None}]
+    assert select("SELECT * FROM q FULL JOIN p ON q.pid = p.id") == [{"pid": None, "qty": None, "id": 1, "name": "a"}]
+    assert select("SELECT * FROM p RIGHT JOIN q ON p.id = q.pid") == []
+
+
+def test_outer_join_residual_keeps_unmatched_rows(tables, select):
+    rows = select("SELECT a.x, a2.x FROM a LEFT JOIN a2 ON a.id = a2.id AND y > 10")
+    assert rows == [{"a.x": "left", "a2.x": None}, {"a.x": "lonely", "a2.x": None}]
@@ -0,0 +1,69 @@
+import pytest
+
+from conftest import ADMIN
+from core.table_storage import TableFile
+from query.sql_parser import parse_sql
+from utils.json_utils import compile_path, extract_path
+
+DOCS = {
+    1: '{"a": {"b": "x", "n": 1}, "tags": ["red", "blue"]}',
+    2: '{"a": {"b": "y", "n": 2}, "items": [{"x": 1, "y": 2}, {"x": 3}]}',
+    3: '{"a": {"b": "x", "n": 3}}',
+    4: '{"a": 5}',
+}
+
+
+@pytest.fixture
+def docs(run, db, monkeypatch):
+    monkeypatch.setattr(db.result_cache, "max_entries", 0)
+    values = ", ".join(f"({i}, '{doc}')" for i, doc in DOCS.items())
+    run("CREATE TABLE docs (id int, data JSONB)", f"INSERT INTO docs (id, data) VALUES {values}")
+
+
+def test_jsonb_stored_decoded(docs, db):
+    rows = TableFile(db._get_table_path("docs"), db.metadata_key).rows()
+    assert rows[0]["data"] == {"a": {"b": "x", "n": 1}, "tags": ["red", "blue"]}
+
+
+def test_invalid_json_is_rejected(docs, run, select, monkeypatch):
+    errors = []
+    monkeypatch.setattr("core.database_system.print_error", errors.append)
+    run("INSERT INTO docs (id, data) VALUES (5, '{not json')")
+    assert len(errors) == 1
+    assert len(select("SELECT id FROM docs")) == 4
+
+
+def test_paths_compile_to_keys_and_indexes():
+    assert compile_path("$.a.b[0]") == ("a", "b", 0)
+    assert compile_path("['a'][-1]") == ("a", -1)
+    assert extract_path({"a": [1, {"b": 2}]}, compile_path("$.a[1].b")) == 2
+    assert extract_path({"a": 1}, compile_path("$.a.b")) is None
+    for path in ("$.a.__class__()", "[0].__import__('os')", "$.a; 1"):
+        with pytest.raises(ValueError):
+            compile_path(path)
+
+
+def test_query_json_and_json_table(docs, db):
+    assert db.query_json("docs", "data", "$.a.n", ADMIN) == [{"data": 1}, {"data": 2}, {"data": 3}, {"data": None}]
+    assert db.query_json("docs", "data", "__import__('os')", ADMIN) == []
+    assert db.json_table("docs", "data", "$.items", ["x", "y"], ADMIN) == [{"x": 1, "y": 2}, {"x": 3, "y": None}]
+
+
+@pytest.mark.parametrize("condition, expected", [
+    ("data->'a'->>'b' = 'x'", [1, 3]),
+    ("data->'a'->>'b' IN ('y', 'z')", [2]),
+    ("data->'a'->>'b' = 'w'", []),
+])
+def test_path_index_matches_scan(docs, run, db, select, condition, expected):
+    scanned = sorted(row["id"] for row in select(f"SELECT /*+ SEQSCAN */ id FROM docs WHERE {condition}"))
+    run("CREATE INDEX ON docs ((data->'a'->>'b'))")
+    plan = db.plan_scan("docs", parse_sql(f"SELECT id FROM docs WHERE {condition}").where, hints=["INDEXSCAN"])
+    assert plan.method == "index_scan"
+    indexed = sorted(row["id"] for row in select(f"SELECT /*+ INDEXSCAN */ id FROM docs WHERE {condition}"))
+    assert scanned == indexed == expected
+
+
+def test_path_index_follows_writes(docs, run, select):
+    run("CREATE INDEX ON docs ((data->'a'->>'b'))", "UPDATE docs SET data = '{\"a\": {\"b\": \"x\"}}' WHERE id = 2",
+        "DELETE FROM docs WHERE id = 1")
+    assert sorted(row["id"] for row in select("SELECT /*+ INDEXSCAN */ id FROM docs WHERE data->'a'->>'b' = 'x'")) == [2, 3]
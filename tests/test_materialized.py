@@ -0,0 +1,82 @@
+import pytest
+
+
+@pytest.fixture
+def orders(run):
+    run("CREATE TABLE od (id int, g int, amt int, note str)",
+        "INSERT INTO od (id, g, amt, note) VALUES (1, 1, 10, 'a'), (2, 1, 5, 'b'), (3, 2, 7, 'c')",
+        "CREATE MATERIALIZED VIEW sv AS SELECT g, SUM(amt) AS total FROM od GROUP BY g")
+
+
+def test_drop_column_read_by_view_is_refused(orders, run, select):
+    run("ALTER TABLE od DROP COLUMN amt", "REFRESH MATERIALIZED VIEW sv")
+    assert "amt" in select("SELECT * FROM od")[0]
+    assert select("SELECT g, total FROM sv ORDER BY g") == [{"g": 1, "total": 15}, {"g": 2, "total": 7}]
+
+
+def test_drop_column_not_read_by_view(orders, run, select):
+    run("ALTER TABLE od DROP COLUMN note", "INSERT INTO od (id, g, amt) VALUES (4, 2, 1)", "REFRESH MATERIALIZED VIEW sv")
+    assert "note" not in select("SELECT * FROM od")[0]
+    assert select("SELECT g, total FROM sv ORDER BY g") == [{"g": 1, "total": 15}, {"g": 2, "total": 8}]
+
+
+def test_drop_column_under_select_star_is_refused(orders, run, select):
+    run("CREATE MATERIALIZED VIEW allv AS SELECT * FROM od WHERE g = 2", "ALTER TABLE od DROP COLUMN note",
+        "REFRESH MATERIALIZED VIEW allv")
+    assert select("SELECT note FROM allv") == [{"note": "c"}]
+
+
+VIEWS = {
+    "agg": "SELECT g, count(*) AS n, sum(amt) AS total, avg(amt) AS mean, min(amt) AS lo, max(amt) AS hi FROM od GROUP BY g",
+    "sel": "SELECT id, amt FROM od WHERE amt > 6",
+    "joined": "SELECT od.id, od.amt, gr.label FROM od JOIN gr ON od.g = gr.g",
+}
+
+
+def _sorted(rows):
+    return sorted(rows, key=lambda row: sorted((key, str(value)) for key, value in row.items()))
+
+
+@pytest.fixture
+def views(orders, run, monkeypatch, db):
+    monkeypatch.setattr(db.result_cache, "max_entries", 0)
+    run("CREATE TABLE gr (g int, label str)", "INSERT INTO gr (g, label) VALUES (1, 'un'), (2, 'deux'), (3, 'trois')",
+        *(f"CREATE MATERIALIZED VIEW {name} AS {query}" for name, query in VIEWS.items()))
+
+
+def _assert_views_current(select):
+    for name, query in VIEWS.items():
+        assert _sorted(select(f"SELECT * FROM {name}")) == _sorted(select(query)), name
+
+
+@pytest.mark.parametrize("writes", [
+    ["INSERT INTO od (id, g, amt, note) VALUES (4, 3, 20, 'd'), (5, 1, 1, 'e')"],
+    ["UPDATE od SET amt = 2 WHERE id = 1", "UPDATE od SET g = 2 WHERE id = 2"],
+    ["DELETE FROM od WHERE amt = 10", "DELETE FROM od WHERE g = 2"],
+    ["CREATE TABLE src (id int, amt int)", "INSERT INTO src (id, amt) VALUES (3, 30), (9, 8)",
+     "MERGE INTO od USING src ON od.id = src.id WHEN MATCHED THEN UPDATE SET amt = src.amt "
+     "WHEN NOT MATCHED THEN INSERT (id, g, amt, note) VALUES (src.id, 3, src.amt, 'm')"],
+    ["TRUNCATE TABLE od", "INSERT INTO od (id, g, amt, note) VALUES (6, 2, 4, 'f')"],
+    ["INSERT INTO gr (g, label) VALUES (1, 'one')", "DELETE FROM gr WHERE g = 2"],
+])
+def test_incremental_maintenance_matches_recomputation(views, run, select, writes):
+    run(*writes)
+    _assert_views_current(select)
+
+
+def test_on_demand_view_applies_logged_changes_on_refresh(orders, run, select):
+    run("CREATE MATERIALIZED VIEW dv REFRESH ON DEMAND AS SELECT g, sum(amt) AS total FROM od GROUP BY g",
+        "INSERT INTO od (id, g, amt, note) VALUES (4, 2, 3, 'd')", "DELETE FROM od WHERE id = 1")
+    assert select("SELECT g, total FROM dv ORDER BY g") == [{"g": 1, "total": 15}, {"g": 2, "total": 7}]
+    run("REFRESH MATERIALIZED VIEW dv")
+    assert select("SELECT g, total FROM dv ORDER BY g") == [{"g": 1, "total": 5}, {"g": 2, "total": 10}]
+
+
+def test_emptied_group_forgets_its_extremes(orders, run, select):
+    run("CREATE MATERIALIZED VIEW tot AS SELECT count(*) AS n, sum(amt) AS s, max(amt) AS hi FROM od",
+        "DELETE FROM od WHERE id > 0")
+    assert select("SELECT n, s, hi FROM tot") == [{"n": 0, "s": None, "hi": None}]
+    run("INSERT INTO od (id, g, amt, note) VALUES (4, 1, 1, 'd')")
+    assert select("SELECT n, s, hi FROM tot") == [{"n": 1, "s": 1, "hi": 1}]
+    run("DELETE FROM od WHERE g = 1", "INSERT INTO od (id, g, amt, note) VALUES (5, 1, 2, 'e')")
+    assert select("SELECT g, total FROM sv") == [{"g": 1, "total": 2}]
@@ -0,0 +1,28 @@
+import pytest
+
+
+@pytest.fixture
+def inventory(run):
+    run("CREATE TABLE inv (id int, qty int CHECK (qty >= 0))",
+        "INSERT INTO inv (id, qty) VALUES (1, 5), (2, 7)",
+        "CREATE TABLE src (id int, qty int)",
+        "INSERT INTO src (id, qty) VALUES (1, 3), (2, 4), (3, 9)")
+
+
+def test_merge_rejects_check_violation_on_update(inventory, run, select):
+    run("MERGE INTO inv USING src ON inv.id = src.id WHEN MATCHED THEN UPDATE SET qty = -1")
+    assert select("SELECT id, qty FROM inv") == [{"id": 1, "qty": 5}, {"id": 2, "qty": 7}]
+
+
+def test_merge_rejects_check_violation_on_insert(inventory, run, select):
+    run("MERGE INTO inv USING src ON inv.id = src.id "
+        "WHEN MATCHED THEN UPDATE SET qty = inv.qty + src.qty "
+        "WHEN NOT MATCHED THEN INSERT (id, qty) VALUES (src.id, 0 - src.qty)")
+    assert select("SELECT id, qty FROM inv") == [{"id": 1, "qty": 5}, {"id": 2, "qty": 7}]
+
+
+def test_merge_applies_valid_rows(inventory, run, select):
+    run("MERGE INTO inv USING src ON inv.id = src.id "
+        "WHEN MATCHED THEN UPDATE SET qty = inv.qty - src.qty "
+        "WHEN NOT MATCHED THEN INSERT (id, qty) VALUES (src.id, src.qty)")
+    assert select("SELECT id, qty FROM inv") == [{"id": 1, "qty": 2}, {"id": 2, "qty": 3}, {"id": 3, "qty": 9}]
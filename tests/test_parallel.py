@@ -0,0 +1,31 @@
+import pytest
+
+import config.config as conf
+from conftest import ADMIN
+
+
+@pytest.fixture
+def big(db, run, monkeypatch):
+    monkeypatch.setattr(conf, "parallel_workers", 4)
+    monkeypatch.setattr(db.result_cache, "max_entries", 0)
+    run("CREATE TABLE big (id int, grp int, price float, tag str)",
+        "CREATE TABLE small (grp int, label str)")
+    db.insert_records("big", [
+        {"id": i, "grp": i % 7 if i % 11 else None, "price": i % 100 / 4 if i % 13 else None, "tag": "abc"[i % 3]}
+        for i in range(5000)], ADMIN)
+    db.insert_records("small", [{"grp": g, "label": f"L{g}"} for g in range(7)], ADMIN)
+
+
+@pytest.mark.parametrize("query", [
+    "SELECT * FROM big WHERE price > 20",
+    "SELECT id, tag FROM big WHERE tag = 'a' AND price < 3",
+    "SELECT count(*), sum(price), avg(price), min(price), max(price), count(distinct tag) FROM big WHERE id > 100",
+    "SELECT grp, count(*), sum(price), min(tag) FROM big GROUP BY grp ORDER BY grp",
+    "SELECT tag, grp, count(*) AS n FROM big WHERE price > 5 GROUP BY tag, grp HAVING count(*) > 50 ORDER BY tag, grp",
+    "SELECT id, price FROM big WHERE price > 20 ORDER BY price DESC, id LIMIT 7",
+    "SELECT big.id, small.label FROM big JOIN small ON big.grp = small.grp WHERE big.price > 24",
+    "SELECT grp, count(*) FROM big WHERE id < 0 GROUP BY grp",
+])
+def test_parallel_scan_matches_serial(big, db, query):
+    serial = db.execute_with_hints(query, ["PARALLEL(1)"], ADMIN)
+    assert db.execute_with_hints(query, ["PARALLEL(4)"], ADMIN) == serial
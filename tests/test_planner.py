@@ -0,0 +1,83 @@
+import pytest
+
+import config.config as conf
+from conftest import ADMIN
+from core.statistics import analyze_column, selectivity
+from query.sql_parser import parse_sql
+
+ROWS = 6000
+
+
+@pytest.fixture
+def orders(run, db, monkeypatch):
+    """`status` is 'done' on most rows and 'late' on a few; `customer` is unique and stored in key order."""
+    monkeypatch.setattr(conf, "parallel_workers", 1)
+    run("CREATE TABLE orders (id int, customer int, status str, amount int)")
+    db.insert_records("orders", [{"id": i, "customer": i, "status": "late" if i % 500 == 0 else "done", "amount": i % 100}
+                                 for i in range(ROWS)], ADMIN)
+    run("CREATE BITMAP INDEX os ON orders (status)", "ANALYZE orders")
+
+
+def plan(db, query, hints=None):
+    statement = parse_sql(query)
+    return db.plan_scan(statement.table, statement.where, hints=hints)
+
+
+def test_analyze_collects_column_statistics():
+    stats = analyze_column([1, 1, 1, 2, 3, None, None, 4])
+    assert stats["null_frac"] == 0.25
+    assert stats["n_distinct"] == 4
+    assert stats["mcv"] == [[1, 3 / 8]]
+    assert (stats["min"], stats["max"], stats["sorted"]) == (1, 4, True)
+    assert stats["histogram"][0] == 1 and stats["histogram"][-1] == 4
+
+
+def test_estimates_use_statistics(orders, db):
+    statistics = db._read_metadata()[1]["statistics"]["orders"]
+    assert statistics["row_count"] == ROWS
+    assert selectivity(statistics, ("=", "status", "late")) == pytest.approx(12 / ROWS)
+    assert selectivity(statistics, ("<", "customer", 1500)) == pytest.approx(0.25, abs=0.02)
+    assert selectivity(statistics, ("=", "status", None)) == 0.0
+
+
+def test_selective_predicate_uses_index(orders, db):
+    assert plan(db, "SELECT id FROM orders WHERE status = 'late'").method == "index_scan"
+    chosen = plan(db, "SELECT id FROM orders WHERE status = 'done'")
+    assert chosen.method == "seq_scan"
+    assert "index_scan" in [candidate.method for candidate in chosen.alternatives]
+
+
+def test_hints_are_directives(orders, db, select):
+    assert plan(db, "SELECT id FROM orders WHERE status = 'late'", ["SEQSCAN"]).method == "seq_scan"
+    assert plan(db, "SELECT id FROM orders WHERE status = 'done'", ["INDEXSCAN(status)"]).method == "index_scan"
+    forced = select("SELECT /*+ INDEXSCAN(status) */ id FROM orders WHERE status = 'late'")
+    assert sorted(row["id"] for row in forced) == list(range(0, ROWS, 500))
+
+
+def test_covering_index_allows_index_only_scan(orders, run, db, select):
+    run("CREATE INDEX oc ON orders (customer) INCLUDE (amount)")
+    statement = parse_sql("SELECT customer, amount FROM orders WHERE customer = 42")
+    chosen = db.plan_scan("orders", statement.where, ["customer", "amount"])
+    assert chosen.method == "index_only_scan"
+    assert select("SELECT customer, amount FROM orders WHERE customer = 42") == [{"customer": 42, "amount": 42}]
+
+
+def test_join_method_and_order(orders, run, db):
+    run("CREATE TABLE customers (id int, name str)")
+    db.insert_records("customers", [{"id": i, "name": f"c{i}"} for i in range(200)], ADMIN)
+    run("ANALYZE customers")
+    chosen = db.plan_join("orders", "customers", "customer", "id")
+    assert chosen.method == "hash_join"
+    # Table de construction : la plus petite.
+    assert chosen.inner == "customers"
+    assert db.plan_join("orders", "customers", "customer", "id", ["NESTLOOP"]).method == "nested_loop"
+    assert db.plan_join("orders", "customers", "customer", "id", ["LEADING(customers)"]).outer == "customers"
+
+
+def test_explain_lists_chosen_plan_and_alternatives(orders, run, monkeypatch):
+    printed = []
+    monkeypatch.setattr("query.query_parser.print_response", lambda text, kind: printed.append(text))
+    run("EXPLAIN SELECT id FROM orders WHERE status = 'late'")
+    lines = [line for line in printed[0].splitlines() if "scan" in line]
+    assert "*" in lines[0] and "index_scan" in lines[0]
+    assert any("seq_scan" in line for line in lines[1:])
@@ -0,0 +1,59 @@
+from collections import Counter
+
+import pytest
+
+import config.config as conf
+from conftest import ADMIN
+from core.executor import HashSetOp
+
+LEFT = [{"k": i % 7, "tag": None if i % 5 == 0 else "x"} for i in range(40)]
+RIGHT = [{"k": i % 4, "tag": None if i % 4 == 0 else "x"} for i in range(20)]
+
+
+def reference(op, all):
+    """Multiset result of LEFT <op> [ALL] RIGHT, NULL equal to NULL."""
+    left = Counter((row["k"], row["tag"]) for row in LEFT)
+    right = Counter((row["k"], row["tag"]) for row in RIGHT)
+    if op == "union":
+        return left + right if all else Counter(set(left) | set(right))
+    if op == "intersect":
+        return left & right if all else Counter(set(left) & set(right))
+    return left - right if all else Counter(set(left) - set(right))
+
+
+@pytest.fixture(params=[200000, 3], ids=["memory", "spilled"])
+def tables(request, run, db, monkeypatch):
+    monkeypatch.setattr(db.result_cache, "max_entries", 0)
+    monkeypatch.setattr(conf, "set_memory_rows", request.param)
+    run("CREATE TABLE a (k int, tag str)", "CREATE TABLE b (n int, label str)")
+    db.insert_records("a", [dict(row) for row in LEFT], ADMIN)
+    db.insert_records("b", [{"n": row["k"], "label": row["tag"]} for row in RIGHT], ADMIN)
+
+
+@pytest.mark.parametrize("op", ["union", "intersect", "except"])
+@pytest.mark.parametrize("all", [False, True])
+def test_set_operations_match_multisets(tables, select, op, all):
+    rows = select(f"SELECT k, tag FROM a {op.upper()}{' ALL' if all else ''} SELECT n, label FROM b")
+    # Colonnes nommées d'après la première requête.
+    assert Counter((row["k"], row["tag"]) for row in rows) == reference(op, all)
+
+
+def test_order_by_and_limit_apply_to_the_whole_result(tables, select):
+    rows = select("SELECT k FROM a UNION SELECT n FROM b WHERE n < 2 ORDER BY k DESC LIMIT 3")
+    assert rows == [{"k": 6}, {"k": 5}, {"k": 4}]
+
+
+def test_intersect_binds_tighter_than_union(tables, select):
+    rows = select("SELECT k FROM a WHERE k = 6 UNION SELECT k FROM a INTERSECT SELECT n FROM b ORDER BY k")
+    assert rows == [{"k": k} for k in (0, 1, 2, 3, 6)]
+
+
+def test_column_counts_must_match(tables, select):
+    with pytest.raises(ValueError):
+        select("SELECT k, tag FROM a UNION SELECT n FROM b")
+
+
+def test_spilled_partitions_are_processed(db):
+    node = HashSetOp(iter(LEFT), iter(RIGHT), "except", True, memory_rows=2, partitions=3, spill_key=db.metadata_key)
+    assert Counter((row["k"], row["tag"]) for row in node) == reference("except", True)
+    assert node.spilled
@@ -0,0 +1,86 @@
+import random
+
+import pytest
+
+import config.config as conf
+import core.table_storage as table_storage
+from conftest import ADMIN
+from core.executor import Sort, TopN
+from query.sql_ast import OrderItem
+
+ROWS = [{"id": i, "a": random.Random(i).choice([None, 1, 2, 3]), "b": random.Random(-i).randint(0, 50)} for i in range(700)]
+
+
+def reference(rows, a_descending, nulls_first):
+    """ORDER BY a [DESC] NULLS FIRST|LAST, b DESC, by successive stable sorts."""
+    rows = sorted(rows, key=lambda row: -row["b"])
+    present = sorted((row for row in rows if row["a"] is not None), key=lambda row: row["a"], reverse=a_descending)
+    nulls = [row for row in rows if row["a"] is None]
+    return nulls + present if nulls_first else present + nulls
+
+
+@pytest.mark.parametrize("a_descending", [False, True])
+@pytest.mark.parametrize("nulls_first", [False, True])
+def test_external_sort_matches_in_memory_sort(db, a_descending, nulls_first):
+    order_by = [OrderItem("a", a_descending, nulls_first), OrderItem("b", True)]
+    node = Sort(iter(ROWS), order_by, memory_rows=64, spill_key=db.metadata_key)
+    assert list(node) == reference(ROWS, a_descending, nulls_first)
+    assert node.runs == 11
+
+
+def test_default_null_placement_and_mixed_types(db):
+    rows = [{"v": value} for value in [3, "b", None, 1.5, "a", 2]]
+    ascending = list(Sort(iter(rows), [OrderItem("v")], memory_rows=2, spill_key=db.metadata_key))
+    # Comme PostgreSQL : NULL en dernier en ordre croissant, en premier en ordre décroissant ; nombres avant chaînes.
+    assert [row["v"] for row in ascending] == [1.5, 2, 3, "a", "b", None]
+    descending = list(Sort(iter(rows), [OrderItem("v", True)], memory_rows=2, spill_key=db.metadata_key))
+    assert [row["v"] for row in descending] == [None, "b", "a", 3, 2, 1.5]
+
+
+def test_order_by_spills_beyond_memory(run, db, select, monkeypatch):
+    monkeypatch.setattr(conf, "sort_memory_rows", 50)
+    run("CREATE TABLE t (id int, a int, b int)")
+    db.insert_records("t", [dict(row) for row in ROWS], ADMIN)
+    rows = select("SELECT id FROM t ORDER BY a DESC NULLS LAST, b DESC")
+    assert [row["id"] for row in rows] == [row["id"] for row in reference(ROWS, True, False)]
+
+
+class OrderedRows(list):
+    """Rows already in order of the first sort key, as an index order scan yields them."""
+    ordered = True
+
+    def __iter__(self):
+        self.pulled = 0
+        for row in list.__iter__(self):
+            self.pulled += 1
+            yield row
+
+
+def test_top_n_matches_sort_and_slice():
+    order_by = [OrderItem("a", True, False), OrderItem("b")]
+    expected = sorted(ROWS, key=lambda row: (row["a"] is None, -(row["a"] or 0), row["b"]))[:25]
+    assert list(TopN(iter(ROWS), order_by, 25)) == expected
+
+
+def test_top_n_over_ordered_input_stops_after_ties():
+    rows = OrderedRows({"k": i // 10, "n": -i} for i in range(1000))
+    assert list(TopN(rows, [OrderItem("k")], 3)) == rows[:3]
+    assert rows.pulled == 3
+    # Clé suivante : les ex æquo de la première clé sont lus jusqu'au bout.
+    assert list(TopN(rows, [OrderItem("k"), OrderItem("n")], 3)) == [rows[9], rows[8], rows[7]]
+    assert rows.pulled == 11
+
+
+def test_index_is_read_in_order_under_limit(run, db, select, monkeypatch):
+    monkeypatch.setattr(db.result_cache, "max_entries", 0)
+    monkeypatch.setattr(conf, "parallel_workers", 1)
+    run("CREATE TABLE ev (id int, ts int)")
+    db.insert_records("ev", [{"id": i, "ts": (i * 7919) % 5000} for i in range(5000)], ADMIN)
+    run("CREATE BITMAP INDEX et ON ev (ts)", "ANALYZE ev")
+    top = (OrderItem("ts", True), 5)
+    assert db.plan_scan("ev", None, ["id", "ts"], order=top).method == "index_order_scan"
+    decoded = []
+    decode = table_storage.decode_block
+    monkeypatch.setattr(table_storage, "decode_block", lambda *args: decoded.append(1) or decode(*args))
+    assert [row["ts"] for row in select("SELECT id, ts FROM ev ORDER BY ts DESC LIMIT 5")] == [4999, 4998, 4997, 4996, 4995]
+    assert len(decoded) <= 5
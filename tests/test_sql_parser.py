@@ -0,0 +1,120 @@
+import dataclasses
+
+import pytest
+
+from conftest import ADMIN
+from core.planner import Planner
+from query.prepared import PreparedStatement
+from query.query_parser import execute_query
+from query.sql_ast import BinaryOp, Column, Delete, Literal, Param, Update
+from query.sql_parser import SQLSyntaxError, normalize_query, parse_sql
+
+
+def test_line_comment_ends_at_newline():
+    statement = parse_sql("DELETE FROM r -- purge one row\nWHERE id = 2")
+    assert isinstance(statement, Delete)
+    assert statement.where == ("=", "id", 2)
+
+
+def test_comments_dropped_but_literals_and_hints_kept():
+    assert normalize_query("UPDATE r SET v = '-- x' /* c */ WHERE id = 1 -- tail") == "UPDATE r SET v = '-- x' WHERE id = 1"
+    assert normalize_query("SELECT /*+ PARALLEL(2) */ a FROM t;") == "SELECT /*+ PARALLEL(2) */ a FROM t"
+    assert parse_sql("SELECT /*+ SEQSCAN */ a FROM t -- c").hints == ["SEQSCAN"]
+
+
+def test_delete_and_update_with_trailing_line_comment(run, select):
+    run("CREATE TABLE r (id int, v int)", "INSERT INTO r (id, v) VALUES (1, 10), (2, 20), (3, 30)")
+    run("UPDATE r SET v = 0 -- reset\nWHERE id = 1")
+    run("DELETE FROM r -- purge one row\nWHERE id = 2")
+    assert select("SELECT id, v FROM r") == [{"id": 1, "v": 0}, {"id": 3, "v": 30}]
+
+
+def test_select_distinct_is_not_an_alias():
+    statement = parse_sql("SELECT DISTINCT g FROM o")
+    assert statement.distinct and [item.alias for item in statement.items] == [None]
+    assert not parse_sql("SELECT ALL g FROM o").distinct
+
+
+def test_select_distinct_rows(run, select):
+    run("CREATE TABLE o (g int, h str)", "INSERT INTO o (g, h) VALUES (2, 'x'), (1, 'y'), (2, 'x'), (1, 'z'), (2, 'w')")
+    assert select("SELECT DISTINCT g FROM o") == [{"g": 2}, {"g": 1}]
+    assert select("SELECT DISTINCT g FROM o ORDER BY g LIMIT 1") == [{"g": 1}]
+    assert select("SELECT DISTINCT * FROM o WHERE g = 2") == [{"g": 2, "h": "x"}, {"g": 2, "h": "w"}]
+    assert select("SELECT DISTINCT count(*) AS n FROM o GROUP BY g ORDER BY n") == [{"n": 2}, {"n": 3}]
+    assert select("SELECT DISTINCT h FROM o WHERE h = 'x' UNION SELECT DISTINCT h FROM o WHERE g = 1") == [{"h": "x"}, {"h": "y"}, {"h": "z"}]
+
+
+def test_params_parsed_only_in_prepare():
+    prepared = parse_sql("PREPARE p AS SELECT id FROM a WHERE v > $1 AND s = $2")
+    assert prepared.param_count == 2
+    assert prepared.statement.where == ("and", [(">", "v", Param(index=1)), ("=", "s", Param(index=2))])
+    with pytest.raises(SQLSyntaxError):
+        parse_sql("SELECT id FROM a WHERE v > $1")
+    with pytest.raises(SQLSyntaxError):
+        parse_sql("PREPARE p AS SELECT id FROM a WHERE v > $2")
+
+
+def test_prepared_statement_binds_values(run, db):
+    run("CREATE TABLE a (id int, v int, s str)", "INSERT INTO a (id, v, s) VALUES (1, 10, 'x'), (2, 20, 'y'), (3, 30, 'x')")
+    statement = PreparedStatement.from_sql(db, "PREPARE p AS SELECT id FROM a WHERE v > $1 AND s = $2", ADMIN)
+    assert statement.execute((5, "x")) == [{"id": 1}, {"id": 3}]
+    assert statement.execute((15, "x' OR s = 'y")) == []
+    with pytest.raises(ValueError):
+        statement.execute((5,))
+
+
+def test_where_lowered_to_predicate_leaves():
+    where = parse_sql("SELECT id FROM t WHERE 5 < v AND s LIKE 'a%' AND v BETWEEN 1 AND 7 AND v = NULL").where
+    assert where == ("and", [(">", "v", 5), ("like", "s", "a%"), (">=", "v", 1), ("<=", "v", 7), ("in", "v", (None,))])
+    assert parse_sql("DELETE FROM t WHERE v > w").where == ("expr", BinaryOp(">", Column("v"), Column("w")))
+    joined = parse_sql("SELECT a.id FROM a JOIN b ON a.id = b.id WHERE a.x = 1").where
+    assert joined == ("expr", BinaryOp("=", Column("x", "a"), Literal(1)))
+
+
+def test_prepared_statement_reuses_its_access_plan(run, db, monkeypatch):
+    run("CREATE TABLE a (id int, v int)", "INSERT INTO a (id, v) VALUES (1, 10), (2, 20), (3, 30)",
+        "CREATE BITMAP INDEX iv ON a (v)")
+    statement = PreparedStatement.from_sql(db, "PREPARE p AS SELECT /*+ INDEXSCAN(v) */ id FROM a WHERE v = $1", ADMIN)
+    plans = []
+    choose = Planner.choose
+    monkeypatch.setattr(Planner, "choose", lambda self, *args: plans.append(choose(self, *args)) or plans[-1])
+    assert statement.execute((10,)) == [{"id": 1}]
+    # Plan repris, appliqué à la nouvelle valeur.
+    assert statement.execute((30,)) == [{"id": 3}]
+    assert [plan.method for plan in plans] == ["index_scan"]
+    # Autre forme (NULL) : nouveau plan.
+    assert statement.execute((None,)) == []
+    assert len(plans) == 2
+    run("ANALYZE a")
+    assert statement.execute((20,)) == [{"id": 2}]
+    assert len(plans) == 3
+
+
+def test_prepared_statements_belong_to_their_user(run, db, monkeypatch):
+    errors = []
+    monkeypatch.setattr("query.query_parser.print_error", errors.append)
+    run("CREATE TABLE a (id int)", "PREPARE p AS SELECT id FROM a WHERE id = $1")
+    run("EXECUTE p(1)")
+    assert errors == []
+    execute_query("EXECUTE p(1)", db, {**ADMIN, "username": "other"})
+    assert len(errors) == 1
+
+
+def test_executemany_checks_keys_against_table_and_batch(run, db, select):
+    run("CREATE TABLE k (id int PRIMARY KEY, code str UNIQUE)", "INSERT INTO k (id, code) VALUES (1, 'a')")
+    insert = PreparedStatement.from_sql(db, "PREPARE i AS INSERT INTO k (id, code) VALUES ($1, $2)", ADMIN)
+    assert insert.executemany([(2, "b"), (3, "c")]) == 2
+    assert insert.executemany([(4, "d"), (4, "e")]) == 0
+    assert insert.executemany([(5, "f"), (6, "a")]) == 0
+    assert [row["id"] for row in select("SELECT id FROM k")] == [1, 2, 3]
+
+
+def test_cached_ast_cannot_be_altered():
+    statement = parse_sql("SELECT id FROM a WHERE v > 1 ORDER BY id LIMIT 2")
+    with pytest.raises(dataclasses.FrozenInstanceError):
+        statement.limit = 5
+    assert dataclasses.replace(statement, limit=5).limit == 5
+    assert parse_sql("SELECT id FROM a WHERE v > 1 ORDER BY id LIMIT 2") is statement
+    assert statement.limit == 2
+    combined = parse_sql("SELECT id FROM a UNION SELECT id FROM b ORDER BY id LIMIT 3")
+    assert (combined.limit, combined.right.limit, combined.right.order_by) == (3, None, [])
@@ -0,0 +1,73 @@
+import pytest
+
+import config.config as conf
+import core.table_storage as table_storage
+from conftest import ADMIN
+from core.table_storage import TableFile
+from query.sql_parser import parse_sql
+
+ROWS = 5000
+
+
+@pytest.fixture
+def events(run, db, monkeypatch):
+    """5 blocks of rows in `ts` order; `user_id` is scattered (even values only) and every 7th `tag` is NULL."""
+    monkeypatch.setattr(db.result_cache, "max_entries", 0)
+    monkeypatch.setattr(conf, "parallel_workers", 1)
+    run("CREATE TABLE ev (ts int, user_id int, tag str)")
+    db.insert_records("ev", [{"ts": i, "user_id": i * 7919 % 1000 * 2, "tag": None if i % 7 == 0 else f"t{i % 50}"}
+                             for i in range(ROWS)], ADMIN)
+    return TableFile(db._get_table_path("ev"), db.metadata_key)
+
+
+@pytest.fixture
+def decoded(monkeypatch):
+    """Number of blocks decrypted since the fixture was set up."""
+    count = []
+    decode = table_storage.decode_block
+    monkeypatch.setattr(table_storage, "decode_block", lambda *args: count.append(1) or decode(*args))
+    return count
+
+
+def blocks_kept(table, condition):
+    return table.candidate_blocks(parse_sql(f"SELECT ts FROM ev WHERE {condition}").where)
+
+
+@pytest.mark.parametrize("condition, kept", [
+    ("ts >= 4500", [4]),
+    ("ts < 1024", [0]),
+    ("ts BETWEEN 1500 AND 2100", [1, 2]),
+    ("ts IN (3, 4999)", [0, 4]),
+    ("ts = 5000", []),
+    ("ts > 4500 AND ts < 4000", []),
+    ("ts < 10 OR ts > 4990", [0, 4]),
+    ("tag IS NULL", [0, 1, 2, 3, 4]),
+    ("user_id = 6", [0, 1, 2, 3, 4]),
+])
+def test_zone_maps_exclude_blocks(events, condition, kept):
+    assert events.num_blocks == 5
+    assert blocks_kept(events, condition) == kept
+
+
+def test_excluded_blocks_are_not_decrypted(events, select, decoded):
+    rows = select("SELECT /*+ SEQSCAN */ ts FROM ev WHERE ts >= 4990")
+    assert [row["ts"] for row in rows] == list(range(4990, ROWS))
+    assert len(decoded) == 1
+
+
+def test_bloom_filter_excludes_absent_values(events, run, db, select):
+    run("CREATE BLOOM INDEX ON ev (user_id)")
+    table = TableFile(db._get_table_path("ev"), db.metadata_key)
+    # Valeurs dispersées : les zone maps gardent tout, le filtre de Bloom écarte les blocs sans la valeur.
+    assert blocks_kept(events, "user_id = 1001") == [0, 1, 2, 3, 4]
+    assert blocks_kept(table, "user_id = 1001") == []
+    expected = sorted(i for i in range(ROWS) if i * 7919 % 1000 == 3)
+    assert sorted(row["ts"] for row in select("SELECT /*+ SEQSCAN */ ts FROM ev WHERE user_id = 6")) == expected
+
+
+def test_writes_keep_zone_maps_current(events, run, db, select):
+    run("UPDATE ev SET ts = 99999 WHERE ts = 10", "INSERT INTO ev (ts, user_id, tag) VALUES (-5, 1, 'x')")
+    table = TableFile(db._get_table_path("ev"), db.metadata_key)
+    assert blocks_kept(table, "ts > 50000") == [0]
+    assert blocks_kept(table, "ts < 0") == [4]
+    assert select("SELECT /*+ SEQSCAN */ user_id FROM ev WHERE ts > 50000") == [{"user_id": 10 * 7919 % 1000 * 2}]
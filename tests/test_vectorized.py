@@ -0,0 +1,74 @@
+import pytest
+
+import config.config as conf
+
+BIG = 4 * 10 ** 18
+
+
+@pytest.fixture
+def both_paths(monkeypatch, db, select):
+    """Rows of a query on the vectorized path and on the row-by-row path (result cache off)."""
+    monkeypatch.setattr(db.result_cache, "max_entries", 0)
+
+    def both(query):
+        monkeypatch.setattr(conf, "vectorized_execution", True)
+        vectorized = select(query)
+        monkeypatch.setattr(conf, "vectorized_execution", False)
+        return vectorized, select(query)
+    return both
+
+
+def test_sum_beyond_int64_is_exact(run, both_paths):
+    run("CREATE TABLE w (k int, x int)")
+    run(*(f"INSERT INTO w (k, x) VALUES ({i % 2}, {BIG})" for i in range(5)))
+    vectorized, rows = both_paths("SELECT sum(x), avg(x) FROM w")
+    assert vectorized == rows == [{"sum(x)": 5 * BIG, "avg(x)": float(BIG)}]
+
+
+def test_grouped_sum_beyond_int64_is_exact(run, both_paths):
+    run("CREATE TABLE w (k int, x int)")
+    run(*(f"INSERT INTO w (k, x) VALUES ({i % 2}, {BIG})" for i in range(5)))
+    vectorized, rows = both_paths("SELECT k, sum(x), avg(x) FROM w GROUP BY k")
+    assert vectorized == rows == [
+        {"k": 0, "sum(x)": 3 * BIG, "avg(x)": float(BIG)},
+        {"k": 1, "sum(x)": 2 * BIG, "avg(x)": float(BIG)},
+    ]
+
+
+def test_arithmetic_beyond_int64_is_exact(run, both_paths):
+    run("CREATE TABLE w (k int, x int)")
+    run(*(f"INSERT INTO w (k, x) VALUES ({i}, {BIG})" for i in range(3)))
+    vectorized, rows = both_paths("SELECT max(x * 3), sum(x + x), min(k - x) FROM w")
+    assert vectorized == rows == [{"max(x * 3)": 3 * BIG, "sum(x + x)": 6 * BIG, "min(k - x)": -BIG}]
+
+
+@pytest.fixture
+def mixed(run):
+    values = ", ".join(
+        f"({i}, {'NULL' if i % 5 == 0 else i % 7}, {'NULL' if i % 6 == 0 else i / 4}, "
+        f"{'NULL' if i % 4 == 0 else repr('abc'[i % 3] + str(i % 2))})"
+        for i in range(60))
+    run("CREATE TABLE m (id int, x int, f float, s str)", f"INSERT INTO m (id, x, f, s) VALUES {values}")
+
+
+@pytest.mark.parametrize("where", [
+    "x > 3 AND s = 'a1'",
+    "x IS NULL OR f < 2.5",
+    "s LIKE 'b%'",
+    "x != 3",
+    "x IN (1, 2, 6)",
+    "x BETWEEN 2 AND 4",
+    "NOT (f >= 5 AND s IS NOT NULL)",
+])
+def test_masks_match_row_path(mixed, both_paths, where):
+    vectorized, rows = both_paths(f"SELECT id FROM m WHERE {where}")
+    assert vectorized == rows
+    assert rows
+
+
+def test_aggregates_match_row_path(mixed, both_paths):
+    vectorized, rows = both_paths(
+        "SELECT s, count(*), count(x), sum(x), min(f), max(f), avg(f) FROM m WHERE id > 3 GROUP BY s ORDER BY s")
+    assert vectorized == rows
+    vectorized, rows = both_paths("SELECT count(*), count(s), sum(f), min(s), max(x), avg(x) FROM m")
+    assert vectorized == rows
@@ -0,0 +1,61 @@
+import pytest
+
+import config.config as conf
+
+# id: v, s ; les lignes 3 et 6 ont des NULL.
+ROWS = {1: (5, "abc"), 2: (10, "bcd"), 3: (None, None), 4: (30, "axe"), 5: (5, "b"), 6: (None, "a")}
+
+
+@pytest.fixture(params=["rows", "vectorized", "bitmap"])
+def where(request, run, select, db, monkeypatch):
+    """Ids matching a WHERE clause, on the row path, the vectorized path or bitmap indexes."""
+    monkeypatch.setattr(db.result_cache, "max_entries", 0)
+    monkeypatch.setattr(conf, "vectorized_execution", request.param != "rows")
+    values = ", ".join(f"({i}, {'NULL' if v is None else v}, {'NULL' if s is None else repr(s)})" for i, (v, s) in ROWS.items())
+    run("CREATE TABLE t (id int, v int, s str)", f"INSERT INTO t (id, v, s) VALUES {values}")
+    hint = "SEQSCAN"
+    if request.param == "bitmap":
+        run("CREATE BITMAP INDEX tv ON t (v)", "CREATE BITMAP INDEX ts ON t (s)")
+        hint = "BITMAPSCAN"
+    return lambda condition: sorted(row["id"] for row in select(f"SELECT /*+ {hint} */ id FROM t WHERE {condition}"))
+
+
+@pytest.mark.parametrize("condition, expected", [
+    ("v != 5", [2, 4]),
+    ("v <> 5", [2, 4]),
+    ("NOT v = 5", [2, 4]),
+    ("v NOT IN (10, 30)", [1, 5]),
+    ("v NOT IN (10, NULL)", []),
+    ("v NOT BETWEEN 6 AND 30", [1, 5]),
+    ("s NOT LIKE 'a%'", [2, 5]),
+    ("NOT (v > 1)", []),
+    ("NOT (v = 5 AND s = 'b')", [1, 2, 4, 6]),
+    ("NOT (v = 5 OR s = 'a')", [2, 4]),
+    ("NOT NOT v = 5", [1, 5]),
+    ("v = NULL", []),
+    ("NOT v = NULL", []),
+    ("v IS NULL", [3, 6]),
+    ("NOT v IS NULL", [1, 2, 4, 5]),
+    ("v IS NOT NULL AND NOT s IS NULL", [1, 2, 4, 5]),
+])
+def test_null_is_unknown_under_predicate_and_negation(where, condition, expected):
+    assert where(condition) == expected
+
+
+@pytest.mark.parametrize("condition, expected", [
+    ("v > id * 4", [1, 2, 4]),
+    ("v + 1 > 11", [4]),
+    ("NOT (v + 1 > 11)", [1, 2, 5]),
+    ("20 > v", [1, 2, 5]),
+    ("t.v = 10", [2]),
+    ("s = 'b' OR v - id = 4", [1, 5]),
+])
+def test_conditions_use_the_expression_grammar(where, condition, expected):
+    assert where(condition) == expected
+
+
+def test_unknown_column_is_reported(where, monkeypatch):
+    errors = []
+    monkeypatch.setattr("core.database_system.print_error", errors.append)
+    assert where("v > w") == []
+    assert errors and errors[0].endswith(": w")
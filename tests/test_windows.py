@@ -0,0 +1,82 @@
+import pytest
+
+from conftest import ADMIN
+
+ROWS = [{"id": i, "dept": i % 3, "day": (i * 7) % 20, "amount": None if i % 11 == 0 else (i * 37) % 50} for i in range(120)]
+
+
+@pytest.fixture
+def sales(run, db, monkeypatch):
+    monkeypatch.setattr(db.result_cache, "max_entries", 0)
+    run("CREATE TABLE sales (id int, dept int, day int, amount int)")
+    db.insert_records("sales", [dict(row) for row in ROWS], ADMIN)
+
+
+def partition(row):
+    """Rows of the partition of `row`, in ORDER BY day, id."""
+    return sorted((other for other in ROWS if other["dept"] == row["dept"]), key=lambda other: (other["day"], other["id"]))
+
+
+def aggregates(frame):
+    values = [row["amount"] for row in frame if row["amount"] is not None]
+    if not values:
+        return {"s": None, "a": None, "lo": None, "hi": None}
+    return {"s": sum(values), "a": sum(values) / len(values), "lo": min(values), "hi": max(values)}
+
+
+def by_id(rows):
+    return {row["id"]: row for row in rows}
+
+
+def test_ranking_functions(sales, select):
+    rows = by_id(select("SELECT id, ROW_NUMBER() OVER (PARTITION BY dept ORDER BY day, id) AS rn, "
+                        "RANK() OVER (PARTITION BY dept ORDER BY day) AS r, "
+                        "DENSE_RANK() OVER (PARTITION BY dept ORDER BY day) AS dr, "
+                        "NTILE(4) OVER (PARTITION BY dept ORDER BY day, id) AS tile FROM sales"))
+    assert len(rows) == len(ROWS)
+    for row in ROWS:
+        ordered = partition(row)
+        position = ordered.index(row)
+        days = [other["day"] for other in ordered]
+        assert rows[row["id"]]["rn"] == position + 1
+        assert rows[row["id"]]["r"] == days.index(row["day"]) + 1
+        assert rows[row["id"]]["dr"] == sorted(set(days)).index(row["day"]) + 1
+        # 40 lignes par partition : 4 groupes de 10.
+        assert rows[row["id"]]["tile"] == position // 10 + 1
+
+
+def test_lag_and_lead(sales, select):
+    rows = by_id(select("SELECT id, LAG(amount) OVER (PARTITION BY dept ORDER BY day, id) AS prev, "
+                        "LEAD(amount, 2, -1) OVER (PARTITION BY dept ORDER BY day, id) AS next2 FROM sales"))
+    for row in ROWS:
+        ordered = partition(row)
+        position = ordered.index(row)
+        assert rows[row["id"]]["prev"] == (ordered[position - 1]["amount"] if position else None)
+        assert rows[row["id"]]["next2"] == (ordered[position + 2]["amount"] if position + 2 < len(ordered) else -1)
+
+
+@pytest.mark.parametrize("frame, members", [
+    ("ROWS BETWEEN 2 PRECEDING AND 1 FOLLOWING",
+     lambda ordered, row: ordered[max(ordered.index(row) - 2, 0):ordered.index(row) + 2]),
+    ("RANGE BETWEEN 3 PRECEDING AND CURRENT ROW",
+     lambda ordered, row: [other for other in ordered if row["day"] - 3 <= other["day"] <= row["day"]]),
+    # Sans cadre : du début de la partition jusqu'aux pairs de la ligne courante.
+    ("", lambda ordered, row: [other for other in ordered if other["day"] <= row["day"]]),
+])
+def test_framed_aggregates(sales, select, frame, members):
+    order = "day, id" if frame.startswith("ROWS") else "day"
+    over = f"OVER (PARTITION BY dept ORDER BY {order} {frame})"
+    rows = by_id(select(f"SELECT id, SUM(amount) {over} AS s, AVG(amount) {over} AS a, "
+                        f"MIN(amount) {over} AS lo, MAX(amount) {over} AS hi FROM sales"))
+    for row in ROWS:
+        expected = aggregates(members(partition(row), row))
+        assert {key: rows[row["id"]][key] for key in expected} == pytest.approx(expected), row["id"]
+
+
+def test_window_result_can_be_ordered_and_limited(sales, select):
+    rows = select("SELECT id, RANK() OVER (ORDER BY amount DESC) AS r FROM sales WHERE amount IS NOT NULL "
+                  "ORDER BY r, id LIMIT 3")
+    amounts = [row["amount"] for row in ROWS if row["amount"] is not None]
+    ranks = [{"id": row["id"], "r": sum(amount > row["amount"] for amount in amounts) + 1}
+             for row in ROWS if row["amount"] is not None]
+    assert rows == sorted(ranks, key=lambda row: (row["r"], row["id"]))[:3]